@@ -0,0 +1,211 @@
+"""Eternity and channel stone layouts along a band.
+
+Stones are distributed by arc length along the band's girdle line. That line
+is either a client-supplied polyline or a circle derived from a US finger
+size. The solver finds the largest stone count that fits with at least
+``min_gap`` between girdles. It then spreads the leftover length evenly, up
+to ``min_gap + tolerance`` per gap. Everything is vectorized over the
+candidate counts and the curve samples; there is no per-stone loop.
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .manufacturability import MIN_STONE_CLEARANCE
+
+BAND_PATTERNS = ("eternity_full", "eternity_half", "channel")
+# Extra spacing allowed on top of the minimum gap before the layout is flagged
+BAND_GAP_TOLERANCE = 0.05
+DEFAULT_BAND_THICKNESS = 1.6
+CIRCLE_SEGMENTS = 720
+# Share of a closed band covered when the request does not say (open curves: all of it)
+DEFAULT_COVERAGE = {"eternity_full": 1.0, "eternity_half": 0.5, "channel": 1.0 / 3.0}
+
+
+def us_ring_inner_diameter(size: float) -> float:
+    """Inner diameter in mm for a US/Canada ring size (size 7 -> 17.3 mm)."""
+    return 11.63 + 0.8128 * size
+
+
+def ring_curve(finger_size: float, band_thickness: float = DEFAULT_BAND_THICKNESS,
+               segments: int = CIRCLE_SEGMENTS) -> np.ndarray:
+    """Girdle line of a ring: a circle in the XY plane, finger along z.
+
+    The curve starts at the top of the ring (+y) and runs clockwise when
+    viewed down +z, so arc length 0 is the centre stone of a half eternity.
+    """
+    radius = us_ring_inner_diameter(finger_size) / 2.0 + band_thickness
+    t = np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False)
+    return np.column_stack((radius * np.sin(t), radius * np.cos(t), np.zeros(segments)))
+
+
+class ArcLengthCurve:
+    """Polyline with vectorized lookup by arc length."""
+
+    def __init__(self, points, closed: bool):
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2 or points.shape[1] != 3 or len(points) < 2:
+            raise ValueError("curve must be a list of at least two [x, y, z] points")
+        if closed and np.allclose(points[0], points[-1]):
+            points = points[:-1]
+        self.points = np.vstack((points, points[:1])) if closed else points
+        self.closed = closed
+        seg = np.linalg.norm(np.diff(self.points, axis=0), axis=1)
+        self.cum = np.concatenate(([0.0], np.cumsum(seg)))
+        self.length = float(self.cum[-1])
+        if self.length <= 0:
+            raise ValueError("curve has zero length")
+        self.centroid = points.mean(axis=0)
+
+    def at(self, s: np.ndarray):
+        """Points, unit tangents and outward unit normals at arc lengths ``s``."""
+        s = np.mod(s, self.length) if self.closed else np.clip(s, 0.0, self.length)
+        k = np.clip(np.searchsorted(self.cum, s, side="right") - 1, 0, len(self.cum) - 2)
+        a, b = self.points[k], self.points[k + 1]
+        span = np.maximum(self.cum[k + 1] - self.cum[k], 1e-12)
+        t = ((s - self.cum[k]) / span)[:, None]
+        points = a + t * (b - a)
+        tangents = (b - a) / span[:, None]
+        # Outward: away from the curve centroid, with the tangent part removed
+        out = points - self.centroid
+        out -= np.sum(out * tangents, axis=1, keepdims=True) * tangents
+        normals = out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return points, tangents, normals
+
+
+@dataclass
+class BandLayout:
+    pattern: str
+    positions: np.ndarray  # (N, 3) girdle centres
+    normals: np.ndarray  # (N, 3) outward seat axes
+    sizes: np.ndarray  # (N,) stone diameters
+    arc: np.ndarray  # (N,) arc length of each stone along the curve
+    gap: float  # girdle-to-girdle spacing along the curve
+    min_chord_gap: Optional[float]  # smallest straight-line clearance between neighbours
+    curve_length: float
+    covered_length: float
+    within_tolerance: bool
+
+    @property
+    def count(self) -> int:
+        return int(len(self.positions))
+
+    def stones(self) -> List[dict]:
+        """Stones in the form ``/cad/diamond-seats`` and the production report take."""
+        return [
+            {"position": p, "size": s, "normal": n}
+            for p, s, n in zip(np.round(self.positions, 4).tolist(), self.sizes.tolist(), np.round(self.normals, 6).tolist())
+        ]
+
+
+def _required_length(seq: np.ndarray, min_gap: float, closed: bool) -> np.ndarray:
+    """Length needed by the first n stones of ``seq`` for every n (index n - 1)."""
+    pitch = (seq[:-1] + seq[1:]) / 2.0 + min_gap
+    inner = np.concatenate(([0.0], np.cumsum(pitch)))
+    if closed:
+        # Back round to the first stone
+        return inner + (seq + seq[0]) / 2.0 + min_gap
+    return inner + (seq[0] + seq) / 2.0
+
+
+def _place(seq: np.ndarray, start: float, covered: float, min_gap: float,
+           max_gap: float, closed: bool):
+    """Arc positions for ``seq`` within ``[start, start + covered]`` and the gap used."""
+    n = len(seq)
+    need = _required_length(seq, min_gap, closed)[-1]
+    gaps = n if closed else n - 1
+    gap = min_gap + ((covered - need) / gaps if gaps else 0.0)
+    if not closed:
+        gap = min(gap, max_gap)
+    pitch = (seq[:-1] + seq[1:]) / 2.0 + gap
+    arc = np.concatenate(([0.0], np.cumsum(pitch)))
+    if closed:
+        arc = arc + start
+    else:
+        # Whatever the tolerance cannot absorb becomes equal margins at both ends
+        used = arc[-1] + (seq[0] + seq[-1]) / 2.0
+        arc = arc + start + (covered - used) / 2.0 + seq[0] / 2.0
+    return arc, gap
+
+
+def solve_band(pattern: str, stone_sizes: Sequence[float], curve=None, closed: Optional[bool] = None,
+               finger_size: Optional[float] = None, band_thickness: float = DEFAULT_BAND_THICKNESS,
+               coverage: Optional[float] = None, min_gap: float = MIN_STONE_CLEARANCE,
+               tolerance: float = BAND_GAP_TOLERANCE) -> BandLayout:
+    """Fit the maximum number of stones along a band.
+
+    ``stone_sizes`` repeats along the band (``[2.0]`` for a single size,
+    ``[2.0, 1.5]`` to alternate). A full eternity only uses whole repeats,
+    so the sequence joins up where the band closes.
+    """
+    if pattern not in BAND_PATTERNS:
+        raise ValueError(f"pattern must be one of {', '.join(BAND_PATTERNS)}")
+    sizes = np.asarray(stone_sizes, dtype=np.float64).ravel()
+    if not len(sizes) or not np.all(sizes > 0):
+        raise ValueError("stone_sizes must be a non-empty list of positive diameters")
+    if min_gap < 0 or tolerance < 0:
+        raise ValueError("min_gap and tolerance must not be negative")
+    if curve is None:
+        if finger_size is None:
+            raise ValueError("either curve or finger_size is required")
+        curve, closed = ring_curve(finger_size, band_thickness), True
+    band = ArcLengthCurve(curve, closed=True if closed is None else closed)
+
+    if coverage is None:
+        coverage = DEFAULT_COVERAGE[pattern] if band.closed else 1.0
+    if not 0 < coverage <= 1:
+        raise ValueError("coverage must be in (0, 1]")
+    if pattern == "eternity_full" and not (band.closed and coverage == 1.0):
+        raise ValueError("eternity_full needs a closed band curve and full coverage")
+    full_loop = band.closed and coverage == 1.0
+    covered = band.length * coverage
+    # Runs on closed bands are centred on arc length 0, on open curves on the midpoint
+    if full_loop:
+        start = 0.0
+    elif band.closed:
+        start = -covered / 2.0
+    else:
+        start = (band.length - covered) / 2.0
+
+    # Every candidate count at once: the longest prefix of the repeated sequence that fits
+    upper = int(covered / (sizes.min() + min_gap)) + 2
+    seq = np.resize(sizes, upper)
+    need = _required_length(seq, min_gap, full_loop)
+    fits = need <= covered + 1e-9
+    counts = np.arange(1, upper + 1)
+    if full_loop:
+        fits &= (counts % len(sizes) == 0) & (counts >= 2)
+    candidates = counts[fits]
+    step = len(sizes) if full_loop else 1
+
+    n = int(candidates.max()) if len(candidates) else 0
+    while n > 0:
+        arc, gap = _place(seq[:n], start, covered, min_gap, min_gap + tolerance, full_loop)
+        positions, _, normals = band.at(arc)
+        if n == 1:
+            chord_gap = None
+            break
+        # Neighbours are closer in a straight line than along a curved band
+        nxt = np.roll(np.arange(n), -1) if full_loop else np.arange(1, n)
+        cur = np.arange(n) if full_loop else np.arange(n - 1)
+        chord = np.linalg.norm(positions[nxt] - positions[cur], axis=1) - (seq[cur] + seq[nxt]) / 2.0
+        chord_gap = float(chord.min())
+        if chord_gap >= min_gap - 1e-9:
+            break
+        n -= step
+    if n <= 0:
+        raise ValueError("no stone fits on this band with the requested gap")
+
+    return BandLayout(
+        pattern=pattern,
+        positions=positions,
+        normals=normals,
+        sizes=seq[:n].copy(),
+        arc=arc,
+        gap=float(gap),
+        min_chord_gap=chord_gap,
+        curve_length=band.length,
+        covered_length=covered,
+        within_tolerance=bool(gap <= min_gap + tolerance + 1e-9),
+    )
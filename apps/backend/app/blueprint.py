@@ -0,0 +1,327 @@
+"""PDF blueprints: orthographic views of a mesh on a framed drawing sheet.
+
+Views are parallel projections. Every vertex is projected in one matmul per
+view. What gets drawn are the feature edges, picked with array operations
+over all edges at once:
+- creases (dihedral angle above ``CREASE_ANGLE``),
+- open borders,
+- the silhouette for that view (edges between a front- and a back-facing
+  triangle).
+
+Hidden lines are not removed; views are line drawings, not renders.
+
+The sheet frame (border, zone ticks, title block grid) depends only on the
+page size. Its geometry is computed once per process. In each PDF it is
+drawn once as a form XObject that every page reuses. One scale from the
+standard series (10:1 ... 1:10) applies to all views and is printed in the
+title block.
+
+Rendering is a plain function of arrays to a file, so it runs on the CAD
+process pool through the export queue. Blueprints for a whole collection
+spread across the cores.
+
+The same projected feature edges also make the DXF drawing (``render_dxf``).
+It is full size (1:1, millimetres) with one layer per view, for CAM.
+"""
+import os
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+from reportlab.lib.pagesizes import A3, A4, letter, landscape
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+
+from .dxf_writer import line_entities, write_dxf
+
+CREASE_ANGLE = 30.0  # degrees
+STANDARD_SCALES = (10.0, 5.0, 2.0, 1.0, 0.5, 0.2, 0.1)
+PAGE_SIZES = {"A4": A4, "A3": A3, "letter": letter}
+MARGIN = 10 * mm
+TITLE_BLOCK = (120 * mm, 28 * mm)
+ZONE_TICK = 4 * mm
+
+# (towards viewer, world up) per view
+VIEWS: Dict[str, Tuple[Tuple[float, float, float], Tuple[float, float, float]]] = {
+    "front": ((0, -1, 0), (0, 0, 1)),
+    "top": ((0, 0, 1), (0, 1, 0)),
+    "right": ((1, 0, 0), (0, 0, 1)),
+    "iso": ((1, -1, 1), (0, 0, 1)),
+    "back": ((0, 1, 0), (0, 0, 1)),
+    "bottom": ((0, 0, -1), (0, -1, 0)),
+    "left": ((-1, 0, 0), (0, 0, 1)),
+}
+# Third-angle arrangement on a 2x2 grid, (column, row) from the top left
+SHEETS = (
+    {"top": (0, 0), "iso": (1, 0), "front": (0, 1), "right": (1, 1)},
+    {"bottom": (0, 0), "back": (0, 1), "left": (1, 1)},
+)
+# DXF view placement (column, row), rows counting up: third-angle around the front view
+DXF_LAYOUT = {
+    "front": (0, 0),
+    "top": (0, 1),
+    "bottom": (0, -1),
+    "right": (1, 0),
+    "left": (-1, 0),
+    "back": (2, 0),
+    "iso": (1, 1),
+}
+DXF_VIEWS = ("front", "top", "right")
+DXF_VIEW_GAP = 10.0  # mm between views
+DXF_RESOLUTION = 1e-6  # mm; projected endpoints closer than this are the same point
+
+
+def view_axes(name: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(2, 3) screen axes and the unit direction towards the viewer."""
+    toward, up = (np.asarray(v, dtype=np.float64) for v in VIEWS[name])
+    toward = toward / np.linalg.norm(toward)
+    right = np.cross(up, toward)
+    right /= np.linalg.norm(right)
+    return np.stack((right, np.cross(toward, right))), toward
+
+
+def face_normals(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    tris = vertices[faces]
+    n = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    length = np.linalg.norm(n, axis=1, keepdims=True)
+    return np.divide(n, length, out=np.zeros_like(n), where=length > 0)
+
+
+@dataclass
+class EdgeSet:
+    """Unique mesh edges with the two faces beside each (``-1`` on borders)."""
+
+    edges: np.ndarray  # (E, 2)
+    left: np.ndarray  # (E,)
+    right: np.ndarray  # (E,)
+    always: np.ndarray  # (E,) creases, borders and non-manifold edges
+
+    def visible(self, normals: np.ndarray, toward: np.ndarray) -> np.ndarray:
+        """Edges to draw for a view: the fixed features plus that view's silhouette."""
+        facing = normals @ toward > 0
+        paired = self.right >= 0
+        silhouette = np.zeros(len(self.edges), dtype=bool)
+        silhouette[paired] = facing[self.left[paired]] != facing[self.right[paired]]
+        return self.edges[self.always | silhouette]
+
+
+def edge_set(vertices: np.ndarray, faces: np.ndarray, normals: np.ndarray,
+             crease_angle: float = CREASE_ANGLE) -> EdgeSet:
+    n = len(vertices)
+    corners = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+    keys = corners.min(axis=1) * n + corners.max(axis=1)
+    owner = np.tile(np.arange(len(faces)), 3)
+    order = np.argsort(keys, kind="stable")
+    keys, owner = keys[order], owner[order]
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    counts = np.diff(np.append(starts, len(keys)))
+    left = owner[starts]
+    right = np.where(counts >= 2, owner[np.minimum(starts + 1, len(keys) - 1)], -1)
+    paired = counts == 2
+    crease = np.zeros(len(starts), dtype=bool)
+    cosines = np.sum(normals[left[paired]] * normals[right[paired]], axis=1)
+    crease[paired] = cosines < np.cos(np.radians(crease_angle))
+    edges = np.column_stack(np.divmod(keys[starts], n))
+    return EdgeSet(edges=edges, left=left, right=right, always=crease | ~paired)
+
+
+@dataclass(frozen=True)
+class FrameTemplate:
+    width: float
+    height: float
+    lines: Tuple[Tuple[float, float, float, float], ...]
+    labels: Tuple[Tuple[float, float, str], ...]
+    fields: Dict[str, Tuple[float, float]]  # title block value positions
+    drawing_area: Tuple[float, float, float, float]  # x, y, w, h
+
+
+@lru_cache(maxsize=8)
+def frame_template(page: str) -> FrameTemplate:
+    """Border, zone marks and title block for a landscape sheet (computed once per size)."""
+    if page not in PAGE_SIZES:
+        raise ValueError(f"page must be one of {', '.join(PAGE_SIZES)}")
+    width, height = landscape(PAGE_SIZES[page])
+    x0, y0, x1, y1 = MARGIN, MARGIN, width - MARGIN, height - MARGIN
+    lines: List[Tuple[float, float, float, float]] = [
+        (x0, y0, x1, y0), (x1, y0, x1, y1), (x1, y1, x0, y1), (x0, y1, x0, y0),
+    ]
+    labels: List[Tuple[float, float, str]] = []
+    # Zone ticks: numbered columns, lettered rows, about every 50 mm
+    columns, rows = max(2, int((x1 - x0) // (50 * mm))), max(2, int((y1 - y0) // (50 * mm)))
+    for i in range(columns + 1):
+        x = x0 + (x1 - x0) * i / columns
+        lines += [(x, y1, x, y1 + ZONE_TICK / 2), (x, y0, x, y0 - ZONE_TICK / 2)]
+        if i < columns:
+            labels.append((x + (x1 - x0) / columns / 2, y1 + 1.2 * mm, str(i + 1)))
+    for j in range(rows + 1):
+        y = y1 - (y1 - y0) * j / rows
+        lines += [(x0, y, x0 - ZONE_TICK / 2, y), (x1, y, x1 + ZONE_TICK / 2, y)]
+        if j < rows:
+            labels.append((x0 - 3 * mm, y - (y1 - y0) / rows / 2, "ABCDEFGH"[j]))
+    # Title block: bottom right, a title row over two rows of three cells
+    tw, th = TITLE_BLOCK
+    bx, by = x1 - tw, y0
+    row = th / 3
+    lines += [(bx, by, bx, by + th), (bx, by + th, x1, by + th), (bx, by + row, x1, by + row), (bx, by + 2 * row, x1, by + 2 * row)]
+    for k in (1, 2):
+        lines += [(bx + tw * k / 3, by, bx + tw * k / 3, by + 2 * row)]
+    names = ("title", "number", "scale", "units", "date", "sheet", "drawn_by")
+    cells = [(bx, by + 2 * row, tw)] + [(bx + tw * (k % 3) / 3, by + row * (1 - k // 3), tw / 3) for k in range(6)]
+    fields = {}
+    for name, (cx, cy, _) in zip(names, cells):
+        labels.append((cx + 1.5 * mm, cy + row - 3 * mm, name.replace("_", " ").upper()))
+        fields[name] = (cx + 1.5 * mm, cy + 1.8 * mm)
+    area = (x0 + 2 * mm, y0 + th + 2 * mm, (x1 - x0) - 4 * mm, (y1 - y0) - th - 4 * mm)
+    return FrameTemplate(width, height, tuple(lines), tuple(labels), fields, area)
+
+
+def drawing_scale(extents: np.ndarray, cell: Tuple[float, float]) -> float:
+    """Largest standard scale at which every view (mm extents) fits its cell (points)."""
+    need = np.max(extents, axis=0) * mm
+    for scale in STANDARD_SCALES:
+        if np.all(need * scale <= np.asarray(cell) * 0.85):
+            return scale
+    return float(np.min(np.asarray(cell) * 0.85 / np.maximum(need, 1e-9)))
+
+
+def scale_label(scale: float) -> str:
+    if scale >= 1:
+        return f"{scale:g}:1"
+    return f"1:{1 / scale:g}"
+
+
+def mesh_properties(vertices: np.ndarray, faces: np.ndarray) -> Dict[str, float]:
+    tris = vertices[faces]
+    cross = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    size = vertices.max(axis=0) - vertices.min(axis=0)
+    return {
+        "width": float(size[0]), "depth": float(size[1]), "height": float(size[2]),
+        "area": float(np.linalg.norm(cross, axis=1).sum() / 2.0),
+        "volume": float(abs(np.einsum("ij,ij->i", tris[:, 0], np.cross(tris[:, 1], tris[:, 2])).sum()) / 6.0),
+        "triangles": int(len(faces)), "vertices": int(len(vertices)),
+    }
+
+
+def render_blueprint(vertices, faces, path, options: dict) -> dict:
+    """Write a multi-page PDF blueprint; options: title, drawn_by, page, number."""
+    vertices, faces = np.asarray(vertices, dtype=np.float64), np.asarray(faces, dtype=np.int64)
+    frame = frame_template(options.get("page", "A4"))
+    normals = face_normals(vertices, faces)
+    edges = edge_set(vertices, faces, normals)
+    centre = (vertices.max(axis=0) + vertices.min(axis=0)) / 2.0
+
+    projected = {}
+    for name in VIEWS:
+        axes, toward = view_axes(name)
+        points = (vertices - centre) @ axes.T
+        projected[name] = (points, edges.visible(normals, toward))
+    ax, ay, aw, ah = frame.drawing_area
+    cell = (aw / 2, ah / 2)
+    extents = np.array([p.max(axis=0) - p.min(axis=0) for p, _ in projected.values()])
+    scale = drawing_scale(extents, cell)
+
+    pdf = canvas.Canvas(str(path), pagesize=(frame.width, frame.height))
+    title = str(options.get("title") or "Untitled")
+    pdf.setTitle(title)
+    pdf.beginForm("frame")
+    pdf.setLineWidth(0.8)
+    pdf.lines(list(frame.lines))
+    pdf.setFont("Helvetica", 5)
+    for x, y, text in frame.labels:
+        if len(text) == 1:
+            pdf.drawCentredString(x, y, text)  # zone mark
+        else:
+            pdf.drawString(x, y, text)
+    pdf.endForm()
+
+    values = {
+        "title": title, "number": str(options.get("number", "")), "scale": scale_label(scale), "units": "mm",
+        "date": str(options.get("date") or date.today().isoformat()), "drawn_by": str(options.get("drawn_by", "")),
+    }
+    lines_drawn = 0
+    for index, sheet in enumerate(SHEETS):
+        pdf.doForm("frame")
+        pdf.setFont("Helvetica", 9)
+        for name, text in {**values, "sheet": f"{index + 1} / {len(SHEETS)}"}.items():
+            pdf.drawString(*frame.fields[name], text[:60])
+        for name, (col, row) in sheet.items():
+            points, visible = projected[name]
+            cx, cy = ax + cell[0] * (col + 0.5), ay + ah - cell[1] * (row + 0.5)
+            xy = points * (scale * mm) + [cx, cy]
+            segments = np.concatenate((xy[visible[:, 0]], xy[visible[:, 1]]), axis=1)
+            pdf.setLineWidth(0.25)
+            pdf.lines(segments.tolist())
+            lines_drawn += len(segments)
+            pdf.setFont("Helvetica", 7)
+            pdf.drawCentredString(cx, cy - cell[1] / 2 + 2 * mm, name.upper())
+        if index == len(SHEETS) - 1:
+            props = mesh_properties(vertices, faces)
+            pdf.setFont("Helvetica", 8)
+            tx, ty = ax + cell[0] + 6 * mm, ay + ah - 8 * mm
+            rows = [
+                f"Bounding box: {props['width']:.2f} x {props['depth']:.2f} x {props['height']:.2f} mm",
+                f"Surface area: {props['area']:.2f} mm²",
+                f"Volume: {props['volume']:.2f} mm³",
+                f"Mesh: {props['triangles']} triangles, {props['vertices']} vertices",
+            ]
+            for k, text in enumerate(rows):
+                pdf.drawString(tx, ty - k * 4.5 * mm, text)
+        pdf.showPage()
+    pdf.save()
+    return {"bytes": os.path.getsize(path), "pages": len(SHEETS), "scale": scale_label(scale), "lines": lines_drawn}
+
+
+def unique_segments(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """(N, 4) projected segments without end-on (zero length) and coincident duplicates.
+
+    Hidden lines are not removed, so back edges land exactly on front edges.
+    CAM would cut those twice.
+    """
+    a, b = np.round(starts / DXF_RESOLUTION), np.round(ends / DXF_RESOLUTION)
+    swap = (a[:, 0] > b[:, 0]) | ((a[:, 0] == b[:, 0]) & (a[:, 1] > b[:, 1]))
+    keys = np.where(swap[:, None], np.hstack((b, a)), np.hstack((a, b)))
+    keep = np.any(keys[:, :2] != keys[:, 2:], axis=1)
+    _, first = np.unique(keys[keep], axis=0, return_index=True)
+    return np.hstack((starts, ends))[np.flatnonzero(keep)[np.sort(first)]]
+
+
+def render_dxf(vertices, faces, path, options: dict) -> dict:
+    """Write the views' feature edges as a 1:1 DXF.
+
+    options: views (default front, top, right).
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64)
+    views = [name.lower() for name in (options.get("views") or DXF_VIEWS)]
+    unknown = sorted(set(views) - set(DXF_LAYOUT))
+    if unknown:
+        raise ValueError(
+            f"unknown views {', '.join(unknown)}; use {', '.join(DXF_LAYOUT)}"
+        )
+    normals = face_normals(vertices, faces)
+    edges = edge_set(vertices, faces, normals)
+    centre = (vertices.max(axis=0) + vertices.min(axis=0)) / 2.0
+
+    projected = {}
+    for name in views:
+        axes, toward = view_axes(name)
+        projected[name] = ((vertices - centre) @ axes.T, edges.visible(normals, toward))
+    spans = [np.ptp(points, axis=0) for points, _ in projected.values()]
+    pitch = np.max(spans, axis=0) + DXF_VIEW_GAP
+
+    blocks, lower, upper, count = [], [], [], 0
+    for name, (points, visible) in projected.items():
+        xy = points + pitch * DXF_LAYOUT[name]
+        segments = unique_segments(xy[visible[:, 0]], xy[visible[:, 1]])
+        blocks.append(
+            line_entities(segments[:, :2], segments[:, 2:], layer=name.upper())
+        )
+        lower.append(xy.min(axis=0))
+        upper.append(xy.max(axis=0))
+        count += len(segments)
+    extents = np.array([np.min(lower, axis=0), np.max(upper, axis=0)])
+    entities = (block for view in blocks for block in view)
+    size = write_dxf(path, entities, [name.upper() for name in views], extents)
+    return {"bytes": size, "entities": count, "views": views, "scale": "1:1"}
@@ -0,0 +1,209 @@
+"""Boolean operations on solids, evaluated as a memoized dependency graph.
+
+A model is a DAG of ``union`` / ``subtract`` / ``intersect`` nodes over
+stored solids, e.g. ``(shank ∪ head) − seats``. Each node has a key: the hash
+of its op and its inputs' keys. Leaves are keyed by their content-addressed
+id in the :class:`~.geometry_store.GeometryStore`, which makes the keys a
+Merkle tree. Editing one input changes only the keys on its path to the
+root. Evaluation walks down from the root and stops at every node whose key
+already has a result, so only that dirty path is recomputed. Results are
+stored back in the geometry store as ``result`` objects.
+
+The mesh kernel classifies whole triangles as inside or outside the other
+operand, by parity ray casting through a :class:`~.spatial.SurfaceIndex`,
+and keeps or flips them per op. It is fully vectorized but does not split
+triangles that straddle the other surface. The result is exact for
+disjoint or nested operands; along intersection seams it is a preview-grade
+approximation.
+"""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .geometry_store import GeometryStore
+from .shared_tasks import SharedTasks
+from .spatial import SurfaceIndex
+
+BOOLEAN_OPS = ("union", "subtract", "intersect")
+# Ops whose result does not depend on input order
+COMMUTATIVE_OPS = ("union", "intersect")
+BOOLEAN_MEMO_SIZE = 4096
+
+Mesh = Tuple[np.ndarray, np.ndarray]
+
+
+def _compact(vertices: np.ndarray, faces: np.ndarray) -> Mesh:
+    """Drop unreferenced vertices and renumber faces."""
+    used, inverse = np.unique(faces, return_inverse=True)
+    return vertices[used], inverse.reshape(-1, 3).astype(np.int64)
+
+
+def _inside(mesh: Mesh, faces_of: Mesh) -> np.ndarray:
+    """Which triangles of ``faces_of`` have their centroid inside closed ``mesh``."""
+    vertices, faces = faces_of
+    if not len(faces) or not len(mesh[1]):
+        return np.zeros(len(faces), dtype=bool)
+    centroids = vertices[faces].mean(axis=1)
+    return SurfaceIndex(mesh[0], mesh[1]).contains(centroids)
+
+
+def mesh_boolean(op: str, meshes: List[Mesh]) -> Mesh:
+    """Fold ``op`` left to right over closed triangle meshes."""
+    if op not in BOOLEAN_OPS:
+        raise ValueError(f"op must be one of {', '.join(BOOLEAN_OPS)}")
+    if not meshes:
+        raise ValueError("boolean needs at least one solid")
+    a = (np.asarray(meshes[0][0], dtype=np.float64), np.asarray(meshes[0][1], dtype=np.int64))
+    for vertices, faces in meshes[1:]:
+        b = (np.asarray(vertices, dtype=np.float64), np.asarray(faces, dtype=np.int64))
+        a_in_b = _inside(b, a)
+        b_in_a = _inside(a, b)
+        if op == "union":
+            keep_a, keep_b, flip_b = ~a_in_b, ~b_in_a, False
+        elif op == "intersect":
+            keep_a, keep_b, flip_b = a_in_b, b_in_a, False
+        else:
+            # A minus B: A's outside plus B's inside, turned to face into the cavity
+            keep_a, keep_b, flip_b = ~a_in_b, b_in_a, True
+        faces_b = b[1][keep_b][:, ::-1] if flip_b else b[1][keep_b]
+        vertices = np.vstack((a[0], b[0]))
+        faces = np.vstack((a[1][keep_a], faces_b + len(a[0])))
+        a = _compact(vertices, faces) if len(faces) else (np.empty((0, 3)), np.empty((0, 3), dtype=np.int64))
+    return a
+
+
+def node_key(op: str, input_keys: List[str]) -> str:
+    keys = sorted(input_keys) if op in COMMUTATIVE_OPS else list(input_keys)
+    return hashlib.blake2b(f"{op}({','.join(keys)})".encode(), digest_size=16).hexdigest()
+
+
+def parse_graph(data: dict) -> Tuple[Dict[str, dict], str]:
+    """Normalize a request into ``({name: {"op", "inputs"}}, root)``.
+
+    Accepts either a single node ``{"op": ..., "solids": [ids]}`` or a graph
+    ``{"nodes": {name: {"op": ..., "inputs": [ids or node names]}}, "root": name}``.
+    """
+    if "nodes" in data:
+        nodes, root = data["nodes"], data.get("root")
+        if not isinstance(nodes, dict) or not nodes:
+            raise ValueError("nodes must be a non-empty mapping of name -> {op, inputs}")
+        if root is None and len(nodes) == 1:
+            root = next(iter(nodes))
+    else:
+        nodes, root = {"result": {"op": data.get("op"), "inputs": data.get("solids") or []}}, "result"
+    if root not in nodes:
+        raise ValueError("root must name one of the nodes")
+    graph = {}
+    for name, node in nodes.items():
+        if not isinstance(node, dict) or node.get("op") not in BOOLEAN_OPS:
+            raise ValueError(f"node '{name}' needs an op of {', '.join(BOOLEAN_OPS)}")
+        inputs = node.get("inputs") or []
+        if not inputs or not all(isinstance(i, str) for i in inputs):
+            raise ValueError(f"node '{name}' needs a list of input ids")
+        graph[name] = {"op": node["op"], "inputs": list(inputs)}
+    return graph, root
+
+
+class BooleanEvaluator:
+    """Memoized evaluation of boolean DAGs over a geometry store.
+
+    ``run(fn, *args)`` executes the mesh kernel (the CAD process pool in the
+    app). Results are memoized by node key in a bounded LRU mapping to
+    stored result ids. Concurrent requests for the same key share one
+    computation.
+    """
+
+    def __init__(self, store: GeometryStore, run: Callable[..., Awaitable], memo_size: int = BOOLEAN_MEMO_SIZE):
+        self.store = store
+        self.run = run
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, str]" = OrderedDict()
+        self._pending = SharedTasks()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, result_id: str) -> None:
+        self._memo[key] = result_id
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+
+    def keys(self, graph: Dict[str, dict]) -> Dict[str, str]:
+        """Key of every node, bottom-up; rejects cycles and unknown inputs."""
+        keys: Dict[str, str] = {}
+        state: Dict[str, int] = {}
+
+        def visit(name: str) -> str:
+            if name in keys:
+                return keys[name]
+            if state.get(name) == 1:
+                raise ValueError(f"boolean graph has a cycle through '{name}'")
+            state[name] = 1
+            inputs = []
+            for ref in graph[name]["inputs"]:
+                if ref in graph:
+                    inputs.append(visit(ref))
+                elif self.store.get(ref) is not None:
+                    inputs.append(ref)
+                else:
+                    raise ValueError(f"unknown solid or node '{ref}'")
+            keys[name] = node_key(graph[name]["op"], inputs)
+            state[name] = 2
+            return keys[name]
+
+        for name in graph:
+            visit(name)
+        return keys
+
+    async def evaluate(self, graph: Dict[str, dict], root: str) -> Tuple[str, Dict[str, dict]]:
+        """Result id of ``root`` plus per-node ``{key, result_id, cached}`` for the nodes visited."""
+        keys = self.keys(graph)
+        report: Dict[str, dict] = {}
+
+        async def resolve(ref: str) -> str:
+            if ref not in graph:
+                return ref  # a stored solid
+            key = keys[ref]
+            if key in self._memo and self.store.get(self._memo[key]) is not None:
+                self.hits += 1
+                self._memo.move_to_end(key)
+                report[ref] = {"key": key, "result_id": self._memo[key], "cached": True}
+                return self._memo[key]
+
+            async def compute() -> str:
+                input_ids = await asyncio.gather(*(resolve(i) for i in graph[ref]["inputs"]))
+                meshes = [self.mesh(i) for i in input_ids]
+                vertices, faces = await self.run(mesh_boolean, graph[ref]["op"], meshes)
+                obj, _ = await asyncio.to_thread(
+                    self.store.put, "result", {"op": graph[ref]["op"], "vertices": vertices, "faces": faces}
+                )
+                self._remember(key, obj.id)
+                return obj.id
+
+            result_id, shared = await self._pending.run(key, compute)
+            if shared:
+                self.hits += 1
+            else:
+                self.misses += 1
+            report[ref] = {"key": key, "result_id": result_id, "cached": shared}
+            return result_id
+
+        return await resolve(root), report
+
+    def mesh(self, object_id: str) -> Mesh:
+        obj = self.store.get(object_id)
+        if obj is None or "vertices" not in obj.arrays or "faces" not in obj.arrays:
+            raise ValueError(f"'{object_id}' is not a solid with vertices and faces")
+        return obj.arrays["vertices"], obj.arrays["faces"]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "memoized": len(self._memo),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,133 @@
+"""Process pool for CPU-bound CAD work.
+
+The geometry handlers are ``async def``, so NumPy work run inline blocks the
+event loop for every other request (logins, the collab WebSocket). Handlers
+hand that work to ``ComputePool`` instead. The pool runs it in worker
+processes and bounds how many jobs may wait, so a burst of heavy jobs gets a
+fast ``PoolSaturated`` (503) instead of an ever-growing queue.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+# 0 workers runs jobs inline on the event loop (handy for debugging)
+CAD_POOL_WORKERS = int(os.getenv("CAD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Jobs allowed to wait once every worker is busy
+CAD_POOL_MAX_QUEUE = int(os.getenv("CAD_POOL_MAX_QUEUE", str(2 * max(CAD_POOL_WORKERS, 1))))
+# "spawn" keeps workers clear of the event loop and DB threads of the parent
+CAD_POOL_START_METHOD = os.getenv("CAD_POOL_START_METHOD", "spawn")
+
+
+class PoolSaturated(RuntimeError):
+    """Every worker is busy and the wait queue is full."""
+
+
+class ComputePool:
+    def __init__(self, workers: int = CAD_POOL_WORKERS, max_queue: int = CAD_POOL_MAX_QUEUE,
+                 start_method: str = CAD_POOL_START_METHOD):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._started_at: Optional[float] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return max(self.workers, 1) + self.max_queue
+
+    def start(self) -> None:
+        """Create the worker processes (idempotent; the first ``run`` also starts the pool)."""
+        if self._executor is None and self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context(self.start_method))
+            self._started_at = time.monotonic()
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in a worker and await its result.
+
+        ``fn`` and its arguments must be picklable (module-level functions,
+        NumPy arrays, plain data). Exceptions raised by ``fn`` propagate to
+        the caller unchanged.
+        """
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise PoolSaturated(f"CAD workers are busy ({self.in_flight} jobs in flight), retry shortly")
+        started = time.perf_counter()
+        if self.workers <= 0:
+            self._acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                self._release(started, False)
+                raise
+            self._release(started, True)
+            return result
+        self.start()
+        try:
+            job = self._executor.submit(fn, *args, **kwargs)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); replace the pool on the next job
+            self.failed += 1
+            self.shutdown(wait=False)
+            raise
+        self._acquire()
+        # The slot is held until the job itself finishes: a cancelled caller
+        # stops waiting, but a job already running in a worker carries on
+        job.add_done_callback(lambda f: self._release(started, not f.cancelled() and f.exception() is None))
+        try:
+            return await asyncio.wrap_future(job)
+        except BrokenProcessPool:
+            self.shutdown(wait=False)
+            raise
+
+    def _acquire(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def _release(self, started: float, ok: bool) -> None:
+        # Runs in the executor's callback thread for pool jobs
+        with self._lock:
+            self.in_flight -= 1
+            self.busy_seconds += time.perf_counter() - started
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def stats(self) -> dict:
+        workers = max(self.workers, 1)
+        busy = min(self.in_flight, workers)
+        uptime = time.monotonic() - self._started_at if self._started_at is not None else 0.0
+        return {
+            "workers": self.workers,
+            "running": self.running,
+            "busy": busy,
+            "queued": self.in_flight - busy,
+            "max_queue": self.max_queue,
+            "utilization": round(busy / workers, 3),
+            # Job time (including queue wait) per worker-second since start
+            "load": round(self.busy_seconds / (uptime * workers), 3) if uptime else 0.0,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None
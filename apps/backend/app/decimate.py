@@ -0,0 +1,150 @@
+"""Quadric-error mesh decimation for viewport levels of detail.
+
+This is the Garland-Heckbert quadric error metric, applied in parallel
+passes instead of one edge at a time.
+- Each pass computes every vertex quadric and every edge collapse cost at
+  once.
+- It then collapses an independent set of edges: each one is the cheapest
+  edge at both of its endpoints, so no two collapses touch the same vertex.
+- Passes repeat until the triangle budget is met.
+
+Open borders get extra constraint planes so outlines (e.g. a ring's edge)
+are not eaten away.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+# Stop when a pass removes less than this share of what is still to go
+MIN_PASS_PROGRESS = 0.001
+MAX_PASSES = 64
+BORDER_WEIGHT = 100.0
+
+
+def _face_planes(vertices: np.ndarray, faces: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    a, b, c = (vertices[faces[:, k]] for k in range(3))
+    n = np.cross(b - a, c - a)
+    area2 = np.linalg.norm(n, axis=1)
+    n = n / np.maximum(area2, 1e-30)[:, None]
+    d = -np.sum(n * a, axis=1)
+    return n, d, area2
+
+
+def _plane_quadrics(n: np.ndarray, d: np.ndarray, weight: np.ndarray) -> np.ndarray:
+    """(M, 10) packed upper triangles of ``w * p p^T`` for planes ``p = (n, d)``."""
+    p = np.column_stack((n, d))
+    iu = np.triu_indices(4)
+    return weight[:, None] * p[:, iu[0]] * p[:, iu[1]]
+
+
+def _edge_keys(faces: np.ndarray, vertex_count: int) -> np.ndarray:
+    """``lo * V + hi`` for the three edges of every face (corner-major)."""
+    edges = np.concatenate([faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]])
+    return edges.min(axis=1) * vertex_count + edges.max(axis=1)
+
+
+def vertex_quadrics(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    n, d, area2 = _face_planes(vertices, faces)
+    face_q = _plane_quadrics(n, d, area2 / 2.0)
+    quadrics = np.zeros((len(vertices), 10))
+    for k in range(3):
+        for col in range(10):
+            quadrics[:, col] += np.bincount(faces[:, k], weights=face_q[:, col], minlength=len(vertices))
+
+    # Border edges (used by one face): a plane through the edge, perpendicular to the face
+    keys = _edge_keys(faces, len(vertices))
+    _, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    border = np.flatnonzero(counts[inverse] == 1)
+    if len(border):
+        e = np.column_stack(np.divmod(keys[border], len(vertices)))
+        f = border % len(faces)
+        direction = vertices[e[:, 1]] - vertices[e[:, 0]]
+        m = np.cross(direction, n[f])
+        length = np.linalg.norm(m, axis=1)
+        ok = length > 1e-30
+        m = m[ok] / length[ok][:, None]
+        e = e[ok]
+        dm = -np.sum(m * vertices[e[:, 0]], axis=1)
+        bq = _plane_quadrics(m, dm, BORDER_WEIGHT * np.sum(direction[ok] ** 2, axis=1))
+        for k in range(2):
+            for col in range(10):
+                quadrics[:, col] += np.bincount(e[:, k], weights=bq[:, col], minlength=len(vertices))
+    return quadrics
+
+
+def _quadric_error(q: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """``[v 1] Q [v 1]^T`` for packed quadrics (M, 10) and points (M, 3)."""
+    x, y, z = v[:, 0], v[:, 1], v[:, 2]
+    return (q[:, 0] * x * x + 2 * q[:, 1] * x * y + 2 * q[:, 2] * x * z + 2 * q[:, 3] * x
+            + q[:, 4] * y * y + 2 * q[:, 5] * y * z + 2 * q[:, 6] * y
+            + q[:, 7] * z * z + 2 * q[:, 8] * z + q[:, 9])
+
+
+def _clean(faces: np.ndarray) -> np.ndarray:
+    """Drop collapsed (repeated index) and duplicate triangles."""
+    ok = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 0] != faces[:, 2])
+    faces = faces[ok]
+    if not len(faces):
+        return faces
+    s = np.sort(faces, axis=1)
+    n = int(s.max()) + 1
+    if n < 2 ** 21:
+        # Sorted triple packed into one int64; far cheaper than np.unique(axis=0)
+        _, first = np.unique((s[:, 0] * n + s[:, 1]) * n + s[:, 2], return_index=True)
+    else:
+        _, first = np.unique(s, axis=0, return_index=True)
+    return faces[np.sort(first)]
+
+
+def compact(vertices: np.ndarray, faces: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    used, inverse = np.unique(faces, return_inverse=True)
+    return vertices[used], inverse.reshape(-1, 3)
+
+
+def quadric_decimate(vertices, faces, target_faces: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce a triangle mesh to about ``target_faces`` triangles."""
+    vertices = np.array(vertices, dtype=np.float64)
+    faces = _clean(np.asarray(faces, dtype=np.int64))
+    for _ in range(MAX_PASSES):
+        excess = len(faces) - target_faces
+        if excess <= 0:
+            break
+        quadrics = vertex_quadrics(vertices, faces)
+        a, b = np.divmod(np.unique(_edge_keys(faces, len(vertices))), len(vertices))
+        q = quadrics[a] + quadrics[b]
+        # Best of the two endpoints and the midpoint
+        candidates = np.stack((vertices[a], vertices[b], (vertices[a] + vertices[b]) / 2.0))
+        errors = np.stack([_quadric_error(q, c) for c in candidates])
+        pick = np.argmin(errors, axis=0)
+        cost = errors[pick, np.arange(len(a))]
+        target = candidates[pick, np.arange(len(a))]
+
+        # Independent set: edges that are the cheapest at both endpoints
+        rank = np.empty(len(a), dtype=np.int64)
+        rank[np.argsort(cost, kind="stable")] = np.arange(len(a))
+        best = np.full(len(vertices), len(a), dtype=np.int64)
+        np.minimum.at(best, a, rank)
+        np.minimum.at(best, b, rank)
+        chosen = np.flatnonzero((best[a] == rank) & (best[b] == rank))
+        # Each collapse removes about two triangles; do not overshoot the budget
+        chosen = chosen[np.argsort(rank[chosen])][: max(1, (excess + 1) // 2)]
+
+        remap = np.arange(len(vertices))
+        remap[b[chosen]] = a[chosen]
+        vertices[a[chosen]] = target[chosen]
+        before = len(faces)
+        faces = _clean(remap[faces])
+        if before - len(faces) < max(1, MIN_PASS_PROGRESS * excess):
+            break
+    return compact(vertices, faces)
+
+
+def lod_chain(vertices, faces, levels: int = 4, ratio: float = 0.25, min_faces: int = 256) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Full mesh plus up to ``levels - 1`` coarser meshes, each ``ratio`` of the previous."""
+    chain = [compact(np.asarray(vertices, dtype=np.float64), _clean(np.asarray(faces, dtype=np.int64)))]
+    while len(chain) < levels:
+        target = int(len(chain[-1][1]) * ratio)
+        if target < min_faces:
+            break
+        chain.append(quadric_decimate(*chain[-1], target))
+    return chain
@@ -0,0 +1,181 @@
+"""ASCII DXF (R12) writer for 2D drawings: lines, arcs and polylines from arrays.
+
+R12 is the dialect every CAM package and laser/waterjet controller reads. It
+has no handles, classes or object section. Files are in millimetres.
+
+Entities of one kind are never built one by one. Each kind has a fixed text
+template with ``%`` placeholders for its numbers. The template is repeated
+for a block of entities and filled from the flattened array in one format
+call. Polylines (POLYLINE, VERTEX..., SEQEND) differ in length, so their
+block template is assembled by indexing an array of the three piece
+templates, then filled the same way. Output is yielded block by block, like
+the mesh writers, so it can go to a file or a streaming response.
+"""
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence, Union
+
+import numpy as np
+
+from .mesh_writers import CHUNK_ROWS, write_chunks
+
+COORD = "%.6f"
+# AutoCAD colour index per layer, cycled
+LAYER_COLOURS = (7, 1, 3, 5, 2, 4, 6)
+
+
+def _rows(n: int, rows: int) -> Iterator[slice]:
+    for start in range(0, n, rows):
+        yield slice(start, min(start + rows, n))
+
+
+def _layer(layer: str) -> str:
+    # Layer names go into %-format templates; a literal "%" must not be a placeholder
+    return layer.replace("%", "%%")
+
+
+def _fill(template: str, values: np.ndarray, rows: int) -> Iterator[str]:
+    """``template`` repeated once per row of ``values`` and filled, ``rows`` a block."""
+    for part in _rows(len(values), rows):
+        block = template * (part.stop - part.start)
+        yield block % tuple(values[part].ravel().tolist())
+
+
+def line_entities(
+    starts, ends, layer: str = "0", rows: int = CHUNK_ROWS
+) -> Iterator[str]:
+    """LINE entities from (N, 2) start and end points."""
+    values = np.hstack(
+        (np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64))
+    )
+    template = (
+        f"0\nLINE\n8\n{_layer(layer)}\n"
+        f"10\n{COORD}\n20\n{COORD}\n30\n0.0\n11\n{COORD}\n21\n{COORD}\n31\n0.0\n"
+    )
+    yield from _fill(template, values, rows)
+
+
+def arc_entities(
+    centres, radii, start_angles, end_angles, layer: str = "0", rows: int = CHUNK_ROWS
+) -> Iterator[str]:
+    """ARC entities (counter-clockwise from start to end angle, in degrees).
+
+    Arcs spanning 360 degrees or more are written as CIRCLEs.
+    """
+    centres = np.asarray(centres, dtype=np.float64)
+    radii, start, end = (
+        np.asarray(a, dtype=np.float64) for a in (radii, start_angles, end_angles)
+    )
+    full = np.abs(end - start) >= 360.0
+    circles = np.column_stack((centres[full], radii[full]))
+    arcs = np.column_stack(
+        (
+            centres[~full],
+            radii[~full],
+            np.mod(start[~full], 360.0),
+            np.mod(end[~full], 360.0),
+        )
+    )
+    centre = f"8\n{_layer(layer)}\n10\n{COORD}\n20\n{COORD}\n30\n0.0\n40\n{COORD}\n"
+    circle = f"0\nCIRCLE\n{centre}"
+    arc = f"0\nARC\n{centre}50\n{COORD}\n51\n{COORD}\n"
+    yield from _fill(circle, circles, rows)
+    yield from _fill(arc, arcs, rows)
+
+
+def polyline_entities(
+    points, offsets, closed=None, layer: str = "0", rows: int = CHUNK_ROWS
+) -> Iterator[str]:
+    """POLYLINE entities; polyline ``i`` is ``points[offsets[i]:offsets[i + 1]]``.
+
+    Each block holds whole polylines and about ``rows`` vertices.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    counts = np.diff(offsets)
+    if closed is None:
+        flags = np.zeros(len(counts))
+    else:
+        flags = (np.asarray(closed) != 0).astype(np.float64)
+    layer = _layer(layer)
+    pieces = np.array(
+        [
+            f"0\nPOLYLINE\n8\n{layer}\n66\n1\n10\n0.0\n20\n0.0\n30\n0.0\n70\n%d\n",
+            f"0\nVERTEX\n8\n{layer}\n10\n{COORD}\n20\n{COORD}\n30\n0.0\n",
+            f"0\nSEQEND\n8\n{layer}\n",
+        ],
+        dtype=object,
+    )
+    # Block boundaries on polyline starts, every ~rows vertices
+    total = offsets[-1] if len(counts) else 0
+    cuts = np.unique(np.searchsorted(offsets[:-1], np.arange(0, total, rows)))
+    bounds = np.append(cuts, len(counts))
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        n = counts[first:last]
+        # Piece sequence per polyline: header, one VERTEX per point, SEQEND
+        sequence = np.ones(int(n.sum()) + 2 * len(n), dtype=np.int64)
+        header = np.cumsum(n + 2) - (n + 2)
+        sequence[header] = 0
+        sequence[header + n + 1] = 2
+        template = "".join(pieces[sequence])
+        # One flag per header, then x, y per vertex, in order
+        values = np.empty(len(n) + 2 * int(n.sum()))
+        flag_at = 2 * (offsets[first:last] - offsets[first]) + np.arange(len(n))
+        is_flag = np.zeros(len(values), dtype=bool)
+        is_flag[flag_at] = True
+        values[flag_at] = flags[first:last]
+        values[~is_flag] = points[offsets[first]:offsets[last]].ravel()
+        yield template % tuple(values.tolist())
+
+
+def _header(extents: np.ndarray) -> str:
+    (x0, y0), (x1, y1) = extents
+    return (
+        # R12 has no units variable ($INSUNITS, $MEASUREMENT came later); 1 unit = 1 mm
+        "0\nSECTION\n2\nHEADER\n9\n$ACADVER\n1\nAC1009\n"
+        f"9\n$EXTMIN\n10\n{x0:.6f}\n20\n{y0:.6f}\n30\n0.0\n"
+        f"9\n$EXTMAX\n10\n{x1:.6f}\n20\n{y1:.6f}\n30\n0.0\n"
+        "0\nENDSEC\n"
+    )
+
+
+def _tables(layers: Sequence[str]) -> str:
+    layer_rows = "".join(
+        f"0\nLAYER\n2\n{name}\n70\n0\n"
+        f"62\n{LAYER_COLOURS[i % len(LAYER_COLOURS)]}\n6\nCONTINUOUS\n"
+        for i, name in enumerate(layers)
+    )
+    return (
+        "0\nSECTION\n2\nTABLES\n"
+        "0\nTABLE\n2\nLTYPE\n70\n1\n"
+        "0\nLTYPE\n2\nCONTINUOUS\n70\n0\n3\nSolid line\n72\n65\n73\n0\n40\n0.0\n"
+        "0\nENDTAB\n"
+        f"0\nTABLE\n2\nLAYER\n70\n{len(layers)}\n{layer_rows}0\nENDTAB\n"
+        "0\nENDSEC\n"
+    )
+
+
+def dxf_chunks(
+    entities: Iterable[str],
+    layers: Sequence[str] = ("0",),
+    extents: Optional[np.ndarray] = None,
+) -> Iterator[bytes]:
+    """A complete DXF document around blocks from the ``*_entities`` generators."""
+    if extents is None:
+        extents = np.zeros((2, 2))
+    extents = np.asarray(extents, dtype=np.float64)
+    head = _header(extents) + _tables(list(layers))
+    yield (head + "0\nSECTION\n2\nENTITIES\n").encode()
+    for block in entities:
+        yield block.encode()
+    yield b"0\nENDSEC\n0\nEOF\n"
+
+
+def write_dxf(
+    path: Union[str, Path],
+    entities: Iterable[str],
+    layers: Sequence[str] = ("0",),
+    extents: Optional[np.ndarray] = None,
+) -> int:
+    """Write a DXF file; returns its size in bytes."""
+    return write_chunks(path, dxf_chunks(entities, layers, extents))
+
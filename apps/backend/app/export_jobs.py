@@ -0,0 +1,442 @@
+"""Asynchronous, deduplicating export jobs (STL, GLB, drawings, ...).
+
+An export is identified by its key: the hash of (model version, format,
+options). The model version is the geometry id of the model's mesh.
+- Submitting a key that is already queued or running returns the existing
+  job.
+- Submitting a key whose artifact is already on disk returns it at once,
+  without queueing anything.
+
+So a dashboard asking for the same STL many times a minute costs one export.
+
+Jobs wait in a bounded queue that a fixed number of worker tasks drain. Each
+worker hands the actual file writing to ``run`` (the CAD process pool in the
+app). Formats are pluggable: ``exporters`` maps a format name to a picklable
+``fn(vertices, faces, path, options) -> dict``. The leading arguments are
+whatever ``load(geometry_id)`` returns, so a queue whose loader also returns
+face materials can pass them on (the app's thumbnails do). Stored 2-D
+curves go through ``load_curve`` and ``curve_exporters`` the same way, so
+flat-cut outlines export as DXF polylines and arcs. ``on_done(job)``,
+if given, is awaited after each successful export (the app records drawings
+there).
+
+The queueing itself (lanes, backpressure, cancellation, history, waiting out
+a saturated pool) lives in ``JobQueue``, which the render scheduler in
+:mod:`.render_jobs` shares.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from itertools import chain
+from pathlib import Path
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .blueprint import render_blueprint, render_dxf
+from .compute_pool import CAD_POOL_WORKERS, PoolSaturated
+from .dxf_writer import arc_entities, polyline_entities, write_dxf
+from .mesh_writers import MESH_CHUNKERS, write_chunks, write_glb
+
+# One job in flight per pool worker, so a collection's exports use every core
+CAD_EXPORT_WORKERS = int(os.getenv("CAD_EXPORT_WORKERS", str(max(2, CAD_POOL_WORKERS))))
+CAD_EXPORT_MAX_QUEUE = int(os.getenv("CAD_EXPORT_MAX_QUEUE", "64"))
+# Finished jobs kept for status polling
+CAD_EXPORT_HISTORY = int(os.getenv("CAD_EXPORT_HISTORY", "1024"))
+# Backoff while a job's pool is saturated (seconds, doubling up to the maximum)
+CAD_EXPORT_RETRY_DELAY = 0.05
+CAD_EXPORT_MAX_RETRY_DELAY = 2.0
+
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+
+
+class QueueFull(RuntimeError):
+    """Raised when a job queue cannot take another job."""
+
+
+class JobCancelled(Exception):
+    """Raised at a checkpoint of a job whose cancellation was requested."""
+
+
+def export_key(version: str, fmt: str, options: Optional[dict]) -> str:
+    canonical = json.dumps({"v": version, "f": fmt, "o": options or {}}, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def export_mesh(fmt: str, vertices, faces, path, options: dict) -> dict:
+    return {"bytes": write_chunks(path, MESH_CHUNKERS[fmt](vertices, faces)), "triangles": int(len(faces))}
+
+
+def export_stl(vertices, faces, path, options: dict) -> dict:
+    return export_mesh("stl", vertices, faces, path, options)
+
+
+def export_obj(vertices, faces, path, options: dict) -> dict:
+    return export_mesh("obj", vertices, faces, path, options)
+
+
+def export_3mf(vertices, faces, path, options: dict) -> dict:
+    return export_mesh("3mf", vertices, faces, path, options)
+
+
+def export_glb(vertices, faces, path, options: dict) -> dict:
+    return {"bytes": write_glb(path, vertices, faces), "triangles": int(len(faces))}
+
+
+def export_curve_dxf(points, offsets, closed, arcs, path, options: dict) -> dict:
+    """Flat-cut outlines as a 1:1 DXF: a POLYLINE per polyline, an ARC per arc.
+
+    options: layer (default CUT).
+    """
+    layer = str(options.get("layer") or "CUT")
+    # Closed polylines that repeat their first point would make CAM cut a zero-length edge
+    first, last = offsets[:-1], offsets[1:] - 1
+    repeated = (closed != 0) & (last > first)
+    repeated[repeated] = np.all(points[first[repeated]] == points[last[repeated]], axis=1)
+    keep = np.ones(len(points), dtype=bool)
+    keep[last[repeated]] = False
+    points, offsets = points[keep], offsets - np.concatenate(([0], np.cumsum(repeated)))
+    corners = [points, arcs[:, :2] - arcs[:, 2:3], arcs[:, :2] + arcs[:, 2:3]]
+    corners = np.concatenate(corners) if len(points) or len(arcs) else np.zeros((1, 2))
+    extents = np.array([corners.min(axis=0), corners.max(axis=0)])
+    entities = chain(
+        polyline_entities(points, offsets, closed, layer),
+        arc_entities(arcs[:, :2], arcs[:, 2], arcs[:, 3], arcs[:, 4], layer),
+    )
+    size = write_dxf(path, entities, [layer], extents)
+    return {"bytes": size, "polylines": int(len(offsets) - 1), "arcs": int(len(arcs)), "scale": "1:1"}
+
+
+EXPORTERS: Dict[str, Callable[..., dict]] = {
+    "stl": export_stl,
+    "obj": export_obj,
+    "3mf": export_3mf,
+    "glb": export_glb,
+    "pdf": render_blueprint,
+    "dxf": render_dxf,
+}
+# Formats for stored 2-D curves (SVG imports, /geometry/curve outlines)
+CURVE_EXPORTERS: Dict[str, Callable[..., dict]] = {
+    "dxf": export_curve_dxf,
+}
+
+
+@dataclass
+class Job:
+    """A queued unit of work that writes one file (``path``, served at ``url``)."""
+    id: str
+    model_id: int
+    geometry_id: str
+    path: Path
+    url: str
+    lane: int = 0
+    status: str = "queued"
+    error: Optional[str] = None
+    result: dict = field(default_factory=dict)
+    cancel_requested: bool = False
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "model_id": self.model_id,
+            "geometry_id": self.geometry_id,
+            "status": self.status,
+            "error": self.error,
+            "result": self.result,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue(ABC):
+    """Lanes of queued jobs drained by ``workers`` tasks.
+
+    Lane 0 is served first. While several lanes have work they are served by
+    smooth weighted round robin over ``weights``, which keeps strict-ish
+    priority without starving the low lanes; one weight makes a plain FIFO.
+    At most ``max_queue`` jobs wait, beyond that ``submit`` raises
+    ``full_error``. Cancelling a queued job removes it at once; a running
+    one stops at its next ``_checkpoint``.
+
+    ``run(fn, *args)`` executes the CPU-bound steps (a
+    :class:`~.compute_pool.ComputePool` in the app). A saturated pool is not a
+    job failure: the worker backs off and tries again. Workers start lazily
+    on the first submit (and in the app lifespan), so a queue also works when
+    lifespan events are not run. Subclasses implement ``_execute``.
+    """
+
+    name = "job"
+    full_error = QueueFull
+
+    def __init__(self, run: Callable[..., Awaitable], workers: int, max_queue: int, history: int,
+                 weights: Tuple[int, ...] = (1,)):
+        self.run = run
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.history = history
+        self.weights = weights
+        self.lanes: List[Deque[Job]] = [deque() for _ in weights]
+        self._credit = [0] * len(weights)
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._ready: Optional[asyncio.Semaphore] = None
+        self._tasks = []
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.deferred = 0
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(lane) for lane in self.lanes)
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._tasks and self._tasks[0].get_loop() is loop and not self._tasks[0].done():
+            return
+        self._ready = asyncio.Semaphore(self.waiting)
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        # A job running on a previous (closed) loop can never finish now
+        for job in self.jobs.values():
+            if job.status == "running":
+                job.status, job.error = "failed", f"{self.name} queue restarted"
+
+    async def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _remember(self, job: Job) -> None:
+        self.jobs[job.id] = job
+        self.jobs.move_to_end(job.id)
+        while len(self.jobs) > self.history:
+            oldest = next(iter(self.jobs.values()))
+            if oldest.status in ("queued", "running"):
+                break
+            self.jobs.popitem(last=False)
+
+    def _enqueue(self, job: Job) -> Job:
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise self.full_error(f"{self.name} queue is full ({self.max_queue} jobs waiting)")
+        self.lanes[job.lane].append(job)
+        self.submitted += 1
+        self._remember(job)
+        self._ready.release()
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        """Drop a queued job, or stop a running one at its next checkpoint."""
+        job = self.jobs[job_id]
+        if job.status == "queued":
+            self.lanes[job.lane].remove(job)
+            job.status, job.finished_at = "cancelled", datetime.utcnow()
+            self.cancelled += 1
+        elif job.status == "running":
+            job.cancel_requested = True
+        return job
+
+    def _pick(self) -> Optional[Job]:
+        """Smooth weighted round robin over the non-empty lanes."""
+        busy = [i for i, lane in enumerate(self.lanes) if lane]
+        if not busy:
+            return None
+        for i in busy:
+            self._credit[i] += self.weights[i]
+        chosen = max(busy, key=lambda i: (self._credit[i], -i))
+        self._credit[chosen] -= sum(self.weights[i] for i in busy)
+        return self.lanes[chosen].popleft()
+
+    async def _worker(self) -> None:
+        while True:
+            # Cancelled queued jobs leave extra permits; ``_pick`` then finds nothing
+            await self._ready.acquire()
+            job = self._pick()
+            if job is not None:
+                await self._process(job)
+
+    @staticmethod
+    def _checkpoint(job: Job) -> None:
+        if job.cancel_requested:
+            raise JobCancelled()
+
+    @abstractmethod
+    async def _execute(self, job: Job, tmp: Path) -> dict:
+        """Write the job's file to ``tmp`` and return its result."""
+
+    async def _finished(self, job: Job) -> None:
+        """Called once the file is in place, before the job is reported done."""
+
+    async def _process(self, job: Job) -> None:
+        job.status, job.started_at = "running", datetime.utcnow()
+        tmp = job.path.with_name(f"{job.path.stem}.{os.getpid()}.tmp{job.path.suffix}")
+        try:
+            job.result = await self._execute(job, tmp)
+            os.replace(tmp, job.path)
+            await self._finished(job)
+            job.status = "done"
+            self.completed += 1
+        except JobCancelled:
+            job.status = "cancelled"
+            self.cancelled += 1
+            tmp.unlink(missing_ok=True)
+        except asyncio.CancelledError:
+            job.status, job.error = "failed", "cancelled"
+            raise
+        except Exception as e:
+            job.status, job.error = "failed", str(getattr(e, "detail", None) or e)
+            self.failed += 1
+            tmp.unlink(missing_ok=True)
+        finally:
+            job.finished_at = datetime.utcnow()
+
+    async def _run_when_free(self, fn, *args):
+        """``run(fn, *args)``, waiting out ``PoolSaturated`` instead of failing the job."""
+        delay = CAD_EXPORT_RETRY_DELAY
+        while True:
+            try:
+                return await self.run(fn, *args)
+            except PoolSaturated:
+                self.deferred += 1
+                await asyncio.sleep(delay)
+                delay = min(2 * delay, CAD_EXPORT_MAX_RETRY_DELAY)
+
+    async def wait(self, job_id: str) -> Job:
+        """Block until the job has finished (used by tests and synchronous callers)."""
+        job = self.jobs[job_id]
+        while job.status in ("queued", "running"):
+            await asyncio.sleep(0.01)
+        return job
+
+    def stats(self) -> dict:
+        states = {state: 0 for state in JOB_STATES}
+        for job in self.jobs.values():
+            states[job.status] += 1
+        return {
+            "workers": self.workers,
+            "queued": self.waiting,
+            "max_queue": self.max_queue,
+            "jobs": states,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "deferred": self.deferred,
+        }
+
+
+@dataclass(kw_only=True)
+class ExportJob(Job):
+    """``id`` is the export key, so repeated requests poll the same job."""
+    format: str
+    options: dict
+    curve: bool = False  # a stored curve rather than a mesh
+    requests: int = 1
+
+    def to_dict(self) -> dict:
+        return {
+            **super().to_dict(),
+            "format": self.format,
+            "url": self.url if self.status == "done" else None,
+            "requests": self.requests,
+        }
+
+
+class ExportQueue(JobQueue):
+    """Deduplicating export queue on one FIFO lane.
+
+    Curves are exported only when ``load_curve`` is given; their jobs take
+    the ``curve_exporters`` for their format instead of ``exporters``.
+    """
+
+    name = "export"
+
+    def __init__(self, load: Callable[[str], Tuple[np.ndarray, ...]], run: Callable[..., Awaitable],
+                 exporters: Dict[str, Callable[..., dict]] = EXPORTERS, workers: int = CAD_EXPORT_WORKERS,
+                 max_queue: int = CAD_EXPORT_MAX_QUEUE, history: int = CAD_EXPORT_HISTORY,
+                 on_done: Optional[Callable[[ExportJob], Awaitable]] = None,
+                 load_curve: Optional[Callable[[str], Tuple[np.ndarray, ...]]] = None,
+                 curve_exporters: Dict[str, Callable[..., dict]] = CURVE_EXPORTERS):
+        super().__init__(run, workers, max_queue, history)
+        self.load = load
+        self.on_done = on_done
+        self.exporters = exporters
+        self.load_curve = load_curve
+        self.curve_exporters = curve_exporters if load_curve is not None else {}
+        self.deduplicated = 0
+        self.reused = 0
+
+    def submit(self, model_id: int, geometry_id: str, fmt: str, options: Optional[dict],
+               place: Callable[[str, str], Tuple[Path, str]], curve: bool = False) -> ExportJob:
+        """Queue an export, or return the job/artifact already covering it.
+
+        ``place(name, suffix)`` gives the artifact's path and URL; ``curve``
+        marks ``geometry_id`` as a stored curve rather than a mesh.
+        """
+        fmt = fmt.lower()
+        exporters = self.curve_exporters if curve else self.exporters
+        if fmt not in exporters:
+            source = "curves" if curve else "meshes"
+            raise ValueError(f"format for {source} must be one of {', '.join(sorted(exporters)) or 'none'}")
+        self.start()
+        key = export_key(geometry_id, fmt, options)
+        job = self.jobs.get(key)
+        if job is not None and job.status in ("queued", "running"):
+            job.requests += 1
+            self.deduplicated += 1
+            return job
+        if job is not None and job.status == "done" and job.path.exists():
+            job.requests += 1
+            self.reused += 1
+            self.jobs.move_to_end(key)
+            return job
+        path, url = place(key, f".{fmt}")
+        job = ExportJob(id=key, model_id=model_id, geometry_id=geometry_id, format=fmt,
+                        options=options or {}, curve=curve, path=path, url=url)
+        if path.exists():
+            # Finished by an earlier process
+            job.status, job.finished_at = "done", datetime.utcnow()
+            job.result = {"bytes": path.stat().st_size}
+            self.reused += 1
+            self._remember(job)
+            return job
+        return self._enqueue(job)
+
+    async def _execute(self, job: ExportJob, tmp: Path) -> dict:
+        load, exporters = (self.load_curve, self.curve_exporters) if job.curve else (self.load, self.exporters)
+        arrays = await asyncio.to_thread(load, job.geometry_id)
+        self._checkpoint(job)
+        return await self._run_when_free(exporters[job.format], *arrays, tmp, job.options)
+
+    async def _finished(self, job: ExportJob) -> None:
+        # Before "done", so a client that sees done also sees what on_done recorded
+        if self.on_done is None:
+            return
+        try:
+            await self.on_done(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The file is fine; only the bookkeeping after it failed
+            job.result["on_done_error"] = str(e)
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "deduplicated": self.deduplicated,
+            "reused": self.reused,
+            "formats": sorted(self.exporters),
+            "curve_formats": sorted(self.curve_exporters),
+        }
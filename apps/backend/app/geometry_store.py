@@ -0,0 +1,256 @@
+"""Content-addressed store for curves, surfaces and solids.
+
+Every object has a canonical binary form: a JSON header (kind, metadata,
+array layout) followed by its numeric arrays as little-endian float64 /
+int64, each 64-byte aligned. The object id is the blake2b hash of those
+bytes. Submitting the same primitive twice therefore yields the same id and
+nothing new is written.
+
+Objects live in two tiers. An LRU in memory, bounded by array bytes, holds
+recently used objects. Behind it is an on-disk tier (one file per object,
+in its canonical form) that is read back through ``np.memmap``, so a cold
+object costs a header parse and page-ins only for the data actually
+touched.
+"""
+import hashlib
+import json
+import os
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+GEOMETRY_KINDS = ("curve", "surface", "solid", "result")
+# Anchored to the backend directory, not the working directory of the process
+GEOMETRY_STORE_DIR = Path(os.getenv("CAD_GEOMETRY_STORE_DIR", Path(__file__).resolve().parent.parent / "geometry_store"))
+GEOMETRY_CACHE_BYTES = int(os.getenv("CAD_GEOMETRY_CACHE_MB", "256")) * 1024 * 1024
+
+MAGIC = b"CJGEOM1\0"
+ALIGN = 64
+
+
+@dataclass
+class GeometryObject:
+    id: str
+    kind: str
+    meta: dict  # Non-array fields, as submitted
+    arrays: Dict[str, np.ndarray]
+
+    @property
+    def nbytes(self) -> int:
+        return int(sum(a.nbytes for a in self.arrays.values()))
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "meta": self.meta,
+            "arrays": {name: {"dtype": a.dtype.name, "shape": list(a.shape)} for name, a in self.arrays.items()},
+        }
+
+    def to_dict(self) -> dict:
+        """The object as it was submitted (arrays back as lists)."""
+        return {**self.meta, **{name: a.tolist() for name, a in self.arrays.items()}}
+
+
+def split_payload(data: dict) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Separate numeric, rectangular list fields (as canonical arrays) from metadata."""
+    meta, arrays = {}, {}
+    for name, value in data.items():
+        if isinstance(value, np.ndarray) or (isinstance(value, list) and len(value)):
+            try:
+                array = np.asarray(value)
+            except ValueError:  # ragged
+                array = None
+            if array is not None and array.dtype.kind in "iuf":
+                arrays[name] = np.ascontiguousarray(array, dtype="<f8" if array.dtype.kind == "f" else "<i8")
+                continue
+        meta[name] = value
+    return meta, arrays
+
+
+def _is_object_id(object_id: str) -> bool:
+    return len(object_id) == 32 and all(c in "0123456789abcdef" for c in object_id)
+
+
+def _padding(offset: int) -> int:
+    return -offset % ALIGN
+
+
+def encode(kind: str, meta: dict, arrays: Dict[str, np.ndarray]) -> Tuple[bytes, list]:
+    """Canonical header bytes and the array buffers that follow it."""
+    layout, offset = [], 0
+    for name in sorted(arrays):
+        array = arrays[name]
+        layout.append({"name": name, "dtype": array.dtype.str, "shape": list(array.shape), "offset": offset})
+        offset += array.nbytes + _padding(array.nbytes)
+    header = json.dumps({"kind": kind, "meta": meta, "arrays": layout}, sort_keys=True, separators=(",", ":")).encode()
+    prefix = MAGIC + struct.pack("<I", len(header)) + header
+    prefix += b"\0" * _padding(len(prefix))
+    buffers = []
+    for name in sorted(arrays):
+        buffers.append(memoryview(arrays[name].reshape(-1).view(np.uint8)))
+        buffers.append(b"\0" * _padding(arrays[name].nbytes))
+    return prefix, buffers
+
+
+class GeometryStore:
+    def __init__(self, root: Path = GEOMETRY_STORE_DIR, max_memory_bytes: int = GEOMETRY_CACHE_BYTES):
+        self.root = Path(root)
+        self.max_memory_bytes = max_memory_bytes
+        self._memory: "OrderedDict[str, GeometryObject]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.writes = 0
+        self.deduplicated = 0
+
+    def path(self, object_id: str) -> Path:
+        return self.root / object_id[:2] / f"{object_id}.geom"
+
+    def put(self, kind: str, data: dict) -> Tuple[GeometryObject, bool]:
+        """Store ``data`` as a ``kind`` object; returns the object and whether it was new."""
+        if kind not in GEOMETRY_KINDS:
+            raise ValueError(f"kind must be one of {', '.join(GEOMETRY_KINDS)}")
+        meta, arrays = split_payload(data)
+        if not arrays:
+            raise ValueError(f"{kind} needs at least one numeric array (points, vertices, ...)")
+        try:
+            prefix, buffers = encode(kind, meta, arrays)
+        except TypeError as e:
+            raise ValueError(f"{kind} metadata must be JSON: {e}")
+        digest = hashlib.blake2b(prefix, digest_size=16)
+        for buf in buffers:
+            digest.update(buf)
+        obj = GeometryObject(id=digest.hexdigest(), kind=kind, meta=meta, arrays=arrays)
+
+        with self._lock:
+            known = obj.id in self._memory
+        path = self.path(obj.id)
+        created = not known and not path.exists()
+        if created:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(prefix)
+                for buf in buffers:
+                    f.write(buf)
+            os.replace(tmp, path)
+        with self._lock:
+            if created:
+                self.writes += 1
+            else:
+                self.deduplicated += 1
+            self._remember(obj)
+        return obj, created
+
+    def get(self, object_id: str) -> Optional[GeometryObject]:
+        with self._lock:
+            obj = self._memory.get(object_id)
+            if obj is not None:
+                self._memory.move_to_end(object_id)
+                self.memory_hits += 1
+                return obj
+        obj = self._load(object_id)
+        if obj is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._remember(obj)
+        return obj
+
+    def exists(self, object_id: str) -> bool:
+        """Whether ``object_id`` is stored, without loading it."""
+        with self._lock:
+            if object_id in self._memory:
+                return True
+        return _is_object_id(object_id) and self.path(object_id).exists()
+
+    def mesh(self, object_id: str) -> Tuple[np.ndarray, np.ndarray]:
+        """``(vertices, faces)`` of a stored triangle mesh; ``ValueError`` otherwise."""
+        obj = self.get(object_id)
+        if obj is None or "vertices" not in obj.arrays or "faces" not in obj.arrays:
+            raise ValueError(f"'{object_id}' is not a stored mesh with vertices and faces")
+        vertices, faces = obj.arrays["vertices"], obj.arrays["faces"]
+        if faces.ndim != 2 or faces.shape[1] != 3 or not len(faces):
+            raise ValueError(f"'{object_id}' has no triangle faces")
+        return vertices, faces
+
+    def curve(self, object_id: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """``(points, offsets, closed, arcs)`` of a stored 2-D curve; ``ValueError`` otherwise.
+
+        Polyline ``i`` is ``points[offsets[i]:offsets[i + 1]]`` (x, y; any z is
+        dropped). Without ``offsets`` the points are one polyline, and
+        ``closed`` may be one flag for all of them. ``arcs`` rows are centre x,
+        y, radius and start / end angle in degrees, counter-clockwise.
+        """
+        obj = self.get(object_id)
+        if obj is None or obj.kind != "curve" or not ({"points", "arcs"} & set(obj.arrays)):
+            raise ValueError(f"'{object_id}' is not a stored curve with points or arcs")
+        points = obj.arrays.get("points", np.zeros((0, 2)))
+        if points.ndim != 2 or points.shape[1] not in (2, 3):
+            raise ValueError(f"'{object_id}' points must be (N, 2) or (N, 3)")
+        points = points[:, :2]
+        offsets = obj.arrays.get("offsets", np.array([0, len(points)] if len(points) else [0]))
+        if offsets.ndim != 1 or not len(offsets) or offsets[0] != 0 or offsets[-1] != len(points) \
+                or np.any(np.diff(offsets) < 0):
+            raise ValueError(f"'{object_id}' offsets must rise from 0 to the number of points")
+        closed = np.asarray(obj.arrays.get("closed", obj.meta.get("closed", False)))
+        if closed.ndim == 0:
+            closed = np.full(len(offsets) - 1, closed)
+        if closed.shape != (len(offsets) - 1,):
+            raise ValueError(f"'{object_id}' needs one closed flag per polyline")
+        arcs = obj.arrays.get("arcs", np.zeros((0, 5)))
+        if arcs.ndim != 2 or arcs.shape[1] != 5:
+            raise ValueError(f"'{object_id}' arcs must be (K, 5): cx, cy, radius, start, end")
+        return points, offsets, (closed != 0).astype(np.int64), arcs
+
+    def _load(self, object_id: str) -> Optional[GeometryObject]:
+        if not _is_object_id(object_id):
+            return None
+        path = self.path(object_id)
+        if not path.exists():
+            return None
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a geometry object")
+            (size,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(size))
+        base = len(MAGIC) + 4 + size
+        base += _padding(base)
+        arrays = {}
+        for spec in header["arrays"]:
+            dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+            if not np.prod(shape):
+                arrays[spec["name"]] = np.empty(shape, dtype=dtype)  # nothing to map
+                continue
+            arrays[spec["name"]] = np.memmap(path, dtype=dtype, mode="r", offset=base + spec["offset"], shape=shape)
+        return GeometryObject(id=object_id, kind=header["kind"], meta=header["meta"], arrays=arrays)
+
+    def _remember(self, obj: GeometryObject) -> None:
+        if obj.id in self._memory:
+            self._memory.move_to_end(obj.id)
+            return
+        if obj.nbytes > self.max_memory_bytes:
+            return
+        self._memory[obj.id] = obj
+        self._memory_bytes += obj.nbytes
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_objects": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "writes": self.writes,
+                "deduplicated": self.deduplicated,
+            }
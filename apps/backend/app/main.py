@@ -289,83 +289,6 @@ async def create_stripe_invoice(data: InvoiceRequest):
         status = "queued"
     return job_id, status, preview_url
 
-def upload_project_file_to_provider(provider: CloudProvider, project_id: int, file_url: str, version: str, metadata: dict):
-    # Stub: Add real integration for each provider
-    if provider == CloudProvider.aws:
-        upload_id = f"aws-{uuid.uuid4()}"
-        status = "uploaded"
-        file_url = f"https://s3.amazonaws.com/yourbucket/projects/{project_id}/{version or 'latest'}.zip"
-    elif provider == CloudProvider.gcp:
-        upload_id = f"gcp-{uuid.uuid4()}"
-        status = "uploaded"
-        file_url = f"https://storage.googleapis.com/yourbucket/projects/{project_id}/{version or 'latest'}.zip"
-    elif provider == CloudProvider.azure:
-        upload_id = f"azure-{uuid.uuid4()}"
-        status = "uploaded"
-        file_url = f"https://youraccount.blob.core.windows.net/projects/{project_id}/{version or 'latest'}.zip"
-    else:
-        upload_id = f"local-{uuid.uuid4()}"
-        status = "uploaded"
-    return upload_id, status, file_url
-
-# --- Cloud Rendering API ---
-class CloudRenderJobRequest(BaseModel):
-    model_id: int
-    quality: str = "high"
-    options: Optional[dict] = None
-
-class CloudRenderJobOut(BaseModel):
-    job_id: str
-    status: str
-    preview_url: Optional[str] = None
-
-@app.post("/cloud/render", response_model=CloudRenderJobOut)
-async def start_cloud_render_job(data: CloudRenderJobRequest):
-    provider = CloudProvider(CLOUD_PROVIDER)
-    job_id, status, preview_url = submit_render_job_to_provider(provider, data.model_id, data.quality, data.options or {})
-    return CloudRenderJobOut(job_id=job_id, status=status, preview_url=preview_url)
-
-# --- Cloud Project Storage API ---
-class CloudProjectUploadRequest(BaseModel):
-    project_id: int
-    file_url: str
-    version: Optional[str] = None
-    metadata: Optional[dict] = None
-
-class CloudProjectUploadOut(BaseModel):
-    upload_id: str
-    status: str
-    file_url: str
-    version: Optional[str] = None
-
-@app.post("/cloud/project/upload", response_model=CloudProjectUploadOut)
-async def upload_project_file(data: CloudProjectUploadRequest):
-    provider = CloudProvider(CLOUD_PROVIDER)
-    try:
-        upload_id, status, file_url = upload_project_file_to_provider(provider, data.project_id, data.file_url, data.version, data.metadata or {})
-        # Simulate version history update (stub)
-        # In production, update DB or cloud metadata
-        return CloudProjectUploadOut(upload_id=upload_id, status=status, file_url=file_url, version=data.version)
-    except Exception as e:
-        return CloudProjectUploadOut(upload_id="", status="error", file_url=data.file_url, version=data.version)
-
-class CloudProjectListOut(BaseModel):
-    projects: list
-
-@app.get("/cloud/project/list", response_model=CloudProjectListOut)
-async def list_cloud_projects():
-    # Stub: In production, list projects and version history from cloud storage
-    # Example metadata: project_id, name, versions, last_modified, owner
-    projects = [
-        {
-            "project_id": 1,
-            "name": "Demo Project",
-            "versions": ["v1.0", "v1.1"],
-            "last_modified": "2025-09-16T12:00:00Z",
-            "owner": "user@example.com"
-        }
-    ]
-    return CloudProjectListOut(projects=projects)
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, status, Request, UploadFile, File, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware import Middleware
@@ -578,54 +501,551 @@ async def share_project():
     return {"status": "Project shared!"}
 from fastapi import APIRouter, UploadFile, File, Form
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Tuple
 import numpy as np
+from .stone_layout import fill_lattice, fill_region, prepare_region, shape_names
+from .region_cache import RegionCache, RegionNotResident, fill_resident, region_key
+from .manufacturability import (
+    check_stone_clearance, check_wall_thickness, MIN_STONE_CLEARANCE, MIN_EDGE_CLEARANCE, MIN_WALL_THICKNESS,
+    THICKNESS_MAX_DISTANCE, THICKNESS_SAMPLES,
+)
+from .seats import seat_job, seat_templates, stone_columns, template_cache_stats, template_keys, template_name, templates_json
+from .compute_pool import ComputePool, PoolSaturated
+from .streaming import STREAM_SLICE_SIZE, wants_stream, stream_response, fill_records, seat_records
+from .band_layout import solve_band, BAND_GAP_TOLERANCE, DEFAULT_BAND_THICKNESS
+from .sweep import sweep_to_stl
+from .geometry_store import GeometryStore
+from .booleans import BooleanEvaluator, parse_graph
+from .viewport import ViewportCache, pick_level
+from .export_jobs import ExportQueue, QueueFull
+from .blueprint import PAGE_SIZES, VIEWS
+from .svg_import import DEFAULT_TOLERANCE, FEED_SIZE, MAX_SVG_SIZE, SVGImporter
+from .mass_properties import ALLOYS, MassPropertiesCache, MeshNotFound, density
+from .project_uploads import CHUNK_SIZE, ProjectStore, VersionExists, receive_chunk
+from .render_jobs import CAD_RENDER_WORKERS, RenderQueueFull, RenderScheduler
+from .rasterizer import render_thumbnail
+from .report_batch import MAX_REPORT_BATCH, REPORT_BATCH_CONCURRENCY, ReportMemo, report_key, run_batch
+from .mesh_writers import MESH_CHUNKERS, MESH_MEDIA_TYPES
+from fastapi.responses import StreamingResponse
+from . import static_files
+from .static_files import static_path
+from fastapi.staticfiles import StaticFiles
+from .mesh_io import BINARY_CONTENT_TYPES, decode_arrays
+from pydantic import ValidationError
+from fastapi.exceptions import RequestValidationError
+import json
+import asyncio
 
 router = APIRouter()
 
+# Worker processes for CPU-heavy CAD work; started and stopped in lifespan
+cad_pool = ComputePool()
+
+async def offload(fn, *args, **kwargs):
+    """Run ``fn`` on the CAD process pool; 503 when the pool is saturated."""
+    try:
+        return await cad_pool.run(fn, *args, **kwargs)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+async def offload_streamed(fn, *args, **kwargs):
+    """``offload`` for the slices of a stream that has already started.
+
+    The 503 status can no longer be sent, so ``PoolSaturated`` is waited out.
+    """
+    delay = 0.05
+    while True:
+        try:
+            return await cad_pool.run(fn, *args, **kwargs)
+        except PoolSaturated:
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, 2.0)
+
+@router.get("/cad/pool")
+async def cad_pool_status():
+    return cad_pool.stats()
+
+# Parsed fill regions (vertices, faces, bounds) by content hash; the surface
+# indexes live in the pool workers (see region_cache.resident_region)
+region_cache = RegionCache()
+
+# Curves, surfaces and solids by content hash (memory LRU over on-disk objects)
+geometry_store = GeometryStore()
+# Boolean DAG results memoized by (op, input keys); kernels run on the CAD pool
+boolean_evaluator = BooleanEvaluator(geometry_store, offload)
+# Viewport LOD sets per model version (geometry id); decimation runs on the CAD pool
+viewport_cache = ViewportCache(geometry_store, offload)
+# Current geometry id (model version) of each CAD model, set by viewport/export requests
+model_geometry = {}
+# Export formats that are technical drawings; each file gets a TechnicalDrawing row
+DRAWING_FORMATS = ("dxf", "pdf")
+
+async def record_drawing(job) -> None:
+    """Store a finished drawing export against its model (one row per file)."""
+    if job.format not in DRAWING_FORMATS:
+        return
+    async with SessionLocal() as db:
+        drawing_id = (await db.execute(
+            select(TechnicalDrawing.id).where(TechnicalDrawing.drawing_url == job.url)
+        )).scalar_one_or_none()
+        if drawing_id is None:
+            drawing = TechnicalDrawing(cad_model_id=job.model_id, drawing_url=job.url)
+            db.add(drawing)
+            await db.commit()
+            drawing_id = drawing.id
+    job.result["drawing_id"] = drawing_id
+
+# Deduplicated export jobs keyed by (geometry id, format, options); files written on the CAD pool.
+# The queue waits for pool capacity itself, so it takes cad_pool.run rather than offload's 503.
+export_queue = ExportQueue(geometry_store.mesh, cad_pool.run, on_done=record_drawing, load_curve=geometry_store.curve)
+# Volume, area and centroid per model version; cheap enough to compute in-process
+mass_cache = MassPropertiesCache(geometry_store.mesh)
+
+def model_version(model_id: int, geometry_id: Optional[str]) -> str:
+    geometry_id = geometry_id or model_geometry.get(model_id)
+    if geometry_id is None:
+        raise HTTPException(status_code=404, detail="No geometry known for this model; pass geometry_id")
+    return geometry_id
+
+async def submit_export(model_id: int, geometry_id: Optional[str], fmt: str, options: Optional[dict] = None,
+                        kind: str = "exports") -> dict:
+    """Queue (or join, or reuse) an export of the model's current geometry (a mesh or a 2-D curve)."""
+    geometry_id = model_version(model_id, geometry_id)
+    obj = await asyncio.to_thread(geometry_store.get, geometry_id)
+    curve = obj is not None and obj.kind == "curve"
+    try:
+        await asyncio.to_thread(geometry_store.curve if curve else geometry_store.mesh, geometry_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        job = export_queue.submit(model_id, geometry_id, fmt, options, lambda name, suffix: static_path(kind, suffix, name),
+                                  curve=curve)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    model_geometry[model_id] = geometry_id
+    return job.to_dict()
+
+@router.get("/export/jobs")
+async def export_queue_status():
+    return export_queue.stats()
+
+@router.get("/export/jobs/{job_id}")
+async def export_job_status(job_id: str):
+    job = export_queue.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job.to_dict()
+
+# --- Cloud Rendering API ---
+def render_mesh(geometry_id: str):
+    """``(vertices, faces, materials)`` of a stored mesh; ``materials`` is its optional per-face array."""
+    vertices, faces = geometry_store.mesh(geometry_id)
+    materials = geometry_store.get(geometry_id).arrays.get("materials")
+    if materials is not None and materials.size != len(faces):
+        raise ValueError(f"'{geometry_id}' has {materials.size} materials for {len(faces)} faces")
+    return vertices, faces, materials
+
+# Renders get their own worker processes, so a queue of ultra renders never starves CAD requests.
+# Render jobs and thumbnails each keep at most one step per worker in flight.
+render_pool = ComputePool(workers=CAD_RENDER_WORKERS, max_queue=CAD_RENDER_WORKERS)
+# Local (offline) render backend
+render_scheduler = RenderScheduler(render_mesh, render_pool.run, workers=CAD_RENDER_WORKERS)
+CLOUD_PROVIDER = os.getenv("CLOUD_PROVIDER", "local")
+
+class CloudRenderJobRequest(BaseModel):
+    model_id: int
+    quality: str = "high"  # preview, draft, standard, high or ultra (see render_jobs.RENDER_QUALITIES)
+    options: Optional[dict] = None  # view, size
+    geometry_id: Optional[str] = None  # defaults to the model's last known geometry
+
+class CloudRenderJobOut(BaseModel):
+    job_id: str
+    status: str
+    preview_url: Optional[str] = None
+    model_id: Optional[int] = None
+    quality: Optional[str] = None
+    progress: float = 0.0
+    error: Optional[str] = None
+    result: dict = Field(default_factory=dict)
+
+async def submit_render_job_to_provider(provider: CloudProvider, model_id: int, geometry_id: Optional[str],
+                                        quality: str, options: dict) -> dict:
+    if provider != CloudProvider.local:
+        raise HTTPException(status_code=501, detail=f"No {provider.value} render backend is configured; use CLOUD_PROVIDER=local")
+    geometry_id = model_version(model_id, geometry_id)
+    try:
+        await asyncio.to_thread(geometry_store.mesh, geometry_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        job = render_scheduler.submit(model_id, geometry_id, quality, options,
+                                      lambda name, suffix: static_path("renders", suffix, name))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    model_geometry[model_id] = geometry_id
+    return job.to_dict()
+
+@router.post("/cloud/render", response_model=CloudRenderJobOut)
+async def start_cloud_render_job(data: CloudRenderJobRequest):
+    try:
+        provider = CloudProvider(CLOUD_PROVIDER)
+    except ValueError:
+        raise HTTPException(status_code=500, detail=f"Unknown CLOUD_PROVIDER '{CLOUD_PROVIDER}'")
+    return await submit_render_job_to_provider(provider, data.model_id, data.geometry_id, data.quality, data.options or {})
+
+@router.get("/cloud/render/jobs")
+async def render_queue_status():
+    return {**render_scheduler.stats(), "pool": render_pool.stats()}
+
+@router.get("/cloud/render/jobs/{job_id}", response_model=CloudRenderJobOut)
+async def render_job_status(job_id: str):
+    job = render_scheduler.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Render job not found")
+    return job.to_dict()
+
+@router.delete("/cloud/render/jobs/{job_id}", response_model=CloudRenderJobOut)
+async def cancel_render_job(job_id: str):
+    """Cancel a queued job at once, or a running one after its current band."""
+    if job_id not in render_scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Render job not found")
+    job = render_scheduler.cancel(job_id)
+    if job.status in ("done", "failed"):
+        raise HTTPException(status_code=409, detail=f"Render job already {job.status}")
+    return job.to_dict()
+
+# --- Cloud Project Storage API ---
+# Local backend: content-addressed chunks, resumable upload sessions, version manifests
+project_store = ProjectStore()
+
+class CloudProjectUploadRequest(BaseModel):
+    project_id: int
+    chunks: List[dict]  # [{"hash": BLAKE2b-128 hex, "size": bytes}] in file order
+    version: Optional[str] = None  # defaults to the next free v<n> when the upload completes
+    metadata: Optional[dict] = None
+    file_url: Optional[str] = None  # client-side name of the archive, kept in metadata
+
+class CloudProjectUploadOut(BaseModel):
+    upload_id: str
+    status: str  # "uploading" until every chunk is stored, then "ready" to complete, then "uploaded"
+    file_url: Optional[str] = None  # known once the version is
+    version: Optional[str] = None
+    chunk_size: int = CHUNK_SIZE
+    missing: List[int] = Field(default_factory=list)  # chunk indices still to send
+    size: int = 0
+
+def project_file_url(project_id: int, version: str) -> str:
+    return f"/cloud/project/{project_id}/versions/{version}"
+
+def upload_status(session, missing: List[int]) -> CloudProjectUploadOut:
+    return CloudProjectUploadOut(upload_id=session.id, status="uploading" if missing else "ready",
+                                 file_url=project_file_url(session.project_id, session.version) if session.version else None,
+                                 version=session.version, missing=missing, size=session.size)
+
+async def upload_project_file_to_provider(provider: CloudProvider, data: CloudProjectUploadRequest) -> CloudProjectUploadOut:
+    if provider != CloudProvider.local:
+        raise HTTPException(status_code=501, detail=f"No {provider.value} project storage is configured; use CLOUD_PROVIDER=local")
+    metadata = {**(data.metadata or {}), **({"file_url": data.file_url} if data.file_url else {})}
+    try:
+        session = await asyncio.to_thread(project_store.begin, data.project_id, data.chunks, data.version, metadata)
+    except VersionExists as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return upload_status(session, await asyncio.to_thread(project_store.missing, session))
+
+async def open_upload(upload_id: str):
+    try:
+        return await asyncio.to_thread(project_store.session, upload_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Upload not found or already completed")
+
+@router.post("/cloud/project/upload", response_model=CloudProjectUploadOut)
+async def upload_project_file(data: CloudProjectUploadRequest):
+    """Open a chunked upload; only the chunks listed in ``missing`` need to be sent."""
+    try:
+        provider = CloudProvider(CLOUD_PROVIDER)
+    except ValueError:
+        raise HTTPException(status_code=500, detail=f"Unknown CLOUD_PROVIDER '{CLOUD_PROVIDER}'")
+    return await upload_project_file_to_provider(provider, data)
+
+@router.get("/cloud/project/upload/{upload_id}", response_model=CloudProjectUploadOut)
+async def project_upload_status(upload_id: str):
+    """What is left to send, e.g. after a dropped connection."""
+    session = await open_upload(upload_id)
+    return upload_status(session, await asyncio.to_thread(project_store.missing, session))
+
+@router.put("/cloud/project/upload/{upload_id}/chunks/{index}")
+async def upload_project_chunk(upload_id: str, index: int, request: Request):
+    """Store chunk ``index`` from the raw request body (streamed, verified against its hash)."""
+    session = await open_upload(upload_id)
+    try:
+        return await receive_chunk(project_store, session, index, request.stream(),
+                                   lambda f, data: asyncio.to_thread(f.write, data))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/cloud/project/upload/{upload_id}/complete", response_model=CloudProjectUploadOut)
+async def complete_project_upload(upload_id: str):
+    """Publish the version; 409 while chunks are missing or if the version was taken meanwhile."""
+    session = await open_upload(upload_id)
+    try:
+        manifest = await asyncio.to_thread(project_store.complete, session)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return CloudProjectUploadOut(upload_id=session.id, status="uploaded", version=manifest["version"],
+                                 file_url=project_file_url(session.project_id, manifest["version"]), size=manifest["size"])
+
+class CloudProjectListOut(BaseModel):
+    projects: list
+
+@router.get("/cloud/project/list", response_model=CloudProjectListOut)
+async def list_cloud_projects():
+    """Projects in the local store with their version history (oldest first)."""
+    def listing():
+        return [{"project_id": p, "versions": project_store.versions(p)} for p in project_store.projects()]
+    return CloudProjectListOut(projects=await asyncio.to_thread(listing))
+
+@router.get("/cloud/project/{project_id}/versions/{version}")
+async def download_project_version(project_id: int, version: str):
+    """The archive of a version, streamed chunk by chunk."""
+    try:
+        manifest = await asyncio.to_thread(project_store.manifest, project_id, version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Project version not found")
+    return StreamingResponse(project_store.read(manifest), media_type="application/octet-stream",
+                             headers={"Content-Length": str(manifest["size"]), "ETag": f'"{manifest["hash"]}"'})
+
+# Listing thumbnails, cached on disk by model version and options, rendered in the background
+THUMBNAIL_SIZE = 256
+THUMBNAIL_MAX_SIZE = 1024
+CAD_THUMBNAIL_MAX_QUEUE = int(os.getenv("CAD_THUMBNAIL_MAX_QUEUE", "4096"))
+thumbnail_queue = ExportQueue(render_mesh, render_pool.run, exporters={"png": render_thumbnail},
+                              workers=CAD_RENDER_WORKERS, max_queue=CAD_THUMBNAIL_MAX_QUEUE,
+                              history=2 * CAD_THUMBNAIL_MAX_QUEUE)
+
+def request_thumbnail(model_id: int, geometry_id: str, size: int = THUMBNAIL_SIZE, view: str = "iso") -> dict:
+    """Status (and URL when ready) of a thumbnail; never renders on the caller's path."""
+    if not 32 <= size <= THUMBNAIL_MAX_SIZE or view not in VIEWS:
+        raise HTTPException(status_code=400, detail=f"size must be 32..{THUMBNAIL_MAX_SIZE} and view one of {', '.join(VIEWS)}")
+    try:
+        job = thumbnail_queue.submit(model_id, geometry_id, "png", {"size": size, "view": view},
+                                     lambda name, suffix: static_path("previews", suffix, name))
+    except QueueFull:
+        return {"model_id": model_id, "geometry_id": geometry_id, "status": "deferred", "preview_url": None}
+    return {"model_id": model_id, "geometry_id": geometry_id, "status": job.status, "error": job.error,
+            "preview_url": job.url if job.status == "done" else None}
+
+class ThumbnailBatchRequest(BaseModel):
+    models: List[dict]  # [{"model_id", "geometry_id"?}]
+    size: int = THUMBNAIL_SIZE
+    view: str = "iso"
+
+@router.post("/cad/previews")
+async def batch_previews(data: ThumbnailBatchRequest):
+    """Thumbnails for a listing page: ready URLs now, the rest queued (or ``deferred`` when full).
+
+    Models without a known, stored geometry are reported as ``unknown``.
+    """
+    models = []
+    for entry in data.models:
+        try:
+            model_id = int(entry["model_id"])
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="each model needs an integer model_id")
+        models.append((model_id, entry.get("geometry_id") or model_geometry.get(model_id)))
+    stored = await asyncio.to_thread(
+        lambda: {g for _, g in models if isinstance(g, str) and geometry_store.exists(g)}
+    )
+    previews = []
+    for model_id, geometry_id in models:
+        if geometry_id not in stored:
+            previews.append({"model_id": model_id, "status": "unknown", "preview_url": None})
+            continue
+        previews.append(request_thumbnail(model_id, geometry_id, data.size, data.view))
+    return {"previews": previews, "ready": sum(p["status"] == "done" for p in previews)}
+
+@router.get("/cad/previews/queue")
+async def thumbnail_queue_status():
+    return thumbnail_queue.stats()
+
+@router.get("/export/stream/{model_id}")
+async def stream_export(model_id: int, format: str = "stl", geometry_id: Optional[str] = None):
+    """Download the model as STL/OBJ/3MF while it is being serialized (no job, no file)."""
+    fmt = format.lower()
+    if fmt not in MESH_CHUNKERS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(sorted(MESH_CHUNKERS))}")
+    geometry_id = model_version(model_id, geometry_id)
+    try:
+        vertices, faces = await asyncio.to_thread(geometry_store.mesh, geometry_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    model_geometry[model_id] = geometry_id
+    # Sync generator: Starlette drains it on a worker thread, chunk by chunk
+    return StreamingResponse(
+        MESH_CHUNKERS[fmt](vertices, faces),
+        media_type=MESH_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="model-{model_id}.{fmt}"'},
+    )
+
+@router.get("/cad/regions")
+async def region_cache_status():
+    return region_cache.stats()
+
+@router.get("/cad/regions/{region_id}")
+async def get_cached_region(region_id: str):
+    """Check whether a region can still be referenced by ``region_id``."""
+    region = region_cache.peek(region_id)
+    if region is None:
+        raise HTTPException(status_code=404, detail="Region not cached")
+    return {
+        "region_id": region_id,
+        "vertices": len(region.vertices),
+        "faces": None if region.faces is None else len(region.faces),
+        "bytes": region.nbytes,
+    }
+
+def mesh_body(model_cls, array_fields):
+    """Body dependency for geometry endpoints: JSON as usual, or a binary body.
+
+    Binary bodies (see mesh_io) carry the arrays named in ``array_fields`` as
+    zero-copy NumPy views; every other field comes from the X-Mesh-Params JSON
+    header and is validated as normal.
+    """
+    async def parse(request: Request):
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        body = await request.body()
+        try:
+            if content_type not in BINARY_CONTENT_TYPES:
+                return model_cls.model_validate_json(body)
+            arrays = decode_arrays(body, content_type, request.headers.get("x-mesh-layout", ""))
+            unknown = set(arrays) - set(array_fields)
+            if unknown:
+                raise ValueError(f"Unexpected arrays in body: {', '.join(sorted(unknown))}")
+            params = json.loads(request.headers.get("x-mesh-params") or "{}")
+            placeholders = {name: {} if model_cls.model_fields[name].annotation is dict else [] for name in arrays}
+            model = model_cls.model_validate({**params, **placeholders})
+        except ValidationError as e:
+            raise RequestValidationError(e.errors(include_url=False))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        for name, array in arrays.items():
+            setattr(model, name, array)
+        return model
+    return parse
+
+def mesh_openapi(model_cls, array_fields) -> dict:
+    """``openapi_extra`` describing the request body that ``mesh_body`` reads.
+
+    The dependency takes the raw request, so FastAPI would otherwise leave the
+    body out of the schema.
+    """
+    schema = model_cls.model_json_schema()
+    defs = schema.pop("$defs", {})
+
+    def inline(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return inline(defs[node["$ref"].rsplit("/", 1)[-1]])
+            return {key: inline(value) for key, value in node.items()}
+        if isinstance(node, list):
+            return [inline(value) for value in node]
+        return node
+
+    binary = {"schema": {"type": "string", "format": "binary"}}
+    return {"requestBody": {
+        "required": True,
+        "description": f"JSON, or the arrays {', '.join(array_fields)} as a binary body named by the "
+                       "X-Mesh-Layout header, with the other fields as JSON in X-Mesh-Params",
+        "content": {"application/json": {"schema": inline(schema)}, **{t: binary for t in BINARY_CONTENT_TYPES}},
+    }}
+
 class DiamondFillRequest(BaseModel):
-    region_mesh: List[List[float]]  # Example: [[x, y, z], ...]
+    region_mesh: Optional[List[List[float]]] = None  # Example: [[x, y, z], ...]
+    region_id: Optional[str] = None  # Hash of a region sent earlier, instead of region_mesh
     stone_size: float
     grid_type: str
     spacing: float
     padding: float
     stone_shape: str
+    placement_mode: str = "planar"  # "planar" (bounding box) or "surface" (project onto region_mesh)
+    region_faces: Optional[List[List[int]]] = None  # Triangles into region_mesh; omitted = triangle soup
 
 class DiamondFillResponse(BaseModel):
     modified_mesh: Optional[List[List[float]]]
     diamond_report: dict
+    placements: Optional[dict] = None  # {"positions": [[x, y, z], ...], "normals": [...], "shape_ids": [...], "shapes": [...]}
 
 
-@router.post("/cad/auto-diamond-fill", response_model=DiamondFillResponse)
-async def auto_diamond_fill(req: DiamondFillRequest):
-    region = np.array(req.region_mesh)
-    min_xyz = region.min(axis=0)
-    max_xyz = region.max(axis=0)
-    grid = []
-    count = 0
-    shapes_used = []
-    x = min_xyz[0] + req.padding
-    while x < max_xyz[0] - req.padding:
-        y = min_xyz[1] + req.padding
-        while y < max_xyz[1] - req.padding:
-            grid.append([x, y, min_xyz[2]])
-            count += 1
-            if req.stone_shape == "mixed":
-                shapes_used.append([x, y, min_xyz[2], ["round", "princess", "oval", "emerald"][count % 4]])
-            else:
-                shapes_used.append([x, y, min_xyz[2], req.stone_shape])
-            y += req.stone_size + req.spacing
-        x += req.stone_size + req.spacing
-    report = {
-        "total_diamonds": count,
-        "stone_size": req.stone_size,
-        "grid_type": req.grid_type,
-        "spacing": req.spacing,
-        "padding": req.padding,
-        "stone_shape": req.stone_shape,
-        "shapes_used": shapes_used[:10]
-    }
-    return DiamondFillResponse(modified_mesh=req.region_mesh, diamond_report=report)
+@router.post("/cad/auto-diamond-fill", response_model=DiamondFillResponse,
+             openapi_extra=mesh_openapi(DiamondFillRequest, ("region_mesh", "region_faces")))
+async def auto_diamond_fill(request: Request, req: DiamondFillRequest = Depends(mesh_body(DiamondFillRequest, ("region_mesh", "region_faces")))):
+    """Fill a region with stones. Send ``Accept: application/x-ndjson`` (or
+    ``?stream=true``) to receive placements as NDJSON chunks instead."""
+    surface = req.placement_mode == "surface"
+    try:
+        if req.region_id is not None:
+            region_id, region, faces = req.region_id, region_cache.get(req.region_id), None
+            if region is None:
+                raise HTTPException(status_code=404, detail="Unknown region_id, send region_mesh again")
+        elif req.region_mesh is not None:
+            region_id, vertices, faces = await asyncio.to_thread(region_key, req.region_mesh, req.region_faces)
+            region = region_cache.get(region_id)
+        else:
+            raise ValueError("region_mesh or region_id is required")
+        fresh = region is None
+        if fresh:
+            region = await asyncio.to_thread(prepare_region, vertices, faces)
+            region_cache.put(region_id, region)
+        args = (req.stone_size, req.spacing, req.padding, req.grid_type, req.stone_shape)
+
+        async def fill(run, send_mesh, **kwargs):
+            if not surface:
+                # Planar fills only need the bounds
+                return await run(fill_region, region.for_mode("planar"), *args, mode="planar", **kwargs)
+            try:
+                # Workers keep their surface index; the mesh is only sent when one lacks it
+                return await run(fill_resident, region_id, region if send_mesh else None, *args, mode="surface", **kwargs)
+            except RegionNotResident:
+                return await run(fill_resident, region_id, region, *args, mode="surface", **kwargs)
+
+        settings = {
+            "stone_size": req.stone_size,
+            "grid_type": req.grid_type,
+            "spacing": req.spacing,
+            "padding": req.padding,
+            "stone_shape": req.stone_shape,
+            "placement_mode": req.placement_mode,
+        }
+        if wants_stream(request):
+            lattice = fill_lattice(region.bounds, req.stone_size, req.spacing, req.padding, req.grid_type)
+            # The first slice is filled before the response starts, so its errors still get a status
+            head = await fill(offload, fresh, span=(0, STREAM_SLICE_SIZE))
+        else:
+            result = await fill(offload, fresh)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if wants_stream(request):
+        async def slices():
+            yield head
+            placed = head.count
+            for start in range(STREAM_SLICE_SIZE, lattice.size, STREAM_SLICE_SIZE):
+                part = await fill(offload_streamed, False, span=(start, start + STREAM_SLICE_SIZE), first=placed)
+                placed += part.count
+                yield part
+
+        # Totals are only known at the end, in the "done" record
+        report = {"region_id": region_id, **settings}
+        return stream_response(fill_records(report, shape_names(req.stone_shape), slices()))
+    report = {"region_id": region_id, "total_diamonds": result.count, **settings, "shapes_used": result.preview(10)}
+    # Binary uploads are not echoed back as JSON
+    modified_mesh = req.region_mesh if isinstance(req.region_mesh, list) else None
+    return DiamondFillResponse(modified_mesh=modified_mesh, diamond_report=report, placements=result.to_dict())
 
 # Register router with main app
 app.include_router(router)
@@ -659,68 +1079,157 @@ paypalrestsdk.configure({
 # --- Production Report & Manufacturability Check Endpoint ---
 class ProductionReportRequest(BaseModel):
     model_id: int
-    options: Optional[dict] = None
+    options: Optional[dict] = None  # stones: [{"position", "size"}], edge: outline points, min_*_clearance, min_wall_thickness
+    # Model version to check; defaults to the model's last known geometry (no wall check without one)
+    geometry_id: Optional[str] = None
 
 class ProductionReportOut(BaseModel):
     model_id: int
     manufacturable: bool
     issues: list = Field(default_factory=list)
+    collisions: list = Field(default_factory=list)  # [{"stones": [i, j], "clearance", "deficit"}]
+    edge_violations: list = Field(default_factory=list)  # [{"stone": i, "clearance", "deficit"}]
+    wall_thickness: Optional[dict] = None  # min, percentiles, thin_regions (see manufacturability.ThicknessMap)
     report_url: Optional[str] = None
     status: str
 
-@app.post("/cad/production-report", response_model=ProductionReportOut)
-async def production_report(data: ProductionReportRequest):
-    # Realistic manufacturability check (demo logic)
-    # In production, load mesh and stones from DB or file
+async def measure_walls(model_id: int, geometry_id: str, threshold: float, samples: int = THICKNESS_SAMPLES,
+                        include_map: bool = False) -> dict:
+    """Wall thickness of a stored mesh, measured on the CAD pool."""
+    if not threshold > 0 or not 0 < samples <= 10 * THICKNESS_SAMPLES:
+        raise HTTPException(status_code=400, detail=f"threshold must be positive and samples in 1..{10 * THICKNESS_SAMPLES}")
+    try:
+        vertices, faces = await asyncio.to_thread(geometry_store.mesh, geometry_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        walls = await offload(check_wall_thickness, vertices, faces, threshold, samples, THICKNESS_MAX_DISTANCE, include_map)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    model_geometry[model_id] = geometry_id
+    return walls
+
+@router.get("/cad/wall-thickness/{model_id}")
+async def wall_thickness_map(model_id: int, geometry_id: Optional[str] = None, threshold: float = MIN_WALL_THICKNESS,
+                             samples: int = THICKNESS_SAMPLES, map: bool = False):
+    """Thickness percentiles and thin regions of the model; ``?map=true`` adds the samples."""
+    return await measure_walls(model_id, model_version(model_id, geometry_id), threshold, samples, map)
+
+async def production_checks(model_id: int, geometry_id: Optional[str], options: dict) -> dict:
+    """Stone clearance and wall checks of one model version; everything but the model id."""
+    # Prongs are not analysed yet
     mesh = {
-        "wall_thickness": 1.1,  # mm
         "prong_strength": 0.7   # arbitrary units
     }
-    stones = data.options.get("stones", []) if data.options else []
+    stones = options.get("stones", [])
+    try:
+        min_stone_clearance = float(options.get("min_stone_clearance", MIN_STONE_CLEARANCE))
+        min_edge_clearance = float(options.get("min_edge_clearance", MIN_EDGE_CLEARANCE))
+        min_wall = float(options.get("min_wall_thickness", MIN_WALL_THICKNESS))
+        clearance = await offload(check_stone_clearance, stones, options.get("edge"), min_stone_clearance, min_edge_clearance)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    walls = None
+    if geometry_id is not None:
+        walls = await measure_walls(model_id, geometry_id, min_wall)
     issues = []
-    if mesh["wall_thickness"] < 1.0:
-        issues.append("Minimum wall thickness not met")
+    if walls is not None and walls["thin_regions"]:
+        issues.append(
+            f"Minimum wall thickness not met: {len(walls['thin_regions'])} regions below {min_wall} mm "
+            f"(thinnest {walls['min']} mm)"
+        )
     if mesh["prong_strength"] < 0.5:
         issues.append("Prong strength below recommended")
-    if len(stones) > 0 and any(s.get("overlap", False) for s in stones):
+    if clearance["collisions"]:
+        issues.append(f"Stone seat overlap detected: {len(clearance['collisions'])} stone pairs below {min_stone_clearance} mm clearance")
+    elif any(s.get("overlap", False) for s in stones):
         issues.append("Stone seat overlap detected")
-    manufacturable = len(issues) == 0
-    report_url = f"/static/reports/{data.model_id}_production.pdf"
+    if clearance["edge_violations"]:
+        issues.append(f"{len(clearance['edge_violations'])} stones closer than {min_edge_clearance} mm to the edge")
+    return {
+        "manufacturable": len(issues) == 0,
+        "issues": issues,
+        "collisions": clearance["collisions"],
+        "edge_violations": clearance["edge_violations"],
+        "wall_thickness": walls,
+    }
+
+# Finished reports by (model version, options); see report_batch
+report_memo = ReportMemo()
+
+async def production_report_for(data: ProductionReportRequest) -> Tuple[ProductionReportOut, bool]:
+    """Report of one model and whether it came from the memo."""
+    options = data.options or {}
+    geometry_id = data.geometry_id or model_geometry.get(data.model_id)
+    checks, cached = await report_memo.get(
+        report_key(geometry_id, options), lambda: production_checks(data.model_id, geometry_id, options)
+    )
+    if geometry_id is not None:
+        model_geometry[data.model_id] = geometry_id
     return ProductionReportOut(
         model_id=data.model_id,
-        manufacturable=manufacturable,
-        issues=issues,
-        report_url=report_url,
+        **checks,
+        report_url=f"/static/reports/{data.model_id}_production.pdf",
         status="report generated"
-    )
-from pydantic import Field
-
-# --- Production Report & Manufacturability Check Endpoint ---
-class ProductionReportRequest(BaseModel):
-    model_id: int
-    options: Optional[dict] = None
-
-class ProductionReportOut(BaseModel):
-    model_id: int
-    manufacturable: bool
-    issues: list = Field(default_factory=list)
-    report_url: Optional[str] = None
-    status: str
+    ), cached
 
-@app.post("/cad/production-report", response_model=ProductionReportOut)
+@router.post("/cad/production-report", response_model=ProductionReportOut)
 async def production_report(data: ProductionReportRequest):
-    # Stub: Analyze manufacturability and generate report
-    # Example: geometry_kernel.check_manufacturability(model_id)
-    issues = ["Minimum wall thickness not met", "Stone seat overlap detected"]
-    manufacturable = False if issues else True
-    report_url = f"/static/reports/{data.model_id}_production.pdf"
-    return ProductionReportOut(
-        model_id=data.model_id,
-        manufacturable=manufacturable,
-        issues=issues,
-        report_url=report_url,
-        status="report generated (stub)"
-    )
+    return (await production_report_for(data))[0]
+
+class BatchProductionReportRequest(BaseModel):
+    model_ids: List[int] = Field(default_factory=list)  # checked at their last known geometry with ``options``
+    items: List[ProductionReportRequest] = Field(default_factory=list)  # per-model geometry_id / options
+    options: Optional[dict] = None
+    concurrency: Optional[int] = None  # checks in flight, at most REPORT_BATCH_CONCURRENCY
+
+async def production_report_records(requests: List[ProductionReportRequest], concurrency: int):
+    """NDJSON records: header, one ``report`` or ``error`` per model as it finishes, ``done``."""
+    yield {"type": "header", "count": len(requests), "concurrency": concurrency}
+    cached = failed = 0
+    async for index, item, result in run_batch(requests, production_report_for, concurrency):
+        if isinstance(result, Exception):
+            failed += 1
+            detail = result.detail if isinstance(result, HTTPException) else str(result)
+            status_code = result.status_code if isinstance(result, HTTPException) else 500
+            yield {"type": "error", "index": index, "model_id": item.model_id, "status_code": status_code, "detail": detail}
+            continue
+        report, from_memo = result
+        cached += from_memo
+        yield {"type": "report", "index": index, "cached": from_memo, **report.model_dump()}
+    yield {"type": "done", "count": len(requests), "cached": cached, "failed": failed}
+
+@router.post("/cad/production-report/batch")
+async def batch_production_report(data: BatchProductionReportRequest, request: Request):
+    """Pre-flight a collection; streams NDJSON per model as checks finish (or one JSON body).
+
+    Unchanged model versions with the same options are answered from the
+    report memo.
+    """
+    requests = [ProductionReportRequest(model_id=m, options=data.options) for m in data.model_ids] + data.items
+    if not 0 < len(requests) <= MAX_REPORT_BATCH:
+        raise HTTPException(status_code=400, detail=f"A batch holds 1..{MAX_REPORT_BATCH} models")
+    concurrency = min(data.concurrency or REPORT_BATCH_CONCURRENCY, REPORT_BATCH_CONCURRENCY)
+    if concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency must be at least 1")
+    records = production_report_records(requests, concurrency)
+    if wants_stream(request):
+        return stream_response(records)
+    reports, errors, done = [], [], None
+    async for record in records:
+        if record["type"] == "report":
+            reports.append(record)
+        elif record["type"] == "error":
+            errors.append(record)
+        elif record["type"] == "done":
+            done = record
+    key = lambda record: record["index"]
+    return {"reports": sorted(reports, key=key), "errors": sorted(errors, key=key),
+            "count": done["count"], "cached": done["cached"], "failed": done["failed"]}
+
+@router.get("/cad/production-report/memo")
+async def production_report_memo():
+    return report_memo.stats()
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy import Column, Integer, String, Float, Text, select
@@ -750,20 +1259,34 @@ paypalrestsdk.configure({
 
 # --- Sweep Along Path to STL API ---
 class SweepRequest(BaseModel):
-    path: list  # List of path points or curve data
-    profile: dict  # Profile shape data
-    params: Optional[dict] = None
+    path: list  # Path points [[x, y, z], ...]
+    profile: dict  # {"type": "circle", "radius": r} | ellipse (rx, ry) | rect (width, height) | {"points": [[u, v], ...]}
+    params: Optional[dict] = None  # closed (loop the path, e.g. chain links), caps (close open ends, default true)
 
 class SweepOut(BaseModel):
     stl_url: str
     status: str
-
-@app.post("/geometry/sweep", response_model=SweepOut)
-async def sweep_along_path(data: SweepRequest):
-    # Stub: Integrate with geometry kernel to sweep profile along path and export STL
-    # Example: geometry_kernel.sweep(path, profile) → STL
-    stl_url = "/static/exports/sweep_result.stl"
-    return SweepOut(stl_url=stl_url, status="sweep generated (stub)")
+    triangles: Optional[int] = None
+    bytes: Optional[int] = None
+
+@router.post("/geometry/sweep", response_model=SweepOut,
+             openapi_extra=mesh_openapi(SweepRequest, ("path", "profile")))
+async def sweep_along_path(data: SweepRequest = Depends(mesh_body(SweepRequest, ("path", "profile")))):
+    params = data.params or {}
+    # One-off files, removed after CAD_SWEEP_RETENTION_HOURS by housekeeping
+    out_path, stl_url = static_path("sweeps", ".stl")
+    try:
+        result = await offload(
+            sweep_to_stl, data.path, data.profile, str(out_path),
+            closed=bool(params.get("closed", False)), caps=bool(params.get("caps", True))
+        )
+    except (ValueError, TypeError) as e:
+        out_path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        out_path.unlink(missing_ok=True)
+        raise
+    return SweepOut(stl_url=stl_url, status="sweep generated", **result)
 import os
 import uuid
 from datetime import datetime
@@ -808,29 +1331,89 @@ class DiamondSeatRequest(BaseModel):
     jewelry_type: str
     cad_model_id: int
     pattern: StonePattern
-    stones: list  # List of stone positions and sizes
-    params: Optional[dict] = None
+    stones: list = Field(default_factory=list)  # [{"position": [x, y, z], "size": d, "normal"?: [nx, ny, nz], "shape"?: str}, ...]
+    params: Optional[dict] = None  # shape (default cut), size (default for columnar input), include_mesh (merged cutter mesh)
+    # Columnar alternative to ``stones`` (also how binary uploads arrive)
+    positions: Optional[List[List[float]]] = None
+    sizes: Optional[List[float]] = None
+    normals: Optional[List[List[float]]] = None
 
 class DiamondSeatOut(BaseModel):
-    seat_geometries: list  # List of seat geometry data (stub)
+    seat_geometries: list  # Per stone: position, size, shape, template name and 4x4 placement transform
+    templates: Optional[dict] = None  # Cutter mesh per template name, shared by every seat using it
+    mesh: Optional[dict] = None  # Merged cutter mesh for all seats, when params.include_mesh is set
+    template_cache: Optional[dict] = None
     status: str
 
-@app.post("/cad/diamond-seats", response_model=DiamondSeatOut)
-async def generate_diamond_seats(data: DiamondSeatRequest):
-    # Integrate with geometry engine to cut seats/holes for each stone
-    seat_geometries = []
-    for stone in data.stones:
-        # Placeholder for geometry kernel logic
-        seat_geometry = {
-            "position": stone.get("position"),
-            "size": stone.get("size"),
-            "type": data.pattern,
-            "seat": f"Seat geometry for {data.pattern} at {stone.get('position')} (geometry kernel stub)"
-        }
-        # Example: seat_geometry["mesh"] = geometry_kernel.cut_seat(...)
-        seat_geometries.append(seat_geometry)
-    # TODO: Integrate with OpenCASCADE/CGAL or other kernel for real seat cutting
-    return DiamondSeatOut(seat_geometries=seat_geometries, status="generated (geometry stub)")
+@router.post("/cad/diamond-seats", response_model=DiamondSeatOut,
+             openapi_extra=mesh_openapi(DiamondSeatRequest, ("positions", "sizes", "normals")))
+async def generate_diamond_seats(request: Request, data: DiamondSeatRequest = Depends(mesh_body(DiamondSeatRequest, ("positions", "sizes", "normals")))):
+    params = data.params or {}
+    pattern = data.pattern.value
+    default_shape = params.get("shape", "round")
+    stones = data.stones
+    try:
+        if data.positions is not None:
+            positions = np.asarray(data.positions, dtype=np.float64).reshape(-1, 3)
+            sizes = np.broadcast_to(np.asarray(data.sizes if data.sizes is not None else params.get("size"), dtype=np.float64), len(positions))
+            normals = np.tile([0.0, 0.0, 1.0], (len(positions), 1)) if data.normals is None else np.asarray(data.normals, dtype=np.float64).reshape(-1, 3)
+            if len(normals) != len(positions):
+                raise ValueError("normals must have one row per position")
+            shapes = [default_shape] * len(positions)
+            stones = [{"position": p, "size": sz} for p, sz in zip(positions.tolist(), sizes.tolist())]
+        else:
+            positions, sizes, shapes, normals = stone_columns(stones, default_shape)
+        # Templates come from this process's cache, shared by every pool worker
+        keys, _ = template_keys(pattern, sizes, shapes)
+        meshes = await asyncio.to_thread(seat_templates, keys)
+        template_cache = template_cache_stats()
+        with_mesh = bool(params.get("include_mesh"))
+        if not wants_stream(request):
+            seats, templates = await offload(seat_job, pattern, positions, sizes, shapes, normals, meshes,
+                                             with_mesh=with_mesh)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid stones: {e}")
+
+    def seat_rows(seats, start):
+        names = [template_name(key) for key in seats.keys]
+        stop = start + len(seats.template_ids)
+        return [
+            {
+                "position": stone.get("position"),
+                "size": stone.get("size"),
+                "type": pattern,
+                "shape": shape,
+                "template": names[tid],
+                "transform": transform
+            }
+            for stone, shape, tid, transform in zip(stones[start:stop], shapes[start:stop],
+                                                     seats.template_ids.tolist(), seats.transforms.tolist())
+        ]
+
+    if wants_stream(request):
+        async def slices():
+            for start in range(0, len(stones), STREAM_SLICE_SIZE):
+                part = slice(start, start + STREAM_SLICE_SIZE)
+                part_keys, _ = template_keys(pattern, sizes[part], shapes[part])
+                seats, _ = await offload_streamed(seat_job, pattern, positions[part], sizes[part], shapes[part],
+                                                  normals[part], {key: meshes[key] for key in part_keys},
+                                                  with_mesh=with_mesh, with_templates=False)
+                yield seat_rows(seats, start), (seats.vertices, seats.faces) if with_mesh else None
+
+        templates = await asyncio.to_thread(templates_json, meshes)
+        header = {"templates": templates, "template_cache": template_cache, "status": "generated"}
+        return stream_response(seat_records(header, slices(), len(stones)))
+    seat_geometries = seat_rows(seats, 0)
+    mesh = None
+    if with_mesh:
+        mesh = {"vertices": seats.vertices.tolist(), "faces": seats.faces.tolist()}
+    return DiamondSeatOut(
+        seat_geometries=seat_geometries,
+        templates=templates,
+        mesh=mesh,
+        template_cache=template_cache,
+        status="generated"
+    )
 import os
 import uuid
 from datetime import datetime
@@ -870,62 +1453,6 @@ paypalrestsdk.configure({
     "client_secret": PAYPAL_CLIENT_SECRET
 })
 
-
-# --- Technical Drawing/Export Pipeline API ---
-class DrawingFormat(str, Enum):
-    stl = "stl"
-    obj = "obj"
-    step = "step"
-    pdf = "pdf"
-    dxf = "dxf"
-
-class DrawingRequest(BaseModel):
-    model_id: int
-    format: DrawingFormat
-    options: Optional[dict] = None
-
-class DrawingOut(BaseModel):
-    model_id: int
-    format: DrawingFormat
-    url: str
-    created_at: datetime
-
-
-@app.post("/drawing/export", response_model=DrawingOut)
-async def export_drawing(data: DrawingRequest):
-    # Stub: Integrate with geometry kernel/exporter
-    url = f"/static/exports/{data.model_id}.{data.format}"
-    return DrawingOut(
-        model_id=data.model_id,
-        format=data.format,
-        url=url,
-        created_at=datetime.utcnow()
-    )
-
-# --- 3MF Export Endpoint ---
-@app.post("/drawing/export-3mf/{model_id}")
-async def export_3mf(model_id: int):
-    # Stub: Integrate with geometry kernel for 3MF export
-    url = f"/static/exports/{model_id}.3mf"
-    return {"ok": True, "download_url": url, "status": "3MF export generated (stub)"}
-
-# --- SVG Import Endpoint ---
-@app.post("/drawing/import-svg")
-async def import_svg(svg_data: dict):
-    # Stub: Parse SVG and convert to geometry primitives
-    # Example: geometry_kernel.import_svg(svg_data)
-    return {"ok": True, "imported": True, "details": "SVG import processed (stub)", "svg_data": svg_data}
-
-@app.get("/drawing/blueprint/{model_id}", response_model=DrawingOut)
-async def get_blueprint(model_id: int, format: DrawingFormat = DrawingFormat.pdf):
-    # Stub: Return blueprint file URL
-    url = f"/static/blueprints/{model_id}.{format}"
-    return DrawingOut(
-        model_id=model_id,
-        format=format,
-        url=url,
-        created_at=datetime.utcnow()
-    )
 import paypalrestsdk
 from dotenv import load_dotenv
 import sentry_sdk
@@ -1037,11 +1564,15 @@ class DrawingFormat(str, Enum):
     step = "step"
     pdf = "pdf"
     dxf = "dxf"
+    glb = "glb"
+    three_mf = "3mf"
 
 class DrawingRequest(BaseModel):
     model_id: int
     format: DrawingFormat
     options: Optional[dict] = None
+    # Model version to export; defaults to the model's last known geometry
+    geometry_id: Optional[str] = None
 
 class DrawingOut(BaseModel):
     model_id: int
@@ -1050,41 +1581,95 @@ class DrawingOut(BaseModel):
     created_at: datetime
 
 
-@app.post("/drawing/export", response_model=DrawingOut)
+class ExportJobOut(BaseModel):
+    job_id: str
+    model_id: int
+    geometry_id: str
+    format: str
+    status: str
+    url: Optional[str] = None
+    error: Optional[str] = None
+    result: dict = {}
+    requests: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+
+@router.post("/drawing/export", response_model=ExportJobOut)
 async def export_drawing(data: DrawingRequest):
-    # Stub: Integrate with geometry kernel/exporter
-    url = f"/static/exports/{data.model_id}.{data.format}"
-    return DrawingOut(
-        model_id=data.model_id,
-        format=data.format,
-        url=url,
-        created_at=datetime.utcnow()
-    )
+    """Queue an export; poll ``/export/jobs/{job_id}`` until ``status`` is done."""
+    return await submit_export(data.model_id, data.geometry_id, data.format.value, data.options)
 
 # --- 3MF Export Endpoint ---
-@app.post("/drawing/export-3mf/{model_id}")
-async def export_3mf(model_id: int):
-    # Stub: Integrate with geometry kernel for 3MF export
-    url = f"/static/exports/{model_id}.3mf"
-    return {"ok": True, "download_url": url, "status": "3MF export generated (stub)"}
+@router.post("/drawing/export-3mf/{model_id}", response_model=ExportJobOut)
+async def export_3mf(model_id: int, geometry_id: Optional[str] = None):
+    return await submit_export(model_id, geometry_id, "3mf")
 
 # --- SVG Import Endpoint ---
-@app.post("/drawing/import-svg")
-async def import_svg(svg_data: dict):
-    # Stub: Parse SVG and convert to geometry primitives
-    # Example: geometry_kernel.import_svg(svg_data)
-    return {"ok": True, "imported": True, "details": "SVG import processed (stub)", "svg_data": svg_data}
-
-@app.get("/drawing/blueprint/{model_id}", response_model=DrawingOut)
-async def get_blueprint(model_id: int, format: DrawingFormat = DrawingFormat.pdf):
-    # Stub: Return blueprint file URL
-    url = f"/static/blueprints/{model_id}.{format}"
-    return DrawingOut(
-        model_id=model_id,
-        format=format,
-        url=url,
-        created_at=datetime.utcnow()
-    )
+@router.post("/drawing/import-svg")
+async def import_svg(request: Request, tolerance: float = DEFAULT_TOLERANCE):
+    """Flatten an SVG (the raw request body) into polylines, stored as one curve.
+
+    The body is parsed while it streams in, ``FEED_SIZE`` bytes per thread hop, and
+    may be at most ``MAX_SVG_SIZE`` bytes; ``tolerance`` is the chord error in mm.
+    """
+    too_large = HTTPException(status_code=413, detail=f"SVG uploads are limited to {MAX_SVG_SIZE} bytes")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_SVG_SIZE:
+        raise too_large
+    try:
+        importer = SVGImporter(tolerance)
+        received = 0
+        buffered = bytearray()
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > MAX_SVG_SIZE:
+                raise too_large
+            buffered += chunk
+            if len(buffered) >= FEED_SIZE:
+                await asyncio.to_thread(importer.feed, bytes(buffered))
+                buffered.clear()
+        if buffered:
+            await asyncio.to_thread(importer.feed, bytes(buffered))
+        artwork = await asyncio.to_thread(importer.close)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stored = await store_geometry("curve", {
+        "type": "polyline_set", "units": "mm",
+        "points": artwork.points, "offsets": artwork.offsets, "closed": artwork.closed,
+    })
+    return {**stored, **artwork.summary()}
+
+@router.get("/drawing/blueprint/{model_id}", response_model=ExportJobOut)
+async def get_blueprint(model_id: int, format: DrawingFormat = DrawingFormat.pdf, geometry_id: Optional[str] = None,
+                        title: Optional[str] = None, page: str = "A4"):
+    if page not in PAGE_SIZES:
+        raise HTTPException(status_code=400, detail=f"page must be one of {', '.join(PAGE_SIZES)}")
+    options = {"title": title or f"Model {model_id}", "number": str(model_id), "page": page}
+    return await submit_export(model_id, geometry_id, format.value, options, kind="blueprints")
+
+class BlueprintModel(BaseModel):
+    model_id: int
+    geometry_id: Optional[str] = None
+    title: Optional[str] = None
+
+class BlueprintBatchRequest(BaseModel):
+    models: List[BlueprintModel]
+    page: str = "A4"
+    drawn_by: Optional[str] = None
+
+@router.post("/drawing/blueprints", response_model=List[ExportJobOut])
+async def batch_blueprints(data: BlueprintBatchRequest):
+    """Queue PDF blueprints for a collection; they render in parallel on the CAD pool."""
+    if data.page not in PAGE_SIZES:
+        raise HTTPException(status_code=400, detail=f"page must be one of {', '.join(PAGE_SIZES)}")
+    jobs = []
+    for item in data.models:
+        options = {"title": item.title or f"Model {item.model_id}", "number": str(item.model_id), "page": data.page}
+        if data.drawn_by:
+            options["drawn_by"] = data.drawn_by
+        jobs.append(await submit_export(item.model_id, item.geometry_id, "pdf", options, kind="blueprints"))
+    return jobs
 import paypalrestsdk
 from dotenv import load_dotenv
 import sentry_sdk
@@ -1283,29 +1868,142 @@ async def list_stone_patterns(jewelry_type: str, cad_model_id: int, db: AsyncSes
     patterns = result.scalars().all()
     return patterns
 
+class BandPatternRequest(BaseModel):
+    jewelry_type: str = "ring"
+    cad_model_id: int
+    pattern: StonePattern  # eternity_full, eternity_half or channel
+    stone_sizes: List[float]  # Repeating size sequence, e.g. [2.0] or [2.0, 1.5]
+    finger_size: Optional[float] = None  # US ring size; used when no curve is given
+    curve: Optional[List[List[float]]] = None  # Girdle line of the band as [[x, y, z], ...]
+    closed: Optional[bool] = None  # Whether ``curve`` is a closed loop (default: closed)
+    band_thickness: float = DEFAULT_BAND_THICKNESS
+    coverage: Optional[float] = None  # Share of the band to set; defaults per pattern
+    min_gap: float = MIN_STONE_CLEARANCE
+    tolerance: float = BAND_GAP_TOLERANCE  # Extra spacing allowed on top of min_gap
+
+@router.post("/cad/stone-patterns/solve", response_model=StonePatternCreate)
+async def solve_stone_pattern(data: BandPatternRequest):
+    """Distribute eternity / channel stones by arc length.
+
+    Returns the pattern with the solved layout in ``params``; the stones in
+    ``params.stones`` can go straight to ``POST /cad/diamond-seats``.
+    """
+    try:
+        layout = solve_band(
+            data.pattern.value, data.stone_sizes, curve=data.curve, closed=data.closed,
+            finger_size=data.finger_size, band_thickness=data.band_thickness, coverage=data.coverage,
+            min_gap=data.min_gap, tolerance=data.tolerance
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    params = data.model_dump(exclude={"jewelry_type", "cad_model_id", "pattern", "curve"}, exclude_none=True)
+    params.update(
+        count=layout.count,
+        gap=round(layout.gap, 4),
+        min_chord_gap=None if layout.min_chord_gap is None else round(layout.min_chord_gap, 4),
+        curve_length=round(layout.curve_length, 4),
+        covered_length=round(layout.covered_length, 4),
+        within_tolerance=layout.within_tolerance,
+        stones=layout.stones(),
+    )
+    return StonePatternCreate(jewelry_type=data.jewelry_type, cad_model_id=data.cad_model_id, pattern=data.pattern, params=params)
+
 # --- Geometry Engine Integration Stubs ---
-@app.post("/geometry/curve")
+async def store_geometry(kind: str, data: dict) -> dict:
+    """Store a primitive under its content hash; resubmissions are deduplicated."""
+    try:
+        obj, created = await asyncio.to_thread(geometry_store.put, kind, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ok": True, f"{kind}_id": obj.id, "id": obj.id, "deduplicated": not created, "bytes": obj.nbytes}
+
+@router.post("/geometry/curve")
 async def create_curve(data: dict):
-    # Stub: Integrate with geometry kernel (e.g., OpenCASCADE)
-    return {"ok": True, "curve_id": "curve123", "data": data}
+    # data: {"type": "polyline" | "bspline" | ..., "points": [[x, y, z], ...], ...}
+    return await store_geometry("curve", data)
 
-@app.post("/geometry/surface")
+@router.post("/geometry/surface")
 async def create_surface(data: dict):
-    return {"ok": True, "surface_id": "surface123", "data": data}
+    return await store_geometry("surface", data)
 
-@app.post("/geometry/solid")
+@router.post("/geometry/solid")
 async def create_solid(data: dict):
-    return {"ok": True, "solid_id": "solid123", "data": data}
-
-@app.post("/geometry/boolean")
+    # data: {"vertices": [[x, y, z], ...], "faces": [[i, j, k], ...], ...}
+    return await store_geometry("solid", data)
+
+@router.get("/geometry/objects/{object_id}")
+async def get_geometry_object(object_id: str, arrays: bool = False):
+    """Metadata and array layout of a stored object; ``?arrays=true`` adds the data."""
+    obj = await asyncio.to_thread(geometry_store.get, object_id)
+    if obj is None:
+        raise HTTPException(status_code=404, detail="Geometry object not found")
+    body = obj.summary()
+    if arrays:
+        body["data"] = obj.to_dict()
+    return body
+
+@router.get("/geometry/store")
+async def geometry_store_status():
+    return geometry_store.stats()
+
+@router.post("/geometry/boolean")
 async def boolean_operation(data: dict):
-    # data: {op: "union"|"subtract"|"intersect", solids: [...]}
-    return {"ok": True, "result_id": "result123", "data": data}
+    """Evaluate a boolean over stored solids, reusing every unchanged intermediate.
+
+    data: {op: "union"|"subtract"|"intersect", solids: [ids]} for one
+    operation, or {nodes: {name: {op, inputs: [solid ids or node names]}},
+    root: name} for a whole chain such as (shank ∪ head) − seats.
+    """
+    try:
+        graph, root = parse_graph(data)
+        result_id, nodes = await boolean_evaluator.evaluate(graph, root)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    evaluated = sum(1 for n in nodes.values() if not n["cached"])
+    return {
+        "ok": True,
+        "result_id": result_id,
+        "nodes": nodes,
+        "evaluated": evaluated,
+        "reused": len(nodes) - evaluated,
+        "cache": boolean_evaluator.stats(),
+    }
 
-@app.get("/geometry/viewport/{model_id}")
-async def get_3d_viewport(model_id: int):
-    # Stub: Return data for 3D rendering
-    return {"ok": True, "model_id": model_id, "viewport_url": f"/static/viewport/{model_id}.glb"}
+@router.get("/geometry/viewport")
+async def viewport_cache_status():
+    return viewport_cache.stats()
+
+@router.get("/geometry/viewport/{model_id}")
+async def get_3d_viewport(model_id: int, geometry_id: Optional[str] = None, triangles: Optional[int] = None):
+    """GLB for a model's current geometry at the finest level within ``triangles``.
+
+    ``geometry_id`` (a stored solid or boolean result) sets the model's
+    current version; later requests may omit it. Without a budget the
+    coarsest level is returned for a fast first frame. ``levels`` lists every
+    level, coarsest first, for progressive refinement.
+    """
+    geometry_id = model_version(model_id, geometry_id)
+    if triangles is not None and triangles < 1:
+        raise HTTPException(status_code=400, detail="triangles must be positive")
+    directory = static_files.STATIC_DIR / "viewport"
+    try:
+        levels = await viewport_cache.levels(geometry_id, directory)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    model_geometry[model_id] = geometry_id
+    url = f"{static_files.STATIC_URL}/viewport"
+    listed = [{**{k: v for k, v in lv.items() if k != "file"}, "url": f"{url}/{lv['file']}"}
+              for lv in sorted(levels, key=lambda lv: -lv["level"])]
+    chosen = pick_level(levels, triangles)
+    return {
+        "ok": True,
+        "model_id": model_id,
+        "geometry_id": geometry_id,
+        "viewport_url": f"{url}/{chosen['file']}",
+        "level": chosen["level"],
+        "triangles": chosen["triangles"],
+        "levels": listed,
+    }
 import sentry_sdk
 # Sentry monitoring setup
 sentry_dsn = os.getenv("SENTRY_DSN", None)
@@ -1587,7 +2285,7 @@ async def list_assembly_components(db: AsyncSession = Depends(get_db)):
     comps = result.scalars().all()
     return comps
 
-@app.post("/cad/drawings", response_model=TechnicalDrawingOut)
+@router.post("/cad/drawings", response_model=TechnicalDrawingOut)
 async def create_technical_drawing(draw: TechnicalDrawingCreate, db: AsyncSession = Depends(get_db)):
     new_draw = TechnicalDrawing(**draw.dict())
     db.add(new_draw)
@@ -1595,13 +2293,15 @@ async def create_technical_drawing(draw: TechnicalDrawingCreate, db: AsyncSessio
     await db.refresh(new_draw)
     return new_draw
 
-@app.get("/cad/drawings", response_model=List[TechnicalDrawingOut])
-async def list_technical_drawings(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(TechnicalDrawing.__table__.select())
-    draws = result.scalars().all()
-    return draws
+@router.get("/cad/drawings", response_model=List[TechnicalDrawingOut])
+async def list_technical_drawings(cad_model_id: Optional[int] = None, db: AsyncSession = Depends(get_db)):
+    query = select(TechnicalDrawing)
+    if cad_model_id is not None:
+        query = query.where(TechnicalDrawing.cad_model_id == cad_model_id)
+    result = await db.execute(query)
+    return result.scalars().all()
 
-@app.post("/cad/bom", response_model=BOMEntryOut)
+@router.post("/cad/bom", response_model=BOMEntryOut)
 async def create_bom_entry(entry: BOMEntryCreate, db: AsyncSession = Depends(get_db)):
     new_entry = BOMEntry(**entry.dict())
     db.add(new_entry)
@@ -1609,24 +2309,108 @@ async def create_bom_entry(entry: BOMEntryCreate, db: AsyncSession = Depends(get
     await db.refresh(new_entry)
     return new_entry
 
-@app.get("/cad/bom", response_model=List[BOMEntryOut])
-async def list_bom_entries(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(BOMEntry.__table__.select())
-    entries = result.scalars().all()
-    return entries
+@router.get("/cad/bom", response_model=List[BOMEntryOut])
+async def list_bom_entries(cad_model_id: Optional[int] = None, db: AsyncSession = Depends(get_db)):
+    query = select(BOMEntry)
+    if cad_model_id is not None:
+        query = query.where(BOMEntry.cad_model_id == cad_model_id)
+    result = await db.execute(query)
+    return result.scalars().all()
 
-# Stubs for 3D preview, export, cloud rendering, collaboration
-@app.get("/cad/preview/{model_id}")
-async def get_3d_preview(model_id: int):
-    return {"ok": True, "preview_url": f"/static/previews/{model_id}.png"}
+# Most models per quote request
+MAX_QUOTE_ITEMS = int(os.getenv("CAD_MAX_QUOTE_ITEMS", "1000"))
 
-@app.post("/cad/export/{model_id}")
-async def export_cad_model(model_id: int, format: str = "STL"):
-    return {"ok": True, "download_url": f"/static/exports/{model_id}.{format.lower()}"}
+class BOMQuoteItem(BaseModel):
+    model_id: int
+    alloy: str
+    geometry_id: Optional[str] = None  # defaults to the model's last known geometry
+    pieces: int = 1
 
-@app.post("/cad/cloud-render/{model_id}")
-async def cloud_render(model_id: int):
-    return {"ok": True, "status": "queued", "render_url": f"/static/renders/{model_id}.png"}
+class BOMQuoteRequest(BaseModel):
+    items: List[BOMQuoteItem]
+    price_per_gram: dict = Field(default_factory=dict)  # by alloy
+    densities: Optional[dict] = None  # g/cm³ by alloy; extends or overrides mass_properties.ALLOYS
+    save: bool = False  # insert one BOMEntry per item (quantity in grams); needs a price for every alloy
+
+async def measure_mass(geometry_ids: List[str]):
+    try:
+        return await asyncio.to_thread(mass_cache.get_many, geometry_ids)
+    except MeshNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/cad/mass-properties/{model_id}")
+async def model_mass_properties(model_id: int, geometry_id: Optional[str] = None):
+    """Volume (mm³), area (mm²), centroid and weight in grams for every known alloy."""
+    geometry_id = model_version(model_id, geometry_id)
+    props = (await measure_mass([geometry_id]))[0]
+    model_geometry[model_id] = geometry_id
+    weights = {alloy: round(props.weight(value), 4) for alloy, value in ALLOYS.items()}
+    return {"model_id": model_id, "geometry_id": geometry_id, **props.to_dict(), "weights": weights}
+
+@router.post("/cad/bom/quote")
+async def quote_bom(data: BOMQuoteRequest, db: AsyncSession = Depends(get_db)):
+    """Metal weight and cost of many models at once; ``save`` fills their BOM rows."""
+    if not 0 < len(data.items) <= MAX_QUOTE_ITEMS:
+        raise HTTPException(status_code=400, detail=f"items must hold 1..{MAX_QUOTE_ITEMS} models")
+    if any(item.pieces < 1 for item in data.items):
+        raise HTTPException(status_code=400, detail="pieces must be at least 1")
+    try:
+        densities = [density(item.alloy, data.densities) for item in data.items]
+        prices = {alloy: float(price) for alloy, price in data.price_per_gram.items()}
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    unpriced = sorted({item.alloy for item in data.items} - set(prices))
+    if data.save and unpriced:
+        raise HTTPException(status_code=400, detail=f"price_per_gram missing for {', '.join(unpriced)}")
+    geometry_ids = [model_version(item.model_id, item.geometry_id) for item in data.items]
+    measured = await measure_mass(geometry_ids)
+
+    quotes, entries = [], []
+    for item, geometry_id, props, value in zip(data.items, geometry_ids, measured, densities):
+        grams = props.weight(value) * item.pieces
+        price = prices.get(item.alloy)
+        quotes.append({
+            "model_id": item.model_id, "geometry_id": geometry_id, "alloy": item.alloy, "pieces": item.pieces,
+            "density": value, **props.to_dict(), "weight": round(grams, 4),
+            "price": None if price is None else round(grams * price, 2),
+        })
+        if data.save:
+            entries.append(BOMEntry(cad_model_id=item.model_id, material=item.alloy, quantity=quotes[-1]["weight"],
+                                    price=quotes[-1]["price"]))
+    if entries:
+        db.add_all(entries)
+        await db.commit()
+        for quote, entry in zip(quotes, entries):
+            quote["bom_entry_id"] = entry.id
+    for item, geometry_id in zip(data.items, geometry_ids):
+        model_geometry[item.model_id] = geometry_id
+    total = sum(q["price"] for q in quotes) if not unpriced else None
+    return {"items": quotes, "total_weight": round(sum(q["weight"] for q in quotes), 4),
+            "total_price": None if total is None else round(total, 2)}
+
+# Stubs for collaboration
+@router.get("/cad/preview/{model_id}")
+async def get_3d_preview(model_id: int, geometry_id: Optional[str] = None, size: int = THUMBNAIL_SIZE, view: str = "iso"):
+    """The model's thumbnail URL once rendered; otherwise queues it and reports its status."""
+    geometry_id = model_version(model_id, geometry_id)
+    # Checked before queueing, so unknown ids never take a queue slot
+    if not await asyncio.to_thread(geometry_store.exists, geometry_id):
+        raise HTTPException(status_code=404, detail="Geometry object not found")
+    preview = request_thumbnail(model_id, geometry_id, size, view)
+    if preview["status"] == "deferred":
+        raise HTTPException(status_code=503, detail="Thumbnail queue is full", headers={"Retry-After": "5"})
+    model_geometry[model_id] = geometry_id
+    return {"ok": True, **preview}
+
+@router.post("/cad/export/{model_id}", response_model=ExportJobOut)
+async def export_cad_model(model_id: int, format: str = "STL", geometry_id: Optional[str] = None):
+    return await submit_export(model_id, geometry_id, format.lower())
+
+@router.post("/cad/cloud-render/{model_id}", response_model=CloudRenderJobOut)
+async def cloud_render(model_id: int, quality: str = "high", geometry_id: Optional[str] = None):
+    return await submit_render_job_to_provider(CloudProvider.local, model_id, geometry_id, quality, {})
 
 @app.post("/cad/collaborate/{model_id}")
 async def collaborate(model_id: int, user: str):
@@ -1686,13 +2470,44 @@ class Token(BaseModel):
 
 from contextlib import asynccontextmanager
 
+# Seconds between sweeps of expired upload sessions and other temporary files
+CAD_HOUSEKEEPING_INTERVAL = float(os.getenv("CAD_HOUSEKEEPING_INTERVAL", "3600"))
+# How long /geometry/sweep STLs stay downloadable
+CAD_SWEEP_RETENTION = float(os.getenv("CAD_SWEEP_RETENTION_HOURS", "24")) * 3600
+
+async def housekeeping():
+    while True:
+        try:
+            removed = await asyncio.to_thread(project_store.expire)
+            if any(removed.values()):
+                logger.info(f"Expired project uploads: {removed}")
+            removed = await asyncio.to_thread(static_files.expire, "sweeps", CAD_SWEEP_RETENTION)
+            if removed:
+                logger.info(f"Removed {removed} expired sweep STLs")
+        except Exception:
+            logger.exception("Housekeeping failed")
+        await asyncio.sleep(CAD_HOUSEKEEPING_INTERVAL)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    static_files.STATIC_DIR.mkdir(parents=True, exist_ok=True)
+    cad_pool.start()
+    render_pool.start()
+    export_queue.start()
+    render_scheduler.start()
+    thumbnail_queue.start()
+    cleanup = asyncio.create_task(housekeeping())
     yield
-    # Shutdown logic (if needed)
+    # Shutdown logic
+    cleanup.cancel()
+    await export_queue.shutdown()
+    await render_scheduler.shutdown()
+    await thumbnail_queue.shutdown()
+    cad_pool.shutdown()
+    render_pool.shutdown()
 
 # --- FastAPI app initialization ---
 app = FastAPI(lifespan=lifespan)
@@ -2100,3 +2915,9 @@ async def create_stripe_invoice(data: InvoiceRequest):
         return {"ok": True, "invoice": invoice}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+# Register the CAD router with the final app instance (the app is re-created above)
+app.include_router(router)
+# Generated exports, blueprints and renders
+# The directory is created in lifespan, not at import time
+app.mount(static_files.STATIC_URL, StaticFiles(directory=static_files.STATIC_DIR, check_dir=False), name="static")
@@ -0,0 +1,198 @@
+"""Manufacturability checks behind ``/cad/production-report``.
+
+Wall thickness is measured by ray casting. Points are sampled over the
+surface, area-weighted. From each point a ray goes inward against the face
+normal; the distance to the first wall it meets is the local thickness. The
+rays run through a BVH of the model in vectorized batches. Thin samples
+(under the casting minimum) that lie near each other are grouped into
+regions, so the report can point at places rather than list points.
+"""
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from .spatial import TriangleBVH, close_pairs, connected_components, segment_distances
+
+# Minimum metal left between neighbouring seats and between a seat and the
+# piece edge, in mm. Both can be overridden per request through ``options``.
+MIN_STONE_CLEARANCE = 0.1
+MIN_EDGE_CLEARANCE = 0.2
+# Thinnest wall that still casts reliably, in mm (``options.min_wall_thickness``)
+MIN_WALL_THICKNESS = 1.0
+THICKNESS_SAMPLES = int(os.getenv("CAD_THICKNESS_SAMPLES", "20000"))
+# Walls thicker than this are reported as "at least this thick"; keeps rays short
+THICKNESS_MAX_DISTANCE = 8.0
+THICKNESS_PERCENTILES = (1, 5, 50)
+MAX_THIN_REGIONS = 50
+
+
+def stone_arrays(stones: list):
+    """Split ``[{"position": [x, y, z], "size": d}, ...]`` into position/radius arrays.
+
+    Stones without a position are skipped; ``index`` maps rows back to the
+    caller's list so reported pairs use the client's numbering.
+    """
+    if not isinstance(stones, list) or not all(isinstance(s, dict) for s in stones):
+        raise ValueError("stones must be a list of {position, size} objects")
+    index = [i for i, s in enumerate(stones) if s.get("position") is not None]
+    if not index:
+        return np.empty((0, 3)), np.empty(0), np.empty(0, dtype=np.int64)
+    positions = np.array([stones[i]["position"] for i in index], dtype=np.float64)
+    if positions.ndim != 2 or positions.shape[1] not in (2, 3):
+        raise ValueError("stone positions must be [x, y] or [x, y, z]")
+    radii = np.array([float(stones[i].get("size") or 0.0) / 2.0 for i in index])
+    if not (np.isfinite(positions).all() and np.isfinite(radii).all()) or (radii < 0).any():
+        raise ValueError("stone positions and sizes must be finite, sizes not negative")
+    return positions, radii, np.array(index, dtype=np.int64)
+
+
+def edge_outline(edge) -> np.ndarray:
+    """``edge`` as an (N, 2) or (N, 3) array of finite points."""
+    outline = np.asarray(edge, dtype=np.float64)
+    if outline.ndim != 2 or outline.shape[1] not in (2, 3):
+        raise ValueError("edge must be a list of [x, y] or [x, y, z] points")
+    if not np.isfinite(outline).all():
+        raise ValueError("edge points must be finite")
+    return outline
+
+
+def check_stone_clearance(stones: list, edge: Optional[list] = None, min_stone_clearance: float = MIN_STONE_CLEARANCE,
+                          min_edge_clearance: float = MIN_EDGE_CLEARANCE) -> dict:
+    """Stone-to-stone and stone-to-edge clearance check.
+
+    ``edge`` is an optional closed outline of the setting area (a list of
+    points). Returns the offending stone pairs and edge stones, each with the
+    measured clearance and the deficit against the required minimum, worst
+    first. Malformed stones or edges raise ``ValueError``.
+    """
+    positions, radii, index = stone_arrays(stones)
+    i, j, gap = close_pairs(positions, radii, min_stone_clearance)
+    order = np.argsort(gap, kind="stable")
+    collisions = [
+        {"stones": [int(a), int(b)], "clearance": round(float(g), 4), "deficit": round(float(min_stone_clearance - g), 4)}
+        for a, b, g in zip(index[i[order]], index[j[order]], gap[order])
+    ]
+
+    edge_violations = []
+    outline = edge_outline(edge) if edge is not None and len(edge) else None
+    if outline is not None and len(outline) > 1 and len(positions):
+        dim = min(outline.shape[1], positions.shape[1])
+        seg_a = outline[:, :dim]
+        seg_b = np.roll(seg_a, -1, axis=0)
+        reach = radii.max() + min_edge_clearance
+        dist, _ = segment_distances(positions[:, :dim], seg_a, seg_b, reach)
+        edge_gap = dist - radii
+        bad = np.flatnonzero(edge_gap < min_edge_clearance)
+        bad = bad[np.argsort(edge_gap[bad], kind="stable")]
+        edge_violations = [
+            {"stone": int(index[k]), "clearance": round(float(edge_gap[k]), 4), "deficit": round(float(min_edge_clearance - edge_gap[k]), 4)}
+            for k in bad
+        ]
+    return {"collisions": collisions, "edge_violations": edge_violations}
+
+
+@dataclass
+class ThicknessMap:
+    points: np.ndarray  # (N, 3) surface samples
+    faces: np.ndarray  # (N,) triangle each sample lies on
+    thickness: np.ndarray  # (N,) mm; inf where no opposite wall within max_distance
+    area: float  # total surface area, mm^2
+    max_distance: float
+
+    def summary(self, threshold: float = MIN_WALL_THICKNESS) -> dict:
+        """Minimum and percentiles of the thickness, plus regions thinner than ``threshold``."""
+        measured = self.thickness[np.isfinite(self.thickness)]
+        # Unmeasured samples are at least max_distance thick
+        capped = np.minimum(self.thickness, self.max_distance)
+        thin = np.flatnonzero(self.thickness < threshold)
+        return {
+            "samples": int(len(self.thickness)),
+            "measured": int(len(measured)),
+            "min": round(float(measured.min()), 4) if len(measured) else None,
+            "percentiles": {f"p{p}": round(float(np.percentile(capped, p)), 4) for p in THICKNESS_PERCENTILES}
+            if len(capped) else {},
+            "threshold": threshold,
+            "thin_fraction": round(len(thin) / max(len(self.thickness), 1), 4),
+            "thin_regions": self.thin_regions(thin, threshold),
+        }
+
+    def thin_regions(self, thin: np.ndarray, threshold: float) -> list:
+        """Thin samples grouped into regions, worst first.
+
+        Samples link up when about a sample spacing apart along the surface,
+        or when closer than ``threshold`` (the two faces of one thin wall).
+        """
+        if not len(thin):
+            return []
+        link = max(2.0 * np.sqrt(self.area / max(len(self.thickness), 1)), threshold)
+        points = self.points[thin]
+        i, j, _ = close_pairs(points, np.zeros(len(thin)), link)
+        labels = connected_components(len(thin), i, j)
+        count = np.bincount(labels)
+        worst = np.full(len(count), np.inf)
+        np.minimum.at(worst, labels, self.thickness[thin])
+        lo = np.full((len(count), 3), np.inf)
+        hi = np.full((len(count), 3), -np.inf)
+        np.minimum.at(lo, labels, points)
+        np.maximum.at(hi, labels, points)
+        centroid = np.stack([np.bincount(labels, points[:, k]) for k in range(3)], axis=1) / count[:, None]
+        order = np.lexsort((-count, worst))[:MAX_THIN_REGIONS]
+        return [
+            {
+                "samples": int(count[r]),
+                "area": round(float(count[r] * self.area / len(self.thickness)), 4),
+                "min_thickness": round(float(worst[r]), 4),
+                "centroid": np.round(centroid[r], 4).tolist(),
+                "bounds": [np.round(lo[r], 4).tolist(), np.round(hi[r], 4).tolist()],
+            }
+            for r in order
+        ]
+
+
+def wall_thickness(vertices, faces, samples: int = THICKNESS_SAMPLES, max_distance: float = THICKNESS_MAX_DISTANCE,
+                   seed: int = 0) -> ThicknessMap:
+    """Sample the surface and measure the wall behind each sample with inward rays.
+
+    Expects a closed mesh with consistent winding; inward-facing meshes are
+    detected from the signed volume and handled. Sampling is seeded, so the
+    same mesh always gives the same map.
+    """
+    vertices, faces = np.asarray(vertices, dtype=np.float64), np.asarray(faces, dtype=np.int64)
+    a, b, c = (vertices[faces[:, k]] for k in range(3))
+    cross = np.cross(b - a, c - a)
+    doubled = np.linalg.norm(cross, axis=1)
+    if not len(faces) or doubled.sum() <= 0:
+        raise ValueError("mesh has no surface area")
+    normals = cross / np.where(doubled > 0, doubled, 1.0)[:, None]
+    # Outward winding has positive signed volume; otherwise "inward" flips
+    inward = -1.0 if np.einsum("ij,ij->", a, cross) >= 0 else 1.0
+
+    rng = np.random.default_rng(seed)
+    cumulative = np.cumsum(doubled)
+    tri = np.minimum(np.searchsorted(cumulative, rng.random(samples) * cumulative[-1], side="right"), len(faces) - 1)
+    r1, r2 = np.sqrt(rng.random(samples)), rng.random(samples)
+    points = (1 - r1)[:, None] * a[tri] + (r1 * (1 - r2))[:, None] * b[tri] + (r1 * r2)[:, None] * c[tri]
+
+    bvh = TriangleBVH(vertices, faces)
+    thickness, _ = bvh.intersect(points, inward * normals[tri], max_distance=max_distance, ignore=tri)
+    return ThicknessMap(points=points, faces=tri, thickness=thickness, area=float(doubled.sum() / 2), max_distance=max_distance)
+
+
+def check_wall_thickness(vertices, faces, threshold: float = MIN_WALL_THICKNESS, samples: int = THICKNESS_SAMPLES,
+                         max_distance: float = THICKNESS_MAX_DISTANCE, include_map: bool = False) -> dict:
+    """Thickness summary of a mesh (picklable entry point for the CAD pool).
+
+    ``include_map`` adds the samples themselves: points and thickness, capped
+    at ``max_distance`` where no opposite wall was found.
+    """
+    thickness = wall_thickness(vertices, faces, samples, max(max_distance, threshold))
+    summary = thickness.summary(threshold)
+    if include_map:
+        summary["map"] = {
+            "points": np.round(thickness.points, 4).tolist(),
+            "thickness": np.round(np.minimum(thickness.thickness, thickness.max_distance), 4).tolist(),
+            "max_distance": thickness.max_distance,
+        }
+    return summary
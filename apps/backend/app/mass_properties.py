@@ -0,0 +1,164 @@
+"""Mass properties of closed triangle meshes: volume, area, centroid and metal weight.
+
+Volume and centroid come from signed tetrahedra spanned by the origin and
+each triangle. The signed volumes sum to the enclosed volume, and their
+volume-weighted centres give the centroid. Both sums run as array
+expressions over all triangles. Many meshes are handled in one pass by
+concatenating their triangles and reducing per mesh with ``np.add.reduceat``.
+
+Weights are ``volume (mm³) × density (g/cm³) / 1000`` grams. The alloy table
+holds nominal densities; quotes may override them.
+
+Stored meshes are addressed by content hash, so their properties never
+change and are memoized by geometry id.
+"""
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MASS_MEMO_SIZE = int(os.getenv("CAD_MASS_MEMO_SIZE", "4096"))
+
+# Nominal casting densities in g/cm³
+ALLOYS: Dict[str, float] = {
+    "gold_24k": 19.32,
+    "gold_22k": 17.80,
+    "gold_18k_yellow": 15.58,
+    "gold_18k_white": 14.70,
+    "gold_18k_rose": 15.18,
+    "gold_14k_yellow": 13.07,
+    "gold_14k_white": 12.61,
+    "gold_14k_rose": 13.20,
+    "gold_10k_yellow": 11.57,
+    "silver_925": 10.36,
+    "silver_999": 10.49,
+    "platinum_950": 20.70,
+    "palladium_950": 12.00,
+    "titanium": 4.51,
+    "brass": 8.53,
+    "bronze": 8.80,
+    "wax": 0.95,
+}
+
+
+@dataclass
+class MassProperties:
+    volume: float  # mm³, always positive; inward-wound meshes are flipped
+    area: float  # mm²
+    centroid: Tuple[float, float, float]
+    bounds: Tuple[Tuple[float, float, float], Tuple[float, float, float]]
+    triangles: int
+
+    def weight(self, density: float) -> float:
+        """Grams at ``density`` g/cm³."""
+        return self.volume * density / 1000.0
+
+    def to_dict(self) -> dict:
+        return {
+            "volume": round(self.volume, 6), "area": round(self.area, 6),
+            "centroid": [round(c, 6) for c in self.centroid],
+            "bounds": [[round(c, 6) for c in corner] for corner in self.bounds],
+            "triangles": self.triangles,
+        }
+
+
+def density(alloy: str, overrides: Optional[Dict[str, float]] = None) -> float:
+    """Density of ``alloy`` in g/cm³; ``ValueError`` for unknown alloys."""
+    table = {**ALLOYS, **(overrides or {})}
+    if alloy not in table:
+        raise ValueError(f"Unknown alloy '{alloy}'; choose one of {sorted(table)} or give its density")
+    value = float(table[alloy])
+    if not value > 0:
+        raise ValueError(f"Density of '{alloy}' must be positive")
+    return value
+
+
+def mass_properties_many(meshes: Sequence[Tuple[np.ndarray, np.ndarray]]) -> List[MassProperties]:
+    """Properties of several meshes, computed in one vectorized pass."""
+    if not meshes:
+        return []
+    tris = []
+    for vertices, faces in meshes:
+        vertices, faces = np.asarray(vertices, dtype=np.float64), np.asarray(faces, dtype=np.int64)
+        if vertices.ndim != 2 or vertices.shape[1] != 3 or faces.ndim != 2 or faces.shape[1] != 3 or not len(faces):
+            raise ValueError("Each mesh needs (N, 3) vertices and (M, 3) triangle faces")
+        if faces.min() < 0 or faces.max() >= len(vertices):
+            raise ValueError("Face index out of range")
+        tris.append(vertices[faces])
+    counts = np.array([len(t) for t in tris])
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    tris = np.concatenate(tris)
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+
+    signed = np.einsum("ij,ij->i", a, np.cross(b, c)) / 6.0
+    area = np.linalg.norm(np.cross(b - a, c - a), axis=1) / 2.0
+    volume = np.add.reduceat(signed, starts)
+    moment = np.add.reduceat(signed[:, None] * (a + b + c), starts) / 4.0
+    areas = np.add.reduceat(area, starts)
+    lo = np.minimum.reduceat(tris.min(axis=1), starts)
+    hi = np.maximum.reduceat(tris.max(axis=1), starts)
+
+    results = []
+    for i, n in enumerate(counts):
+        if volume[i] == 0:
+            raise ValueError("Mesh encloses no volume; is it closed?")
+        results.append(MassProperties(
+            volume=float(abs(volume[i])), area=float(areas[i]),
+            centroid=tuple(float(x) for x in moment[i] / volume[i]),
+            bounds=(tuple(float(x) for x in lo[i]), tuple(float(x) for x in hi[i])),
+            triangles=int(n),
+        ))
+    return results
+
+
+def mass_properties(vertices, faces) -> MassProperties:
+    return mass_properties_many([(vertices, faces)])[0]
+
+
+class MeshNotFound(LookupError):
+    """``load`` rejected a geometry id: it is not a stored triangle mesh."""
+
+
+class MassPropertiesCache:
+    """Bounded LRU of :class:`MassProperties` by geometry id.
+
+    ``load(geometry_id)`` returns ``(vertices, faces)`` and raises ``ValueError``
+    for ids that are not stored meshes; ``get_many`` reports those as
+    :class:`MeshNotFound`. It loads and measures every missing mesh in one
+    batch, outside the lock, so it may run from several threads at once.
+    """
+
+    def __init__(self, load: Callable[[str], Tuple[np.ndarray, np.ndarray]], memo_size: int = MASS_MEMO_SIZE):
+        self.load = load
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, MassProperties]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, geometry_ids: Sequence[str]) -> List[MassProperties]:
+        unique = list(dict.fromkeys(geometry_ids))
+        with self._lock:
+            # Hits are copied out here; another thread may evict them meanwhile
+            found = {g: self._memo[g] for g in unique if g in self._memo}
+            for geometry_id in found:
+                self._memo.move_to_end(geometry_id)
+            missing = [g for g in unique if g not in found]
+            self.hits += len(geometry_ids) - len(missing)
+            self.misses += len(missing)
+        meshes = []
+        for geometry_id in missing:
+            try:
+                meshes.append(self.load(geometry_id))
+            except ValueError as e:
+                raise MeshNotFound(str(e)) from e
+        computed = dict(zip(missing, mass_properties_many(meshes)))
+        with self._lock:
+            self._memo.update(computed)
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+        found.update(computed)
+        return [found[g] for g in geometry_ids]
@@ -0,0 +1,128 @@
+"""Binary mesh ingest for the geometry endpoints.
+
+Large arrays can be sent as the raw request body instead of JSON lists, and
+are exposed as NumPy views over the received bytes (``np.frombuffer``), with
+no parsing and no copy. Two body encodings are supported:
+
+``application/octet-stream``
+    Raw little-endian arrays back to back. The ``X-Mesh-Layout`` header lists
+    them in order as ``name:dtype:shape`` entries separated by ``;``, e.g.
+    ``region_mesh:float32:500000,3;region_faces:uint32:998000,3``. One
+    dimension per shape may be ``-1``.
+
+``application/x-npy``
+    One or more ``.npy`` payloads back to back. ``X-Mesh-Layout`` only names
+    them (``region_mesh;region_faces``); dtype and shape come from each
+    ``.npy`` header.
+
+All non-array request fields travel as a small JSON object in the
+``X-Mesh-Params`` header.
+"""
+import ast
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+RAW_CONTENT_TYPE = "application/octet-stream"
+NPY_CONTENT_TYPE = "application/x-npy"
+BINARY_CONTENT_TYPES = (RAW_CONTENT_TYPE, NPY_CONTENT_TYPE)
+
+DTYPES = {
+    "float32": "<f4", "f4": "<f4",
+    "float64": "<f8", "f8": "<f8",
+    "uint32": "<u4", "u4": "<u4",
+    "int32": "<i4", "i4": "<i4",
+    "uint8": "u1", "u1": "u1",
+}
+
+
+def parse_layout(header: str, with_types: bool) -> List[Tuple[str, str, Tuple[int, ...]]]:
+    """Parse an ``X-Mesh-Layout`` header into ``(name, dtype, shape)`` entries."""
+    entries = []
+    for item in filter(None, (part.strip() for part in (header or "").split(";"))):
+        if not with_types:
+            entries.append((item, "", ()))
+            continue
+        try:
+            name, dtype, shape = item.split(":")
+            shape = tuple(int(d) for d in shape.split(",")) if shape else (-1,)
+        except ValueError:
+            raise ValueError(f"Bad X-Mesh-Layout entry '{item}', expected name:dtype:shape")
+        if dtype.lower() not in DTYPES:
+            raise ValueError(f"Unsupported dtype '{dtype}' in X-Mesh-Layout")
+        entries.append((name, DTYPES[dtype.lower()], shape))
+    if not entries:
+        raise ValueError("X-Mesh-Layout header is required for binary bodies")
+    return entries
+
+
+def _resolve_shape(shape: Tuple[int, ...], available: int) -> Tuple[Tuple[int, ...], int]:
+    known = int(np.prod([d for d in shape if d != -1])) if shape else 1
+    if shape.count(-1) > 1:
+        raise ValueError("Only one dimension per array may be -1")
+    if -1 in shape:
+        if known == 0 or available % known:
+            raise ValueError("Binary body size does not match X-Mesh-Layout")
+        shape = tuple(available // known if d == -1 else d for d in shape)
+    return shape, int(np.prod(shape))
+
+
+def read_raw_arrays(body, layout: List[Tuple[str, str, Tuple[int, ...]]]) -> Dict[str, np.ndarray]:
+    """Slice zero-copy views out of a raw little-endian body."""
+    arrays, offset = {}, 0
+    for n, (name, dtype, shape) in enumerate(layout):
+        itemsize = np.dtype(dtype).itemsize
+        if -1 in shape:
+            # Only the last array may size itself from what is left of the body
+            if n != len(layout) - 1:
+                raise ValueError("Only the last array in X-Mesh-Layout may use -1")
+            shape, count = _resolve_shape(shape, (len(body) - offset) // itemsize)
+        else:
+            shape, count = _resolve_shape(shape, 0)
+        if offset + count * itemsize > len(body):
+            raise ValueError(f"Binary body is too short for '{name}'")
+        arrays[name] = np.frombuffer(body, dtype=dtype, count=count, offset=offset).reshape(shape)
+        offset += count * itemsize
+    if offset != len(body):
+        raise ValueError("Binary body has trailing bytes not described by X-Mesh-Layout")
+    return arrays
+
+
+def read_npy_arrays(body, names: List[str]) -> Dict[str, np.ndarray]:
+    """Zero-copy views over back-to-back ``.npy`` payloads (format 1.0 / 2.0)."""
+    arrays, offset, view = {}, 0, memoryview(body)
+    for name in names:
+        if bytes(view[offset:offset + 6]) != b"\x93NUMPY":
+            raise ValueError(f"'{name}' is not a .npy payload")
+        major = view[offset + 6]
+        if major == 1:
+            header_len = int.from_bytes(view[offset + 8:offset + 10], "little")
+            start = offset + 10
+        else:
+            header_len = int.from_bytes(view[offset + 8:offset + 12], "little")
+            start = offset + 12
+        try:
+            header = ast.literal_eval(bytes(view[start:start + header_len]).decode("latin1"))
+            dtype = np.dtype(header["descr"])
+            shape = tuple(int(d) for d in header["shape"])
+        except (SyntaxError, ValueError, KeyError, TypeError):
+            raise ValueError(f"'{name}' has an unreadable .npy header")
+        if header.get("fortran_order"):
+            raise ValueError(f"'{name}' must be C-ordered")
+        if dtype.byteorder == ">" or dtype.fields is not None or dtype.hasobject:
+            raise ValueError(f"'{name}' must be a little-endian numeric array")
+        count = int(np.prod(shape))
+        data_start = start + header_len
+        if data_start + count * dtype.itemsize > len(body):
+            raise ValueError(f"Binary body is too short for '{name}'")
+        arrays[name] = np.frombuffer(body, dtype=dtype, count=count, offset=data_start).reshape(shape)
+        offset = data_start + count * dtype.itemsize
+    if offset != len(body):
+        raise ValueError("Binary body has trailing bytes after the .npy payloads in X-Mesh-Layout")
+    return arrays
+
+
+def decode_arrays(body, content_type: str, layout_header: str) -> Dict[str, np.ndarray]:
+    if content_type == NPY_CONTENT_TYPE:
+        return read_npy_arrays(body, [name for name, _, _ in parse_layout(layout_header, with_types=False)])
+    return read_raw_arrays(body, parse_layout(layout_header, with_types=True))
@@ -0,0 +1,313 @@
+"""Chunked, resumable project uploads into a content-addressed local store.
+
+A client splits its archive into chunks and hashes each one with BLAKE2b
+(``chunk_hash``). It opens an upload with the list of ``(hash, size)``. The
+server answers with the indices of the chunks it does not have yet. Only
+those are sent, one request each, and then the upload is completed into a
+version manifest. Chunks are stored once under their hash and shared by
+every version and project. Re-uploading a mostly unchanged archive therefore
+sends only the chunks that changed. Chunk boundaries are the client's
+choice: fixed ``CHUNK_SIZE`` blocks work, and content-defined boundaries
+also survive insertions.
+
+Chunk bodies are streamed to disk through a small buffer while being hashed.
+A chunk is only moved into the store once its hash and size match, so memory
+stays bounded however large the project is. Upload sessions are kept as JSON
+next to the chunks. After a dropped connection, or even a server restart,
+``missing`` says exactly what is left to send. Sessions idle for longer than
+``UPLOAD_TTL`` are dropped by ``expire``, with their partial and orphaned
+chunks.
+
+A version is claimed only when its upload completes, by hard-linking the
+finished manifest into place. Two uploads can therefore never publish the
+same version: an explicit one that already exists raises ``VersionExists``,
+and a default ``v<n>`` moves on to the next free number.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterable, Awaitable, BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+# Anchored to the backend directory, not the working directory of the process
+PROJECT_STORE_DIR = Path(os.getenv("CAD_PROJECT_STORE_DIR", Path(__file__).resolve().parent.parent / "project_store"))
+CHUNK_SIZE = 8 * 1024 * 1024  # suggested to clients
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+MAX_PROJECT_SIZE = int(os.getenv("CAD_MAX_PROJECT_MB", "8192")) * 1024 * 1024
+# Bytes held in memory per chunk being written / file being read
+IO_BUFFER = 1024 * 1024
+# Idle time after which an unfinished upload and its unreferenced chunks are removed
+UPLOAD_TTL = float(os.getenv("CAD_UPLOAD_TTL_HOURS", "24")) * 3600
+
+HASH_RE = re.compile(r"^[0-9a-f]{32}$")
+VERSION_RE = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+class VersionExists(ValueError):
+    """The project already has a version with this name."""
+
+
+def chunk_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+@dataclass
+class UploadSession:
+    id: str
+    project_id: int
+    version: Optional[str]  # None: the next free v<n>, chosen on completion
+    chunks: List[str]
+    sizes: List[int]
+    metadata: dict = field(default_factory=dict)
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+
+    @property
+    def size(self) -> int:
+        return sum(self.sizes)
+
+
+class ProjectStore:
+    def __init__(self, root: Path = PROJECT_STORE_DIR):
+        self.root = Path(root)
+        self.chunks_received = 0
+        self.chunks_deduplicated = 0
+        self.bytes_received = 0
+
+    def chunk_path(self, digest: str) -> Path:
+        return self.root / "chunks" / digest[:2] / digest
+
+    def _session_path(self, upload_id: str) -> Path:
+        return self.root / "uploads" / f"{upload_id}.json"
+
+    def manifest_path(self, project_id: int, version: str) -> Path:
+        return self.root / "projects" / str(int(project_id)) / f"{version}.json"
+
+    def begin(self, project_id: int, chunks: List[dict], version: Optional[str] = None,
+              metadata: Optional[dict] = None) -> UploadSession:
+        """Open an upload of ``chunks`` (``[{"hash", "size"}]``, in file order)."""
+        if not chunks:
+            raise ValueError("An upload needs at least one chunk")
+        try:
+            hashes = [str(c["hash"]).lower() for c in chunks]
+            sizes = [int(c["size"]) for c in chunks]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Each chunk needs a hash and an integer size")
+        if not all(HASH_RE.match(h) for h in hashes):
+            raise ValueError("Chunk hashes must be 32 hex digits (BLAKE2b, 16 bytes)")
+        if not all(0 < s <= MAX_CHUNK_SIZE for s in sizes):
+            raise ValueError(f"Chunk sizes must be 1..{MAX_CHUNK_SIZE} bytes")
+        if sum(sizes) > MAX_PROJECT_SIZE:
+            raise ValueError(f"Projects are limited to {MAX_PROJECT_SIZE} bytes")
+        if version is not None:
+            if not VERSION_RE.match(version):
+                raise ValueError("version may only use letters, digits, '.', '_' and '-' (at most 64)")
+            if self.manifest_path(project_id, version).exists():
+                raise VersionExists(f"project {int(project_id)} already has a version '{version}'")
+        session = UploadSession(uuid.uuid4().hex, int(project_id), version, hashes, sizes, metadata or {})
+        self._save(session)
+        return session
+
+    def _save(self, session: UploadSession) -> None:
+        path = self._session_path(session.id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(asdict(session)))
+        os.replace(tmp, path)
+
+    def session(self, upload_id: str) -> UploadSession:
+        """The open upload ``upload_id``; ``KeyError`` if unknown or completed."""
+        if not HASH_RE.match(upload_id):
+            raise KeyError(upload_id)
+        try:
+            return UploadSession(**json.loads(self._session_path(upload_id).read_text()))
+        except FileNotFoundError:
+            raise KeyError(upload_id)
+
+    def missing(self, session: UploadSession) -> List[int]:
+        """Indices of chunks not in the store yet (first index per distinct hash)."""
+        seen, missing = set(), []
+        for index, digest in enumerate(session.chunks):
+            if digest not in seen:
+                seen.add(digest)
+                if not self.chunk_path(digest).exists():
+                    missing.append(index)
+        return missing
+
+    def open_chunk(self, session: UploadSession, index: int) -> Tuple[str, int, Optional[Path]]:
+        """``(hash, size, temporary path)`` for receiving chunk ``index``; no path if already stored."""
+        if not 0 <= index < len(session.chunks):
+            raise ValueError(f"chunk index must be 0..{len(session.chunks) - 1}")
+        try:
+            # Activity keeps the session from expiring
+            os.utime(self._session_path(session.id))
+        except FileNotFoundError:
+            raise ValueError("upload expired or already completed; open a new one")
+        digest, size = session.chunks[index], session.sizes[index]
+        if self.chunk_path(digest).exists():
+            self.chunks_deduplicated += 1
+            return digest, size, None
+        path = self.chunk_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return digest, size, path.with_name(f"{digest}.{uuid.uuid4().hex}.part")
+
+    def commit_chunk(self, digest: str, size: int, tmp: Path, received: int, hasher) -> None:
+        """Move a received chunk into the store if it is complete and intact; else discard it."""
+        try:
+            if received != size:
+                raise ValueError(f"chunk has {received} bytes, expected {size}; resend it")
+            if hasher.hexdigest() != digest:
+                raise ValueError("chunk content does not match its hash; resend it")
+            os.replace(tmp, self.chunk_path(digest))
+        finally:
+            tmp.unlink(missing_ok=True)
+        self.chunks_received += 1
+        self.bytes_received += size
+
+    def complete(self, session: UploadSession) -> dict:
+        """Write the version manifest once every chunk is stored.
+
+        Raises ``VersionExists`` if the session's explicit version was
+        published in the meantime; the session stays open.
+        """
+        missing = self.missing(session)
+        if missing:
+            raise ValueError(f"{len(missing)} chunks are still missing")
+        root = hashlib.blake2b("".join(session.chunks).encode(), digest_size=16).hexdigest()
+        manifest = {
+            "project_id": session.project_id, "version": session.version, "size": session.size,
+            "hash": root, "chunks": session.chunks, "sizes": session.sizes, "metadata": session.metadata,
+            "uploaded_at": datetime.utcnow().isoformat(),
+        }
+        if session.version is not None:
+            if not self._publish(manifest):
+                raise VersionExists(f"project {session.project_id} already has a version '{session.version}'")
+        else:
+            number = len(self.versions(session.project_id)) + 1
+            while True:
+                manifest["version"] = f"v{number}"
+                if self._publish(manifest):
+                    break
+                number += 1
+        self._session_path(session.id).unlink(missing_ok=True)
+        return manifest
+
+    def _publish(self, manifest: dict) -> bool:
+        """Create the manifest file unless its version exists; atomic, the file is never partial."""
+        path = self.manifest_path(manifest["project_id"], manifest["version"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(manifest))
+        try:
+            os.link(tmp, path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            tmp.unlink()
+
+    def manifest(self, project_id: int, version: str) -> dict:
+        if not VERSION_RE.match(version):
+            raise KeyError(version)
+        try:
+            return json.loads(self.manifest_path(project_id, version).read_text())
+        except FileNotFoundError:
+            raise KeyError(version)
+
+    def versions(self, project_id: int) -> List[dict]:
+        """Manifests of a project (without chunk lists), oldest first."""
+        directory = self.root / "projects" / str(int(project_id))
+        found = []
+        for path in directory.glob("*.json") if directory.exists() else ():
+            manifest = json.loads(path.read_text())
+            found.append({k: v for k, v in manifest.items() if k not in ("chunks", "sizes")})
+        return sorted(found, key=lambda m: m["uploaded_at"])
+
+    def projects(self) -> List[int]:
+        directory = self.root / "projects"
+        return sorted(int(p.name) for p in directory.iterdir() if p.name.isdigit()) if directory.exists() else []
+
+    def read(self, manifest: dict) -> Iterator[bytes]:
+        """The archive, ``IO_BUFFER`` bytes at a time."""
+        for digest in manifest["chunks"]:
+            with open(self.chunk_path(digest), "rb") as f:
+                while True:
+                    block = f.read(IO_BUFFER)
+                    if not block:
+                        break
+                    yield block
+
+    def expire(self, max_age: float = UPLOAD_TTL) -> dict:
+        """Remove idle sessions, stale partial files and chunks no version or session uses."""
+        cutoff = time.time() - max_age
+
+        def stale(path: Path) -> bool:
+            try:
+                return path.stat().st_mtime < cutoff
+            except FileNotFoundError:
+                return False
+
+        removed = {"sessions": 0, "partial": 0, "chunks": 0}
+        for path in [*self.root.rglob("*.part"), *self.root.rglob("*.tmp")]:
+            if stale(path):
+                path.unlink(missing_ok=True)
+                removed["partial"] += 1
+        referenced = set()
+        for path in (self.root / "uploads").glob("*.json"):
+            if stale(path):
+                path.unlink(missing_ok=True)
+                removed["sessions"] += 1
+            else:
+                referenced.update(json.loads(path.read_text())["chunks"])
+        for path in (self.root / "projects").glob("*/*.json"):
+            referenced.update(json.loads(path.read_text())["chunks"])
+        for path in (self.root / "chunks").glob("*/*"):
+            if HASH_RE.match(path.name) and path.name not in referenced and stale(path):
+                path.unlink(missing_ok=True)
+                removed["chunks"] += 1
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "chunks_received": self.chunks_received,
+            "chunks_deduplicated": self.chunks_deduplicated,
+            "bytes_received": self.bytes_received,
+        }
+
+
+async def receive_chunk(store: ProjectStore, session: UploadSession, index: int, body: AsyncIterable[bytes],
+                        write: Callable[[BinaryIO, bytes], Awaitable]) -> dict:
+    """Stream one chunk body into the store.
+
+    ``write(f, data)`` performs a blocking file write (``asyncio.to_thread``
+    in the app). At most ``IO_BUFFER`` bytes are held at a time, and a body
+    longer than the declared size is cut off early. A dropped connection
+    leaves nothing behind; the chunk stays missing.
+    """
+    digest, size, tmp = store.open_chunk(session, index)
+    if tmp is None:
+        return {"index": index, "hash": digest, "stored": False}
+    hasher = hashlib.blake2b(digest_size=16)
+    received, buffer = 0, bytearray()
+    try:
+        with open(tmp, "wb") as f:
+            async for piece in body:
+                received += len(piece)
+                if received > size:
+                    break
+                hasher.update(piece)
+                buffer += piece
+                if len(buffer) >= IO_BUFFER:
+                    await write(f, bytes(buffer))
+                    buffer.clear()
+            if buffer and received <= size:
+                await write(f, bytes(buffer))
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    store.commit_chunk(digest, size, tmp, received, hasher)
+    return {"index": index, "hash": digest, "stored": True}
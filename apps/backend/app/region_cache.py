@@ -0,0 +1,133 @@
+"""Cache of prepared fill regions, keyed by a content hash of the mesh.
+
+Designers re-run the auto fill on the same region many times while only
+changing spacing, padding or stone size. The first request for a region pays
+for parsing it. Later requests reuse the :class:`~.stone_layout.PreparedRegion`,
+and may send just its ``region_id`` instead of re-uploading the mesh.
+
+The API process keeps the parsed mesh and its bounds. The
+:class:`~.spatial.SurfaceIndex` a surface fill needs stays in the pool
+workers: each worker keeps its own cache of indexed regions (see
+``resident_region``), built the first time that worker sees a region, so
+later jobs send only the ``region_id``. Eviction is LRU, bounded both by
+entry count and by total array memory.
+"""
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .stone_layout import FillResult, PreparedRegion, as_vertices, fill_region, prepare_region
+
+REGION_CACHE_ENTRIES = int(os.getenv("CAD_REGION_CACHE_ENTRIES", "64"))
+REGION_CACHE_BYTES = int(os.getenv("CAD_REGION_CACHE_MB", "512")) * 1024 * 1024
+# Indexed regions kept by each pool worker
+WORKER_REGION_ENTRIES = int(os.getenv("CAD_WORKER_REGION_ENTRIES", "16"))
+WORKER_REGION_BYTES = int(os.getenv("CAD_WORKER_REGION_MB", "256")) * 1024 * 1024
+
+
+class RegionNotResident(KeyError):
+    """The worker that took the job has not indexed this region yet; resend it with the mesh."""
+
+
+def region_key(region_mesh, faces=None) -> Tuple[str, np.ndarray, Optional[np.ndarray]]:
+    """Content hash of a region plus its parsed vertex / face arrays.
+
+    The hash is taken over canonical float64 / int64 bytes, so the same mesh
+    gets the same ``region_id`` whether it arrived as JSON or as float32
+    binary.
+    """
+    vertices = as_vertices(region_mesh)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(vertices, dtype="<f8").tobytes())
+    if faces is not None:
+        faces = np.asarray(faces)
+        digest.update(b"faces")
+        digest.update(np.ascontiguousarray(faces, dtype="<i8").tobytes())
+    return digest.hexdigest(), vertices, faces
+
+
+class RegionCache:
+    def __init__(self, max_entries: int = REGION_CACHE_ENTRIES, max_bytes: int = REGION_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, PreparedRegion]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str) -> Optional[PreparedRegion]:
+        region = self._entries.get(key)
+        if region is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return region
+
+    def peek(self, key: str) -> Optional[PreparedRegion]:
+        """Look up without touching LRU order or hit counters."""
+        return self._entries.get(key)
+
+    def put(self, key: str, region: PreparedRegion) -> None:
+        """Store (or replace) a region; regions larger than the whole budget are not kept."""
+        self.discard(key)
+        size = region.nbytes
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+        self._entries[key] = region
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def discard(self, key: str) -> None:
+        region = self._entries.pop(key, None)
+        if region is not None:
+            self.bytes -= region.nbytes
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Per-process: every pool worker fills its own copy on first use
+_resident = RegionCache(max_entries=WORKER_REGION_ENTRIES, max_bytes=WORKER_REGION_BYTES)
+
+
+def resident_region(region_id: str, region: Optional[PreparedRegion] = None) -> PreparedRegion:
+    """This process's indexed copy of ``region_id``, built from ``region`` on first use.
+
+    Raises ``RegionNotResident`` when the region is not cached here and
+    ``region`` is not given.
+    """
+    cached = _resident.get(region_id)
+    if cached is None:
+        if region is None:
+            raise RegionNotResident(region_id)
+        cached = prepare_region(region, surface=True)
+        _resident.put(region_id, cached)
+    return cached
+
+
+def fill_resident(region_id: str, region: Optional[PreparedRegion], *args, **kwargs) -> FillResult:
+    """Process-pool entry point for surface fills; ``region`` is only needed on a worker's first use."""
+    return fill_region(resident_region(region_id, region), *args, **kwargs)
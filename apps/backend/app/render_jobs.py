@@ -0,0 +1,133 @@
+"""Local render scheduler: priority lanes, progress, cancellation and backpressure.
+
+This is the ``CloudProvider.local`` render backend and needs no network. Each
+render quality has a lane. Cheap previews sit in a high-priority lane, so
+they are not stuck behind a batch of ultra renders; ``LANE_WEIGHTS`` sets
+each lane's share of picks.
+
+A job runs as a sequence of pool calls on the render pool (see
+:mod:`.rasterizer`): one ``prepare_scene``, then one ``raster_band`` per
+band of ``RENDER_TILE_ROWS`` output rows. Progress is reported per band.
+Cancellation takes effect between bands, and a queued job is removed at
+once. ``submit`` raises ``RenderQueueFull`` once ``max_queue`` jobs wait.
+The app answers that with 503 and ``Retry-After``. Lanes, cancellation and
+the rest of the queue machinery come from :class:`~.export_jobs.JobQueue`.
+"""
+import asyncio
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .blueprint import VIEWS
+from .export_jobs import Job, JobQueue, QueueFull
+from .rasterizer import SHADINGS, prepare_scene, raster_band, write_png
+
+CAD_RENDER_WORKERS = int(os.getenv("CAD_RENDER_WORKERS", "2"))
+CAD_RENDER_MAX_QUEUE = int(os.getenv("CAD_RENDER_MAX_QUEUE", "32"))
+# Finished render jobs kept for status polling
+CAD_RENDER_HISTORY = int(os.getenv("CAD_RENDER_HISTORY", "1024"))
+RENDER_TILE_ROWS = 64
+
+# quality: (lane, image size in pixels, supersamples per axis); lane 0 is served first
+RENDER_QUALITIES: Dict[str, Tuple[int, int, int]] = {
+    "preview": (0, 256, 1),
+    "draft": (1, 512, 1),
+    "standard": (2, 1024, 2),
+    "high": (3, 1600, 2),
+    "ultra": (4, 2048, 3),
+}
+# Share of picks per lane while every lane has work
+LANE_WEIGHTS = (16, 8, 4, 2, 1)
+
+
+class RenderQueueFull(QueueFull):
+    """Raised when the render queue cannot take another job."""
+
+
+@dataclass(kw_only=True)
+class RenderJob(Job):
+    quality: str
+    size: int
+    samples: int
+    view: str
+    shading: str
+    progress: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            **super().to_dict(),
+            "quality": self.quality,
+            "progress": round(self.progress, 4),
+            "preview_url": self.url if self.status == "done" else None,
+        }
+
+
+class RenderScheduler(JobQueue):
+    """Render jobs in one lane per quality.
+
+    ``load(geometry_id)`` gives ``(vertices, faces, materials)``; ``run(fn, *args)``
+    executes a render step (the render pool in the app).
+    """
+
+    name = "render"
+    full_error = RenderQueueFull
+
+    def __init__(self, load: Callable[[str], Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]],
+                 run: Callable[..., Awaitable], workers: int = CAD_RENDER_WORKERS, max_queue: int = CAD_RENDER_MAX_QUEUE,
+                 history: int = CAD_RENDER_HISTORY, qualities: Dict[str, Tuple[int, int, int]] = RENDER_QUALITIES,
+                 weights: Tuple[int, ...] = LANE_WEIGHTS):
+        super().__init__(run, workers, max_queue, history, weights)
+        self.load = load
+        self.qualities = qualities
+
+    def submit(self, model_id: int, geometry_id: str, quality: str, options: Optional[dict],
+               place: Callable[[str, str], Tuple[Path, str]]) -> RenderJob:
+        """Queue a render; ``options``: view (default ``iso``), size (pixels), shading (default ``phong``).
+
+        ``place(name, suffix)`` gives the image's path and URL.
+        """
+        if quality not in self.qualities:
+            raise ValueError(f"quality must be one of {', '.join(self.qualities)}")
+        lane, size, samples = self.qualities[quality]
+        options = options or {}
+        view = options.get("view", "iso")
+        if view not in VIEWS:
+            raise ValueError(f"view must be one of {', '.join(VIEWS)}")
+        shading = options.get("shading", "phong")
+        if shading not in SHADINGS:
+            raise ValueError(f"shading must be one of {', '.join(SHADINGS)}")
+        try:
+            size = int(options.get("size", size))
+        except (TypeError, ValueError):
+            raise ValueError("size must be an integer")
+        if not 16 <= size <= self.qualities[quality][1]:
+            raise ValueError(f"size must be 16..{self.qualities[quality][1]} pixels for {quality} renders")
+        self.start()
+        job_id = uuid.uuid4().hex
+        path, url = place(job_id, ".png")
+        return self._enqueue(RenderJob(id=job_id, model_id=model_id, geometry_id=geometry_id, quality=quality,
+                                       lane=lane, size=size, samples=samples, view=view, shading=shading,
+                                       path=path, url=url))
+
+    async def _execute(self, job: RenderJob, tmp: Path) -> dict:
+        vertices, faces, materials = await asyncio.to_thread(self.load, job.geometry_id)
+        scene = await self._run_when_free(prepare_scene, vertices, faces, job.size, job.size, job.samples, job.view,
+                                          job.shading, materials)
+        image = np.empty((job.size, job.size, 3), dtype=np.uint8)
+        for row0 in range(0, job.size, RENDER_TILE_ROWS):
+            self._checkpoint(job)
+            row1 = min(row0 + RENDER_TILE_ROWS, job.size)
+            image[row0:row1] = await self._run_when_free(raster_band, scene.band(row0, row1), row0, row1)
+            job.progress = row1 / job.size
+        size = await asyncio.to_thread(write_png, tmp, image)
+        return {"bytes": size, "width": job.size, "height": job.size, "triangles": int(len(faces))}
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "lanes": {quality: len(self.lanes[lane]) for quality, (lane, _, _) in self.qualities.items()},
+        }
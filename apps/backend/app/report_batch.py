@@ -0,0 +1,114 @@
+"""Production reports for whole collections.
+
+A collection pre-flight checks hundreds of models. ``run_batch`` feeds them
+to a fixed number of worker tasks, so at most ``concurrency`` checks hold CAD
+pool slots at once and interactive requests still get through. Results are
+yielded in completion order, for streaming.
+
+A report depends only on the model version (geometry id) and the check
+options. ``ReportMemo`` keeps recent reports under that key. Re-checking an
+unchanged collection is then a series of dictionary lookups. Concurrent
+requests for the same key share one computation.
+"""
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional, Tuple
+
+from .compute_pool import CAD_POOL_WORKERS
+from .shared_tasks import SharedTasks
+
+REPORT_MEMO_SIZE = int(os.getenv("CAD_REPORT_MEMO_SIZE", "4096"))
+# Checks in flight per batch; defaults to one per CAD pool worker
+REPORT_BATCH_CONCURRENCY = int(os.getenv("CAD_REPORT_BATCH_CONCURRENCY", str(max(CAD_POOL_WORKERS, 1))))
+MAX_REPORT_BATCH = int(os.getenv("CAD_MAX_REPORT_BATCH", "5000"))
+
+
+def report_key(geometry_id: Optional[str], options: Optional[dict]) -> str:
+    """Key of a report: the model version plus canonical JSON of the options."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update((geometry_id or "").encode())
+    digest.update(b"\0")
+    digest.update(json.dumps(options or {}, sort_keys=True, separators=(",", ":")).encode())
+    return digest.hexdigest()
+
+
+class ReportMemo:
+    """Bounded LRU of finished reports; failed checks are not remembered."""
+
+    def __init__(self, memo_size: int = REPORT_MEMO_SIZE):
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, dict]" = OrderedDict()
+        self._pending = SharedTasks()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        self._memo.clear()
+
+    async def get(self, key: str, compute: Callable[[], Awaitable[dict]]) -> Tuple[dict, bool]:
+        """``(report, cached)``; ``compute()`` runs only for a new key."""
+        if key in self._memo:
+            self.hits += 1
+            self._memo.move_to_end(key)
+            return self._memo[key], True
+
+        async def remember() -> dict:
+            report = await compute()
+            self._memo[key] = report
+            while len(self._memo) > self.memo_size:
+                self._memo.popitem(last=False)
+            return report
+
+        report, shared = await self._pending.run(key, remember)
+        if shared:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return report, shared
+
+    def stats(self) -> dict:
+        return {"entries": len(self._memo), "pending": len(self._pending), "hits": self.hits, "misses": self.misses}
+
+
+async def run_batch(items: Iterable[Any], check: Callable[[Any], Awaitable[dict]],
+                    concurrency: int = REPORT_BATCH_CONCURRENCY) -> AsyncIterator[Tuple[int, Any, Any]]:
+    """``(index, item, result or exception)`` for every item, as checks finish.
+
+    Exceptions from ``check`` are yielded, not raised, so one bad model does
+    not end the batch. Closing the iterator early cancels the workers.
+    """
+    work = iter(enumerate(items))
+    done: asyncio.Queue = asyncio.Queue()
+
+    async def worker() -> None:
+        try:
+            for index, item in work:
+                try:
+                    result = await check(item)
+                except asyncio.CancelledError:
+                    if asyncio.current_task().cancelling():
+                        raise
+                    # A shared computation was cancelled, not this batch
+                    result = RuntimeError("check was cancelled")
+                except Exception as e:
+                    result = e
+                await done.put((index, item, result))
+        finally:
+            done.put_nowait(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(concurrency, 1))]
+    try:
+        running = len(workers)
+        while running:
+            finished = await done.get()
+            if finished is None:
+                running -= 1
+            else:
+                yield finished
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,240 @@
+"""Seat cutter generation for ``/cad/diamond-seats``.
+
+A cutter mesh is built once per (pattern, stone size, shape) and kept in a
+bounded LRU cache. Every stone using that template is placed with one batched
+affine transform, so thousands of identical melee seats cost a single template
+build plus one matrix multiply.
+
+The app looks templates up in the web process (``seat_templates``) and hands
+them to the pool job with the stones. There is then one cache for the whole
+server, so its hit rate does not drop as the number of pool workers grows.
+"""
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SEAT_TEMPLATE_CACHE_SIZE = 256
+SEAT_SEGMENTS = 24
+
+TemplateKey = Tuple[str, float, str]
+Mesh = Tuple[np.ndarray, np.ndarray]
+
+# Seat profile per setting style, as fractions of the stone diameter:
+# head  - clearance cylinder above the girdle (for the crown / burnishing tool)
+# girdle - girdle band height
+# pavilion - cone depth below the girdle (41 degree pavilion ~ 0.43 d)
+# bore  - through hole under the culet, as a fraction of the girdle radius
+#         (0 closes the seat at the culet)
+PATTERN_PROFILES = {
+    "pave": {"head": 0.35, "girdle": 0.04, "pavilion": 0.43, "bore": 0.5},
+    "honeycomb_pave": {"head": 0.35, "girdle": 0.04, "pavilion": 0.43, "bore": 0.5},
+    "micro_prong_pave": {"head": 0.30, "girdle": 0.03, "pavilion": 0.43, "bore": 0.45},
+    "channel": {"head": 0.60, "girdle": 0.05, "pavilion": 0.43, "bore": 0.4},
+    "invisible": {"head": 0.20, "girdle": 0.05, "pavilion": 0.45, "bore": 0.0},
+    "gypsy_flush": {"head": 0.05, "girdle": 0.04, "pavilion": 0.43, "bore": 0.5},
+    "eternity_full": {"head": 0.40, "girdle": 0.04, "pavilion": 0.43, "bore": 0.5},
+    "eternity_half": {"head": 0.40, "girdle": 0.04, "pavilion": 0.43, "bore": 0.5},
+    "prong": {"head": 0.50, "girdle": 0.05, "pavilion": 0.43, "bore": 0.5},
+    "bead": {"head": 0.35, "girdle": 0.04, "pavilion": 0.43, "bore": 0.5},
+    "bar": {"head": 0.45, "girdle": 0.04, "pavilion": 0.43, "bore": 0.5},
+    "custom": {"head": 0.35, "girdle": 0.04, "pavilion": 0.43, "bore": 0.5},
+}
+
+
+def cross_section(shape: str, segments: int = SEAT_SEGMENTS) -> np.ndarray:
+    """Unit girdle outline (max half-width 1) for a stone shape, as (S, 2) points."""
+    t = np.linspace(0.0, 2.0 * np.pi, segments, endpoint=False)
+    ring = np.column_stack((np.cos(t), np.sin(t)))
+    if shape == "oval":
+        return ring * [1.0, 0.7]
+    if shape in ("princess", "square", "emerald"):
+        # Project the circle onto a square (emerald: a stretched, corner-cut rectangle)
+        ring = ring / np.abs(ring).max(axis=1, keepdims=True)
+        if shape == "emerald":
+            ring = np.clip(ring, -0.85, 0.85) / 0.85 * [1.0, 0.7]
+        return ring
+    return ring
+
+
+@lru_cache(maxsize=SEAT_TEMPLATE_CACHE_SIZE)
+def seat_template(pattern: str, size: float, shape: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Closed cutter mesh for one seat, girdle centred on the origin, table facing +z.
+
+    Returns read-only ``(vertices, faces)`` arrays; they are shared by every
+    caller that hits the cache.
+    """
+    if size <= 0:
+        raise ValueError("stone size must be positive")
+    profile = PATTERN_PROFILES.get(pattern, PATTERN_PROFILES["custom"])
+    r = size / 2.0
+    pavilion = size * profile["pavilion"]
+    # (radius, z) rings from the top of the head clearance down to the culet / bore
+    rings = [
+        (r * 1.02, size * profile["head"]),
+        (r * 1.02, size * profile["girdle"]),
+        (r, 0.0),
+    ]
+    if profile["bore"] > 0:
+        bore = profile["bore"] * r
+        rings += [(bore, -pavilion * (1.0 - bore / r)), (bore, -pavilion - 0.3 * size)]
+    else:
+        rings += [(0.05 * r, -pavilion * 0.95)]
+    section = cross_section(shape)
+    s = len(section)
+    radius = np.array([ring[0] for ring in rings])
+    height = np.array([ring[1] for ring in rings])
+    side = np.empty((len(rings), s, 3))
+    side[:, :, :2] = radius[:, None, None] * section[None, :, :]
+    side[:, :, 2] = height[:, None]
+    vertices = np.vstack((side.reshape(-1, 3), [[0.0, 0.0, height[0]], [0.0, 0.0, height[-1]]]))
+
+    # Quads between consecutive rings, split into two triangles each
+    ring_idx = np.arange(len(rings) - 1)[:, None] * s
+    j = np.arange(s)[None, :]
+    a = (ring_idx + j).ravel()
+    b = (ring_idx + (j + 1) % s).ravel()
+    c, d = a + s, b + s
+    walls = np.concatenate((np.column_stack((a, c, b)), np.column_stack((b, c, d))))
+    top, bottom = len(vertices) - 2, len(vertices) - 1
+    jj = np.arange(s)
+    caps = np.concatenate((
+        np.column_stack((np.full(s, top), jj, (jj + 1) % s)),
+        np.column_stack((np.full(s, bottom), (len(rings) - 1) * s + (jj + 1) % s, (len(rings) - 1) * s + jj)),
+    ))
+    faces = np.concatenate((walls, caps)).astype(np.int64)
+    vertices.setflags(write=False)
+    faces.setflags(write=False)
+    return vertices, faces
+
+
+def align_z(normals: np.ndarray) -> np.ndarray:
+    """Batched rotation matrices (N, 3, 3) taking +z onto each unit normal (Rodrigues)."""
+    n = np.asarray(normals, dtype=np.float64)
+    n = n / np.maximum(np.linalg.norm(n, axis=1, keepdims=True), 1e-12)
+    c = n[:, 2]
+    v = np.column_stack((-n[:, 1], n[:, 0], np.zeros(len(n))))  # z x n
+    k = np.zeros((len(n), 3, 3))
+    k[:, 0, 2], k[:, 1, 2] = v[:, 1], -v[:, 0]
+    k[:, 2, 0], k[:, 2, 1] = -v[:, 1], v[:, 0]
+    rot = np.eye(3)[None] + k + (k @ k) / np.maximum(1.0 + c, 1e-12)[:, None, None]
+    # Normals pointing straight down: any half-turn about a horizontal axis
+    rot[c < -1.0 + 1e-9] = np.diag([1.0, -1.0, -1.0])
+    return rot
+
+
+def stone_columns(stones: list, default_shape: str) -> Tuple[np.ndarray, np.ndarray, List[str], np.ndarray]:
+    """``(positions, sizes, shapes, normals)`` of ``[{"position", "size", "normal"?, "shape"?}, ...]``.
+
+    Raises ``ValueError`` for anything that is not a list of such objects.
+    """
+    if not isinstance(stones, list) or not all(isinstance(s, dict) for s in stones):
+        raise ValueError("stones must be a list of {position, size, normal?, shape?} objects")
+    try:
+        positions = np.array([s.get("position") for s in stones], dtype=np.float64).reshape(-1, 3)
+        sizes = np.array([s.get("size") for s in stones], dtype=np.float64)
+        normals = np.array([s.get("normal") or (0.0, 0.0, 1.0) for s in stones], dtype=np.float64).reshape(-1, 3)
+    except (TypeError, ValueError):
+        raise ValueError("every stone needs a position [x, y, z], a numeric size and an optional normal [x, y, z]")
+    if not len(positions) == len(sizes) == len(normals) == len(stones):
+        raise ValueError("every stone needs a position [x, y, z], a numeric size and an optional normal [x, y, z]")
+    shapes = [s.get("shape") or default_shape for s in stones]
+    if not all(isinstance(shape, str) for shape in shapes):
+        raise ValueError("stone shapes must be strings")
+    return positions, sizes, shapes, normals
+
+
+def template_keys(pattern: str, sizes: np.ndarray, shapes: List[str]) -> Tuple[List[TemplateKey], np.ndarray]:
+    """Distinct template keys and, per stone, the index of its key."""
+    sizes = np.round(np.asarray(sizes, dtype=np.float64), 4)
+    if not np.all(sizes > 0) or not np.all(np.isfinite(sizes)):
+        raise ValueError("every stone needs a positive size")
+    if len(shapes) != len(sizes):
+        raise ValueError("every stone needs a shape")
+    groups: Dict[TemplateKey, int] = {}
+    template_ids = np.array([groups.setdefault((pattern, float(sz), sh), len(groups)) for sz, sh in zip(sizes, shapes)], dtype=np.int64)
+    return list(groups), template_ids
+
+
+def seat_templates(keys: List[TemplateKey]) -> Dict[TemplateKey, Mesh]:
+    """Cutter meshes for ``keys`` from this process's template cache."""
+    return {key: seat_template(*key) for key in keys}
+
+
+def template_cache_stats() -> dict:
+    cache = seat_template.cache_info()
+    return {"hits": cache.hits, "misses": cache.misses, "size": cache.currsize, "max_size": cache.maxsize}
+
+
+@dataclass
+class SeatBatch:
+    keys: List[TemplateKey]  # template key per group
+    template_ids: np.ndarray  # (N,) group index per seat
+    transforms: np.ndarray  # (N, 4, 4) placement of each seat
+    vertices: np.ndarray  # (N * V_group, 3) all cutter vertices, grouped by template
+    faces: np.ndarray  # (M, 3) indices into ``vertices``
+    meshes: Dict[TemplateKey, Mesh]  # cutter mesh per key
+
+    def templates(self) -> Dict[str, dict]:
+        return templates_json({key: self.meshes[key] for key in self.keys})
+
+
+def templates_json(meshes: Dict[TemplateKey, Mesh]) -> Dict[str, dict]:
+    """Cutter meshes by template name, as JSON-ready lists."""
+    return {template_name(key): {"vertices": verts.tolist(), "faces": faces.tolist()}
+            for key, (verts, faces) in meshes.items()}
+
+
+def template_name(key: TemplateKey) -> str:
+    pattern, size, shape = key
+    return f"{pattern}:{size:g}:{shape}"
+
+
+def build_seats(pattern: str, positions: np.ndarray, sizes: np.ndarray, shapes: List[str], normals: np.ndarray,
+                with_mesh: bool = True, templates: Optional[Dict[TemplateKey, Mesh]] = None) -> SeatBatch:
+    """Place one cutter per stone, batching all stones that share a template.
+
+    ``with_mesh=False`` skips the merged cutter mesh (about 120 vertices per
+    seat), leaving only the per-seat transforms. ``templates`` supplies the
+    cutter meshes (see ``seat_templates``); missing ones are built here.
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+    keys, template_ids = template_keys(pattern, sizes, shapes)
+    if not len(positions) == len(normals) == len(template_ids):
+        raise ValueError("positions, sizes and normals must have one row per stone")
+    meshes = {key: (templates or {}).get(key) or seat_template(*key) for key in keys}
+    rot = align_z(normals)
+    transforms = np.zeros((len(positions), 4, 4))
+    transforms[:, :3, :3] = rot
+    transforms[:, :3, 3] = positions
+    transforms[:, 3, 3] = 1.0
+
+    all_vertices, all_faces, offset = [], [], 0
+    for gid, key in enumerate(keys if with_mesh else ()):
+        verts, faces = meshes[key]
+        members = np.flatnonzero(template_ids == gid)
+        # One batched multiply places every instance of this template
+        placed = np.einsum("nij,vj->nvi", rot[members], verts) + positions[members, None, :]
+        all_vertices.append(placed.reshape(-1, 3))
+        all_faces.append((faces[None] + offset + len(verts) * np.arange(len(members))[:, None, None]).reshape(-1, 3))
+        offset += len(members) * len(verts)
+    vertices = np.concatenate(all_vertices) if all_vertices else np.empty((0, 3))
+    faces = np.concatenate(all_faces) if all_faces else np.empty((0, 3), dtype=np.int64)
+    return SeatBatch(keys=keys, template_ids=template_ids, transforms=transforms, vertices=vertices, faces=faces,
+                     meshes=meshes)
+
+
+def seat_job(pattern: str, positions: np.ndarray, sizes: np.ndarray, shapes: List[str], normals: np.ndarray,
+             templates: Dict[TemplateKey, Mesh], with_mesh: bool = False, with_templates: bool = True):
+    """Process-pool entry point: the seat batch and its templates as JSON-ready lists.
+
+    ``with_templates=False`` returns ``None`` for the templates and leaves the
+    cutter meshes out of the batch, so neither is pickled back; streamed
+    slices send the templates once in their header instead.
+    """
+    seats = build_seats(pattern, positions, sizes, shapes, normals, with_mesh=with_mesh, templates=templates)
+    if not with_templates:
+        return replace(seats, meshes={}), None
+    return seats, seats.templates()
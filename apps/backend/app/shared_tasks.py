@@ -0,0 +1,39 @@
+"""One computation per key, shared by every concurrent caller.
+
+Each computation runs as its own task, and callers wait on it through
+``asyncio.shield``. A caller that goes away, for example because its client
+disconnected, is cancelled alone. The computation and the other waiters
+carry on, and its result still reaches whatever cache ``compute`` fills.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SharedTasks:
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Nobody may be waiting any more; mark the outcome as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """``(result, shared)``; ``compute()`` starts only if no task for ``key`` is running."""
+        task = self._tasks.get(key)
+        shared = task is not None and task.get_loop() is asyncio.get_running_loop()
+        if not shared:
+            task = asyncio.ensure_future(compute())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+        return await asyncio.shield(task), shared
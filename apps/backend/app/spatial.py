@@ -0,0 +1,551 @@
+"""Spatial indexes used by the CAD geometry endpoints.
+
+Everything here is built and queried with whole-array NumPy operations; there
+are no per-triangle or per-point Python loops on the hot paths.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Hashed grids never use more cells than this per axis, so packed int64 cell
+# keys cannot overflow (3 axes: about 2**60) whatever the requested cell size
+MAX_GRID_CELLS_PER_AXIS = 1 << 20
+# Longest segment, in cells per axis, that segment_distances hashes cell by cell
+MAX_SEGMENT_CELLS = 8
+
+# 3x3 neighbourhood offsets used by grid queries
+_NEIGHBOURS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.int64)
+
+
+def triangle_faces(vertices: np.ndarray, faces=None) -> np.ndarray:
+    """Return an (F, 3) int array of faces, treating a bare vertex list as a triangle soup."""
+    if faces is None:
+        if vertices.shape[0] % 3:
+            raise ValueError("region_faces is required unless region_mesh is a triangle soup")
+        return np.arange(vertices.shape[0], dtype=np.int64).reshape(-1, 3)
+    faces = np.asarray(faces)
+    if faces.dtype.kind not in "iu":
+        faces = faces.astype(np.int64)
+    if faces.ndim != 2 or faces.shape[1] != 3:
+        raise ValueError("region_faces must be a list of [i, j, k] triangles")
+    if faces.size and (faces.min() < 0 or faces.max() >= vertices.shape[0]):
+        raise ValueError("region_faces references a vertex that does not exist")
+    return faces
+
+
+class SurfaceIndex:
+    """Uniform 2-D grid over a triangle mesh, binned in the XY plane.
+
+    The cell size is the 95th percentile triangle extent. Triangles no larger
+    than a cell are stored once, in the cell holding their centroid, and are
+    found from any point they cover by searching the 3x3 neighbourhood; the few
+    oversized triangles are stored in every cell their bounding box touches.
+    The cell -> triangle table is CSR-style (``cell_start`` offsets into
+    ``cell_tris``), so queries are a gather plus one batched barycentric test.
+    """
+
+    def __init__(self, vertices: np.ndarray, faces=None):
+        self.vertices = np.ascontiguousarray(vertices)
+        self.faces = triangle_faces(self.vertices, faces)
+        self._vertex_normals: Optional[np.ndarray] = None
+        self.bounds = (self.vertices.min(axis=0), self.vertices.max(axis=0))
+
+        # Per-triangle XY bounds, reduced corner by corner (much faster than
+        # reducing over a length-3 axis)
+        corners = [self.vertices[self.faces[:, k], :2] for k in range(3)]
+        tri_lo = np.minimum(np.minimum(corners[0], corners[1]), corners[2])
+        tri_hi = np.maximum(np.maximum(corners[0], corners[1]), corners[2])
+        size = np.maximum(tri_hi[:, 0] - tri_lo[:, 0], tri_hi[:, 1] - tri_lo[:, 1])
+        centroid = (corners[0] + corners[1] + corners[2]) / 3.0
+
+        lo = self.bounds[0][:2]
+        extent = np.maximum(self.bounds[1][:2] - lo, 1e-12)
+        cell = np.percentile(size, 95) if len(size) else extent.max()
+        # Keep the grid O(F) even for degenerate (zero-area) inputs
+        cell = max(cell, np.sqrt(extent[0] * extent[1] / max(len(self.faces), 1)), 1e-12)
+        self.origin = lo
+        self.cell = float(cell)
+        self.shape = np.floor(extent / cell).astype(np.int64) + 1
+
+        cell_ids = self._cell_ids(self._cell_coords(centroid))
+        tri_ids = np.arange(len(self.faces), dtype=np.int64)
+        big = size > cell
+        if big.any():
+            # Bounding-box expansion, only for the oversized triangles
+            big_ids = np.flatnonzero(big)
+            c0 = self._cell_coords(tri_lo[big_ids])
+            span = self._cell_coords(tri_hi[big_ids]) - c0 + 1
+            counts = span[:, 0] * span[:, 1]
+            local = np.arange(counts.sum(), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+            w = np.repeat(span[:, 0], counts)
+            cx = np.repeat(c0[:, 0], counts) + local % w
+            cy = np.repeat(c0[:, 1], counts) + local // w
+            cell_ids = np.concatenate((cell_ids[~big], cx * self.shape[1] + cy))
+            tri_ids = np.concatenate((tri_ids[~big], np.repeat(big_ids, counts)))
+
+        # Order within a cell is irrelevant, so the fast unstable sort is fine
+        order = np.argsort(cell_ids)
+        self.cell_tris = tri_ids[order]
+        per_cell = np.bincount(cell_ids, minlength=int(self.shape[0] * self.shape[1]))
+        self.cell_start = np.concatenate(([0], np.cumsum(per_cell)))
+
+    def _cell_coords(self, xy: np.ndarray) -> np.ndarray:
+        c = np.floor((xy - self.origin) / self.cell).astype(np.int64)
+        return np.clip(c, 0, self.shape - 1)
+
+    def _cell_ids(self, coords: np.ndarray) -> np.ndarray:
+        return coords[..., 0] * self.shape[1] + coords[..., 1]
+
+    def candidates(self, xy: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(point_idx, tri_idx)`` pairs for every triangle near each point."""
+        c = self._cell_coords(xy)[:, None, :] + _NEIGHBOURS[None, :, :]
+        valid = np.all((c >= 0) & (c < self.shape), axis=2).ravel()
+        cells = self._cell_ids(np.clip(c, 0, self.shape - 1)).ravel()
+        start = self.cell_start[cells]
+        counts = np.where(valid, self.cell_start[cells + 1] - start, 0)
+        pair_pt = np.repeat(np.arange(len(xy)).repeat(len(_NEIGHBOURS)), counts)
+        offsets = np.repeat(start - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return pair_pt, self.cell_tris[offsets]
+
+    def project(self, xy: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Drop XY points vertically onto the surface.
+
+        Returns ``(hit, points, normals)`` where ``hit`` is a boolean mask over
+        the input and ``points``/``normals`` hold one row per hit, in input
+        order. When several layers overlap, the highest one (largest z) wins.
+        Normals are the vertex normals (see ``vertex_normals``) interpolated
+        across the triangle hit, so they always point up (z > 0).
+        """
+        xy = np.asarray(xy, dtype=np.float64).reshape(-1, 2)
+        hit = np.zeros(len(xy), dtype=bool)
+        inside = np.flatnonzero(np.all((xy >= self.origin) & (xy <= self.bounds[1][:2]), axis=1))
+        pair_pt, pair_tri = self.candidates(xy[inside])
+        pair_pt = inside[pair_pt]
+
+        bary, ok = self._barycentric(xy[pair_pt], pair_tri)
+        pair_pt, pair_tri, bary = pair_pt[ok], pair_tri[ok], bary[ok]
+        z = np.einsum("ij,ji->i", bary, [self.vertices[self.faces[pair_tri, k], 2] for k in range(3)])
+
+        # Highest surface per point: sort by (point, -z) and keep the first of each run
+        order = np.lexsort((-z, pair_pt))
+        sorted_pt = pair_pt[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = sorted_pt[1:] != sorted_pt[:-1]
+        best = order[first]
+        hit[pair_pt[best]] = True
+
+        points = np.column_stack((xy[pair_pt[best]], z[best]))
+        tris = self.faces[pair_tri[best]]
+        normals = np.einsum("ij,jik->ik", bary[best], self.vertex_normals[tris.T])
+        return hit, points, _unit_or(normals, self.upward_normals(pair_tri[best]))
+
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        """Inside test for a closed mesh: odd number of surface crossings above each point.
+
+        The query is nudged by a tiny irrational XY offset so rays through
+        shared edges or vertices are not counted twice.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        xy = points[:, :2] + self.cell * np.array([1.3247e-7, 2.2361e-7])
+        inside = np.flatnonzero(np.all((xy >= self.origin) & (xy <= self.bounds[1][:2]), axis=1))
+        pair_pt, pair_tri = self.candidates(xy[inside])
+        # Oversized triangles can sit in several of the searched cells; count each once
+        key = np.unique(pair_pt * len(self.faces) + pair_tri)
+        pair_pt, pair_tri = key // len(self.faces), key % len(self.faces)
+        bary, ok = self._barycentric(xy[inside][pair_pt], pair_tri, eps=0.0)
+        z = np.einsum("ij,ji->i", bary, [self.vertices[self.faces[pair_tri, k], 2] for k in range(3)])
+        above = ok & (z > points[inside][pair_pt, 2])
+        crossings = np.bincount(pair_pt[above], minlength=len(inside))
+        result = np.zeros(len(points), dtype=bool)
+        result[inside] = crossings % 2 == 1
+        return result
+
+    @property
+    def vertex_normals(self) -> np.ndarray:
+        """Area-weighted vertex normals of the upward-facing surface.
+
+        Seen from above, winding order says nothing about which side is out:
+        faces wound downwards are flipped before they are accumulated, so the
+        normals of a surface fill are consistent whatever the mesh's winding.
+        Computed on first use.
+        """
+        if self._vertex_normals is None:
+            a, b, c = (self.vertices[self.faces[:, k]] for k in range(3))
+            area = np.cross(b - a, c - a)
+            area *= np.where(area[:, 2:] < 0, -1.0, 1.0)
+            ids = self.faces.ravel()
+            n = len(self.vertices)
+            summed = np.column_stack([np.bincount(ids, np.repeat(area[:, k], 3), minlength=n) for k in range(3)])
+            self._vertex_normals = _unit_or(summed, np.array([0.0, 0.0, 1.0]))
+        return self._vertex_normals
+
+    def upward_normals(self, tri_ids: np.ndarray) -> np.ndarray:
+        """Face normals flipped to point up (z >= 0)."""
+        normals = self.face_normals(tri_ids)
+        return normals * np.where(normals[:, 2:] < 0, -1.0, 1.0)
+
+    def face_normals(self, tri_ids: np.ndarray) -> np.ndarray:
+        a, b, c = (self.vertices[self.faces[tri_ids, k]] for k in range(3))
+        normals = np.cross(b - a, c - a)
+        length = np.linalg.norm(normals, axis=1, keepdims=True)
+        np.divide(normals, length, out=normals, where=length > 0)
+        return normals
+
+    def _barycentric(self, p: np.ndarray, tri_ids: np.ndarray, eps: float = 1e-9) -> Tuple[np.ndarray, np.ndarray]:
+        a, b, c = (self.vertices[self.faces[tri_ids, k], :2] for k in range(3))
+        v0, v1, v2 = b - a, c - a, p - a
+        den = v0[:, 0] * v1[:, 1] - v1[:, 0] * v0[:, 1]
+        safe = np.where(np.abs(den) > 1e-15, den, 1.0)
+        v = (v2[:, 0] * v1[:, 1] - v1[:, 0] * v2[:, 1]) / safe
+        w = (v0[:, 0] * v2[:, 1] - v2[:, 0] * v0[:, 1]) / safe
+        u = 1.0 - v - w
+        ok = (np.abs(den) > 1e-15) & (u >= -eps) & (v >= -eps) & (w >= -eps)
+        return np.column_stack((u, v, w)), ok
+
+
+def _unit_or(vectors: np.ndarray, fallback: np.ndarray) -> np.ndarray:
+    """Rows of ``vectors`` scaled to unit length; zero rows take ``fallback``."""
+    length = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.where(length > 1e-12, vectors / np.where(length > 1e-12, length, 1.0), fallback)
+
+
+def _half_offsets(dim: int) -> np.ndarray:
+    # The zero offset plus every neighbour offset whose first non-zero step is
+    # positive, so each unordered pair of adjacent cells is visited once
+    offsets = np.array(list(np.ndindex(*(3,) * dim)), dtype=np.int64) - 1
+    first = np.array([o[np.flatnonzero(o)[0]] if o.any() else 1 for o in offsets])
+    return offsets[first > 0]
+
+
+class HashGrid:
+    """Hashed uniform grid: integer cell coordinates packed into sorted int64 keys.
+
+    ``items`` are kept grouped by cell; ``lookup`` finds the run of items for
+    any cell with one ``searchsorted``, so building is O(n log n) and queries
+    are O(log n) each, all vectorized.
+    """
+
+    def __init__(self, coords: np.ndarray, items: np.ndarray):
+        coords = np.asarray(coords, dtype=np.int64)
+        self.lo = coords.min(axis=0) - 1
+        self.span = coords.max(axis=0) - self.lo + 2
+        if np.prod(self.span.astype(np.float64)) >= 2.0 ** 62:
+            raise ValueError("grid too fine for its extent; use larger cells")
+        self.strides = np.concatenate((np.cumprod(self.span[::-1])[::-1][1:], [1])).astype(np.int64)
+        keys = self.keys(coords)
+        order = np.argsort(keys, kind="stable")
+        self.items = np.asarray(items)[order]
+        self.cell_keys, self.cell_start, self.cell_count = np.unique(keys[order], return_index=True, return_counts=True)
+
+    def keys(self, coords: np.ndarray) -> np.ndarray:
+        return (np.asarray(coords, dtype=np.int64) - self.lo) @ self.strides
+
+    def lookup(self, coords: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(start, count)`` into ``items`` for each queried cell (count 0 if empty)."""
+        coords = np.asarray(coords, dtype=np.int64)
+        in_range = np.all((coords >= self.lo) & (coords < self.lo + self.span), axis=-1)
+        keys = self.keys(np.where(in_range[..., None], coords, self.lo))
+        pos = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+        found = in_range & (self.cell_keys[pos] == keys)
+        return self.cell_start[pos], np.where(found, self.cell_count[pos], 0)
+
+
+def _expand(start: np.ndarray, count: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # For query rows with item runs [start, start + count): (row, item position) pairs
+    rows = np.repeat(np.arange(len(count)), count)
+    pos = np.repeat(start - np.cumsum(count) + count, count) + np.arange(count.sum())
+    return rows, pos
+
+
+def _grid_cell(cell: float, lo: np.ndarray, hi: np.ndarray) -> float:
+    """``cell``, enlarged where needed to keep a grid over ``[lo, hi]`` within ``MAX_GRID_CELLS_PER_AXIS``."""
+    return float(max(cell, float(np.max(hi - lo)) / MAX_GRID_CELLS_PER_AXIS, 1e-9))
+
+
+def close_pairs(points: np.ndarray, radii: np.ndarray, clearance: float = 0.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Find every pair of spheres/discs closer than ``r_i + r_j + clearance``.
+
+    Returns ``(i, j, gap)`` with ``i < j`` and ``gap`` the surface-to-surface
+    distance (negative when the stones overlap). Cells are as wide as the
+    largest possible interaction, so only adjacent cells need to be compared.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    radii = np.asarray(radii, dtype=np.float64)
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+    if len(points) < 2:
+        return empty
+    # Coordinates are taken from the lower corner, so far-off models cannot overflow either
+    origin = points.min(axis=0)
+    cell = _grid_cell(2.0 * radii.max() + clearance, origin, points.max(axis=0))
+    coords = np.floor((points - origin) / cell).astype(np.int64)
+    grid = HashGrid(coords, np.arange(len(points)))
+    sorted_coords = coords[grid.items]
+
+    found_i, found_j, found_gap = [], [], []
+    for offset in _half_offsets(points.shape[1]):
+        start, count = grid.lookup(sorted_coords + offset)
+        rows, pos = _expand(start, count)
+        if not offset.any():
+            keep = rows < pos  # same cell: each unordered pair once, no self pairs
+            rows, pos = rows[keep], pos[keep]
+        i, j = grid.items[rows], grid.items[pos]
+        gap = np.linalg.norm(points[i] - points[j], axis=1) - radii[i] - radii[j]
+        close = gap < clearance
+        found_i.append(np.minimum(i, j)[close])
+        found_j.append(np.maximum(i, j)[close])
+        found_gap.append(gap[close])
+    if not found_i:
+        return empty
+    return np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_gap)
+
+
+def segment_distances(points: np.ndarray, seg_a: np.ndarray, seg_b: np.ndarray, reach: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Distance from each point to the nearest segment, looking no further than ``reach``.
+
+    Returns ``(distance, segment_idx)``; points with no segment within reach
+    get ``inf`` and ``-1``. Segments are hashed into every cell their bounding
+    box touches, and each point only tests segments from its 3^d neighbourhood.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    seg_a = np.asarray(seg_a, dtype=np.float64)
+    seg_b = np.asarray(seg_b, dtype=np.float64)
+    dist = np.full(len(points), np.inf)
+    nearest = np.full(len(points), -1, dtype=np.int64)
+    if len(points) == 0 or len(seg_a) == 0:
+        return dist, nearest
+
+    seg_lo, seg_hi = np.minimum(seg_a, seg_b), np.maximum(seg_a, seg_b)
+    origin = np.minimum(points.min(axis=0), seg_lo.min(axis=0))
+    # Long segments widen the cells rather than fill thousands of them
+    cell = _grid_cell(max(reach, float(np.max(seg_hi - seg_lo)) / MAX_SEGMENT_CELLS), origin,
+                     np.maximum(points.max(axis=0), seg_hi.max(axis=0)))
+    c0 = np.floor((seg_lo - origin) / cell).astype(np.int64)
+    span = np.floor((seg_hi - origin) / cell).astype(np.int64) - c0 + 1
+    counts = np.prod(span, axis=1)
+    seg_ids, local = _expand(np.zeros(len(counts), dtype=np.int64), counts)
+    cells = np.empty((len(seg_ids), points.shape[1]), dtype=np.int64)
+    for axis in range(points.shape[1] - 1, -1, -1):
+        cells[:, axis] = c0[seg_ids, axis] + local % span[seg_ids, axis]
+        local = local // span[seg_ids, axis]
+    grid = HashGrid(cells, seg_ids)
+
+    neighbours = np.array(list(np.ndindex(*(3,) * points.shape[1])), dtype=np.int64) - 1
+    coords = np.floor((points - origin) / cell).astype(np.int64)
+    start, count = grid.lookup(coords[:, None, :] + neighbours[None, :, :])
+    rows, pos = _expand(start.ravel(), count.ravel())
+    pt = rows // len(neighbours)
+    seg = grid.items[pos]
+
+    a, ab = seg_a[seg], seg_b[seg] - seg_a[seg]
+    denom = np.einsum("ij,ij->i", ab, ab)
+    t = np.clip(np.einsum("ij,ij->i", points[pt] - a, ab) / np.where(denom > 0, denom, 1.0), 0.0, 1.0)
+    d = np.linalg.norm(points[pt] - (a + t[:, None] * ab), axis=1)
+
+    # Nearest segment per point: sort by (point, distance), keep the first of each run
+    order = np.lexsort((d, pt))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = pt[order][1:] != pt[order][:-1]
+    best = order[first]
+    dist[pt[best]] = d[best]
+    nearest[pt[best]] = seg[best]
+    return dist, nearest
+
+
+def _morton(cells: np.ndarray) -> np.ndarray:
+    # Interleave the low 10 bits of three integer coordinates into 30-bit codes
+    code = np.zeros(len(cells), dtype=np.int64)
+    for axis in range(3):
+        x = cells[:, axis] & 0x3FF
+        x = (x | (x << 16)) & 0x030000FF
+        x = (x | (x << 8)) & 0x0300F00F
+        x = (x | (x << 4)) & 0x030C30C3
+        x = (x | (x << 2)) & 0x09249249
+        code |= x << axis
+    return code
+
+
+class TriangleBVH:
+    """Bounding volume hierarchy over a triangle mesh, built and traversed with array ops.
+
+    Triangles are sorted along a Morton curve of their centroids and cut into
+    leaves of ``leaf_size``. The tree over the leaves is complete and stored
+    implicitly like a heap (node ``k`` has children ``2k`` and ``2k + 1``), so
+    building it is one sort and one min/max reduction per level.
+
+    Rays are traversed level by level as a frontier of (ray, node) pairs. Each
+    level is one batched slab test. At the leaves, the surviving pairs expand
+    to (ray, triangle) pairs for one batched Moller-Trumbore test.
+    """
+
+    def __init__(self, vertices: np.ndarray, faces: np.ndarray, leaf_size: int = 8):
+        vertices = np.asarray(vertices, dtype=np.float64)
+        faces = np.asarray(faces, dtype=np.int64)
+        if not len(faces):
+            raise ValueError("cannot build a BVH without triangles")
+        self.faces = faces
+        a, b, c = (vertices[faces[:, k]] for k in range(3))
+        lo, hi = np.minimum(np.minimum(a, b), c), np.maximum(np.maximum(a, b), c)
+        box_lo, box_hi = lo.min(axis=0), hi.max(axis=0)
+        cells = ((lo + hi) / 2 - box_lo) / np.maximum(box_hi - box_lo, 1e-12) * 1023
+        order = np.argsort(_morton(cells.astype(np.int64)), kind="stable")
+
+        self.leaf_size = leaf_size
+        self.depth = max(int(np.ceil(np.log2(max(-(-len(faces) // leaf_size), 1)))), 0)
+        self.leaves = 2 ** self.depth
+        slots = self.leaves * leaf_size
+        # Triangle id per leaf slot, -1 for padding
+        self.slot_tri = np.full(slots, -1, dtype=np.int64)
+        self.slot_tri[:len(faces)] = order
+        # Triangle data per slot (padding repeats triangle 0 and is masked by slot_tri)
+        padded = np.concatenate((order, np.zeros(slots - len(faces), dtype=np.int64)))
+        self.origin, self.edge1, self.edge2 = a[padded], (b - a)[padded], (c - a)[padded]
+
+        # Empty (padding) nodes get NaN bounds, which fail every slab comparison;
+        # parents ignore them through fmin/fmax
+        node_lo = np.full((2 * self.leaves, 3), np.nan)
+        node_hi = np.full((2 * self.leaves, 3), np.nan)
+        pad = slots - len(faces)
+        leaf_lo = np.concatenate((lo[order], np.full((pad, 3), np.inf))).reshape(self.leaves, leaf_size, 3).min(axis=1)
+        leaf_hi = np.concatenate((hi[order], np.full((pad, 3), -np.inf))).reshape(self.leaves, leaf_size, 3).max(axis=1)
+        filled = np.isfinite(leaf_lo[:, 0])
+        node_lo[self.leaves:][filled], node_hi[self.leaves:][filled] = leaf_lo[filled], leaf_hi[filled]
+        for level in range(self.depth - 1, -1, -1):
+            k = np.arange(2 ** level, 2 ** (level + 1))
+            node_lo[k] = np.fmin(node_lo[2 * k], node_lo[2 * k + 1])
+            node_hi[k] = np.fmax(node_hi[2 * k], node_hi[2 * k + 1])
+        # Traversal runs in float32 (half the memory traffic); boxes are padded
+        # so rounding can only make them larger
+        margin = 1e-6 * float(np.linalg.norm(box_hi - box_lo)) + 1e-9
+        self.node_lo = (node_lo - margin).astype(np.float32)
+        self.node_hi = (node_hi + margin).astype(np.float32)
+
+    def _slab(self, origins: np.ndarray, inv: np.ndarray, nodes: np.ndarray,
+              reach: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Which nodes each ray enters within ``reach``, and the entry distance."""
+        t0 = (self.node_lo[nodes] - origins) * inv
+        t1 = (self.node_hi[nodes] - origins) * inv
+        near, far = np.minimum(t0, t1), np.maximum(t0, t1)
+        # Component-wise reductions; much faster than reducing over a length-3 axis
+        near = np.maximum(np.maximum(near[:, 0], near[:, 1]), near[:, 2])
+        far = np.minimum(np.minimum(far[:, 0], far[:, 1]), far[:, 2])
+        return (near <= far) & (far >= 0) & (near <= reach), near
+
+    def intersect(self, origins: np.ndarray, directions: np.ndarray, max_distance: float = np.inf,
+                  ignore: Optional[np.ndarray] = None, batch: int = 8192) -> Tuple[np.ndarray, np.ndarray]:
+        """First hit along each ray within ``max_distance``.
+
+        Returns ``(t, triangle)``, with ``inf`` and ``-1`` for rays that hit
+        nothing. ``ignore`` gives one triangle per ray to skip (the triangle a
+        ray starts on).
+
+        The level-by-level traversal cannot stop at the first hit, so every
+        node along the ray's reach is visited. Rays are therefore cast short
+        first, and only the misses are cast again, four times further each
+        pass, up to ``max_distance``. Rays go through in batches to bound the
+        pair arrays.
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+        ignore = np.full(len(origins), -1, dtype=np.int64) if ignore is None else np.asarray(ignore, dtype=np.int64)
+        t = np.full(len(origins), np.inf)
+        tri = np.full(len(origins), -1, dtype=np.int64)
+        diagonal = float(np.linalg.norm(self.node_hi[1] - self.node_lo[1]))
+        limit = min(float(max_distance), diagonal * np.sqrt(3) + 1e-9)
+        reach = limit / 64
+        pending = np.arange(len(origins))
+        while len(pending):
+            reach = min(reach * 4, limit)
+            for start in range(0, len(pending), batch):
+                part = pending[start:start + batch]
+                t[part], tri[part] = self._intersect(origins[part], directions[part], reach, ignore[part])
+            if reach >= limit:
+                break
+            pending = pending[tri[pending] < 0]
+        return t, tri
+
+    def _intersect(self, origins: np.ndarray, directions: np.ndarray, reach: float,
+                   ignore: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        n = len(origins)
+        o32 = origins.astype(np.float32)
+        # Zero components become tiny ones, so no inf * 0 NaNs in the slab test
+        inv = (1.0 / np.where(directions == 0, 1e-30, directions)).astype(np.float32)
+        r32 = np.float32(reach)
+        rays = np.arange(n)
+        nodes = np.ones(n, dtype=np.int64)
+        with np.errstate(invalid="ignore", over="ignore"):
+            keep, near = self._slab(o32, inv, nodes, r32)
+            rays, nodes = rays[keep], nodes[keep]
+            for _ in range(self.depth):
+                rays = np.repeat(rays, 2)
+                nodes = (np.repeat(nodes, 2) << 1) | np.tile(np.array([0, 1]), len(nodes))
+                keep, near = self._slab(o32[rays], inv[rays], nodes, r32)
+                rays, nodes, near = rays[keep], nodes[keep], near[keep]
+
+        # Leaves in order of entry along each ray. Round k tests every active
+        # ray's k-th leaf; a ray is done once its hit is nearer than its next leaf.
+        order = np.lexsort((near, rays))
+        rays, leaves, near = rays[order], nodes[order] - self.leaves, near[order]
+        best_t = np.full(n, np.inf)
+        best_tri = np.full(n, -1, dtype=np.int64)
+        pos = np.flatnonzero(np.concatenate(([True], rays[1:] != rays[:-1]))) if len(rays) else rays
+        end = np.append(pos[1:], len(rays))
+        while len(pos):
+            t, tri = self._leaf_hits(origins, directions, rays[pos], leaves[pos], reach, ignore)
+            ray = rays[pos]
+            better = t < best_t[ray]
+            best_t[ray[better]], best_tri[ray[better]] = t[better], tri[better]
+            pos = pos + 1
+            going = pos < end
+            going[going] = near[pos[going]] <= best_t[ray[going]]
+            pos, end = pos[going], end[going]
+        return best_t, best_tri
+
+    def _leaf_hits(self, origins: np.ndarray, directions: np.ndarray, rays: np.ndarray, leaves: np.ndarray,
+                   reach: float, ignore: np.ndarray, eps: float = 1e-9) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest hit of each (ray, leaf) pair among the leaf's triangles (Moller-Trumbore)."""
+        k = self.leaf_size
+        slots = (leaves * k)[:, None] + np.arange(k)
+        tri = self.slot_tri[slots]
+        o = origins[rays][:, None, :]
+        d = directions[rays][:, None, :]
+        # Padding slots point at triangle 0 and are masked out below
+        e1, e2 = self.edge1[slots], self.edge2[slots]
+        s = o - self.origin[slots]
+        px = d[..., 1] * e2[..., 2] - d[..., 2] * e2[..., 1]
+        py = d[..., 2] * e2[..., 0] - d[..., 0] * e2[..., 2]
+        pz = d[..., 0] * e2[..., 1] - d[..., 1] * e2[..., 0]
+        det = e1[..., 0] * px + e1[..., 1] * py + e1[..., 2] * pz
+        ok = (np.abs(det) > 1e-15) & (tri >= 0) & (tri != ignore[rays][:, None])
+        inv_det = 1.0 / np.where(ok, det, 1.0)
+        u = (s[..., 0] * px + s[..., 1] * py + s[..., 2] * pz) * inv_det
+        qx = s[..., 1] * e1[..., 2] - s[..., 2] * e1[..., 1]
+        qy = s[..., 2] * e1[..., 0] - s[..., 0] * e1[..., 2]
+        qz = s[..., 0] * e1[..., 1] - s[..., 1] * e1[..., 0]
+        v = (d[..., 0] * qx + d[..., 1] * qy + d[..., 2] * qz) * inv_det
+        t = (e2[..., 0] * qx + e2[..., 1] * qy + e2[..., 2] * qz) * inv_det
+        hit = ok & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > eps) & (t <= reach)
+        t = np.where(hit, t, np.inf)
+        nearest = t.argmin(axis=1)
+        rows = np.arange(len(rays))
+        t = t[rows, nearest]
+        return t, np.where(np.isfinite(t), tri[rows, nearest], -1)
+
+
+def connected_components(n: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Component label (0..k-1) for each of ``n`` items linked by the pairs ``(i, j)``.
+
+    Min-label propagation with pointer jumping; a handful of array passes for
+    the small, local clusters this is used on.
+    """
+    labels = np.arange(n)
+    i, j = np.asarray(i, dtype=np.int64), np.asarray(j, dtype=np.int64)
+    while True:
+        low = np.minimum(labels[i], labels[j])
+        new = labels.copy()
+        np.minimum.at(new, i, low)
+        np.minimum.at(new, j, low)
+        new = new[new]
+        if np.array_equal(new, labels):
+            break
+        labels = new
+    return np.unique(labels, return_inverse=True)[1]
@@ -0,0 +1,41 @@
+"""On-disk home of generated files served under ``/static``.
+
+Exports, blueprints and renders are written below ``CAD_STATIC_DIR`` and
+handed back to clients as ``/static/<kind>/<name>`` URLs. The default
+directory is anchored to the backend directory, not to wherever the process
+was started. Kinds whose files are one-off results (uuid-named, nothing
+looks them up again) are pruned by age with ``expire``.
+"""
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+
+STATIC_DIR = Path(os.getenv("CAD_STATIC_DIR", Path(__file__).resolve().parent.parent / "static"))
+STATIC_URL = "/static"
+
+
+def static_path(kind: str, suffix: str, name: Optional[str] = None) -> Tuple[Path, str]:
+    """Filesystem path and public URL for a new file under ``<kind>/``.
+
+    ``name`` defaults to a random hex id, so concurrent jobs never collide.
+    """
+    name = f"{name or uuid.uuid4().hex}{suffix}"
+    directory = STATIC_DIR / kind
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / name, f"{STATIC_URL}/{kind}/{name}"
+
+
+def expire(kind: str, max_age: float) -> int:
+    """Delete files under ``<kind>/`` last modified more than ``max_age`` seconds ago; returns the count."""
+    cutoff = time.time() - max_age
+    removed = 0
+    for path in (STATIC_DIR / kind).glob("*"):
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
@@ -0,0 +1,254 @@
+"""Vectorized stone placement for the auto diamond fill endpoints.
+
+Lattices are generated column by column (x outer, y inner) in a single NumPy
+pass, so the output order matches the original nested ``while`` loops. In
+``surface`` mode the lattice is dropped onto the region mesh through a
+:class:`~.spatial.SurfaceIndex` and stones are oriented to the surface normals.
+"""
+import os
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .spatial import SurfaceIndex
+
+# Largest lattice (before clipping to the region) a fill may allocate
+MAX_LATTICE_POINTS = int(os.getenv("CAD_MAX_LATTICE_POINTS", "4000000"))
+
+MIXED_SHAPES = ("round", "princess", "oval", "emerald")
+PLACEMENT_MODES = ("planar", "surface")
+
+GRID_ALIASES = {
+    "square": "square",
+    "grid": "square",
+    "pave": "square",
+    "hex": "hex",
+    "hexagonal": "hex",
+    "honeycomb": "hex",
+    "honeycomb_pave": "hex",
+    "staggered": "staggered",
+    "offset": "staggered",
+    "brick": "staggered",
+}
+
+
+@dataclass
+class FillResult:
+    positions: np.ndarray  # (N, 3) float64, C-contiguous
+    shape_ids: np.ndarray  # (N,) uint8 indices into ``shapes``
+    shapes: Tuple[str, ...]
+    grid_type: str
+    normals: np.ndarray  # (N, 3) unit seat axes
+
+    @property
+    def count(self) -> int:
+        return int(self.positions.shape[0])
+
+    def preview(self, limit: int = 10) -> list:
+        # Same [x, y, z, shape] rows the report has always exposed
+        head = self.positions[:limit].tolist()
+        names = [self.shapes[i] for i in self.shape_ids[:limit]]
+        return [row + [name] for row, name in zip(head, names)]
+
+    def to_dict(self) -> dict:
+        return {
+            "positions": self.positions.tolist(),
+            "normals": self.normals.tolist(),
+            "shape_ids": self.shape_ids.tolist(),
+            "shapes": list(self.shapes),
+        }
+
+
+def normalize_grid_type(grid_type: str) -> str:
+    key = (grid_type or "square").strip().lower()
+    if key not in GRID_ALIASES:
+        raise ValueError(f"Unsupported grid_type '{grid_type}'")
+    return GRID_ALIASES[key]
+
+
+def as_vertices(region_mesh) -> np.ndarray:
+    # Binary uploads arrive as float32 views; use them as-is instead of copying
+    region = np.asarray(region_mesh)
+    if region.dtype.kind != "f":
+        region = region.astype(np.float64)
+    if region.ndim != 2 or region.shape[0] == 0 or region.shape[1] != 3:
+        raise ValueError("region_mesh must be a non-empty list of [x, y, z] vertices")
+    return region
+
+
+@dataclass
+class PreparedRegion:
+    """Region mesh work that does not depend on the fill parameters.
+
+    Built once per region (see :mod:`.region_cache`) and reused while the
+    designer only changes spacing, padding, stone size or grid type.
+    """
+    vertices: Optional[np.ndarray]
+    faces: Optional[np.ndarray]  # None for a triangle soup
+    bounds: Tuple[np.ndarray, np.ndarray]
+    index: Optional[SurfaceIndex] = None  # built on the first surface fill
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.vertices, self.faces]
+        if self.index is not None:
+            arrays += [self.index.vertices, self.index.faces, self.index.cell_tris, self.index.cell_start]
+        # The index shares the vertex (and usually face) buffers; count each once
+        unique = {id(a): a for a in arrays if a is not None}
+        return int(sum(a.nbytes for a in unique.values()))
+
+    def for_mode(self, mode: str) -> "PreparedRegion":
+        """The part a fill in ``mode`` needs (planar fills only use the bounds)."""
+        return self if mode == "surface" else replace(self, vertices=None, faces=None, index=None)
+
+
+def prepare_region(region_mesh, faces=None, surface: bool = False) -> PreparedRegion:
+    if isinstance(region_mesh, PreparedRegion):
+        region = region_mesh
+    else:
+        vertices = as_vertices(region_mesh)
+        region = PreparedRegion(vertices=vertices, faces=faces, bounds=(vertices.min(axis=0), vertices.max(axis=0)))
+    if surface and region.index is None:
+        region = replace(region, index=SurfaceIndex(region.vertices, region.faces))
+    return region
+
+
+@dataclass(frozen=True)
+class Lattice:
+    """Stone lattice over a box, numbered column by column (x outer, y inner).
+
+    Points are generated by index range (``points``), so a large fill can be
+    produced in bounded slices.
+    """
+    lo: np.ndarray
+    hi: np.ndarray
+    pitch: float
+    col_step: float
+    stagger: float  # y shift of every odd column
+    columns: int
+    rows: int
+    clipped: bool  # some points fall outside ``[lo, hi)`` and are dropped
+
+    @property
+    def size(self) -> int:
+        """Points before clipping to the box."""
+        return self.columns * self.rows
+
+    def points(self, start: int = 0, stop: Optional[int] = None, out_dim: int = 2) -> np.ndarray:
+        """(N, out_dim) points with numbers in ``[start, stop)`` that lie inside the box.
+
+        Extra output columns are left for the caller to fill (e.g. z).
+        """
+        stop = self.size if stop is None else min(stop, self.size)
+        if stop <= start:
+            return np.empty((0, out_dim), dtype=np.float64)
+        col, row = np.divmod(np.arange(start, stop), self.rows)
+        grid = np.empty((stop - start, out_dim), dtype=np.float64)
+        grid[:, 0] = self.lo[0] + col * self.col_step
+        grid[:, 1] = self.lo[1] + row * self.pitch + self.stagger * (col & 1)
+        if not self.clipped:
+            return grid
+        return grid[(grid[:, 0] < self.hi[0]) & (grid[:, 1] < self.hi[1])]
+
+
+def plan_lattice(lo, hi, pitch: float, grid_type: str, max_points: int = MAX_LATTICE_POINTS) -> Lattice:
+    """Lattice inside ``[lo, hi)`` for the given grid type.
+
+    ``hex`` packs columns ``pitch * sqrt(3) / 2`` apart with every other column
+    shifted by half a pitch; ``staggered`` uses the same shift at full column
+    spacing; ``square`` is the plain grid. Raises ``ValueError`` when the
+    lattice would have more than ``max_points`` points.
+    """
+    if not pitch > 0:
+        raise ValueError("stone_size + spacing must be positive")
+    grid_type = normalize_grid_type(grid_type)
+    lo = np.asarray(lo, dtype=np.float64)
+    hi = np.asarray(hi, dtype=np.float64)
+    col_step = pitch * np.sqrt(3.0) / 2.0 if grid_type == "hex" else pitch
+    stagger = 0.0 if grid_type == "square" else pitch / 2.0
+    extent = hi - lo
+    if extent[0] <= 0 or extent[1] <= 0:
+        return Lattice(lo, hi, pitch, col_step, stagger, 0, 0, False)
+
+    # Counted in floats first, so an absurd pitch cannot overflow the ints
+    cols, rows = np.ceil(extent[0] / col_step), np.ceil(extent[1] / pitch)
+    if not cols * rows <= max_points:
+        raise ValueError(
+            f"stone_size + spacing of {pitch:g} would place about {cols * rows:.3g} stones in this region; "
+            f"at most {max_points} are allowed"
+        )
+    nx, ny = int(cols), int(rows)
+    # Bounds are checked on the last column / row; only rounding at the far
+    # edge or the shifted columns ever need the full per-point mask.
+    last_shift = stagger if nx > 1 else 0.0
+    clipped = not (lo[0] + (nx - 1) * col_step < hi[0] and lo[1] + (ny - 1) * pitch + last_shift < hi[1])
+    return Lattice(lo, hi, pitch, col_step, stagger, nx, ny, clipped)
+
+
+def lattice_2d(lo, hi, pitch: float, grid_type: str, out_dim: int = 2,
+               max_points: int = MAX_LATTICE_POINTS) -> np.ndarray:
+    """Return (N, out_dim) lattice points inside ``[lo, hi)``; see ``plan_lattice``."""
+    return plan_lattice(lo, hi, pitch, grid_type, max_points).points(out_dim=out_dim)
+
+
+def fill_lattice(bounds, stone_size: float, spacing: float, padding: float, grid_type: str) -> Lattice:
+    """The lattice ``fill_region`` lays over a region with these bounds."""
+    min_xyz, max_xyz = bounds
+    return plan_lattice(np.asarray(min_xyz)[:2] + padding, np.asarray(max_xyz)[:2] - padding,
+                        stone_size + spacing, grid_type)
+
+
+def shape_names(stone_shape: str) -> Tuple[str, ...]:
+    return MIXED_SHAPES if stone_shape == "mixed" else (stone_shape,)
+
+
+def assign_shapes(count: int, stone_shape: str, first: int = 0) -> Tuple[np.ndarray, Tuple[str, ...]]:
+    """Shape ids for ``count`` stones, the first of them being stone number ``first``."""
+    if stone_shape == "mixed":
+        # Stones are numbered from 1, so the first stone is a princess cut
+        ids = np.arange(first + 1, first + count + 1, dtype=np.uint64) % len(MIXED_SHAPES)
+        return ids.astype(np.uint8), MIXED_SHAPES
+    return np.zeros(count, dtype=np.uint8), (stone_shape,)
+
+
+def fill_region(
+    region_mesh,
+    stone_size: float,
+    spacing: float,
+    padding: float,
+    grid_type: str,
+    stone_shape: str,
+    mode: str = "planar",
+    faces=None,
+    span: Optional[Tuple[int, int]] = None,
+    first: int = 0,
+) -> FillResult:
+    """Fill ``region_mesh`` (vertices or a :class:`PreparedRegion`) with a stone lattice.
+
+    ``planar`` lays the lattice flat at the lowest z of the region's bounding
+    box. ``surface`` treats the region as a triangle mesh (``faces``, or a
+    triangle soup when omitted), drops the lattice vertically onto it, keeps
+    only the points that land and orients each stone to the surface normal
+    interpolated from the vertex normals, always pointing up.
+
+    ``span`` limits the fill to that range of lattice points (see
+    ``fill_lattice``), and ``first`` is the number of stones placed before it,
+    so slices filled one after another add up to the whole fill.
+    """
+    if mode not in PLACEMENT_MODES:
+        raise ValueError(f"Unsupported placement_mode '{mode}'")
+    grid = normalize_grid_type(grid_type)
+    region = prepare_region(region_mesh, faces, surface=mode == "surface")
+    index = region.index if mode == "surface" else None
+    lattice = fill_lattice(region.bounds, stone_size, spacing, padding, grid)
+    positions = lattice.points(*(span or (0, None)), out_dim=3)
+
+    if index is None:
+        positions[:, 2] = region.bounds[0][2]
+        normals = np.zeros_like(positions)
+        normals[:, 2] = 1.0
+    else:
+        _, positions, normals = index.project(positions[:, :2])
+    shape_ids, shapes = assign_shapes(positions.shape[0], stone_shape, first)
+    return FillResult(positions=positions, shape_ids=shape_ids, shapes=shapes, grid_type=grid, normals=normals)
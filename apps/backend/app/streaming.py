@@ -0,0 +1,107 @@
+"""NDJSON streaming for large CAD results.
+
+A streamed response is one JSON record per line:
+
+1. a header record (``report`` / ``header``),
+2. the data, ``STREAM_CHUNK_SIZE`` items per record, each with its ``offset``,
+3. a closing ``{"type": "done", "count": N}`` record.
+
+The data is computed ``STREAM_SLICE_SIZE`` items at a time, one pool job per
+slice, and each slice is sent before the next is computed. The first bytes
+go out once the first slice is ready, and the server holds at most one slice,
+however large the result. Clients can render placements as they arrive and
+tell a truncated stream from a complete one by the ``done`` record. A
+failure after the response has started is reported as a final
+``{"type": "error", "detail": ...}`` record instead.
+"""
+import json
+import os
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_CHUNK_SIZE = 2000
+# Items computed per pool job while streaming
+STREAM_SLICE_SIZE = int(os.getenv("CAD_STREAM_SLICE_SIZE", "50000"))
+
+
+def wants_stream(request) -> bool:
+    """Streaming is requested with ``Accept: application/x-ndjson`` or ``?stream=true``."""
+    if request.query_params.get("stream", "").lower() in ("1", "true", "yes"):
+        return True
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson(records: Iterable[dict]) -> Iterator[bytes]:
+    for record in records:
+        yield json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+
+async def ndjson_async(records: AsyncIterable[dict]) -> AsyncIterator[bytes]:
+    try:
+        async for record in records:
+            yield json.dumps(record, separators=(",", ":")).encode() + b"\n"
+    except Exception as e:
+        # The status line is already sent; report the failure in-band, with no "done" record
+        yield json.dumps({"type": "error", "detail": str(e)}, separators=(",", ":")).encode() + b"\n"
+
+
+def stream_response(records: Union[Iterable[dict], AsyncIterable[dict]]) -> StreamingResponse:
+    """Records may come from an async generator when they arrive as work completes."""
+    body = ndjson_async(records) if hasattr(records, "__aiter__") else ndjson(records)
+    return StreamingResponse(body, media_type=NDJSON_MEDIA_TYPE)
+
+
+async def fill_records(report: dict, shapes: Tuple[str, ...], fills: AsyncIterable,
+                       chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[dict]:
+    """Records for ``/cad/auto-diamond-fill`` from consecutive ``FillResult`` slices.
+
+    The region mesh is never echoed. The stone count is only known at the
+    end, so it comes in the ``done`` record.
+    """
+    yield {"type": "report", "diamond_report": report, "shapes": list(shapes)}
+    count = 0
+    async for fill in fills:
+        for start in range(0, fill.count, chunk_size):
+            stop = start + chunk_size
+            yield {
+                "type": "placements",
+                "offset": count + start,
+                "positions": fill.positions[start:stop].tolist(),
+                "normals": fill.normals[start:stop].tolist(),
+                "shape_ids": fill.shape_ids[start:stop].tolist(),
+            }
+        count += fill.count
+    yield {"type": "done", "count": count}
+
+
+async def seat_records(header: dict, slices: AsyncIterable[Tuple[list, Optional[Tuple[np.ndarray, np.ndarray]]]],
+                       count: int, chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[dict]:
+    """Records for ``/cad/diamond-seats`` from consecutive ``(rows, mesh)`` slices.
+
+    ``rows`` are the seat geometry entries of a slice. Its cutter mesh, when
+    requested, follows them as ``mesh_vertices`` then ``mesh_faces`` chunks;
+    offsets and face indices refer to the merged mesh of the whole stream.
+    """
+    yield {"type": "header", **header, "count": count}
+    offset = vertex_offset = face_offset = 0
+    async for rows, mesh in slices:
+        for start in range(0, len(rows), chunk_size):
+            yield {"type": "seats", "offset": offset + start, "seat_geometries": rows[start:start + chunk_size]}
+        offset += len(rows)
+        if mesh is None:
+            continue
+        vertices, faces = mesh
+        # Mesh rows are small, so send more of them per record
+        step = chunk_size * 16
+        for start in range(0, len(vertices), step):
+            yield {"type": "mesh_vertices", "offset": vertex_offset + start,
+                   "vertices": vertices[start:start + step].tolist()}
+        for start in range(0, len(faces), step):
+            yield {"type": "mesh_faces", "offset": face_offset + start,
+                   "faces": (faces[start:start + step] + vertex_offset).tolist()}
+        vertex_offset += len(vertices)
+        face_offset += len(faces)
+    yield {"type": "done", "count": offset}
@@ -0,0 +1,646 @@
+"""Streaming SVG import to flattened polylines (engraving artwork, logos).
+
+The document is fed to an expat parser chunk by chunk as it arrives, and
+shapes are handled in its element callbacks, so no element tree is built and
+memory holds only the output polylines and the path data of one batch.
+
+Shapes are buffered as path data. About ``PATH_BATCH_SIZE`` characters at a
+time are parsed together by ``parse_paths`` into absolute segment arrays,
+without a Python pass per path, and NumPy flattens the batch in one go:
+- Quadratics are degree-elevated to cubics.
+- Cubics get a segment count from Wang's formula for the tolerance.
+- Arcs are converted to centre form (SVG spec F.6.5) and stepped by the
+  chord error.
+- All samples of each kind are evaluated in one pass and scattered back in
+  drawing order.
+
+Output is in millimetres, y up: the root ``viewBox``/``width``/``height``
+give the scale, and element transforms are applied. The tolerance is in
+output millimetres. ``<use>``, text, clip paths and masks are skipped.
+"""
+import math
+import os
+import re
+from dataclasses import dataclass
+from itertools import compress, repeat
+from typing import List, Optional, Sequence, Tuple
+from xml.parsers import expat
+
+import numpy as np
+
+DEFAULT_TOLERANCE = 0.01  # mm
+MAX_SUBDIVISIONS = 512
+# Path data (characters) buffered before one batched parse and flatten
+PATH_BATCH_SIZE = 1 << 20
+# Largest SVG upload, and how much of it is fed to the parser per thread hop
+MAX_SVG_SIZE = int(os.getenv("CAD_MAX_SVG_MB", "64")) * 1024 * 1024
+FEED_SIZE = 1 << 20
+
+SHAPES = ("path", "line", "polyline", "polygon", "rect", "circle", "ellipse")
+# Containers whose children are not drawn directly
+NON_RENDERED = ("defs", "clipPath", "mask", "symbol", "pattern", "marker", "metadata", "style", "title", "desc")
+UNIT_MM = {"mm": 1.0, "cm": 10.0, "in": 25.4, "pt": 25.4 / 72, "pc": 25.4 / 6, "px": 25.4 / 96, "": 25.4 / 96}
+
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+NUMBER_RE = re.compile(_NUMBER)
+COMMAND_RE = re.compile(r"([MmZzLlHhVvCcSsQqTtAa])([^MmZzLlHhVvCcSsQqTtAa]*)")
+ARG_COUNTS = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7}
+TRANSFORM_RE = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+LENGTH_RE = re.compile(rf"^\s*({_NUMBER})\s*([a-z%]*)\s*$")
+
+# Segment kinds
+MOVE, LINE, CUBIC, ARC = 0, 1, 2, 3
+
+# Path commands as op codes, and for each the argument holding the new
+# current point's x / y (-1: that coordinate is unchanged)
+OPS = "MLHVCSQTAZ"
+OP_M, OP_L, OP_H, OP_V, OP_C, OP_S, OP_Q, OP_T, OP_A, OP_Z = range(len(OPS))
+OP_ARGS = np.array([ARG_COUNTS.get(op, 0) for op in OPS])
+END_X = np.array([0, 0, 0, -1, 4, 2, 2, 0, 5, -1])
+END_Y = np.array([1, 1, -1, 0, 5, 3, 3, 1, 6, -1])
+# Joins the paths of a batch; it cannot occur in XML text
+PATH_BREAK = "\x00"
+BREAK = 2 * len(OPS)
+# Token code 2 * op, +1 for relative commands
+TOKEN_CODES = {c: 2 * OPS.index(c.upper()) + c.islower() for c in OPS + OPS.lower()}
+TOKEN_CODES[PATH_BREAK] = BREAK
+PLAIN_NUMBER_RE = re.compile(_NUMBER + r"\Z")
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _numbers(text: Optional[str]) -> np.ndarray:
+    return np.array(NUMBER_RE.findall(text or ""), dtype=np.float64)
+
+
+def parse_transform(text: Optional[str]) -> np.ndarray:
+    """3x3 affine matrix of an SVG ``transform`` attribute."""
+    m = np.eye(3)
+    for name, args in TRANSFORM_RE.findall(text or ""):
+        v = _numbers(args)
+        t = np.eye(3)
+        if name == "matrix" and len(v) == 6:
+            t[:2] = [[v[0], v[2], v[4]], [v[1], v[3], v[5]]]
+        elif name == "translate" and len(v):
+            t[0, 2], t[1, 2] = v[0], (v[1] if len(v) > 1 else 0.0)
+        elif name == "scale" and len(v):
+            t[0, 0], t[1, 1] = v[0], (v[1] if len(v) > 1 else v[0])
+        elif name == "rotate" and len(v):
+            a = math.radians(v[0])
+            r = np.array([[math.cos(a), -math.sin(a), 0], [math.sin(a), math.cos(a), 0], [0, 0, 1]])
+            if len(v) == 3:
+                r = np.array([[1, 0, v[1]], [0, 1, v[2]], [0, 0, 1]]) @ r @ np.array([[1, 0, -v[1]], [0, 1, -v[2]], [0, 0, 1]])
+            t = r
+        elif name == "skewX" and len(v):
+            t[0, 1] = math.tan(math.radians(v[0]))
+        elif name == "skewY" and len(v):
+            t[1, 0] = math.tan(math.radians(v[0]))
+        m = m @ t
+    return m
+
+
+def _length_mm(text: Optional[str]) -> Optional[float]:
+    match = LENGTH_RE.match(text or "")
+    if not match or match.group(2) not in UNIT_MM:
+        return None
+    return float(match.group(1)) * UNIT_MM[match.group(2)]
+
+
+def root_matrix(attrib: dict) -> np.ndarray:
+    """User units to millimetres with y flipped up, from the root's viewBox and size."""
+    box = _numbers(attrib.get("viewBox"))
+    width, height = _length_mm(attrib.get("width")), _length_mm(attrib.get("height"))
+    if len(box) == 4 and box[2] > 0 and box[3] > 0:
+        # Uniform scale, as for the default preserveAspectRatio="xMidYMid meet"
+        fits = [size / extent for size, extent in ((width, box[2]), (height, box[3])) if size]
+        s = min(fits) if fits else UNIT_MM["px"]
+        x0, y0, h = box[0], box[1], box[3]
+    else:
+        s = UNIT_MM["px"]
+        x0, y0, h = 0.0, 0.0, (height / s if height else 0.0)
+    return np.array([[s, 0, -x0 * s], [0, -s, (y0 + h) * s], [0, 0, 1]])
+
+
+@dataclass
+class PathSegments:
+    """Absolute segments of many paths, in drawing order.
+
+    ``kinds`` has one entry per segment; the per-kind arrays hold the numbers
+    of the segments of that kind, in the same order (MOVE/LINE: end point;
+    CUBIC: 4 points; ARC: start, rx, ry, phi, flags, end). ``closed`` has one
+    entry per subpath and ``counts`` the number of segments of each path.
+    """
+    kinds: np.ndarray
+    moves: np.ndarray  # (n, 2)
+    lines: np.ndarray  # (n, 2)
+    cubics: np.ndarray  # (n, 4, 2)
+    arcs: np.ndarray  # (n, 9)
+    closed: np.ndarray
+    counts: np.ndarray
+
+
+def _spaced_arc_flags(d: str) -> str:
+    """``d`` with arc flags written without separators ("a1 1 0 10.5.5") split apart."""
+    parts = []
+    for cmd, text in COMMAND_RE.findall(d):
+        words = NUMBER_RE.findall(text)
+        if cmd in ("A", "a"):
+            spaced = []
+            for word in words:
+                while word and len(spaced) % 7 in (3, 4) and word[0] in "01":
+                    spaced.append(word[0])
+                    word = word[1:]
+                if word:
+                    spaced.append(word)
+            words = spaced
+        parts.append(cmd + " ".join(words))
+    return " ".join(parts)
+
+
+def _tokenize(ds: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Token codes of all paths (``-1`` for numbers), the numbers, and their text.
+
+    Commands and separators are spaced out with ``str.replace`` and the
+    text is split, so well-formed path data never reaches the regex engine.
+    Words that are not one plain number ("1-2", ".5.5", junk) are split the
+    way ``NUMBER_RE`` reads them.
+    """
+    text = PATH_BREAK.join(ds)
+    spaced = text.replace(",", " ")
+    for token in TOKEN_CODES:
+        if token in spaced:
+            spaced = spaced.replace(token, f" {token} ")
+    words = spaced.split()
+    codes = np.fromiter(map(TOKEN_CODES.get, words, repeat(-1)), dtype=np.int64, count=len(words))
+    numbers = None
+    if "_" not in text:
+        texts = list(compress(words, (codes < 0).tolist()))
+        try:
+            numbers = np.array(texts, dtype=np.float64)
+        except ValueError:
+            pass
+        if numbers is not None and not np.isfinite(numbers).all():
+            # float() also reads "inf" / "nan", which are not SVG numbers
+            numbers = None
+    if numbers is None:
+        plain = []
+        for word, code in zip(words, codes.tolist()):
+            if code >= 0 or PLAIN_NUMBER_RE.match(word):
+                plain.append(word)
+            else:
+                plain += NUMBER_RE.findall(word)
+        words = plain
+        codes = np.fromiter(map(TOKEN_CODES.get, words, repeat(-1)), dtype=np.int64, count=len(words))
+        texts = list(compress(words, (codes < 0).tolist()))
+        numbers = np.array(texts, dtype=np.float64)
+        if not np.isfinite(numbers).all():
+            # "1e400" is a valid number token, but overflows to inf
+            raise ValueError("invalid SVG: path data has numbers out of range")
+    return codes, numbers, texts
+
+
+def _resolve(parent: np.ndarray, mult: np.ndarray, add: np.ndarray) -> np.ndarray:
+    """Solve ``value[i] = mult[i] * value[parent[i]] + add[i]`` by pointer jumping.
+
+    Roots point at themselves with ``mult`` 0, and parents come before their
+    children, so a chain of n links takes log2(n) rounds.
+    """
+    while True:
+        grand = parent[parent]
+        if np.array_equal(grand, parent):
+            return mult * add[parent] + add
+        add = mult * add[parent] + add
+        mult = mult * mult[parent]
+        parent = grand
+
+
+def _chain(index: np.ndarray, linked: np.ndarray, root: np.ndarray, mult: float, add: np.ndarray) -> np.ndarray:
+    """``_resolve`` for values that are ``mult * previous + add`` where ``linked``, else ``root``."""
+    return _resolve(np.where(linked, index - 1, index), np.where(linked, mult, 0.0), np.where(linked, add, root))
+
+
+def parse_paths(ds: Sequence[str]) -> PathSegments:
+    """Absolute segments of the SVG path data ``ds``, parsed as one batch.
+
+    Each command is expanded into one op per argument group. The drawing
+    state the spec threads from op to op (current point, subpath start,
+    reflected control points) is then recovered for all ops at once: every
+    op's end point is either absolute, the previous end point plus an offset,
+    or the subpath start, which ``_resolve`` unrolls in a few NumPy passes.
+    """
+    codes, numbers, texts = _tokenize(ds)
+    marks = np.flatnonzero(codes >= 0)
+    number_count = np.cumsum(codes < 0)
+    # Numbers after each command, up to the next command or path break
+    first = (number_count - (codes < 0))[marks]
+    n_args = np.diff(np.append(first, len(numbers)))
+    path_of = np.cumsum(codes[marks] == BREAK)
+    is_cmd = codes[marks] != BREAK
+    marks, first, n_args, path_of = marks[is_cmd], first[is_cmd], n_args[is_cmd], path_of[is_cmd]
+    cmd_op, cmd_rel = codes[marks] // 2, codes[marks] % 2
+    k = OP_ARGS[cmd_op]
+    reps = np.where(cmd_op == OP_Z, 1, n_args // np.maximum(k, 1))
+
+    # One op per argument group; extra pairs after a moveto are linetos
+    owner = np.repeat(np.arange(len(marks)), reps)
+    group = _local_index(reps)
+    op = cmd_op[owner]
+    rel = cmd_rel[owner].astype(bool)
+    path = path_of[owner]
+    arg = first[owner] + group * k[owner]
+    n = len(op)
+
+    arcs = cmd_op == OP_A
+    if np.any(arcs):
+        # Compact arc flags ("a1 1 0 10.5.5") change how the numbers group; the
+        # few paths that use them are rewritten by the scalar splitter first
+        position = _local_index(n_args[arcs])
+        flags = (np.repeat(first[arcs], n_args[arcs]) + position)[np.isin(position % 7, (3, 4))]
+        compact = [i for i in flags.tolist() if len(texts[i]) > 1 and texts[i][0] in "01"]
+        if compact:
+            tokens = np.searchsorted(number_count, compact, side="right")
+            fixed = list(ds)
+            for p in set(np.cumsum(codes == BREAK)[tokens].tolist()):
+                fixed[p] = _spaced_arc_flags(ds[p])
+            return parse_paths(fixed)
+
+    index = np.arange(n)
+    move = (op == OP_M) & (group == 0)
+    kind = np.where((op == OP_M) & ~move, OP_L, op)
+    starts_path = np.ones(n, dtype=bool)
+    starts_path[1:] = path[1:] != path[:-1]
+    prev_op = np.where(starts_path, -1, np.roll(op, 1))
+    is_open = ~starts_path & (prev_op != OP_Z)
+    inserted = ~move & (op != OP_Z) & ~is_open
+    subpath = move | inserted
+
+    padded = np.concatenate((numbers, np.zeros(7)))
+    args = padded[arg[:, None] + np.arange(7)]
+
+    # The subpath start a closepath returns to: a moveto's end point, or the
+    # point where drawing resumed after an earlier closepath
+    last_start = np.maximum.accumulate(np.where(subpath, index, -1))
+    path_first = np.maximum.accumulate(np.where(starts_path, index, 0))
+    has_start = last_start >= path_first
+    start_ref = np.where(move[np.maximum(last_start, 0)], last_start, last_start - 1)
+    start_ref_ok = has_start & (start_ref >= path_first)
+
+    ends = []
+    for column in (END_X, END_Y):
+        at = column[kind]
+        given = at >= 0
+        value = args[index, np.maximum(at, 0)] * given
+        linked = ~starts_path & (rel | ~given) & (kind != OP_Z)
+        root = np.where(given, value, 0.0)
+        parent = np.where(linked, index - 1, index)
+        mult = linked.astype(np.float64)
+        add = np.where(linked, value, root)
+        closing = (kind == OP_Z) & start_ref_ok
+        parent = np.where(closing, start_ref, parent)
+        mult = np.where(closing, 1.0, mult)
+        add = np.where(kind == OP_Z, 0.0, add)
+        ends.append(_resolve(parent, mult, add))
+    end = np.column_stack(ends)
+    cur = np.where(starts_path[:, None], 0.0, np.roll(end, 1, axis=0))
+    offset = np.where(rel[:, None], cur, 0.0)
+
+    # Control points; Q/T are degree-elevated to cubics
+    c2 = np.where((op == OP_C)[:, None], args[:, 2:4], args[:, 0:2]) + offset
+    after_cubic = np.isin(prev_op, (OP_C, OP_S))
+    c1 = np.where((op == OP_C)[:, None], args[:, 0:2] + offset, cur)
+    c1 = np.where(((op == OP_S) & after_cubic)[:, None], 2 * cur - np.roll(c2, 1, axis=0), c1)
+    quad = (op == OP_Q) | (op == OP_T)
+    after_quad = (op == OP_T) & np.isin(prev_op, (OP_Q, OP_T))
+    q = np.column_stack([
+        _chain(index, after_quad, np.where(op == OP_Q, args[:, j] + offset[:, j], cur[:, j]), -1.0, 2 * cur[:, j])
+        for j in (0, 1)
+    ])
+    c1 = np.where(quad[:, None], cur + 2 / 3 * (q - cur), c1)
+    c2 = np.where(quad[:, None], end + 2 / 3 * (q - end), c2)
+
+    # Zero-length arcs and closing lines are dropped. The comparison allows for
+    # rounding, since end points are summed in a different order than drawn
+    moved = np.any(np.abs(end - cur) > 1e-12 * np.maximum(np.abs(end), np.abs(cur)), axis=1)
+    main = np.full(n, -1)
+    main[move] = MOVE
+    main[np.isin(kind, (OP_L, OP_H, OP_V))] = LINE
+    main[np.isin(op, (OP_C, OP_S, OP_Q, OP_T))] = CUBIC
+    main[(op == OP_A) & moved] = ARC
+    main[(op == OP_Z) & is_open & moved] = LINE
+    slots = np.column_stack((np.where(inserted, MOVE, -1), main)).ravel()
+    keep = slots >= 0
+    kinds = slots[keep]
+    points = np.stack((cur, end), axis=1).reshape(-1, 2)[keep]
+    cubic, arc = main == CUBIC, main == ARC
+
+    # A subpath is closed when the next closepath or moveto after its start is a closepath
+    ender = np.where((op == OP_Z) | move, index, n)
+    next_ender = np.append(np.minimum.accumulate(ender[::-1])[::-1][1:], n)
+    after = next_ender[subpath]
+    ender_at = np.minimum(after, n - 1)
+    closed = (after < n) & (path[ender_at] == path[subpath]) & (op[ender_at] == OP_Z)
+
+    return PathSegments(
+        kinds=kinds.astype(np.int8),
+        moves=points[kinds == MOVE],
+        lines=points[kinds == LINE],
+        cubics=np.stack((cur[cubic], c1[cubic], c2[cubic], end[cubic]), axis=1),
+        arcs=np.column_stack((cur[arc], args[arc, :5], end[arc])),
+        closed=closed.astype(np.int64),
+        counts=np.bincount(np.repeat(path, 2)[keep], minlength=len(ds)),
+    )
+
+
+def _arc_centres(arcs: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Centre parameterization of endpoint arcs (SVG 1.1 F.6.5), vectorized."""
+    x1, y1 = arcs[:, 0], arcs[:, 1]
+    rx, ry = np.abs(arcs[:, 2]), np.abs(arcs[:, 3])
+    phi = np.radians(arcs[:, 4])
+    fa, fs = arcs[:, 5] != 0, arcs[:, 6] != 0
+    x2, y2 = arcs[:, 7], arcs[:, 8]
+    cos, sin = np.cos(phi), np.sin(phi)
+    dx, dy = (x1 - x2) / 2, (y1 - y2) / 2
+    xp, yp = cos * dx + sin * dy, -sin * dx + cos * dy
+    # Radii too small for the endpoints are scaled up
+    lam = np.divide(xp ** 2, rx ** 2, out=np.zeros_like(xp), where=rx > 0) + np.divide(yp ** 2, ry ** 2, out=np.zeros_like(yp), where=ry > 0)
+    grow = np.sqrt(np.maximum(lam, 1.0))
+    rx, ry = rx * grow, ry * grow
+    num = np.maximum(rx ** 2 * ry ** 2 - rx ** 2 * yp ** 2 - ry ** 2 * xp ** 2, 0.0)
+    den = rx ** 2 * yp ** 2 + ry ** 2 * xp ** 2
+    coef = np.sqrt(np.divide(num, den, out=np.zeros_like(num), where=den > 0)) * np.where(fa == fs, -1.0, 1.0)
+    cxp = coef * np.divide(rx * yp, ry, out=np.zeros_like(rx), where=ry > 0)
+    cyp = -coef * np.divide(ry * xp, rx, out=np.zeros_like(ry), where=rx > 0)
+    cx = cos * cxp - sin * cyp + (x1 + x2) / 2
+    cy = sin * cxp + cos * cyp + (y1 + y2) / 2
+    safe_rx, safe_ry = np.where(rx > 0, rx, 1.0), np.where(ry > 0, ry, 1.0)
+    theta1 = np.arctan2((yp - cyp) / safe_ry, (xp - cxp) / safe_rx)
+    theta2 = np.arctan2((-yp - cyp) / safe_ry, (-xp - cxp) / safe_rx)
+    dtheta = theta2 - theta1
+    dtheta = np.where(fs & (dtheta < 0), dtheta + 2 * np.pi, dtheta)
+    dtheta = np.where(~fs & (dtheta > 0), dtheta - 2 * np.pi, dtheta)
+    return cx, cy, rx, ry, cos, sin, theta1, dtheta
+
+
+def _samples(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Owner index and parameter ``t`` in (0, 1] for ``counts[i]`` samples per item."""
+    owner = np.repeat(np.arange(len(counts)), counts)
+    first = np.cumsum(counts) - counts
+    t = (np.arange(int(counts.sum())) - first[owner] + 1) / counts[owner]
+    return owner, t
+
+
+def flatten(segments: PathSegments, tolerance: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Points of all segments in order, and how many points each segment gave.
+
+    ``tolerance`` has one entry per segment, in that segment's own units.
+    """
+    kinds = segments.kinds
+    parts = {
+        MOVE: segments.moves.reshape(-1, 2),
+        LINE: segments.lines.reshape(-1, 2),
+        CUBIC: segments.cubics.reshape(-1, 4, 2),
+        ARC: segments.arcs.reshape(-1, 9),
+    }
+    index = {kind: np.flatnonzero(kinds == kind) for kind in parts}
+    counts = np.ones(len(kinds), dtype=np.int64)
+
+    c = parts[CUBIC]
+    if len(c):
+        # Wang's formula: n = sqrt(3/4 * max|second difference| / tol)
+        second = np.maximum(np.linalg.norm(c[:, 0] - 2 * c[:, 1] + c[:, 2], axis=1),
+                            np.linalg.norm(c[:, 1] - 2 * c[:, 2] + c[:, 3], axis=1))
+        counts[index[CUBIC]] = np.clip(np.ceil(np.sqrt(0.75 * second / tolerance[index[CUBIC]])), 1, MAX_SUBDIVISIONS)
+    if len(parts[ARC]):
+        centres = _arc_centres(parts[ARC])
+        radius = np.maximum(centres[2], centres[3])
+        step = 2 * np.arccos(np.clip(1 - tolerance[index[ARC]] / np.maximum(radius, 1e-12), -1.0, 1.0))
+        n = np.ceil(np.abs(centres[7]) / np.maximum(step, 1e-9))
+        degenerate = (centres[2] == 0) | (centres[3] == 0)
+        counts[index[ARC]] = np.where(degenerate, 1, np.clip(n, 1, MAX_SUBDIVISIONS))
+
+    offsets = np.cumsum(counts) - counts
+    points = np.empty((int(counts.sum()), 2))
+    points[offsets[index[MOVE]]] = parts[MOVE]
+    points[offsets[index[LINE]]] = parts[LINE]
+    if len(c):
+        owner, t = _samples(counts[index[CUBIC]])
+        s, t = (1 - t)[:, None], t[:, None]
+        co = c[owner]
+        pts = s ** 3 * co[:, 0] + 3 * s * s * t * co[:, 1] + 3 * s * t * t * co[:, 2] + t ** 3 * co[:, 3]
+        points[offsets[index[CUBIC]][owner] + _local_index(counts[index[CUBIC]])] = pts
+    if len(parts[ARC]):
+        cx, cy, rx, ry, cos, sin, theta1, dtheta = centres
+        owner, t = _samples(counts[index[ARC]])
+        angle = theta1[owner] + t * dtheta[owner]
+        ex, ey = rx[owner] * np.cos(angle), ry[owner] * np.sin(angle)
+        pts = np.column_stack((cos[owner] * ex - sin[owner] * ey + cx[owner], sin[owner] * ex + cos[owner] * ey + cy[owner]))
+        # Degenerate radii: the spec says draw a straight line
+        flat = ((rx == 0) | (ry == 0))[owner]
+        pts[flat] = parts[ARC][owner[flat], 7:9]
+        points[offsets[index[ARC]][owner] + _local_index(counts[index[ARC]])] = pts
+    return points, counts
+
+
+def _local_index(counts: np.ndarray) -> np.ndarray:
+    """0..counts[i]-1 for each item, concatenated."""
+    first = np.cumsum(counts) - counts
+    return np.arange(int(counts.sum())) - np.repeat(first, counts)
+
+
+@dataclass
+class ImportedArtwork:
+    points: np.ndarray  # (N, 2) mm, all polylines back to back
+    offsets: np.ndarray  # (M + 1,) polyline i is points[offsets[i]:offsets[i + 1]]
+    closed: np.ndarray  # (M,) 0/1
+    elements: int
+    skipped: int
+
+    def polylines(self) -> List[np.ndarray]:
+        return [self.points[a:b] for a, b in zip(self.offsets[:-1], self.offsets[1:])]
+
+    def summary(self) -> dict:
+        bounds = [self.points.min(axis=0).tolist(), self.points.max(axis=0).tolist()] if len(self.points) else None
+        return {
+            "elements": self.elements,
+            "skipped": self.skipped,
+            "polylines": int(len(self.closed)),
+            "closed": int(self.closed.sum()),
+            "points": int(len(self.points)),
+            "bounds": bounds,
+        }
+
+
+class SVGImporter:
+    """Incremental SVG to polyline converter: ``feed`` bytes as they arrive, then ``close``."""
+
+    def __init__(self, tolerance: float = DEFAULT_TOLERANCE, batch_size: int = PATH_BATCH_SIZE):
+        if not tolerance > 0:
+            raise ValueError("tolerance must be positive")
+        self.tolerance = tolerance
+        self.batch_size = batch_size
+        # expat callbacks, so no element objects are built for the document
+        self._parser = expat.ParserCreate(namespace_separator="}")
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._tags = {}  # expanded name -> local name
+        self._matrices: List[np.ndarray] = []
+        self._hiding: List[bool] = []  # per open element: a non-rendered container
+        self._hidden = 0  # depth inside non-rendered containers
+        # Path data waiting for the next batched parse, with its element's matrix
+        self._paths: List[str] = []
+        self._path_matrices: List[np.ndarray] = []
+        self._pending = 0
+        self._points: List[np.ndarray] = []
+        self._lengths: List[np.ndarray] = []
+        self._closed: List[np.ndarray] = []
+        self.elements = 0
+        self.skipped = 0
+        self._seen_root = False
+
+    def feed(self, data: bytes) -> None:
+        try:
+            self._parser.Parse(data, False)
+        except expat.ExpatError as e:
+            raise ValueError(f"invalid SVG: {e}")
+
+    def close(self) -> ImportedArtwork:
+        try:
+            self._parser.Parse(b"", True)
+        except expat.ExpatError as e:
+            raise ValueError(f"invalid SVG: {e}")
+        if not self._seen_root:
+            raise ValueError("no <svg> element found")
+        self._flush()
+        lengths = np.concatenate(self._lengths) if self._lengths else np.zeros(0, dtype=np.int64)
+        return ImportedArtwork(
+            points=np.concatenate(self._points) if self._points else np.zeros((0, 2)),
+            offsets=np.concatenate(([0], np.cumsum(lengths))).astype(np.int64),
+            closed=np.concatenate(self._closed) if self._closed else np.zeros(0, dtype=np.int64),
+            elements=self.elements,
+            skipped=self.skipped,
+        )
+
+    def _start(self, name: str, attrib: dict) -> None:
+        tag = self._tags.get(name)
+        if tag is None:
+            tag = self._tags[name] = _local(name)
+        if not self._matrices:
+            if tag != "svg":
+                raise ValueError("root element is not <svg>")
+            self._seen_root = True
+            parent = root_matrix(attrib)
+        else:
+            parent = self._matrices[-1]
+        transform = attrib.get("transform")
+        matrix = parent @ parse_transform(transform) if transform else parent
+        self._matrices.append(matrix)
+        hiding = tag in NON_RENDERED
+        self._hiding.append(hiding)
+        if hiding:
+            self._hidden += 1
+        elif self._hidden:
+            return
+        elif tag in SHAPES:
+            self._shape(tag, attrib, matrix)
+        elif tag in ("use", "text", "image"):
+            self.skipped += 1
+
+    def _end(self, name: str) -> None:
+        self._matrices.pop()
+        if self._hiding.pop():
+            self._hidden -= 1
+
+    def _shape(self, tag: str, attrib: dict, matrix: np.ndarray) -> None:
+        get = attrib.get
+        if tag == "path":
+            d = get("d", "")
+        elif tag in ("polyline", "polygon"):
+            values = NUMBER_RE.findall(get("points") or "")
+            if len(values) < 4:
+                return
+            d = "M" + " ".join(values[:len(values) // 2 * 2]) + ("z" if tag == "polygon" else "")
+        elif tag == "line":
+            try:
+                x1, y1, x2, y2 = (float(get(k) or 0) for k in ("x1", "y1", "x2", "y2"))
+            except ValueError:
+                return
+            if not all(map(math.isfinite, (x1, y1, x2, y2))):
+                return
+            d = f"M{x1!r} {y1!r}L{x2!r} {y2!r}"
+        else:
+            d = self._shape_path(tag, get)
+        if not d:
+            return
+        self._paths.append(d)
+        self._path_matrices.append(matrix)
+        self._pending += len(d)
+        if self._pending >= self.batch_size:
+            self._flush()
+
+    @staticmethod
+    def _shape_path(tag: str, get) -> str:
+        def num(name):
+            try:
+                value = float(get(name) or 0)
+            except ValueError:
+                return 0.0
+            # float() also reads "inf", "nan" and overflowing exponents
+            return value if math.isfinite(value) else 0.0
+
+        if tag == "rect":
+            x, y, w, h = num("x"), num("y"), num("width"), num("height")
+            if w <= 0 or h <= 0:
+                return ""
+            rx, ry = num("rx"), num("ry")
+            rx, ry = (rx or ry), (ry or rx)
+            rx, ry = min(rx, w / 2), min(ry, h / 2)
+            if rx <= 0 or ry <= 0:
+                return f"M{x},{y}h{w}v{h}h{-w}z"
+            return (f"M{x + rx},{y}h{w - 2 * rx}a{rx},{ry} 0 0 1 {rx},{ry}v{h - 2 * ry}"
+                    f"a{rx},{ry} 0 0 1 {-rx},{ry}h{-(w - 2 * rx)}a{rx},{ry} 0 0 1 {-rx},{-ry}"
+                    f"v{-(h - 2 * ry)}a{rx},{ry} 0 0 1 {rx},{-ry}z")
+        cx, cy = num("cx"), num("cy")
+        rx = ry = num("r")
+        if tag == "ellipse":
+            rx, ry = num("rx"), num("ry")
+        if rx <= 0 or ry <= 0:
+            return ""
+        return f"M{cx + rx},{cy}A{rx},{ry} 0 1 1 {cx - rx},{cy}A{rx},{ry} 0 1 1 {cx + rx},{cy}z"
+
+    def _flush(self) -> None:
+        """Parse and flatten every buffered path in one batched pass and append the polylines."""
+        if not self._paths:
+            return
+        segments = parse_paths(self._paths)
+        drawn = segments.counts > 0
+        per_element = segments.counts[drawn]
+        matrices = np.stack(self._path_matrices)[drawn]
+        self._paths, self._path_matrices, self._pending = [], [], 0
+        self.elements += len(per_element)
+        if not len(per_element):
+            return
+        # Tolerance in mm -> local units of each element
+        with np.errstate(over="ignore", invalid="ignore"):
+            scale = np.sqrt(np.abs(np.linalg.det(matrices[:, :2, :2])))
+        if not np.isfinite(scale).all():
+            raise ValueError("invalid SVG: transforms out of range")
+        local_tol = self.tolerance / np.where(scale > 0, scale, 1.0)
+        points, counts = flatten(segments, np.repeat(local_tol, per_element))
+
+        point_element = np.repeat(np.repeat(np.arange(len(per_element)), per_element), counts)
+        m = matrices[point_element]
+        with np.errstate(over="ignore", invalid="ignore"):
+            points = np.einsum("nij,nj->ni", m[:, :2, :2], points) + m[:, :2, 2]
+        if not np.isfinite(points).all():
+            raise ValueError("invalid SVG: coordinates out of range after transforms")
+
+        # Polylines start at the MOVE points
+        starts = np.flatnonzero(np.repeat(segments.kinds == MOVE, counts))
+        lengths = np.diff(np.append(starts, len(points)))
+        # A lone moveto is not a polyline
+        keep = lengths >= 2
+        self._points.append(points[np.repeat(keep, lengths)])
+        self._lengths.append(lengths[keep])
+        self._closed.append(segments.closed[keep])
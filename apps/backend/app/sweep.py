@@ -0,0 +1,194 @@
+"""Sweep a 2-D profile along a 3-D path (ring shanks, chain links, wire).
+
+Frames along the path use parallel transport, also called rotation
+minimizing frames. The minimal rotation between consecutive tangents is
+computed for every segment at once. Those rotations are chained with a
+log-step prefix product of batched 3x3 matmuls, so there is no per-point
+Python loop. On closed paths the leftover twist is spread evenly by arc
+length, so the seam matches up.
+
+Triangles are produced ring batch by ring batch and handed to a
+:class:`~.mesh_writers.BinarySTLWriter`. Memory stays at one batch even for
+multi-million triangle chains. Paths are assumed to be sampled smooth
+curves. Caps are fanned from the profile centroid, so profiles must be
+star-shaped around it (circles, ellipses, rectangles, D-shapes).
+"""
+from typing import Iterator, Tuple
+
+import numpy as np
+
+from .mesh_writers import BinarySTLWriter
+
+SWEEP_BATCH_TRIANGLES = 262_144
+DEFAULT_PROFILE_SEGMENTS = 32
+PROFILE_TYPES = ("circle", "ellipse", "rect", "points")
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    return v / np.maximum(np.linalg.norm(v, axis=-1, keepdims=True), 1e-12)
+
+
+def profile_points(profile) -> np.ndarray:
+    """(K, 2) counter-clockwise profile outline in the (normal, binormal) plane.
+
+    ``profile`` is either an array of 2-D points or a dict:
+    ``{"type": "circle", "radius", "segments"}``, ``{"type": "ellipse", "rx",
+    "ry", "segments"}``, ``{"type": "rect", "width", "height"}`` or
+    ``{"points": [[u, v], ...]}``.
+    """
+    if isinstance(profile, dict):
+        kind = profile.get("type", "points" if "points" in profile else "circle")
+        if kind not in PROFILE_TYPES:
+            raise ValueError(f"profile type must be one of {', '.join(PROFILE_TYPES)}")
+        if kind == "points":
+            points = np.asarray(profile.get("points"), dtype=np.float64)
+        elif kind == "rect":
+            w, h = float(profile.get("width", 1.0)) / 2.0, float(profile.get("height", 1.0)) / 2.0
+            points = np.array([[-w, -h], [w, -h], [w, h], [-w, h]])
+        else:
+            segments = int(profile.get("segments", DEFAULT_PROFILE_SEGMENTS))
+            if kind == "circle":
+                rx = ry = float(profile.get("radius", 0.5))
+            else:
+                rx, ry = float(profile.get("rx", 0.5)), float(profile.get("ry", 0.5))
+            t = np.linspace(0.0, 2.0 * np.pi, max(segments, 3), endpoint=False)
+            points = np.column_stack((rx * np.cos(t), ry * np.sin(t)))
+    else:
+        points = np.asarray(profile, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] != 2 or len(points) < 3:
+        raise ValueError("profile needs at least three [u, v] points")
+    u, v = points[:, 0], points[:, 1]
+    area = np.dot(u, np.roll(v, -1)) - np.dot(np.roll(u, -1), v)
+    if abs(area) < 1e-12:
+        raise ValueError("profile has zero area")
+    return points if area > 0 else points[::-1].copy()
+
+
+def path_points(path, closed: bool) -> np.ndarray:
+    points = np.asarray(path, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] not in (2, 3):
+        raise ValueError("path must be a list of [x, y, z] points")
+    if points.shape[1] == 2:
+        points = np.column_stack((points, np.zeros(len(points))))
+    # Zero-length segments have no tangent
+    keep = np.concatenate(([True], np.linalg.norm(np.diff(points, axis=0), axis=1) > 1e-12))
+    points = points[keep]
+    if closed and len(points) > 1 and np.linalg.norm(points[-1] - points[0]) <= 1e-12:
+        points = points[:-1]
+    if len(points) < (3 if closed else 2):
+        raise ValueError("path needs at least two distinct points (three when closed)")
+    return points
+
+
+def vertex_tangents(points: np.ndarray, closed: bool) -> np.ndarray:
+    seg = np.diff(np.vstack((points, points[:1])) if closed else points, axis=0)
+    seg = _unit(seg)
+    if closed:
+        tangents = seg + np.roll(seg, 1, axis=0)
+    else:
+        tangents = np.vstack((seg[:1], seg[:-1] + seg[1:], seg[-1:]))
+    # Cusps (a segment doubling back) fall back to the outgoing segment
+    flat = np.linalg.norm(tangents, axis=1) < 1e-9
+    if flat.any():
+        outgoing = seg if closed else np.vstack((seg, seg[-1:]))
+        tangents[flat] = outgoing[flat]
+    return _unit(tangents)
+
+
+def minimal_rotations(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(M, 3, 3) rotations taking unit vectors ``a`` onto ``b`` about ``a x b``."""
+    v = np.cross(a, b)
+    c = np.sum(a * b, axis=1)
+    k = np.zeros((len(a), 3, 3))
+    k[:, 0, 1], k[:, 0, 2] = -v[:, 2], v[:, 1]
+    k[:, 1, 0], k[:, 1, 2] = v[:, 2], -v[:, 0]
+    k[:, 2, 0], k[:, 2, 1] = -v[:, 1], v[:, 0]
+    rot = np.eye(3)[None] + k + (k @ k) / np.maximum(1.0 + c, 1e-12)[:, None, None]
+    flipped = np.flatnonzero(c < -1.0 + 1e-9)
+    if len(flipped):
+        # Half-turn about any axis perpendicular to a
+        axis = _unit(np.cross(a[flipped], np.eye(3)[np.argmin(np.abs(a[flipped]), axis=1)]))
+        rot[flipped] = 2.0 * axis[:, :, None] * axis[:, None, :] - np.eye(3)[None]
+    return rot
+
+
+def prefix_products(rot: np.ndarray) -> np.ndarray:
+    """``out[i] = rot[i] @ rot[i-1] @ ... @ rot[0]`` as a log-step scan."""
+    out = rot.copy()
+    shift = 1
+    while shift < len(out):
+        out[shift:] = out[shift:] @ out[:-shift]
+        shift *= 2
+    return out
+
+
+def transport_frames(points: np.ndarray, closed: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Tangent, normal and binormal (each (P, 3)) along the path."""
+    t = vertex_tangents(points, closed)
+    axis = np.eye(3)[np.argmin(np.abs(t[0]))]
+    n0 = _unit(axis - np.dot(axis, t[0]) * t[0])
+    normals = np.empty_like(t)
+    normals[0] = n0
+    if len(t) > 1:
+        normals[1:] = prefix_products(minimal_rotations(t[:-1], t[1:])) @ n0
+    # Clean up drift from the chained products
+    normals = _unit(normals - np.sum(normals * t, axis=1, keepdims=True) * t)
+
+    if closed:
+        # Twist left over after going once round, spread evenly by arc length
+        back = minimal_rotations(t[-1:], t[:1])[0] @ normals[-1]
+        phi = np.arctan2(np.dot(t[0], np.cross(back, n0)), np.dot(back, n0))
+        seg = np.linalg.norm(np.diff(np.vstack((points, points[:1])), axis=0), axis=1)
+        s = np.concatenate(([0.0], np.cumsum(seg)[:-1])) / seg.sum()
+        angle = (phi * s)[:, None]
+        normals = normals * np.cos(angle) + np.cross(t, normals) * np.sin(angle)
+    return t, normals, np.cross(t, normals)
+
+
+def sweep_triangles(path, profile, closed: bool = False, caps: bool = True,
+                    batch_triangles: int = SWEEP_BATCH_TRIANGLES) -> Tuple[int, Iterator[np.ndarray]]:
+    """Total triangle count and a generator of (N, 3, 3) triangle batches."""
+    points = path_points(path, closed)
+    outline = profile_points(profile)
+    _, normals, binormals = transport_frames(points, closed)
+    k = len(outline)
+    rings = len(points)
+    spans = rings if closed else rings - 1
+    with_caps = caps and not closed
+    total = spans * k * 2 + (2 * k if with_caps else 0)
+    per_batch = max(1, batch_triangles // (2 * k))
+
+    def ring(idx):
+        # (len(idx), K, 3) profile placed in each frame
+        return (points[idx, None, :] + outline[None, :, 0, None] * normals[idx, None, :]
+                + outline[None, :, 1, None] * binormals[idx, None, :])
+
+    def batches():
+        nxt = np.roll(np.arange(k), -1)
+        for start in range(0, spans, per_batch):
+            idx = np.arange(start, min(start + per_batch, spans))
+            a = ring(idx)
+            b = ring((idx + 1) % rings)
+            # Two triangles per quad, wound so normals face away from the path
+            first = np.stack((a, a[:, nxt], b), axis=2)
+            second = np.stack((a[:, nxt], b[:, nxt], b), axis=2)
+            yield np.concatenate((first, second), axis=1).reshape(-1, 3, 3)
+        if with_caps:
+            centre = outline.mean(axis=0)
+            ends = ring(np.array([0, rings - 1]))
+            hub = points[[0, -1]] + centre[0] * normals[[0, -1]] + centre[1] * binormals[[0, -1]]
+            start_cap = np.stack((np.broadcast_to(hub[0], (k, 3)), ends[0, nxt], ends[0]), axis=1)
+            end_cap = np.stack((np.broadcast_to(hub[1], (k, 3)), ends[1], ends[1, nxt]), axis=1)
+            yield np.concatenate((start_cap, end_cap))
+
+    return total, batches()
+
+
+def sweep_to_stl(path, profile, out_path, closed: bool = False, caps: bool = True,
+                 batch_triangles: int = SWEEP_BATCH_TRIANGLES) -> dict:
+    """Sweep ``profile`` along ``path`` straight into a binary STL file."""
+    total, batches = sweep_triangles(path, profile, closed=closed, caps=caps, batch_triangles=batch_triangles)
+    with BinarySTLWriter(out_path, triangle_count=total) as stl:
+        for batch in batches:
+            stl.write(batch)
+    return {"triangles": stl.count, "bytes": stl.nbytes}
@@ -0,0 +1,119 @@
+"""Level-of-detail GLB meshes for the 3-D viewport.
+
+A model version is a solid (or boolean result) in the geometry store, so its
+content-addressed id is the cache key. The first request for a version
+decimates the mesh into a chain of levels, each about a quarter of the
+previous one, and writes one GLB file per level. Later requests for the same
+version, including ones after a restart, reuse those files. Only a change to
+the geometry (a new id) triggers decimation again.
+
+Clients ask for a triangle budget and get back the finest level that fits.
+They also get the full level list, coarsest first, so they can show the
+coarse mesh at once and stream in the finer ones afterwards.
+"""
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+
+from .decimate import lod_chain
+from .geometry_store import GeometryStore
+from .mesh_writers import write_glb
+from .shared_tasks import SharedTasks
+
+VIEWPORT_LEVELS = int(os.getenv("CAD_VIEWPORT_LEVELS", "4"))
+VIEWPORT_RATIO = float(os.getenv("CAD_VIEWPORT_RATIO", "0.25"))
+VIEWPORT_MIN_TRIANGLES = int(os.getenv("CAD_VIEWPORT_MIN_TRIANGLES", "256"))
+VIEWPORT_CACHE_SIZE = 256
+
+
+def build_levels(vertices, faces, directory: Path, name: str, levels: int = VIEWPORT_LEVELS,
+                 ratio: float = VIEWPORT_RATIO, min_faces: int = VIEWPORT_MIN_TRIANGLES) -> List[dict]:
+    """Decimate and write ``<name>_lod<i>.glb`` files; level 0 is the full mesh."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    out = []
+    for i, (v, f) in enumerate(lod_chain(vertices, faces, levels=levels, ratio=ratio, min_faces=min_faces)):
+        file_name = f"{name}_lod{i}.glb"
+        size = write_glb(directory / file_name, v, f)
+        out.append({"level": i, "triangles": int(len(f)), "vertices": int(len(v)), "file": file_name, "bytes": size})
+    with open(directory / f"{name}.json", "w") as manifest:
+        json.dump(out, manifest)
+    return out
+
+
+def pick_level(levels: List[dict], triangle_budget: Optional[int]) -> dict:
+    """Finest level within the budget; the coarsest one without a budget or when none fits."""
+    coarsest = max(levels, key=lambda lv: lv["level"])
+    if triangle_budget is None:
+        return coarsest
+    fitting = [lv for lv in levels if lv["triangles"] <= triangle_budget]
+    return min(fitting, key=lambda lv: lv["level"]) if fitting else coarsest
+
+
+class ViewportCache:
+    """LOD level sets per geometry id, built once and shared by concurrent requests.
+
+    ``run(fn, *args)`` executes the decimation (the CAD process pool in the
+    app). Manifests are memoized in a bounded LRU and also written next to
+    the GLB files, so they survive restarts.
+    """
+
+    def __init__(self, store: GeometryStore, run: Callable[..., Awaitable], memo_size: int = VIEWPORT_CACHE_SIZE):
+        self.store = store
+        self.run = run
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._pending = SharedTasks()
+        self.hits = 0
+        self.builds = 0
+
+    def _remember(self, geometry_id: str, levels: List[dict]) -> None:
+        self._memo[geometry_id] = levels
+        self._memo.move_to_end(geometry_id)
+        while len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+
+    def _from_disk(self, geometry_id: str, directory: Path) -> Optional[List[dict]]:
+        manifest = directory / f"{geometry_id}.json"
+        if not manifest.exists():
+            return None
+        levels = json.loads(manifest.read_text())
+        if not all((directory / lv["file"]).exists() for lv in levels):
+            return None
+        return levels
+
+    async def levels(self, geometry_id: str, directory: Path) -> List[dict]:
+        """Level list for a stored mesh, finest first; raises ``ValueError`` for unknown ids."""
+        levels = self._memo.get(geometry_id)
+        if levels is not None and all((directory / lv["file"]).exists() for lv in levels):
+            self.hits += 1
+            self._memo.move_to_end(geometry_id)
+            return levels
+
+        async def compute() -> List[dict]:
+            levels = await asyncio.to_thread(self._from_disk, geometry_id, directory)
+            if levels is not None:
+                self.hits += 1
+            else:
+                vertices, faces = await asyncio.to_thread(self.store.mesh, geometry_id)
+                self.builds += 1
+                levels = await self.run(build_levels, np.asarray(vertices), np.asarray(faces), directory, geometry_id)
+            self._remember(geometry_id, levels)
+            return levels
+
+        levels, shared = await self._pending.run(geometry_id, compute)
+        if shared:
+            self.hits += 1
+        return levels
+
+    def stats(self) -> dict:
+        return {
+            "cached_versions": len(self._memo),
+            "hits": self.hits,
+            "builds": self.builds,
+        }
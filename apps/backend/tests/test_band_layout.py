@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app
+from ..app.band_layout import solve_band, us_ring_inner_diameter
+
+
+def neighbour_gaps(layout, closed):
+    nxt = np.roll(np.arange(layout.count), -1)
+    gaps = np.linalg.norm(layout.positions[nxt] - layout.positions, axis=1) - (layout.sizes + layout.sizes[nxt]) / 2
+    return gaps if closed else gaps[:-1]
+
+
+def test_full_eternity_fits_max_count():
+    layout = solve_band("eternity_full", [2.0], finger_size=7, min_gap=0.1, tolerance=0.05)
+    radius = us_ring_inner_diameter(7) / 2 + 1.6
+    np.testing.assert_allclose(np.linalg.norm(layout.positions[:, :2], axis=1), radius, atol=1e-3)
+    gaps = neighbour_gaps(layout, closed=True)
+    assert gaps.min() >= 0.1 - 1e-9
+    # Evenly spaced, and one more stone would not fit
+    assert np.ptp(gaps) < 1e-3
+    assert (layout.count + 1) * 2.1 > 2 * np.pi * radius
+    assert layout.within_tolerance
+
+
+def test_alternating_sizes_close_the_loop():
+    layout = solve_band("eternity_full", [2.0, 1.5], finger_size=6.5)
+    assert layout.count % 2 == 0
+    assert layout.sizes.tolist() == [2.0, 1.5] * (layout.count // 2)
+    assert neighbour_gaps(layout, closed=True).min() >= 0.1 - 1e-9
+
+
+def test_channel_on_open_curve_is_centred():
+    curve = np.column_stack((np.linspace(0, 20.05, 50), np.zeros(50), np.zeros(50)))
+    layout = solve_band("channel", [1.5], curve=curve, closed=False, min_gap=0.05, tolerance=0.0)
+    assert layout.count == 12
+    gaps = neighbour_gaps(layout, closed=False)
+    np.testing.assert_allclose(gaps, 0.05, atol=1e-9)
+    margin_start = layout.positions[0, 0] - 0.75
+    margin_end = 20.05 - layout.positions[-1, 0] - 0.75
+    assert margin_start == pytest.approx(margin_end)
+    with pytest.raises(ValueError):
+        solve_band("eternity_full", [1.5], curve=curve, closed=False)
+
+
+@pytest.mark.asyncio
+async def test_solve_endpoint_returns_stone_pattern_payload():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/cad/stone-patterns/solve", json={
+            "cad_model_id": 3, "pattern": "eternity_half", "stone_sizes": [1.8], "finger_size": 7,
+        })
+        bad = await ac.post("/cad/stone-patterns/solve", json={"cad_model_id": 3, "pattern": "pave", "stone_sizes": [1.8], "finger_size": 7})
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body) == {"jewelry_type", "cad_model_id", "pattern", "params"}
+    assert body["pattern"] == "eternity_half" and body["jewelry_type"] == "ring"
+    stones = body["params"]["stones"]
+    assert len(stones) == body["params"]["count"] > 0
+    # Centred on the top of the ring
+    assert np.mean([s["position"][0] for s in stones]) == pytest.approx(0.0, abs=1e-3)
+    assert all(s["position"][1] > -1.0 for s in stones)
+    assert bad.status_code == 400
@@ -0,0 +1,183 @@
+"""Micro-benchmarks for the CAD geometry endpoints.
+
+Opt-in, since the larger sizes take a while:
+
+    CAD_BENCHMARKS=1 ./run_backend_tests.sh                   # compare against baselines
+    CAD_BENCH_RECORD=1 ./run_backend_tests.sh                 # re-record baselines
+    CAD_BENCHMARKS=1 CAD_BENCH_MAX_SIZE=1000000 ./run_backend_tests.sh
+
+Every request goes through ``httpx.ASGITransport``, so timings include body
+parsing, the process-pool hop and response serialization. A benchmark fails
+when its best time exceeds ``baseline * (1 + CAD_BENCH_TOLERANCE)`` plus a
+small absolute slack for millisecond-scale cases. Baselines are
+machine-specific: re-record them on the machine that runs the comparison.
+"""
+import asyncio
+import io
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, cad_pool, geometry_store
+
+BENCHMARKS = os.getenv("CAD_BENCHMARKS") == "1"
+RECORD = os.getenv("CAD_BENCH_RECORD") == "1"
+TOLERANCE = float(os.getenv("CAD_BENCH_TOLERANCE", "0.5"))
+ABSOLUTE_SLACK = 0.02  # seconds
+MAX_SIZE = int(os.getenv("CAD_BENCH_MAX_SIZE", "100000"))
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+# Absolute target for importing 30k simple paths, whatever the baseline says
+SVG_IMPORT_TARGET = 0.75  # seconds
+BASELINES = Path(__file__).with_name("benchmark_baselines.json")
+
+pytestmark = pytest.mark.skipif(not (BENCHMARKS or RECORD), reason="set CAD_BENCHMARKS=1 to run the benchmarks")
+
+
+def load_baselines() -> dict:
+    return json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+
+
+@pytest.fixture(scope="module")
+def results():
+    # Start the workers up front so process spawn is not billed to the first case
+    asyncio.run(cad_pool.run(abs, -1))
+    recorded = {}
+    yield recorded
+    if RECORD and recorded:
+        baselines = load_baselines()
+        baselines.update(recorded)
+        BASELINES.write_text(json.dumps(dict(sorted(baselines.items())), indent=2) + "\n")
+
+
+def sized(n):
+    if n > MAX_SIZE:
+        pytest.skip(f"size {n} is above CAD_BENCH_MAX_SIZE={MAX_SIZE}")
+    return 3 if n <= 10_000 else 1
+
+
+# Endpoints (method, url, content type) that have had their untimed warm-up
+warmed_up = set()
+
+
+async def best_time(repeat, **request) -> float:
+    best = float("inf")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=None) as ac:
+        content_type = "application/json" if "json" in request else request.get("headers", {}).get("Content-Type")
+        endpoint = (request["method"], request["url"], content_type)
+        if endpoint not in warmed_up:
+            # One untimed round per worker on the endpoint's first (smallest) case, so
+            # cold template caches and worker-resident indexes are not billed to it
+            warm = await asyncio.gather(*(ac.request(**request) for _ in range(max(cad_pool.workers, 1))))
+            assert all(r.status_code == 200 for r in warm), warm[0].text[:200]
+            warmed_up.add(endpoint)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = await ac.request(**request)
+            best = min(best, time.perf_counter() - start)
+            assert response.status_code == 200, response.text[:200]
+    return best
+
+
+def check(results, name, elapsed):
+    results[name] = round(elapsed, 4)
+    if RECORD:
+        return
+    baseline = load_baselines().get(name)
+    if baseline is None:
+        pytest.skip(f"no baseline for {name}; record one with CAD_BENCH_RECORD=1")
+    limit = baseline * (1 + TOLERANCE) + ABSOLUTE_SLACK
+    assert elapsed <= limit, f"{name} took {elapsed:.3f}s, baseline {baseline:.3f}s (limit {limit:.3f}s)"
+
+
+def grid_mesh(n):
+    """Gently domed grid with about ``n`` vertices at 1 mm pitch."""
+    side = max(int(np.sqrt(n)), 2)
+    xs, ys = np.meshgrid(np.arange(side, dtype=np.float32), np.arange(side, dtype=np.float32), indexing="ij")
+    zs = 0.002 * ((xs - side / 2) ** 2 + (ys - side / 2) ** 2)
+    vertices = np.column_stack((xs.ravel(), ys.ravel(), zs.ravel()))
+    i, j = np.meshgrid(np.arange(side - 1), np.arange(side - 1), indexing="ij")
+    a = (i * side + j).ravel()
+    faces = np.concatenate((np.column_stack((a, a + side, a + 1)), np.column_stack((a + 1, a + side, a + side + 1))))
+    return vertices, faces.astype(np.uint32)
+
+
+def stone_set(n, seed=0):
+    """About ``n`` stones on a jittered 1 mm lattice, a few of them colliding."""
+    rng = np.random.default_rng(seed)
+    side = int(np.ceil(np.sqrt(n)))
+    xs, ys = np.meshgrid(np.arange(side), np.arange(side), indexing="ij")
+    positions = np.column_stack((xs.ravel(), ys.ravel(), np.zeros(side * side)))[:n]
+    positions[:, :2] += rng.normal(0, 0.02, size=(n, 2))
+    sizes = rng.choice([0.8, 0.85, 0.9], size=n)
+    return positions, sizes
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_bench_auto_diamond_fill_planar(results, n):
+    repeat = sized(n)
+    side = float(np.sqrt(n)) + 1.0
+    region = [[0, 0, 0], [side, 0, 0], [side, side, 0], [0, side, 0]]
+    payload = {"region_mesh": region, "stone_size": 0.8, "grid_type": "hex", "spacing": 0.2, "padding": 0.5, "stone_shape": "mixed"}
+    elapsed = asyncio.run(best_time(repeat, method="POST", url="/cad/auto-diamond-fill", json=payload))
+    check(results, f"auto_diamond_fill[planar-{n}]", elapsed)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_bench_auto_diamond_fill_surface(results, n):
+    repeat = sized(n)
+    vertices, faces = grid_mesh(n)
+    params = {"stone_size": 0.8, "spacing": 0.2, "padding": 0.5, "grid_type": "hex", "stone_shape": "round", "placement_mode": "surface"}
+    elapsed = asyncio.run(best_time(
+        repeat, method="POST", url="/cad/auto-diamond-fill",
+        content=vertices.tobytes() + faces.tobytes(),
+        headers={
+            "Content-Type": "application/octet-stream",
+            "X-Mesh-Layout": f"region_mesh:float32:{len(vertices)},3;region_faces:uint32:-1,3",
+            "X-Mesh-Params": json.dumps(params),
+        },
+    ))
+    check(results, f"auto_diamond_fill[surface-{n}]", elapsed)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_bench_generate_diamond_seats(results, n):
+    repeat = sized(n)
+    positions, sizes = stone_set(n)
+    body = io.BytesIO()
+    np.save(body, positions)
+    np.save(body, sizes)
+    params = {"jewelry_type": "ring", "cad_model_id": 1, "pattern": "pave"}
+    elapsed = asyncio.run(best_time(
+        repeat, method="POST", url="/cad/diamond-seats",
+        content=body.getvalue(),
+        headers={"Content-Type": "application/x-npy", "X-Mesh-Layout": "positions;sizes", "X-Mesh-Params": json.dumps(params)},
+    ))
+    check(results, f"generate_diamond_seats[{n}]", elapsed)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_bench_production_report(results, n):
+    repeat = sized(n)
+    positions, sizes = stone_set(n)
+    stones = [{"position": p, "size": s} for p, s in zip(positions.tolist(), sizes.tolist())]
+    side = float(np.sqrt(n)) + 1.0
+    options = {"stones": stones, "edge": [[-1, -1], [side, -1], [side, side], [-1, side]]}
+    elapsed = asyncio.run(best_time(repeat, method="POST", url="/cad/production-report", json={"model_id": 1, "options": options}))
+    check(results, f"production_report[{n}]", elapsed)
+
+
+def test_bench_svg_import(results, tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    rng = np.random.default_rng(0)
+    paths = "".join(
+        f'<path d="M{x:.2f} {y:.2f} L{x + 1:.2f} {y:.2f} L{x + 1:.2f} {y + 1:.2f} Z"/>'
+        for x, y in rng.uniform(0, 90, (30_000, 2))
+    )
+    svg = '<svg xmlns="http://www.w3.org/2000/svg" width="100mm" height="100mm" viewBox="0 0 100 100">' + paths + "</svg>"
+    elapsed = asyncio.run(best_time(3, method="POST", url="/drawing/import-svg", content=svg.encode()))
+    assert elapsed <= SVG_IMPORT_TARGET, f"svg_import took {elapsed:.3f}s, target {SVG_IMPORT_TARGET:.3f}s"
+    check(results, "svg_import[30000]", elapsed)
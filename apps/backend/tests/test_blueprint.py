@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, geometry_store, export_queue
+from ..app import static_files
+from ..app.blueprint import edge_set, face_normals, frame_template, render_blueprint, view_axes
+from .test_booleans import box
+
+
+def test_cube_feature_edges_and_silhouette():
+    vertices, faces = box([0, 0, 0], [2, 2, 2])
+    normals = face_normals(vertices, faces)
+    edges = edge_set(vertices, faces, normals)
+    # 12 cube edges are creases; the 6 face diagonals are flat and skipped
+    assert len(edges.edges) == 18 and edges.always.sum() == 12
+    _, toward = view_axes("iso")
+    assert len(edges.visible(normals, toward)) == 12
+    axes, toward = view_axes("front")
+    assert np.allclose(axes, [[1, 0, 0], [0, 0, 1]]) and np.allclose(toward, [0, -1, 0])
+
+
+def test_render_blueprint_reuses_one_frame_form(tmp_path):
+    assert frame_template("A4") is frame_template("A4")
+    vertices, faces = box([0, 0, 0], [30, 8, 12])
+    result = render_blueprint(vertices, faces, tmp_path / "bp.pdf", {"title": "Signet blank", "page": "A4"})
+    data = (tmp_path / "bp.pdf").read_bytes()
+    assert data.startswith(b"%PDF") and result["bytes"] == len(data)
+    assert result["pages"] == 2 and result["scale"] == "2:1"
+    assert data.count(b"/Type /Page\n") == 2 and data.count(b"/Subtype /Form") == 1
+    with pytest.raises(ValueError):
+        frame_template("B7")
+
+
+@pytest.mark.asyncio
+async def test_collection_blueprints_queue_one_job_per_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    monkeypatch.setattr(static_files, "STATIC_DIR", tmp_path / "static")
+
+    def solid(mesh):
+        return {"vertices": mesh[0].tolist(), "faces": mesh[1].tolist()}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        ids = [(await ac.post("/geometry/solid", json=solid(box([0, 0, 0], [5 + k, 4, 3])))).json()["solid_id"] for k in range(3)]
+        models = [{"model_id": 20 + k, "geometry_id": gid} for k, gid in enumerate(ids)]
+        jobs = (await ac.post("/drawing/blueprints", json={"models": models, "drawn_by": "QA"})).json()
+        done = [(await export_queue.wait(job["job_id"])).to_dict() for job in jobs]
+        single = (await ac.get("/drawing/blueprint/20", params={"title": "Model 20"})).json()
+        bad_page = await ac.post("/drawing/blueprints", json={"models": models, "page": "B7"})
+
+    assert len({job["job_id"] for job in jobs}) == 3
+    assert all(job["status"] == "done" and job["url"].startswith("/static/blueprints/") for job in done)
+    assert all(job["result"]["pages"] == 2 for job in done)
+    assert single["status"] in ("queued", "running", "done") and single["job_id"] not in {j["job_id"] for j in jobs}
+    assert bad_page.status_code == 400
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, geometry_store
+from ..app.booleans import mesh_boolean
+from ..app.spatial import SurfaceIndex
+
+
+def box(lo, hi):
+    lo, hi = np.asarray(lo, dtype=float), np.asarray(hi, dtype=float)
+    vertices = np.array([[x, y, z] for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+    faces = np.array([
+        [0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5],  # x-, x+
+        [0, 4, 5], [0, 5, 1], [2, 3, 7], [2, 7, 6],  # y-, y+
+        [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3],  # z-, z+
+    ])
+    return vertices, faces
+
+
+def volume(mesh):
+    vertices, faces = mesh
+    tris = vertices[faces]
+    return np.einsum("ij,ij->i", tris[:, 0], np.cross(tris[:, 1], tris[:, 2])).sum() / 6.0
+
+
+def test_contains_matches_box_bounds():
+    index = SurfaceIndex(*box([0, 0, 0], [2, 3, 4]))
+    rng = np.random.default_rng(3)
+    points = rng.uniform(-1, 5, size=(5000, 3))
+    # Include points right under the diagonal edges and the shared vertices
+    points[:4] = [[1, 1.5, 2], [0.5, 0.75, 1], [2, 3, 2], [0, 0, 2]]
+    expected = np.all((points > 0) & (points < [2, 3, 4]), axis=1)
+    got = index.contains(points)
+    assert np.array_equal(got[4:], expected[4:])
+    assert got[0] and got[1]
+    assert index.contains(np.array([[1.0, 1.0, 10.0]])).tolist() == [False]
+
+
+def test_mesh_boolean_on_nested_and_disjoint_solids():
+    outer, inner, apart = box([0, 0, 0], [4, 4, 4]), box([1, 1, 1], [2, 2, 2]), box([10, 0, 0], [11, 1, 1])
+    assert volume(mesh_boolean("subtract", [outer, inner])) == pytest.approx(64 - 1)
+    assert volume(mesh_boolean("union", [outer, inner, apart])) == pytest.approx(64 + 1)
+    assert volume(mesh_boolean("intersect", [outer, inner])) == pytest.approx(1)
+    assert len(mesh_boolean("intersect", [outer, apart])[1]) == 0
+
+
+@pytest.mark.asyncio
+async def test_boolean_graph_recomputes_only_dirty_nodes(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path)
+
+    def solid(mesh):
+        return {"vertices": mesh[0].tolist(), "faces": mesh[1].tolist()}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        ids = {}
+        for name, mesh in {"shank": box([0, 0, 0], [10, 2, 2]), "head": box([4, 0, 2], [6, 2, 5]),
+                           "seat": box([4.5, 0.5, 4], [5.5, 1.5, 4.5]), "seat2": box([4.5, 0.5, 3], [5.5, 1.5, 3.5])}.items():
+            ids[name] = (await ac.post("/geometry/solid", json=solid(mesh))).json()["solid_id"]
+
+        def model(seat):
+            return {"root": "ring", "nodes": {
+                "body": {"op": "union", "inputs": [ids["shank"], ids["head"]]},
+                "ring": {"op": "subtract", "inputs": ["body", ids[seat]]},
+            }}
+
+        first = (await ac.post("/geometry/boolean", json=model("seat"))).json()
+        again = (await ac.post("/geometry/boolean", json=model("seat"))).json()
+        edited = (await ac.post("/geometry/boolean", json=model("seat2"))).json()
+        cycle = await ac.post("/geometry/boolean", json={"root": "a", "nodes": {"a": {"op": "union", "inputs": ["b"]}, "b": {"op": "union", "inputs": ["a"]}}})
+        result = (await ac.get(f"/geometry/objects/{first['result_id']}")).json()
+
+    assert first["evaluated"] == 2 and first["reused"] == 0
+    assert again["evaluated"] == 0 and again["result_id"] == first["result_id"]
+    assert edited["evaluated"] == 1 and edited["nodes"]["body"]["cached"] is True
+    assert edited["result_id"] != first["result_id"]
+    assert edited["cache"]["hits"] >= 2 and 0 < edited["cache"]["hit_rate"] < 1
+    assert result["kind"] == "result" and result["meta"] == {"op": "subtract"}
+    assert cycle.status_code == 400
@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import pytest
+import httpx
+from ..app.main import app
+from ..app.compute_pool import ComputePool, PoolSaturated
+
+
+@pytest.mark.asyncio
+async def test_pool_rejects_when_saturated():
+    pool = ComputePool(workers=1, max_queue=1)
+    try:
+        jobs = [asyncio.ensure_future(pool.run(time.sleep, 0.5)) for _ in range(2)]
+        await asyncio.sleep(0)
+        stats = pool.stats()
+        assert stats["busy"] == 1 and stats["queued"] == 1 and stats["utilization"] == 1.0
+        with pytest.raises(PoolSaturated):
+            await pool.run(time.sleep, 0)
+        await asyncio.gather(*jobs)
+        assert pool.stats()["completed"] == 2 and pool.stats()["rejected"] == 1
+        # Worker exceptions reach the caller
+        with pytest.raises(ValueError):
+            await pool.run(int, "not a number")
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_keeps_its_slot_until_the_job_ends():
+    pool = ComputePool(workers=1, max_queue=0)
+    try:
+        await pool.run(time.sleep, 0)  # start the worker process
+        job = asyncio.ensure_future(pool.run(time.sleep, 0.5))
+        await asyncio.sleep(0.1)
+        job.cancel()
+        await asyncio.sleep(0.05)
+        # The sleep still occupies the only worker
+        assert pool.in_flight == 1
+        with pytest.raises(PoolSaturated):
+            await pool.run(time.sleep, 0)
+        await asyncio.sleep(0.6)
+        assert pool.in_flight == 0 and pool.stats()["completed"] == 2
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_fill_runs_off_the_event_loop():
+    region = [[0, 0, 0], [30, 0, 0], [30, 30, 0], [0, 30, 0]]
+    payload = {"region_mesh": region, "stone_size": 0.8, "grid_type": "hex", "spacing": 0.1, "padding": 0.5, "stone_shape": "round"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        fill = await ac.post("/cad/auto-diamond-fill", json=payload)
+        stats = await ac.get("/cad/pool")
+    assert fill.status_code == 200 and fill.json()["diamond_report"]["total_diamonds"] > 0
+    assert stats.status_code == 200
+    assert stats.json()["running"] is True and stats.json()["completed"] >= 1
@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, geometry_store, export_queue
+from ..app import static_files
+from ..app.blueprint import render_dxf
+from ..app.dxf_writer import arc_entities, dxf_chunks, line_entities, polyline_entities
+from .test_booleans import box
+
+
+def entities(data):
+    """(type, {group code: [values]}) per entity of a DXF's ENTITIES section."""
+    lines = data.decode().split("\n")
+    pairs = list(zip(lines[0::2], lines[1::2]))
+    start = pairs.index(("2", "ENTITIES"))
+    found = []
+    for code, value in pairs[start + 1:]:
+        if code == "0":
+            if value == "ENDSEC":
+                break
+            found.append((value, {}))
+        else:
+            value = float(value) if code != "8" else value
+            found[-1][1].setdefault(code, []).append(value)
+    return found
+
+
+def test_blocks_round_trip_coordinates():
+    rng = np.random.default_rng(3)
+    starts, ends = rng.uniform(-50, 50, (300, 2)), rng.uniform(-50, 50, (300, 2))
+    data = b"".join(dxf_chunks([
+        *line_entities(starts, ends, "CUT", rows=64),
+        *arc_entities([[0, 0], [5, 5]], [2, 3], [0, 45], [360, 90], "CUT"),
+    ], ["CUT"]))
+    found = entities(data)
+    lines = [fields for kind, fields in found if kind == "LINE"]
+    assert len(lines) == 300 and all(fields["8"] == ["CUT"] for fields in lines)
+    assert np.allclose([f["10"] + f["20"] for f in lines], starts, atol=1e-6)
+    assert np.allclose([f["11"] + f["21"] for f in lines], ends, atol=1e-6)
+    assert [kind for kind, _ in found[300:]] == ["CIRCLE", "ARC"]
+    assert found[-1][1]["50"] == [45.0] and found[-1][1]["51"] == [90.0]
+    assert data.endswith(b"0\nEOF\n")
+
+
+def test_polylines_split_into_blocks_of_whole_polylines():
+    counts = np.array([3, 70, 1, 40, 5])
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    points = np.arange(2 * offsets[-1], dtype=np.float64).reshape(-1, 2)
+    closed = [1, 0, 0, 1, 0]
+    blocks = list(polyline_entities(points, offsets, closed, "ENGRAVE", rows=32))
+    assert len(blocks) > 1
+    for block in blocks:
+        assert block.startswith("0\nPOLYLINE")
+        assert block.endswith("SEQEND\n8\nENGRAVE\n")
+    found = entities(b"".join(dxf_chunks(blocks, ["ENGRAVE"])))
+    assert [f["70"][0] for kind, f in found if kind == "POLYLINE"] == closed
+    vertices = [f["10"] + f["20"] for kind, f in found if kind == "VERTEX"]
+    assert np.array_equal(vertices, points)
+    assert [kind for kind, _ in found].count("SEQEND") == 5
+
+
+def test_layer_names_may_contain_percent_signs():
+    data = b"".join(
+        dxf_chunks(
+            [
+                *line_entities([[0, 0]], [[1, 1]], "50%"),
+                *arc_entities([[0, 0]], [1], [0], [90], "50%"),
+                *polyline_entities([[0, 0], [1, 0]], [0, 2], layer="50%"),
+            ],
+            ["50%"],
+        )
+    )
+    found = entities(data)
+    kinds = ["LINE", "ARC", "POLYLINE", "VERTEX", "VERTEX", "SEQEND"]
+    assert [kind for kind, _ in found] == kinds
+    assert all(fields["8"] == ["50%"] for _, fields in found)
+
+
+@pytest.mark.asyncio
+async def test_dxf_export_is_recorded_as_technical_drawing(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    monkeypatch.setattr(static_files, "STATIC_DIR", tmp_path / "static")
+    vertices, faces = box([0, 0, 0], [24, 6, 2])
+    result = render_dxf(vertices, faces, tmp_path / "plate.dxf", {"views": ["top"]})
+    # A box seen from the top: its 4 outline edges
+    assert result["entities"] == 4 and result["views"] == ["top"]
+    with pytest.raises(ValueError):
+        render_dxf(vertices, faces, tmp_path / "x.dxf", {"views": ["under"]})
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        mesh = {"vertices": vertices.tolist(), "faces": faces.tolist()}
+        solid = (await ac.post("/geometry/solid", json=mesh)).json()["solid_id"]
+        request = {"model_id": 1901, "format": "dxf", "geometry_id": solid}
+        job = (await ac.post("/drawing/export", json=request)).json()
+        done = (await export_queue.wait(job["job_id"])).to_dict()
+        export_queue.jobs.clear()
+        again = (await ac.post("/cad/export/1901", params={"format": "DXF"})).json()
+        await export_queue.wait(again["job_id"])
+        params = {"cad_model_id": 1901}
+        drawings = (await ac.get("/cad/drawings", params=params)).json()
+
+    assert done["status"] == "done" and done["result"]["entities"] == 12
+    expected = [(done["result"]["drawing_id"], done["url"])]
+    assert [(d["id"], d["drawing_url"]) for d in drawings] == expected
+    written = tmp_path / "static" / done["url"].split("/static/")[1]
+    layers = {fields["8"][0] for _, fields in entities(written.read_bytes())}
+    assert layers == {"FRONT", "TOP", "RIGHT"}
+
+
+@pytest.mark.asyncio
+async def test_stored_curves_export_as_polylines_and_arcs(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    monkeypatch.setattr(static_files, "STATIC_DIR", tmp_path / "static")
+    svg = (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="40mm" height="20mm"'
+        ' viewBox="0 0 40 20"><polygon points="0,0 10,0 10,10"/>'
+        '<polyline points="20,0 30,0 30,5 35,5"/></svg>'
+    )
+    outline = {
+        "type": "polyline",
+        "points": [[0, 0, 0], [5, 0, 0], [5, 5, 0]],
+        "closed": True,
+        "arcs": [[10, 10, 2, 0, 90], [0, 0, 1, 0, 360]],
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        imported = await ac.post("/drawing/import-svg", content=svg.encode())
+        curve_id = imported.json()["curve_id"]
+        request = {"model_id": 1902, "format": "dxf", "geometry_id": curve_id}
+        job = (await ac.post("/drawing/export", json=request)).json()
+        done = (await export_queue.wait(job["job_id"])).to_dict()
+        drawn = (await ac.post("/geometry/curve", json=outline)).json()["curve_id"]
+        params = {"format": "dxf", "geometry_id": drawn}
+        arcs = (await ac.post("/cad/export/1903", params=params)).json()
+        arcs = (await export_queue.wait(arcs["job_id"])).to_dict()
+        pdf = await ac.post("/cad/export/1903", params={"format": "pdf"})
+        drawings = (await ac.get("/cad/drawings", params={"cad_model_id": 1902})).json()
+
+    assert done["status"] == "done" and done["result"]["polylines"] == 2
+    assert [d["id"] for d in drawings] == [done["result"]["drawing_id"]]
+    data = (tmp_path / "static" / done["url"].split("/static/")[1]).read_bytes()
+    assert b"$INSUNITS" not in data and b"AC1009" in data
+    found = entities(data)
+    assert [f["70"][0] for kind, f in found if kind == "POLYLINE"] == [1, 0]
+    # The polygon's repeated first point is left to the closed flag
+    assert len([kind for kind, _ in found if kind == "VERTEX"]) == 7
+
+    assert arcs["status"] == "done" and arcs["result"]["arcs"] == 2
+    written = tmp_path / "static" / arcs["url"].split("/static/")[1]
+    kinds = [kind for kind, _ in entities(written.read_bytes())]
+    assert kinds == ["POLYLINE", "VERTEX", "VERTEX", "VERTEX", "SEQEND", "CIRCLE", "ARC"]
+    assert pdf.status_code == 400
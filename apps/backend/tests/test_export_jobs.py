@@ -0,0 +1,92 @@
+import struct
+
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, geometry_store, export_queue
+from ..app import static_files
+from ..app.compute_pool import PoolSaturated
+from ..app.export_jobs import ExportQueue, JobQueue, export_key, export_stl
+
+
+def tetra():
+    return {"vertices": [[0, 0, 0], [3, 0, 0], [0, 3, 0], [0, 0, 3]], "faces": [[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]]}
+
+
+def test_export_key_ignores_option_order():
+    assert export_key("a" * 32, "stl", {"x": 1, "y": 2}) == export_key("a" * 32, "stl", {"y": 2, "x": 1})
+    assert export_key("a" * 32, "stl", None) != export_key("a" * 32, "glb", None)
+    assert export_key("a" * 32, "stl", {"x": 1}) != export_key("b" * 32, "stl", {"x": 1})
+
+
+def test_job_queues_must_implement_execute():
+    class Incomplete(JobQueue):
+        pass
+
+    with pytest.raises(TypeError, match="_execute"):
+        Incomplete(None, workers=1, max_queue=1, history=1)
+
+
+@pytest.mark.asyncio
+async def test_identical_exports_share_one_job_and_artifact(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    monkeypatch.setattr(static_files, "STATIC_DIR", tmp_path / "static")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        solid = (await ac.post("/geometry/solid", json=tetra())).json()["solid_id"]
+        completed = export_queue.stats()["completed"]
+        first = (await ac.post("/drawing/export", json={"model_id": 3, "format": "stl", "geometry_id": solid})).json()
+        again = (await ac.post("/cad/export/3", params={"format": "STL"})).json()
+        await export_queue.wait(first["job_id"])
+        done = (await ac.get(f"/export/jobs/{first['job_id']}")).json()
+        reused = (await ac.post("/drawing/export", json={"model_id": 3, "format": "stl"})).json()
+        glb = (await ac.post("/cad/export/3", params={"format": "glb"})).json()
+        unsupported = await ac.post("/cad/export/3", params={"format": "step"})
+        no_model = await ac.post("/cad/export/99")
+        missing = await ac.get("/export/jobs/nope")
+
+    assert again["job_id"] == first["job_id"] and again["requests"] == 2
+    assert done["status"] == "done" and done["result"]["triangles"] == 4
+    assert reused["status"] == "done" and reused["url"] == done["url"] and reused["requests"] == 3
+    assert export_queue.stats()["completed"] == completed + 1
+    assert glb["job_id"] != first["job_id"]
+    data = (tmp_path / "static" / done["url"].split("/static/")[1]).read_bytes()
+    assert struct.unpack_from("<I", data, 80)[0] == 4 and len(data) == 84 + 4 * 50
+    assert unsupported.status_code == 400 and no_model.status_code == 404 and missing.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_finished_artifact_on_disk_is_reused(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    monkeypatch.setattr(static_files, "STATIC_DIR", tmp_path / "static")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        solid = (await ac.post("/geometry/solid", json=tetra())).json()["solid_id"]
+        first = (await ac.post("/cad/export/4", params={"format": "glb", "geometry_id": solid})).json()
+        done = (await export_queue.wait(first["job_id"])).to_dict()
+        # A fresh process only has the file, not the job record
+        export_queue.jobs.clear()
+        submitted = export_queue.stats()["submitted"]
+        again = (await ac.post("/cad/export/4", params={"format": "glb", "geometry_id": solid})).json()
+
+    assert again["status"] == "done" and again["url"] == done["url"]
+    assert export_queue.stats()["submitted"] == submitted
+    assert np.frombuffer((tmp_path / "static" / again["url"].split("/static/")[1]).read_bytes()[:4], "<u4")[0] == 0x46546C67
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_delays_exports_instead_of_failing_them(tmp_path):
+    mesh = tetra()
+    refusals = [PoolSaturated("busy"), PoolSaturated("busy")]
+
+    async def run(fn, *args):
+        if refusals:
+            raise refusals.pop()
+        return fn(*args)
+
+    queue = ExportQueue(lambda _: (np.array(mesh["vertices"], float), np.array(mesh["faces"])), run,
+                        exporters={"stl": export_stl})
+    job = queue.submit(5, "a" * 32, "stl", None, lambda name, suffix: (tmp_path / f"{name}{suffix}", name))
+    await queue.wait(job.id)
+    await queue.shutdown()
+    assert job.status == "done" and job.path.exists() and queue.stats()["deferred"] == 2
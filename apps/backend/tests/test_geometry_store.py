@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, geometry_store
+from ..app.geometry_store import GeometryStore
+
+
+def test_store_dedupes_and_reads_back_from_disk(tmp_path):
+    store = GeometryStore(tmp_path, max_memory_bytes=1024)
+    points = np.random.default_rng(1).normal(size=(200, 3))
+    curve = {"type": "bspline", "degree": 3, "points": points.tolist(), "knots": list(range(204))}
+    first, created = store.put("curve", curve)
+    again, created_again = store.put("curve", {**curve, "points": points.astype(np.float64)})
+    assert created and not created_again and again.id == first.id
+    assert store.put("surface", curve)[0].id != first.id
+    assert store.put("curve", {**curve, "degree": 2})[0].id != first.id
+
+    # Too big for the 1 KB memory tier, so this comes back memory-mapped
+    cold = GeometryStore(tmp_path).get(first.id)
+    assert isinstance(cold.arrays["points"], np.memmap)
+    np.testing.assert_array_equal(cold.arrays["points"], points)
+    assert cold.arrays["knots"].dtype == np.int64
+    assert cold.to_dict() == curve
+    assert store.get("f" * 32) is None and store.get("../etc") is None
+    with pytest.raises(ValueError):
+        store.put("curve", {"type": "polyline"})
+
+
+@pytest.mark.asyncio
+async def test_geometry_endpoints_return_content_ids(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path)
+    solid = {"vertices": [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], "faces": [[0, 2, 1], [0, 1, 3], [0, 3, 2], [1, 2, 3]]}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        first = await ac.post("/geometry/solid", json=solid)
+        second = await ac.post("/geometry/solid", json=solid)
+        fetched = await ac.get(f"/geometry/objects/{first.json()['solid_id']}", params={"arrays": "true"})
+        missing = await ac.get("/geometry/objects/" + "0" * 32)
+        empty = await ac.post("/geometry/curve", json={"type": "line"})
+    assert first.json()["deduplicated"] is False and second.json()["deduplicated"] is True
+    assert first.json()["solid_id"] == second.json()["solid_id"]
+    body = fetched.json()
+    assert body["kind"] == "solid" and body["arrays"]["faces"] == {"dtype": "int64", "shape": [4, 3]}
+    assert body["data"]["vertices"] == solid["vertices"]
+    assert missing.status_code == 404 and empty.status_code == 400
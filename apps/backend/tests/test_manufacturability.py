@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, geometry_store
+from ..app.manufacturability import check_stone_clearance, wall_thickness
+from ..app.spatial import TriangleBVH, close_pairs
+from .test_booleans import box
+
+
+def test_close_pairs_matches_brute_force():
+    rng = np.random.default_rng(7)
+    points = rng.uniform(0, 20, size=(600, 3))
+    radii = rng.uniform(0.2, 0.6, size=600)
+    i, j, gap = close_pairs(points, radii, 0.1)
+
+    d = np.linalg.norm(points[:, None] - points[None], axis=2) - radii[:, None] - radii[None]
+    bi, bj = np.nonzero(np.triu(d < 0.1, k=1))
+    assert sorted(zip(i.tolist(), j.tolist())) == sorted(zip(bi.tolist(), bj.tolist()))
+    np.testing.assert_allclose(np.sort(gap), np.sort(d[bi, bj]))
+
+
+def test_stone_and_edge_clearance_report():
+    stones = [
+        {"position": [0.0, 0.0, 0.0], "size": 1.0},
+        {"position": [1.05, 0.0, 0.0], "size": 1.0},  # 0.05 mm from stone 0
+        {"id": "unplaced"},
+        {"position": [5.0, 5.0, 0.0], "size": 1.0},
+        {"position": [9.4, 5.0, 0.0], "size": 1.0},  # 0.1 mm from the right edge
+    ]
+    edge = [[-2, -2], [10, -2], [10, 10], [-2, 10]]
+    result = check_stone_clearance(stones, edge, min_stone_clearance=0.1, min_edge_clearance=0.2)
+    assert result["collisions"] == [{"stones": [0, 1], "clearance": 0.05, "deficit": 0.05}]
+    assert result["edge_violations"] == [{"stone": 4, "clearance": 0.1, "deficit": 0.1}]
+
+
+@pytest.mark.asyncio
+async def test_production_report_lists_collisions():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        stones = [{"position": [x * 0.9, 0.0, 0.0], "size": 1.0} for x in range(4)]
+        response = await ac.post("/cad/production-report", json={"model_id": 1, "options": {"stones": stones}})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["manufacturable"] is False
+    assert [c["stones"] for c in body["collisions"]] == [[0, 1], [1, 2], [2, 3]]
+    assert body["collisions"][0]["deficit"] == pytest.approx(0.2)
+    for options in ({"stones": stones, "edge": [1, 2, 3]}, {"stones": stones, "edge": [[0, 0], [1]]}, {"stones": [3]}):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            bad = await ac.post("/cad/production-report", json={"model_id": 1, "options": options})
+        assert bad.status_code == 400
+
+
+def test_clearance_with_degenerate_cells():
+    # Zero-size stones far from the origin: the grid cells clamp instead of overflowing int64
+    stones = [{"position": [1e9, 0.0, 0.0], "size": 0.0}, {"position": [-1e9, 1e9, 5.0], "size": 0.0},
+              {"position": [1e9, 1e-12, 0.0], "size": 0.0}]
+    result = check_stone_clearance(stones, [[-2e9, -2e9], [2e9, -2e9], [2e9, 2e9]], min_stone_clearance=0.0,
+                                   min_edge_clearance=0.0)
+    assert [c["stones"] for c in check_stone_clearance(stones, min_stone_clearance=1e-9)["collisions"]] == [[0, 2]]
+    assert result["collisions"] == [] and result["edge_violations"] == []
+
+
+def plate_and_block():
+    """A 0.5 mm plate and, well apart from it, a 4 mm block."""
+    pv, pf = box([0, 0, 0], [20, 20, 0.5])
+    bv, bf = box([40, 0, 0], [44, 4, 4])
+    return np.concatenate((pv, bv)), np.concatenate((pf, bf + len(pv)))
+
+
+def test_bvh_first_hits_match_brute_force():
+    rng = np.random.default_rng(11)
+    vertices = rng.uniform(0, 10, size=(900, 3))
+    faces = np.arange(900).reshape(-1, 3)
+    origins = rng.uniform(0, 10, size=(400, 3))
+    directions = rng.normal(size=(400, 3))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    t, tri = TriangleBVH(vertices, faces, leaf_size=4).intersect(origins, directions, max_distance=6.0)
+
+    a, b, c = (vertices[faces[:, k]][None] for k in range(3))
+    d, o = directions[:, None], origins[:, None]
+    p = np.cross(d, c - a)
+    det = np.sum((b - a) * p, axis=2)
+    s = o - a
+    u = np.sum(s * p, axis=2) / det
+    q = np.cross(s, b - a)
+    v = np.sum(d * q, axis=2) / det
+    bt = np.sum((c - a) * q, axis=2) / det
+    bt = np.where((u >= 0) & (v >= 0) & (u + v <= 1) & (bt > 1e-9) & (bt <= 6.0), bt, np.inf)
+    assert np.isfinite(t).sum() > 50
+    np.testing.assert_allclose(t, bt.min(axis=1))
+    assert np.array_equal(tri[np.isfinite(t)], bt.argmin(axis=1)[np.isfinite(t)])
+
+
+def test_wall_thickness_flags_thin_regions():
+    vertices, faces = plate_and_block()
+    thickness = wall_thickness(vertices, faces, samples=3000)
+    on_plate = thickness.points[:, 0] < 30
+    broad = (thickness.points[:, 2] == 0) | (thickness.points[:, 2] == 0.5)
+    np.testing.assert_allclose(thickness.thickness[on_plate & broad], 0.5)
+    assert np.allclose(thickness.thickness[~on_plate & (thickness.points[:, 2] == 4)], 4)
+    summary = thickness.summary(threshold=1.0)
+    assert summary["min"] == 0.5 and summary["percentiles"]["p1"] == 0.5
+    [region] = summary["thin_regions"]
+    assert region["min_thickness"] == 0.5 and np.allclose(region["centroid"][:2], 10, atol=0.5)
+    # Inward-wound meshes are measured the same way
+    flipped = wall_thickness(vertices, faces[:, ::-1], samples=3000)
+    np.testing.assert_allclose(flipped.thickness, thickness.thickness)
+
+
+@pytest.mark.asyncio
+async def test_production_report_measures_walls(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    vertices, faces = plate_and_block()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        solid = (await ac.post("/geometry/solid", json={"vertices": vertices.tolist(), "faces": faces.tolist()})).json()["solid_id"]
+        report = (await ac.post("/cad/production-report", json={"model_id": 2001, "geometry_id": solid})).json()
+        relaxed = (await ac.post("/cad/production-report", json={"model_id": 2001, "options": {"min_wall_thickness": 0.4}})).json()
+        mapped = (await ac.get("/cad/wall-thickness/2001", params={"samples": 500, "map": True})).json()
+        unknown = await ac.get("/cad/wall-thickness/2002")
+
+    assert report["manufacturable"] is False and report["issues"][0].startswith("Minimum wall thickness not met: 1 regions")
+    assert report["wall_thickness"]["min"] == 0.5
+    assert relaxed["manufacturable"] is True and relaxed["wall_thickness"]["thin_regions"] == []
+    assert len(mapped["map"]["thickness"]) == 500 and min(mapped["map"]["thickness"]) == 0.5
+    assert unknown.status_code == 404
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, geometry_store, mass_cache
+from ..app.mass_properties import ALLOYS, MassPropertiesCache, MeshNotFound, mass_properties, mass_properties_many
+from .test_booleans import box
+
+
+def test_box_volume_area_and_centroid():
+    vertices, faces = box([1, 2, 3], [5, 4, 4])
+    props = mass_properties(vertices, faces)
+    assert np.isclose(props.volume, 8) and np.isclose(props.area, 2 * (8 + 4 + 2))
+    assert np.allclose(props.centroid, [3, 3, 3.5])
+    # Inward winding and a far-away origin change nothing
+    flipped = mass_properties(vertices + 1000, faces[:, ::-1])
+    assert np.isclose(flipped.volume, 8) and np.allclose(flipped.centroid, [1003, 1003, 1003.5])
+    assert np.isclose(props.weight(ALLOYS["gold_18k_yellow"]), 8 * 15.58 / 1000)
+    with pytest.raises(ValueError):
+        mass_properties(vertices, faces[:0])
+
+
+def test_batches_match_single_meshes_and_are_memoized():
+    meshes = [box([0, 0, 0], [s, 2 * s, 1]) for s in (1, 2, 3)]
+    batch = mass_properties_many(meshes)
+    assert [p.volume for p in batch] == pytest.approx([2, 8, 18])
+    assert [p.centroid for p in batch] == [mass_properties(*m).centroid for m in meshes]
+    loads = []
+    cache = MassPropertiesCache(lambda g: loads.append(g) or meshes[int(g)], memo_size=2)
+    assert [p.volume for p in cache.get_many(["0", "1", "0", "2"])] == pytest.approx([2, 8, 2, 18])
+    cache.get_many(["2", "1"])
+    assert loads == ["0", "1", "2"] and cache.hits == 3
+
+
+def test_cache_hits_survive_eviction_during_a_batch():
+    meshes = {g: box([0, 0, 0], [s, 1, 1]) for g, s in (("0", 1), ("1", 2), ("2", 3))}
+
+    def load(geometry_id):
+        if geometry_id == "1":
+            # Another request evicts "0" while this batch is being measured
+            cache.get_many(["2"])
+        if geometry_id not in meshes:
+            raise ValueError(f"'{geometry_id}' is not a stored mesh")
+        return meshes[geometry_id]
+
+    cache = MassPropertiesCache(load, memo_size=1)
+    cache.get_many(["0"])
+    assert [p.volume for p in cache.get_many(["0", "1"])] == pytest.approx([1, 2])
+    with pytest.raises(MeshNotFound):
+        cache.get_many(["missing"])
+
+
+@pytest.mark.asyncio
+async def test_bulk_quote_fills_bom_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    mass_cache._memo.clear()
+    ring, pendant = box([0, 0, 0], [10, 10, 2]), box([0, 0, 0], [5, 4, 1])
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        ids = [(await ac.post("/geometry/solid", json={"vertices": v.tolist(), "faces": f.tolist()})).json()["solid_id"]
+               for v, f in (ring, pendant)]
+        request = {"items": [
+            {"model_id": 2101, "geometry_id": ids[0], "alloy": "silver_925"},
+            {"model_id": 2102, "geometry_id": ids[1], "alloy": "gold_14k_yellow", "pieces": 3},
+        ], "price_per_gram": {"silver_925": 1.0}}
+        unpriced = (await ac.post("/cad/bom/quote", json={**request, "save": True}))
+        preview = (await ac.post("/cad/bom/quote", json=request)).json()
+        request["price_per_gram"]["gold_14k_yellow"] = 60.0
+        saved = (await ac.post("/cad/bom/quote", json={**request, "save": True})).json()
+        rows = (await ac.get("/cad/bom", params={"cad_model_id": 2102})).json()
+        single = (await ac.get("/cad/mass-properties/2101")).json()
+        unknown = await ac.post("/cad/bom/quote", json={"items": [{"model_id": 2101, "alloy": "unobtainium"}]})
+        unstored = await ac.post("/cad/bom/quote", json={"items": [{"model_id": 2103, "geometry_id": "0" * 32, "alloy": "wax"}]})
+
+    assert unpriced.status_code == 400 and unknown.status_code == 400 and unstored.status_code == 404
+    assert preview["items"][1]["price"] is None and preview["total_price"] is None
+    silver, gold = saved["items"]
+    assert silver["weight"] == pytest.approx(200 * 10.36 / 1000) and silver["price"] == pytest.approx(2.07)
+    assert gold["weight"] == pytest.approx(3 * 20 * 13.07 / 1000) and gold["price"] == pytest.approx(47.05)
+    assert saved["total_price"] == pytest.approx(49.12)
+    assert [(r["id"], r["material"], r["quantity"], r["price"]) for r in rows] == [
+        (gold["bom_entry_id"], "gold_14k_yellow", gold["weight"], gold["price"])
+    ]
+    assert single["volume"] == 200 and single["weights"]["platinum_950"] == pytest.approx(4.14)
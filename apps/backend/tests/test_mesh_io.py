@@ -0,0 +1,98 @@
+import io
+import json
+
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app
+from ..app.mesh_io import read_npy_arrays, read_raw_arrays, parse_layout
+
+
+def grid_mesh(n=20):
+    xs, ys = np.meshgrid(np.arange(n, dtype=np.float32), np.arange(n, dtype=np.float32), indexing="ij")
+    vertices = np.column_stack((xs.ravel(), ys.ravel(), np.zeros(n * n, dtype=np.float32)))
+    i, j = np.meshgrid(np.arange(n - 1), np.arange(n - 1), indexing="ij")
+    a = (i * n + j).ravel()
+    faces = np.concatenate((np.column_stack((a, a + n, a + 1)), np.column_stack((a + 1, a + n, a + n + 1)))).astype(np.uint32)
+    return vertices, faces
+
+
+def test_raw_and_npy_bodies_are_zero_copy_views():
+    vertices, faces = grid_mesh(5)
+    body = vertices.tobytes() + faces.tobytes()
+    arrays = read_raw_arrays(body, parse_layout("region_mesh:float32:25,3;region_faces:uint32:-1,3", with_types=True))
+    np.testing.assert_array_equal(arrays["region_mesh"], vertices)
+    np.testing.assert_array_equal(arrays["region_faces"], faces)
+    assert arrays["region_mesh"].base is not None and not arrays["region_mesh"].flags.writeable
+
+    buf = io.BytesIO()
+    np.save(buf, vertices)
+    np.save(buf, faces)
+    arrays = read_npy_arrays(buf.getvalue(), ["region_mesh", "region_faces"])
+    np.testing.assert_array_equal(arrays["region_faces"], faces)
+
+    with pytest.raises(ValueError):
+        read_raw_arrays(body + b"\x00" * 4, parse_layout("region_mesh:float32:25,3;region_faces:uint32:32,3", with_types=True))
+    with pytest.raises(ValueError, match="trailing"):
+        read_npy_arrays(buf.getvalue() + b"\x00" * 4, ["region_mesh", "region_faces"])
+    with pytest.raises(ValueError, match="trailing"):
+        read_npy_arrays(buf.getvalue(), ["region_mesh"])
+
+
+@pytest.mark.filterwarnings("ignore:Duplicate Operation ID")
+def test_binary_endpoints_keep_their_body_schema():
+    spec = app.openapi()
+    body = spec["paths"]["/cad/auto-diamond-fill"]["post"]["requestBody"]
+    assert set(body["content"]) == {"application/json", "application/octet-stream", "application/x-npy"}
+    assert "stone_size" in body["content"]["application/json"]["schema"]["required"]
+    seats = spec["paths"]["/cad/diamond-seats"]["post"]["requestBody"]["content"]["application/json"]["schema"]
+    assert "pave" in seats["properties"]["pattern"]["enum"]
+
+
+@pytest.mark.asyncio
+async def test_auto_fill_accepts_binary_mesh():
+    vertices, faces = grid_mesh()
+    params = {"stone_size": 1.0, "spacing": 0.2, "padding": 0.5, "grid_type": "hex", "stone_shape": "round", "placement_mode": "surface"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        binary = await ac.post(
+            "/cad/auto-diamond-fill",
+            content=vertices.tobytes() + faces.tobytes(),
+            headers={
+                "Content-Type": "application/octet-stream",
+                "X-Mesh-Layout": f"region_mesh:float32:{len(vertices)},3;region_faces:uint32:-1,3",
+                "X-Mesh-Params": json.dumps(params),
+            },
+        )
+        as_json = await ac.post("/cad/auto-diamond-fill", json={**params, "region_mesh": vertices.tolist(), "region_faces": faces.tolist()})
+        bad = await ac.post(
+            "/cad/auto-diamond-fill",
+            content=vertices.tobytes()[:-4],
+            headers={"Content-Type": "application/octet-stream", "X-Mesh-Layout": f"region_mesh:float32:{len(vertices)},3"},
+        )
+    assert binary.status_code == 200 and as_json.status_code == 200
+    assert binary.json()["modified_mesh"] is None
+    assert binary.json()["placements"]["positions"] == as_json.json()["placements"]["positions"]
+    assert bad.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_diamond_seats_accepts_npy_columns():
+    positions = np.array([[0.0, 0.0, 0.0], [3.0, 0.0, 0.0]], dtype=np.float32)
+    buf = io.BytesIO()
+    np.save(buf, positions)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post(
+            "/cad/diamond-seats",
+            content=buf.getvalue(),
+            headers={
+                "Content-Type": "application/x-npy",
+                "X-Mesh-Layout": "positions",
+                "X-Mesh-Params": json.dumps({"jewelry_type": "ring", "cad_model_id": 1, "pattern": "pave", "params": {"size": 1.5}}),
+            },
+        )
+    assert response.status_code == 200
+    seats = response.json()["seat_geometries"]
+    assert [s["position"] for s in seats] == [[0.0, 0.0, 0.0], [3.0, 0.0, 0.0]]
+    assert {s["template"] for s in seats} == {"pave:1.5:round"}
@@ -0,0 +1,65 @@
+import io
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, geometry_store, export_queue
+from ..app import static_files
+from ..app.mesh_writers import obj_chunks, stl_chunks, threemf_chunks, STL_RECORD
+
+NS = "{http://schemas.microsoft.com/3dmanufacturing/core/2015/02}"
+
+
+def mesh(n=1000, seed=5):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-20, 20, size=(n, 3)), rng.integers(0, n, size=(2 * n, 3))
+
+
+def test_obj_and_stl_round_trip():
+    vertices, faces = mesh()
+    chunks = list(obj_chunks(vertices, faces, rows=128))
+    assert len(chunks) > 10
+    lines = b"".join(chunks).decode().splitlines()
+    v = np.array([line.split()[1:] for line in lines if line.startswith("v ")], dtype=float)
+    f = np.array([line.split()[1:] for line in lines if line.startswith("f ")], dtype=int)
+    assert np.allclose(v, vertices) and np.array_equal(f - 1, faces)
+
+    stl = b"".join(stl_chunks(vertices, faces, rows=100))
+    records = np.frombuffer(stl, dtype=STL_RECORD, offset=84)
+    assert len(records) == len(faces) and np.allclose(records["vertices"], vertices[faces], atol=1e-5)
+
+
+def test_3mf_package_streams_in_parts():
+    vertices, faces = mesh()
+    chunks = list(threemf_chunks(vertices, faces, rows=64))
+    assert len(chunks) > 3
+    package = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert package.testzip() is None
+    assert set(package.namelist()) == {"[Content_Types].xml", "_rels/.rels", "3D/3dmodel.model"}
+    model = ET.fromstring(package.read("3D/3dmodel.model"))
+    v = np.array([[float(e.get(k)) for k in "xyz"] for e in model.iter(f"{NS}vertex")])
+    f = np.array([[int(e.get(k)) for k in ("v1", "v2", "v3")] for e in model.iter(f"{NS}triangle")])
+    assert np.allclose(v, vertices) and np.array_equal(f, faces)
+
+
+@pytest.mark.asyncio
+async def test_stream_and_job_exports_match(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    monkeypatch.setattr(static_files, "STATIC_DIR", tmp_path / "static")
+    vertices, faces = mesh(200, seed=9)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        solid = (await ac.post("/geometry/solid", json={"vertices": vertices.tolist(), "faces": faces.tolist()})).json()["solid_id"]
+        streamed = await ac.get("/export/stream/5", params={"format": "OBJ", "geometry_id": solid})
+        job = (await ac.post("/drawing/export-3mf/5")).json()
+        done = (await export_queue.wait(job["job_id"])).to_dict()
+        bad = await ac.get("/export/stream/5", params={"format": "step"})
+
+    assert streamed.status_code == 200 and streamed.headers["content-type"] == "model/obj"
+    assert streamed.content == b"".join(obj_chunks(vertices, faces))
+    assert done["status"] == "done" and done["url"].endswith(".3mf")
+    package = zipfile.ZipFile(tmp_path / "static" / done["url"].split("/static/")[1])
+    assert len(list(ET.fromstring(package.read("3D/3dmodel.model")).iter(f"{NS}triangle"))) == len(faces)
+    assert bad.status_code == 400
@@ -0,0 +1,110 @@
+import os
+import pytest
+import httpx
+from ..app.main import app, project_store
+from ..app.project_uploads import ProjectStore, VersionExists, chunk_hash, receive_chunk
+
+CHUNK = 4096
+
+
+def split(data, size=CHUNK):
+    parts = [data[i:i + size] for i in range(0, len(data), size)]
+    return parts, [{"hash": chunk_hash(p), "size": len(p)} for p in parts]
+
+
+async def body(data, piece=1000):
+    for i in range(0, len(data), piece):
+        yield data[i:i + piece]
+
+
+@pytest.mark.asyncio
+async def test_reupload_sends_only_changed_chunks(tmp_path):
+    store = ProjectStore(tmp_path)
+
+    async def write(f, data):
+        f.write(data)
+
+    archive = os.urandom(10 * CHUNK + 123)
+    parts, chunks = split(archive)
+    first = store.begin(7, chunks)
+    assert store.missing(first) == list(range(11))
+    for i in store.missing(first):
+        assert (await receive_chunk(store, first, i, body(parts[i]), write))["stored"]
+    assert store.complete(first)["version"] == "v1"
+
+    changed = bytearray(archive)
+    changed[5 * CHUNK + 10] ^= 0xFF
+    parts, chunks = split(bytes(changed) + parts[0])
+    second = store.begin(7, chunks, "v2")
+    assert store.missing(second) == [5, 10, 11]
+    for i in store.missing(second):
+        await receive_chunk(store, second, i, body(parts[i]), write)
+    store.complete(second)
+    assert b"".join(store.read(store.manifest(7, "v2"))) == bytes(changed) + parts[0]
+    assert [v["version"] for v in store.versions(7)] == ["v1", "v2"]
+    assert store.chunks_received == 14 and sum(p.is_file() for p in (tmp_path / "chunks").rglob("*")) == 14
+
+
+@pytest.mark.asyncio
+async def test_upload_survives_a_dropped_connection(tmp_path, monkeypatch):
+    monkeypatch.setattr(project_store, "root", tmp_path)
+    archive = os.urandom(3 * CHUNK)
+    parts, chunks = split(archive)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        opened = (await ac.post("/cloud/project/upload", json={"project_id": 25, "chunks": chunks, "version": "1.0",
+                                                               "file_url": "ring.zip"})).json()
+        upload = f"/cloud/project/upload/{opened['upload_id']}"
+        await ac.put(f"{upload}/chunks/0", content=parts[0])
+        # The connection drops halfway through chunk 1, and chunk 2 arrives corrupted
+        truncated = await ac.put(f"{upload}/chunks/1", content=parts[1][:CHUNK // 2])
+        corrupted = await ac.put(f"{upload}/chunks/2", content=parts[2][::-1])
+        early = await ac.post(f"{upload}/complete")
+        resumed = (await ac.get(upload)).json()
+        for i in resumed["missing"]:
+            await ac.put(f"{upload}/chunks/{i}", content=parts[i])
+        done = (await ac.post(f"{upload}/complete")).json()
+        download = await ac.get(done["file_url"])
+        projects = (await ac.get("/cloud/project/list")).json()["projects"]
+        gone = await ac.get(upload)
+
+    assert opened["status"] == "uploading" and opened["missing"] == [0, 1, 2]
+    assert truncated.status_code == 400 and corrupted.status_code == 400 and early.status_code == 409
+    assert resumed["missing"] == [1, 2] and not list(tmp_path.rglob("*.part"))
+    assert done["status"] == "uploaded" and done["file_url"] == "/cloud/project/25/versions/1.0"
+    assert download.content == archive
+    assert projects[0]["project_id"] == 25 and projects[0]["versions"][0]["metadata"] == {"file_url": "ring.zip"}
+    assert gone.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_versions_are_claimed_on_completion_and_stale_uploads_expire(tmp_path):
+    store = ProjectStore(tmp_path)
+
+    async def write(f, data):
+        f.write(data)
+
+    async def upload(data, version=None):
+        parts, chunks = split(data)
+        session = store.begin(9, chunks, version)
+        for i in store.missing(session):
+            await receive_chunk(store, session, i, body(parts[i]), write)
+        return session
+
+    # Two concurrent default uploads, and an explicit one racing for "v1"
+    first, second, explicit = await upload(b"a" * 5000), await upload(b"b" * 5000), await upload(b"c" * 10, "v1")
+    assert [store.complete(s)["version"] for s in (first, second)] == ["v1", "v2"]
+    with pytest.raises(VersionExists):
+        store.complete(explicit)
+    with pytest.raises(VersionExists):
+        store.begin(9, split(b"d")[1], "v2")
+    assert b"".join(store.read(store.manifest(9, "v1"))) == b"a" * 5000
+
+    abandoned = await upload(b"e" * 9000)
+    (tmp_path / "chunks" / "ab").mkdir(parents=True, exist_ok=True)
+    (tmp_path / "chunks" / "ab" / "ab.part").write_bytes(b"x")
+    assert store.expire(max_age=3600) == {"sessions": 0, "partial": 0, "chunks": 0}
+    assert store.expire(max_age=-1) == {"sessions": 2, "partial": 1, "chunks": 3}
+    with pytest.raises(KeyError):
+        store.session(abandoned.id)
+    assert b"".join(store.read(store.manifest(9, "v2"))) == b"b" * 5000
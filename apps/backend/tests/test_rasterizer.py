@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, geometry_store, thumbnail_queue
+from ..app import static_files
+from ..app.rasterizer import GEM, METAL, render_image
+from .test_booleans import box
+
+
+def sphere(n=48, centre=(0, 0, 0), radius=1.0):
+    theta, phi = np.meshgrid(np.linspace(0, np.pi, n), np.linspace(0, 2 * np.pi, n), indexing="ij")
+    vertices = np.stack([np.sin(theta) * np.cos(phi), np.sin(theta) * np.sin(phi), np.cos(theta)], -1).reshape(-1, 3)
+    i = np.arange(n - 1)[:, None] * n + np.arange(n - 1)[None]
+    faces = np.concatenate([np.stack([i, i + n, i + 1], -1).reshape(-1, 3), np.stack([i + 1, i + n, i + n + 1], -1).reshape(-1, 3)])
+    return vertices * radius + centre, faces
+
+
+def test_phong_smooths_curves_but_keeps_creases():
+    vertices, faces = sphere(24)
+    flat = render_image(vertices, faces, 96, 96, shading="flat").astype(int)
+    phong = render_image(vertices, faces, 96, 96, shading="phong").astype(int)
+    covered = (phong != 255).any(axis=2)
+    # Neighbouring pixels jump at every facet edge when flat shaded
+    jumps = lambda image: np.percentile(np.abs(np.diff(image, axis=1)).sum(axis=2)[covered[:, 1:] & covered[:, :-1]], 99)
+    assert jumps(phong) < 0.6 * jumps(flat)
+    vertices, faces = box([0, 0, 0], [2, 2, 2])
+    assert np.array_equal(render_image(vertices, faces, 48, 48, shading="phong"),
+                          render_image(vertices, faces, 48, 48, shading="flat"))
+    with pytest.raises(ValueError):
+        render_image(vertices, faces, 48, 48, shading="toon")
+
+
+def test_gems_sparkle_brighter_than_their_body():
+    vertices, faces = sphere(12)
+    metal = render_image(vertices, faces, 128, 128, materials=np.full(len(faces), METAL))
+    gem = render_image(vertices, faces, 128, 128, materials=np.full(len(faces), GEM))
+    covered = (gem != 255).any(axis=2)
+    # The body alone stays below 70% of the gem colour; glints go past it
+    glints = (gem[covered].min(axis=1) > 200).sum()
+    assert 0 < glints < 0.3 * covered.sum()
+    # Cool, near-white stones against warm metal
+    assert gem[covered][:, 2].mean() > gem[covered][:, 0].mean() - 5
+    assert metal[covered][:, 2].mean() < metal[covered][:, 0].mean()
+
+
+@pytest.mark.asyncio
+async def test_thumbnails_render_in_background_and_are_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    monkeypatch.setattr(static_files, "STATIC_DIR", tmp_path / "static")
+    vertices, faces = sphere(16)
+    materials = np.zeros(len(faces), dtype=int)
+    materials[: len(faces) // 4] = GEM
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        solid = (await ac.post("/geometry/solid", json={"vertices": vertices.tolist(), "faces": faces.tolist(),
+                                                        "materials": materials.tolist()})).json()["solid_id"]
+        first = (await ac.get("/cad/preview/2401", params={"geometry_id": solid, "size": 64})).json()
+        await thumbnail_queue.wait(next(reversed(thumbnail_queue.jobs)))
+        thumbnail_queue.jobs.clear()
+        again = (await ac.get("/cad/preview/2401", params={"size": 64})).json()
+        listing = (await ac.post("/cad/previews", json={"models": [{"model_id": 2401}, {"model_id": 2499}], "size": 64})).json()
+        bad = await ac.get("/cad/preview/2401", params={"size": 4096})
+        submitted = thumbnail_queue.stats()["submitted"]
+        stale = await ac.get("/cad/preview/2402", params={"geometry_id": "0" * 32})
+        stale_listing = (await ac.post("/cad/previews", json={"models": [{"model_id": 2402, "geometry_id": "0" * 32}]})).json()
+
+    assert first["status"] in ("queued", "running") and first["preview_url"] is None
+    assert again["status"] == "done" and again["preview_url"].startswith("/static/previews/")
+    png = tmp_path / "static" / again["preview_url"].split("/static/")[1]
+    assert png.read_bytes()[:4] == b"\x89PNG"
+    assert [p["status"] for p in listing["previews"]] == ["done", "unknown"] and listing["ready"] == 1
+    assert listing["previews"][0]["preview_url"] == again["preview_url"] and bad.status_code == 400
+    assert stale.status_code == 404 and stale_listing["previews"][0]["status"] == "unknown"
+    assert thumbnail_queue.stats()["submitted"] == submitted
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, region_cache
+from ..app.region_cache import RegionCache, RegionNotResident, fill_resident, region_key, resident_region
+from ..app.stone_layout import prepare_region
+
+
+def dome(n=30):
+    xs, ys = np.meshgrid(np.linspace(0, 10, n), np.linspace(0, 10, n), indexing="ij")
+    vertices = np.column_stack((xs.ravel(), ys.ravel(), 0.05 * ((xs - 5) ** 2 + (ys - 5) ** 2).ravel()))
+    i, j = np.meshgrid(np.arange(n - 1), np.arange(n - 1), indexing="ij")
+    a = (i * n + j).ravel()
+    faces = np.concatenate((np.column_stack((a, a + n, a + 1)), np.column_stack((a + 1, a + n, a + n + 1))))
+    return vertices, faces
+
+
+def test_cache_evicts_lru_within_budget():
+    vertices, faces = dome()
+    region = prepare_region(vertices, faces, surface=True)
+    cache = RegionCache(max_entries=3, max_bytes=int(region.nbytes * 2.5))
+    for key in "abc":
+        cache.put(key, region)
+    assert cache.stats()["entries"] == 2 and cache.get("a") is None
+    cache.get("b")
+    cache.put("d", region)
+    assert cache.peek("b") is not None and cache.peek("c") is None
+    assert cache.bytes == 2 * region.nbytes and cache.stats()["evictions"] == 2
+
+
+def test_region_key_ignores_transport_dtype():
+    vertices, faces = dome()
+    vertices = vertices.astype(np.float32)
+    # JSON lists and a float32 / uint32 binary upload of the same mesh
+    key, _, _ = region_key(vertices.tolist(), faces.tolist())
+    assert region_key(vertices, faces.astype(np.uint32))[0] == key
+    assert region_key(vertices, None)[0] != key
+
+
+def test_workers_index_a_region_once():
+    vertices, faces = dome()
+    key, _, _ = region_key(vertices, faces)
+    args = (0.8, 0.2, 0.5, "hex", "round")
+    with pytest.raises(RegionNotResident):
+        fill_resident(key, None, *args, mode="surface")
+    first = fill_resident(key, prepare_region(vertices, faces), *args, mode="surface")
+    index = resident_region(key).index
+    # Later jobs send only the key and reuse the same index
+    again = fill_resident(key, None, *args, mode="surface")
+    assert index is not None and resident_region(key).index is index
+    np.testing.assert_array_equal(first.positions, again.positions)
+
+
+@pytest.mark.asyncio
+async def test_fill_by_region_id_skips_upload():
+    vertices, faces = dome()
+    region_cache.clear()
+    base = {"stone_size": 0.8, "grid_type": "hex", "padding": 0.5, "stone_shape": "round", "placement_mode": "surface"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        first = await ac.post("/cad/auto-diamond-fill", json={**base, "spacing": 0.1, "region_mesh": vertices.tolist(), "region_faces": faces.tolist()})
+        region_id = first.json()["diamond_report"]["region_id"]
+        hits = region_cache.hits
+        by_id = await ac.post("/cad/auto-diamond-fill", json={**base, "spacing": 0.3, "region_id": region_id})
+        full = await ac.post("/cad/auto-diamond-fill", json={**base, "spacing": 0.3, "region_mesh": vertices.tolist(), "region_faces": faces.tolist()})
+        info = await ac.get(f"/cad/regions/{region_id}")
+        missing = await ac.post("/cad/auto-diamond-fill", json={**base, "spacing": 0.3, "region_id": "0" * 32})
+    assert first.status_code == by_id.status_code == full.status_code == 200
+    assert by_id.json()["placements"] == full.json()["placements"]
+    assert by_id.json()["modified_mesh"] is None
+    assert region_cache.hits == hits + 2
+    assert info.json()["faces"] == len(faces)
+    assert missing.status_code == 404
@@ -0,0 +1,79 @@
+import asyncio
+import zlib
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, geometry_store, render_scheduler
+from ..app import static_files
+from ..app.rasterizer import png_bytes, render_image
+from ..app.render_jobs import RenderQueueFull, RenderScheduler
+from .test_booleans import box
+
+
+def test_front_view_of_a_box_is_a_shaded_square():
+    vertices, faces = box([0, 0, 0], [10, 4, 10])
+    image = render_image(vertices, faces, 50, 50, view="front")
+    covered = (image != 255).any(axis=2)
+    # The margin leaves 6% of the image on every side
+    assert covered.sum() == 44 * 44 and covered[3:47, 3:47].all()
+    assert len(np.unique(image[covered], axis=0)) == 1
+    data = png_bytes(image)
+    assert data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR"
+    raw = np.frombuffer(zlib.decompress(data[41:-12]), dtype=np.uint8).reshape(50, 151)
+    assert np.array_equal(raw[:, 1:].reshape(50, 50, 3), image)
+
+
+@pytest.mark.asyncio
+async def test_lanes_priority_backpressure_and_cancellation(tmp_path):
+    mesh, loads = box([0, 0, 0], [2, 2, 2]), []
+
+    async def run(fn, *args):
+        await asyncio.sleep(0)
+        return fn(*args)
+
+    scheduler = RenderScheduler(lambda g: loads.append(g) or (*mesh, None), run, workers=1, max_queue=4)
+    place = lambda name, suffix: (tmp_path / f"{name}{suffix}", f"/static/renders/{name}{suffix}")
+    jobs = [scheduler.submit(1, g, quality, {"size": size}, place)
+            for g, quality, size in (("a", "ultra", 512), ("b", "ultra", 512), ("c", "preview", 64), ("d", "preview", 64))]
+    with pytest.raises(RenderQueueFull):
+        scheduler.submit(1, "e", "draft", {"size": 128}, place)
+    with pytest.raises(ValueError):
+        scheduler.submit(1, "e", "cinematic", None, place)
+    assert scheduler.cancel(jobs[1].id).status == "cancelled"
+
+    while jobs[0].progress == 0:
+        await asyncio.sleep(0)
+    scheduler.cancel(jobs[0].id)
+    await scheduler.wait(jobs[0].id)
+    await scheduler.shutdown()
+
+    # Previews first, then the remaining ultra job; it stopped after a band
+    assert loads == ["c", "d", "a"]
+    assert [j.status for j in jobs] == ["cancelled", "cancelled", "done", "done"]
+    assert 0 < jobs[0].progress < 1 and not jobs[0].path.exists()
+    assert jobs[2].path.read_bytes()[:4] == b"\x89PNG" and jobs[2].result["width"] == 64
+
+
+@pytest.mark.asyncio
+async def test_cloud_render_endpoint_polls_to_done(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    monkeypatch.setattr(static_files, "STATIC_DIR", tmp_path / "static")
+    vertices, faces = box([0, 0, 0], [8, 8, 3])
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        solid = (await ac.post("/geometry/solid", json={"vertices": vertices.tolist(), "faces": faces.tolist()})).json()["solid_id"]
+        job = (await ac.post("/cloud/render", json={"model_id": 2301, "geometry_id": solid, "quality": "preview",
+                                                    "options": {"size": 96}})).json()
+        await render_scheduler.wait(job["job_id"])
+        done = (await ac.get(f"/cloud/render/jobs/{job['job_id']}")).json()
+        again = (await ac.post("/cad/cloud-render/2301", params={"quality": "draft"})).json()
+        cancel_done = await ac.delete(f"/cloud/render/jobs/{job['job_id']}")
+        bad = await ac.post("/cloud/render", json={"model_id": 2301, "quality": "cinematic"})
+        missing = await ac.get("/cloud/render/jobs/nope")
+        await render_scheduler.wait(again["job_id"])
+
+    assert job["status"] == "queued" and done["status"] == "done" and done["progress"] == 1
+    png = tmp_path / "static" / done["preview_url"].split("/static/")[1]
+    assert png.read_bytes()[:4] == b"\x89PNG" and done["result"]["width"] == 96
+    assert again["quality"] == "draft" and again["model_id"] == 2301
+    assert cancel_done.status_code == 409 and bad.status_code == 400 and missing.status_code == 404
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import pytest
+import httpx
+from ..app.main import app, geometry_store, report_memo
+from ..app.report_batch import ReportMemo, report_key, run_batch
+from .test_booleans import box
+
+
+@pytest.mark.asyncio
+async def test_batch_is_bounded_and_yields_in_completion_order():
+    running, peak = 0, 0
+
+    async def check(delay):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(delay)
+        running -= 1
+        if delay == 0:
+            raise ValueError("bad model")
+        return delay
+
+    results = [(i, r) async for i, _, r in run_batch([0.03, 0.01, 0, 0.02, 0.01], check, concurrency=2)]
+    assert peak == 2 and sorted(i for i, _ in results) == [0, 1, 2, 3, 4]
+    assert [i for i, _ in results][:2] == [1, 2] and isinstance(dict(results)[2], ValueError)
+
+
+@pytest.mark.asyncio
+async def test_memo_shares_concurrent_checks_by_version_and_options():
+    memo, calls = ReportMemo(memo_size=8), []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"manufacturable": True}
+
+    key = report_key("abc", {"b": 1, "a": [2]})
+    assert key == report_key("abc", {"a": [2], "b": 1}) != report_key("abd", {"a": [2], "b": 1})
+    first, second = await asyncio.gather(memo.get(key, compute), memo.get(key, compute))
+    assert len(calls) == 1 and (first[1], second[1]) == (False, True)
+    assert (await memo.get(key, compute))[1] and memo.stats()["hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_a_shared_check():
+    memo, release = ReportMemo(memo_size=8), asyncio.Event()
+
+    async def compute():
+        await release.wait()
+        return {"manufacturable": True}
+
+    owner = asyncio.create_task(memo.get("k", compute))
+    await asyncio.sleep(0)
+    batch = asyncio.create_task(_collect(run_batch(["k"], lambda key: memo.get(key, compute))))
+    await asyncio.sleep(0.01)
+    owner.cancel()
+    release.set()
+    results = await asyncio.wait_for(batch, 1)
+    assert results[0][2] == ({"manufacturable": True}, True) and memo.stats()["entries"] == 1
+
+
+async def _collect(batch):
+    return [result async for result in batch]
+
+
+@pytest.mark.asyncio
+async def test_collection_recheck_streams_cached_reports(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    report_memo.clear()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        ids = []
+        for height in (0.4, 3.0):
+            vertices, faces = box([0, 0, 0], [12, 12, height])
+            ids.append((await ac.post("/geometry/solid", json={"vertices": vertices.tolist(), "faces": faces.tolist()})).json()["solid_id"])
+        batch = {"items": [
+            {"model_id": 2201, "geometry_id": ids[0]},
+            {"model_id": 2202, "geometry_id": ids[1]},
+            {"model_id": 2203, "geometry_id": "0" * 32},
+        ], "model_ids": [2204]}
+        first = (await ac.post("/cad/production-report/batch", json=batch)).json()
+        streamed = await ac.post("/cad/production-report/batch", json=batch, params={"stream": "true"})
+        empty = await ac.post("/cad/production-report/batch", json={})
+
+    assert [(r["model_id"], r["manufacturable"], r["cached"]) for r in first["reports"]] == [
+        (2204, True, False), (2201, False, False), (2202, True, False)
+    ]
+    assert [(e["model_id"], e["status_code"]) for e in first["errors"]] == [(2203, 404)]
+    records = [json.loads(line) for line in streamed.text.splitlines()]
+    assert records[0]["type"] == "header" and records[-1] == {"type": "done", "count": 4, "cached": 3, "failed": 1}
+    assert all(r["cached"] for r in records if r["type"] == "report")
+    assert empty.status_code == 400
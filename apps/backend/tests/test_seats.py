@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app
+from ..app.seats import build_seats, seat_job, seat_template, seat_templates, template_keys
+
+
+def test_identical_stones_share_one_template():
+    seat_template.cache_clear()
+    n = 3000
+    positions = np.column_stack((np.arange(n) * 1.2, np.zeros(n), np.zeros(n)))
+    normals = np.tile([0.0, 1.0, 0.0], (n, 1))
+    seats = build_seats("pave", positions, np.full(n, 1.3), ["round"] * n, normals)
+    assert seat_template.cache_info().misses == 1
+    verts, faces = seat_template("pave", 1.3, "round")
+    assert seats.vertices.shape == (n * len(verts), 3)
+    assert seats.faces.shape == (n * len(faces), 3)
+    # Last instance: template rotated so its +z axis follows the normal (+y), then translated
+    last = seats.vertices[-len(verts):]
+    expected = verts @ seats.transforms[-1, :3, :3].T + positions[-1]
+    np.testing.assert_allclose(last, expected)
+    np.testing.assert_allclose(seats.transforms[-1, :3, 2], [0.0, 1.0, 0.0], atol=1e-12)
+
+
+def test_streamed_slices_leave_templates_out_of_the_job_result():
+    positions = np.zeros((4, 3))
+    normals = np.tile([0.0, 0.0, 1.0], (4, 1))
+    sizes, shapes = np.array([1.0, 1.0, 1.5, 1.5]), ["round"] * 4
+    keys, _ = template_keys("pave", sizes, shapes)
+    args = ("pave", positions, sizes, shapes, normals, seat_templates(keys))
+    seats, templates = seat_job(*args)
+    assert set(templates) == {"pave:1:round", "pave:1.5:round"}
+    sliced, none = seat_job(*args, with_templates=False)
+    assert none is None and sliced.meshes == {}
+    assert np.array_equal(sliced.transforms, seats.transforms)
+
+
+def test_seat_template_is_closed_and_outward():
+    verts, faces = seat_template("invisible", 2.0, "princess")
+    edges = {tuple(e) for f in faces.tolist() for e in ((f[0], f[1]), (f[1], f[2]), (f[2], f[0]))}
+    assert all((b, a) in edges for a, b in edges)
+    a, b, c = verts[faces[:, 0]], verts[faces[:, 1]], verts[faces[:, 2]]
+    assert np.einsum("ij,ij->i", a, np.cross(b, c)).sum() > 0
+    with pytest.raises(ValueError):
+        build_seats("pave", [[0, 0, 0]], [0.0], ["round"], [[0, 0, 1]])
+
+
+@pytest.mark.asyncio
+async def test_diamond_seats_endpoint():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        payload = {
+            "jewelry_type": "ring",
+            "cad_model_id": 1,
+            "pattern": "pave",
+            "stones": [
+                {"position": [0, 0, 0], "size": 1.0},
+                {"position": [1.2, 0, 0], "size": 1.0, "normal": [0, 0, -1]},
+                {"position": [3.0, 0, 0], "size": 1.5, "shape": "oval"},
+            ],
+            "params": {"include_mesh": True},
+        }
+        response = await ac.post("/cad/diamond-seats", json=payload)
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["templates"]) == 2
+        assert [s["template"] for s in body["seat_geometries"]] == ["pave:1:round", "pave:1:round", "pave:1.5:oval"]
+        assert body["seat_geometries"][1]["transform"][2][2] == pytest.approx(-1.0)
+        assert len(body["mesh"]["faces"]) == sum(2 * len(t["faces"]) if name.endswith("round") else len(t["faces"]) for name, t in body["templates"].items())
+        # Templates are cached in the web process, so a repeat request is all hits
+        response = await ac.post("/cad/diamond-seats", json=payload)
+        assert response.json()["template_cache"]["hits"] >= 2
+        for bad in ({"size": 1.0}, "stone", [0, 0, 0], {"position": [0, 0, 0], "size": "big"}):
+            response = await ac.post("/cad/diamond-seats", json={**payload, "stones": payload["stones"] + [bad]})
+            assert response.status_code == 400, bad
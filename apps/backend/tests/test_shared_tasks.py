@@ -0,0 +1,23 @@
+import asyncio
+import pytest
+from ..app.shared_tasks import SharedTasks
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_caller_leaves_the_shared_task_running():
+    tasks, calls, release = SharedTasks(), [], asyncio.Event()
+
+    async def compute():
+        calls.append(1)
+        await release.wait()
+        return 42
+
+    first = asyncio.create_task(tasks.run("k", compute))
+    second = asyncio.create_task(tasks.run("k", compute))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    release.set()
+    assert await second == (42, True) and len(calls) == 1
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert "k" not in tasks and len(tasks) == 0
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app
+from ..app.stone_layout import fill_region, lattice_2d
+
+
+def legacy_fill(region, stone_size, spacing, padding, stone_shape):
+    # The original nested-loop implementation, kept as the reference
+    min_xyz, max_xyz = region.min(axis=0), region.max(axis=0)
+    rows, count = [], 0
+    x = min_xyz[0] + padding
+    while x < max_xyz[0] - padding:
+        y = min_xyz[1] + padding
+        while y < max_xyz[1] - padding:
+            count += 1
+            shape = ["round", "princess", "oval", "emerald"][count % 4] if stone_shape == "mixed" else stone_shape
+            rows.append([x, y, min_xyz[2], shape])
+            y += stone_size + spacing
+        x += stone_size + spacing
+    return rows
+
+
+def test_square_fill_matches_legacy_loop():
+    region = np.array([[0.0, 0.0, 1.0], [10.0, 7.0, 2.0]])
+    fill = fill_region(region, 1.0, 0.25, 0.5, "square", "mixed")
+    legacy = legacy_fill(region, 1.0, 0.25, 0.5, "mixed")
+    assert fill.count == len(legacy)
+    assert fill.positions.flags["C_CONTIGUOUS"]
+    np.testing.assert_allclose(fill.positions, [r[:3] for r in legacy])
+    assert [fill.shapes[i] for i in fill.shape_ids] == [r[3] for r in legacy]
+
+
+def test_hex_lattice_is_denser_and_evenly_spaced():
+    square = lattice_2d([0, 0], [20, 20], 1.0, "square")
+    hexagonal = lattice_2d([0, 0], [20, 20], 1.0, "honeycomb")
+    assert len(hexagonal) > len(square)
+    # Nearest neighbour of an interior point sits exactly one pitch away
+    centre = hexagonal[np.argmin(np.linalg.norm(hexagonal - 10.0, axis=1))]
+    d = np.sort(np.linalg.norm(hexagonal - centre, axis=1))
+    np.testing.assert_allclose(d[1:7], 1.0)
+
+
+def test_unknown_grid_type_rejected():
+    with pytest.raises(ValueError):
+        lattice_2d([0, 0], [1, 1], 1.0, "spiral")
+    assert len(lattice_2d([0, 0], [10, 10], 1.0, "square", max_points=100)) == 100
+    with pytest.raises(ValueError):
+        lattice_2d([0, 0], [10, 10], 1.0, "square", max_points=99)
+
+
+@pytest.mark.asyncio
+async def test_auto_diamond_fill_endpoint():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        payload = {
+            "region_mesh": [[0, 0, 0], [5, 5, 0.5]],
+            "stone_size": 1.0,
+            "grid_type": "staggered",
+            "spacing": 0.1,
+            "padding": 0.2,
+            "stone_shape": "round",
+        }
+        response = await ac.post("/cad/auto-diamond-fill", json=payload)
+        assert response.status_code == 200
+        body = response.json()
+        assert body["diamond_report"]["total_diamonds"] == len(body["placements"]["positions"])
+        payload["grid_type"] = "spiral"
+        response = await ac.post("/cad/auto-diamond-fill", json=payload)
+        assert response.status_code == 400
+        # A near-zero pitch is refused before anything is allocated
+        payload.update(grid_type="square", stone_size=1e-9, spacing=0)
+        response = await ac.post("/cad/auto-diamond-fill", json=payload)
+        assert response.status_code == 400 and "at most" in response.json()["detail"]
+
+
+def shank_patch(n=60):
+    # Heightfield patch of a 10 mm radius cylinder, like the top of a ring shank
+    x = np.linspace(-6.0, 6.0, n)
+    X, Y = np.meshgrid(x, np.linspace(0.0, 4.0, n), indexing="ij")
+    Z = np.sqrt(100.0 - X ** 2)
+    vertices = np.column_stack((X.ravel(), Y.ravel(), Z.ravel()))
+    i, j = np.meshgrid(np.arange(n - 1), np.arange(n - 1), indexing="ij")
+    a = (i * n + j).ravel()
+    faces = np.concatenate([np.column_stack((a, a + n, a + 1)), np.column_stack((a + 1, a + n, a + n + 1))])
+    return vertices, faces
+
+
+def test_surface_fill_follows_curved_shank():
+    vertices, faces = shank_patch()
+    fill = fill_region(vertices, 0.8, 0.1, 0.3, "hex", "round", mode="surface", faces=faces)
+    planar = fill_region(vertices, 0.8, 0.1, 0.3, "hex", "round")
+    assert fill.count == planar.count
+    p = fill.positions
+    np.testing.assert_allclose(p[:, 2], np.sqrt(100.0 - p[:, 0] ** 2), atol=1e-3)
+    # Seat axes point radially out of the shank, smoothly across facets and whatever the winding
+    radial = np.column_stack((p[:, 0], 0 * p[:, 0], p[:, 2])) / 10.0
+    np.testing.assert_allclose(fill.normals, radial, atol=2e-3)
+    flipped = fill_region(vertices, 0.8, 0.1, 0.3, "hex", "round", mode="surface", faces=faces[:, ::-1])
+    np.testing.assert_allclose(flipped.normals, fill.normals)
+
+
+def test_surface_fill_drops_points_off_the_mesh():
+    # A single right triangle: only the lower-left half of its bounding box is surface
+    soup = [[0, 0, 0], [10, 0, 0], [0, 10, 0]]
+    fill = fill_region(soup, 0.9, 0.1, 0.0, "square", "round", mode="surface")
+    assert 0 < fill.count < fill_region(soup, 0.9, 0.1, 0.0, "square", "round").count
+    assert np.all(fill.positions[:, 0] + fill.positions[:, 1] <= 10.0 + 1e-9)
+    with pytest.raises(ValueError):
+        fill_region(soup[:2], 0.9, 0.1, 0.0, "square", "round", mode="surface")
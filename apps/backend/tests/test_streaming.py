@@ -0,0 +1,102 @@
+import json
+
+import numpy as np
+import pytest
+import httpx
+from ..app import main
+from ..app.main import app
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+@pytest.mark.asyncio
+async def test_fill_streams_placements_in_chunks():
+    region = [[0, 0, 0], [100, 0, 0], [100, 100, 0], [0, 100, 0]]
+    payload = {"region_mesh": region, "stone_size": 0.8, "grid_type": "square", "spacing": 0.2, "padding": 0.5, "stone_shape": "round"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        streamed = await ac.post("/cad/auto-diamond-fill", json=payload, headers={"Accept": "application/x-ndjson"})
+        whole = await ac.post("/cad/auto-diamond-fill", json=payload)
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    records = read_ndjson(streamed)
+    count = whole.json()["diamond_report"]["total_diamonds"]
+    assert records[0]["type"] == "report" and "total_diamonds" not in records[0]["diamond_report"]
+    assert records[-1] == {"type": "done", "count": count}
+    chunks = [r for r in records if r["type"] == "placements"]
+    assert len(chunks) > 1
+    assert [p for c in chunks for p in c["positions"]] == whole.json()["placements"]["positions"]
+    assert "modified_mesh" not in streamed.text
+
+
+@pytest.mark.asyncio
+async def test_seats_stream_with_mesh():
+    stones = [{"position": [x * 2.0, 0.0, 0.0], "size": 1.0} for x in range(5)]
+    payload = {"jewelry_type": "ring", "cad_model_id": 1, "pattern": "pave", "stones": stones, "params": {"include_mesh": True}}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        streamed = await ac.post("/cad/diamond-seats?stream=true", json=payload)
+        whole = await ac.post("/cad/diamond-seats", json=payload)
+    records = read_ndjson(streamed)
+    assert records[0]["type"] == "header" and records[0]["templates"] == whole.json()["templates"]
+    seats = [s for r in records if r["type"] == "seats" for s in r["seat_geometries"]]
+    assert seats == whole.json()["seat_geometries"]
+    vertices = [v for r in records if r["type"] == "mesh_vertices" for v in r["vertices"]]
+    assert vertices == whole.json()["mesh"]["vertices"]
+    assert records[-1] == {"type": "done", "count": 5}
+
+
+@pytest.mark.asyncio
+async def test_fill_stream_is_computed_in_slices(monkeypatch):
+    # A domed surface drops some lattice points, and mixed shapes count placed stones
+    n = 30
+    xs, ys = np.meshgrid(np.linspace(0, 20, n), np.linspace(0, 20, n), indexing="ij")
+    vertices = np.column_stack((xs.ravel(), ys.ravel(), 0.02 * ((xs - 10) ** 2 + (ys - 10) ** 2).ravel()))
+    keep = (xs - 10) ** 2 + (ys - 10) ** 2 < 80
+    i, j = np.meshgrid(np.arange(n - 1), np.arange(n - 1), indexing="ij")
+    a = (i * n + j)[keep[:-1, :-1]]
+    faces = np.concatenate((np.column_stack((a, a + n, a + 1)), np.column_stack((a + 1, a + n, a + n + 1))))
+    payload = {"region_mesh": vertices.tolist(), "region_faces": faces.tolist(), "stone_size": 0.8, "grid_type": "hex",
+               "spacing": 0.2, "padding": 0.5, "stone_shape": "mixed", "placement_mode": "surface"}
+    calls = []
+    run = main.cad_pool.run
+
+    async def counting_run(fn, *args, **kwargs):
+        calls.append(kwargs.get("span"))
+        return await run(fn, *args, **kwargs)
+
+    monkeypatch.setattr(main, "STREAM_SLICE_SIZE", 100)
+    monkeypatch.setattr(main.cad_pool, "run", counting_run)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        whole = (await ac.post("/cad/auto-diamond-fill", json=payload)).json()["placements"]
+        calls.clear()
+        streamed = read_ndjson(await ac.post("/cad/auto-diamond-fill?stream=true", json=payload))
+    assert len(calls) > 3 and all(stop - start == 100 for start, stop in calls)
+    chunks = [r for r in streamed if r["type"] == "placements"]
+    assert [c["offset"] for c in chunks] == list(np.cumsum([0] + [len(c["positions"]) for c in chunks[:-1]]))
+    assert [p for c in chunks for p in c["positions"]] == whole["positions"]
+    assert [s for c in chunks for s in c["shape_ids"]] == whole["shape_ids"]
+    assert streamed[-1] == {"type": "done", "count": len(whole["positions"])}
+
+
+@pytest.mark.asyncio
+async def test_seats_stream_slices_share_one_mesh(monkeypatch):
+    stones = [{"position": [x * 2.0, 0.0, 0.0], "size": 1.0 + 0.5 * (x % 2)} for x in range(7)]
+    payload = {"jewelry_type": "ring", "cad_model_id": 1, "pattern": "pave", "stones": stones, "params": {"include_mesh": True}}
+    monkeypatch.setattr(main, "STREAM_SLICE_SIZE", 3)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        records = read_ndjson(await ac.post("/cad/diamond-seats?stream=true", json=payload))
+        whole = (await ac.post("/cad/diamond-seats", json=payload)).json()
+    seats = [s for r in records if r["type"] == "seats" for s in r["seat_geometries"]]
+    assert seats == whole["seat_geometries"]
+    vertices = np.array([v for r in records if r["type"] == "mesh_vertices" for v in r["vertices"]])
+    faces = np.array([f for r in records if r["type"] == "mesh_faces" for f in r["faces"]])
+    # Slices group vertices differently from the one-shot mesh, but describe the same triangles
+    assert len(faces) == len(whole["mesh"]["faces"])
+    key = lambda tris: sorted(map(tuple, np.round(np.sort(tris, axis=1), 6).reshape(len(tris), -1).tolist()))
+    expected = np.array(whole["mesh"]["vertices"])[np.array(whole["mesh"]["faces"])]
+    assert key(vertices[faces]) == key(expected)
+    assert records[-1] == {"type": "done", "count": 7}
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+import httpx
+from ..app import main
+from ..app.main import app, geometry_store
+from ..app.svg_import import SVGImporter
+
+HEAD = '<svg xmlns="http://www.w3.org/2000/svg" width="100mm" height="100mm" viewBox="0 0 100 100">'
+
+
+def load(svg, tolerance=0.01, chunk=64, **kwargs):
+    importer = SVGImporter(tolerance, **kwargs)
+    data = svg.encode()
+    for i in range(0, len(data), chunk):
+        importer.feed(data[i:i + chunk])
+    return importer.close()
+
+
+def test_curves_are_flattened_within_tolerance():
+    artwork = load(HEAD + '<circle cx="50" cy="50" r="10"/><path d="M10 10 Q 30 40 50 10"/></svg>')
+    circle, quad = artwork.polylines()
+    assert artwork.closed.tolist() == [1, 0]
+    assert np.allclose(np.linalg.norm(circle - [50, 50], axis=1), 10)
+    midpoints = (circle[1:] + circle[:-1]) / 2
+    assert 10 - np.linalg.norm(midpoints - [50, 50], axis=1).min() <= 0.01
+    coarse = load(HEAD + '<circle cx="50" cy="50" r="10"/></svg>', tolerance=0.5).polylines()[0]
+    assert len(coarse) < len(circle)
+    # y flipped up: the quadratic bulges towards y = 100 - 25
+    assert np.allclose(quad[[0, -1]], [[10, 90], [50, 90]]) and np.isclose(quad[:, 1].min(), 75, atol=0.01)
+
+
+def test_transforms_compact_arcs_and_skipped_elements():
+    svg = HEAD + (
+        '<g transform="translate(10 0) scale(2)"><polygon points="0,0 5,0 5,5"/></g>'
+        '<path d="M0 50a5 5 0 1010 0"/>'
+        '<defs><path d="M0 0 L 5 5"/></defs><text>logo</text><use href="#a"/>'
+        '<path d="M1 1"/></svg>'
+    )
+    artwork = load(svg)
+    triangle, arc = artwork.polylines()
+    assert np.allclose(triangle, [[10, 100], [20, 100], [20, 90], [10, 100]])
+    assert np.allclose(arc[[0, -1]], [[0, 50], [10, 50]]) and np.isclose(arc[:, 1].min(), 45, atol=0.02)
+    assert artwork.elements == 3 and artwork.skipped == 2
+    # Out-of-range attributes are treated like unreadable ones
+    assert load(HEAD + '<rect width="1e400" height="2"/><line x2="nan" y2="1"/></svg>').elements == 0
+    with pytest.raises(ValueError):
+        load("<html></html>")
+
+
+def test_relative_state_carries_across_commands_and_batches():
+    # Glued numbers, an implicit lineto after a relative moveto, and drawing
+    # after a closepath, which starts again from the subpath start
+    artwork = load(HEAD + '<path d="M10 90m0-10-10+20h5.5.5zl0 10"/></svg>')
+    outline, tail = artwork.polylines()
+    assert np.allclose(outline, [[10, 20], [0, 0], [5.5, 0], [6, 0], [10, 20]])
+    assert np.allclose(tail, [[10, 20], [10, 10]])
+    assert artwork.closed.tolist() == [1, 0]
+
+    # Smooth curves and compact arc flags give the same result in any batching
+    paths = "".join(
+        f'<path d="M{i} 5c1 1 2 1 3 0s2-1 3 0q1 1 2 0t2 0a2 1 {i} 0{i % 2}2 0z m1 1 l1-1"/>'
+        for i in range(40)
+    )
+    svg = HEAD + paths + '<polygon points="1,1 5,1 5,5"/><line x2="3" y2="4"/></svg>'
+    batched, whole = load(svg, batch_size=1), load(svg)
+    assert batched.elements == whole.elements == 42
+    assert np.array_equal(batched.offsets, whole.offsets) and np.array_equal(batched.closed, whole.closed)
+    assert np.allclose(batched.points, whole.points)
+
+
+@pytest.mark.asyncio
+async def test_import_endpoint_stores_polylines(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    svg = HEAD + '<rect x="10" y="10" width="30" height="20" rx="4"/><line x1="0" y1="0" x2="100" y2="100"/></svg>'
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        imported = (await ac.post("/drawing/import-svg", content=svg.encode(), params={"tolerance": 0.05})).json()
+        stored = (await ac.get(f"/geometry/objects/{imported['curve_id']}", params={"arrays": True})).json()
+        broken = await ac.post("/drawing/import-svg", content=b"<svg><path")
+        bad_tolerance = await ac.post("/drawing/import-svg", content=svg.encode(), params={"tolerance": 0})
+        overflow = await ac.post("/drawing/import-svg", content=b'<svg viewBox="0 0 10 10"><path d="M1e400 0 L1 1"/></svg>')
+        scaled = await ac.post("/drawing/import-svg",
+                               content=b'<svg viewBox="0 0 10 10"><g transform="scale(1e200)"><path d="M1e200 0 L1 1"/></g></svg>')
+
+    assert imported["polylines"] == 2 and imported["closed"] == 1
+    assert imported["bounds"] == [[0.0, 0.0], [100.0, 100.0]]
+    data = stored["data"]
+    assert data["type"] == "polyline_set" and data["offsets"][-1] == len(data["points"]) == imported["points"]
+    assert broken.status_code == 400 and bad_tolerance.status_code == 400
+    assert overflow.status_code == scaled.status_code == 400 and "invalid SVG" in overflow.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_import_endpoint_rejects_oversized_uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    monkeypatch.setattr(main, "MAX_SVG_SIZE", 200)
+    svg = (HEAD + '<path d="M0 0 L 10 10"/>' * 10 + "</svg>").encode()
+
+    async def body():
+        for i in range(0, len(svg), 50):
+            yield svg[i:i + 50]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        declared = await ac.post("/drawing/import-svg", content=svg)
+        streamed = await ac.post("/drawing/import-svg", content=body())
+    assert declared.status_code == streamed.status_code == 413
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app
+from ..app import static_files
+from ..app.mesh_writers import STL_RECORD
+from ..app.sweep import sweep_triangles, transport_frames
+
+
+def signed_volume(triangles):
+    return np.einsum("ij,ij->i", triangles[:, 0], np.cross(triangles[:, 1], triangles[:, 2])).sum() / 6.0
+
+
+def test_frames_are_rotation_minimizing_and_close_the_loop():
+    t = np.linspace(0, 2 * np.pi, 400, endpoint=False)
+    path = np.column_stack((10 * np.cos(t), 10 * np.sin(t), 2 * np.sin(3 * t)))
+    tangents, normals, binormals = transport_frames(path, closed=True)
+    np.testing.assert_allclose(np.sum(normals * tangents, axis=1), 0, atol=1e-9)
+    np.testing.assert_allclose(np.linalg.norm(binormals, axis=1), 1)
+    # No frame-to-frame twist jumps, including across the seam
+    steps = np.degrees(np.arccos(np.clip(np.sum(normals * np.roll(normals, -1, axis=0), axis=1), -1, 1)))
+    assert steps.max() < 2.0
+
+
+def test_sweep_volume_and_winding():
+    _, batches = sweep_triangles([[0, 0, 0], [0, 0, 5], [0, 0, 10]], {"type": "circle", "radius": 1, "segments": 256}, batch_triangles=100)
+    triangles = np.concatenate(list(batches))
+    assert signed_volume(triangles) == pytest.approx(np.pi * 10, rel=1e-3)
+
+    t = np.linspace(0, 20, 2000)
+    helix = np.column_stack((5 * np.cos(t), 5 * np.sin(t), t / 2))
+    total, batches = sweep_triangles(helix, {"type": "rect", "width": 1.0, "height": 0.5})
+    triangles = np.concatenate(list(batches))
+    length = np.linalg.norm(np.diff(helix, axis=0), axis=1).sum()
+    assert len(triangles) == total
+    assert signed_volume(triangles) == pytest.approx(0.5 * length, rel=1e-3)
+
+
+@pytest.mark.asyncio
+async def test_sweep_endpoint_writes_binary_stl(tmp_path, monkeypatch):
+    monkeypatch.setattr(static_files, "STATIC_DIR", tmp_path)
+    t = np.linspace(0, 2 * np.pi, 120, endpoint=False)
+    link = np.column_stack((4 * np.cos(t), 2.5 * np.sin(t), np.zeros_like(t))).tolist()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        response = await ac.post("/geometry/sweep", json={"path": link, "profile": {"type": "circle", "radius": 0.6, "segments": 24}, "params": {"closed": True}})
+        bad = await ac.post("/geometry/sweep", json={"path": link, "profile": {"type": "star"}})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["triangles"] == 120 * 24 * 2
+    stl = tmp_path / body["stl_url"].removeprefix("/static/")
+    data = stl.read_bytes()
+    assert len(data) == body["bytes"] == 84 + 50 * body["triangles"]
+    assert int.from_bytes(data[80:84], "little") == body["triangles"]
+    records = np.frombuffer(data, dtype=STL_RECORD, offset=84)
+    assert signed_volume(records["vertices"].astype(np.float64)) > 0
+    assert bad.status_code == 400
+    # Only the good sweep left a file; housekeeping prunes it once it is old enough
+    assert [p.name for p in (tmp_path / "sweeps").iterdir()] == [stl.name]
+    assert static_files.expire("sweeps", 3600) == 0 and static_files.expire("sweeps", -1) == 1
@@ -0,0 +1,79 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+import httpx
+from ..app.main import app, geometry_store, viewport_cache
+from ..app import static_files
+from ..app.decimate import quadric_decimate, lod_chain
+from ..app.mesh_writers import write_glb
+
+
+def torus(major=10.0, minor=2.0, nu=120, nv=60):
+    u, v = np.meshgrid(np.linspace(0, 2 * np.pi, nu, endpoint=False), np.linspace(0, 2 * np.pi, nv, endpoint=False), indexing="ij")
+    ring = major + minor * np.cos(v)
+    vertices = np.column_stack(((ring * np.cos(u)).ravel(), (ring * np.sin(u)).ravel(), (minor * np.sin(v)).ravel()))
+    i, j = np.meshgrid(np.arange(nu), np.arange(nv), indexing="ij")
+    a, b = (i * nv + j).ravel(), (((i + 1) % nu) * nv + j).ravel()
+    c, d = (i * nv + (j + 1) % nv).ravel(), (((i + 1) % nu) * nv + (j + 1) % nv).ravel()
+    return vertices, np.concatenate((np.column_stack((a, b, d)), np.column_stack((a, d, c))))
+
+
+def volume(vertices, faces):
+    tris = vertices[faces]
+    return np.einsum("ij,ij->i", tris[:, 0], np.cross(tris[:, 1], tris[:, 2])).sum() / 6.0
+
+
+def test_decimation_meets_budget_and_keeps_shape():
+    vertices, faces = torus()
+    coarse_v, coarse_f = quadric_decimate(vertices, faces, 2000)
+    assert 1500 <= len(coarse_f) <= 2000
+    assert volume(coarse_v, coarse_f) == pytest.approx(volume(vertices, faces), rel=0.02)
+    # Surviving vertices stay on the torus surface
+    radial = np.hypot(coarse_v[:, 0], coarse_v[:, 1])
+    assert np.abs(np.hypot(radial - 10.0, coarse_v[:, 2]) - 2.0).max() < 0.05
+    chain = lod_chain(vertices, faces, levels=4, min_faces=100)
+    assert [len(f) for _, f in chain][0] == len(faces) and len(chain) == 4
+    assert all(len(a[1]) > len(b[1]) for a, b in zip(chain, chain[1:]))
+
+
+def test_glb_layout(tmp_path):
+    vertices, faces = torus(nu=8, nv=6)
+    size = write_glb(tmp_path / "t.glb", vertices, faces)
+    data = (tmp_path / "t.glb").read_bytes()
+    magic, version, total = struct.unpack_from("<III", data)
+    json_len, json_type = struct.unpack_from("<II", data, 12)
+    gltf = json.loads(data[20:20 + json_len])
+    bin_len, bin_type = struct.unpack_from("<II", data, 20 + json_len)
+    assert (magic, version, total, size) == (0x46546C67, 2, len(data), len(data))
+    assert json_type == 0x4E4F534A and bin_type == 0x004E4942 and json_len % 4 == 0
+    assert gltf["accessors"][0]["count"] == len(vertices) and gltf["accessors"][2]["count"] == faces.size
+    offset = 28 + json_len + gltf["bufferViews"][2]["byteOffset"]
+    assert np.array_equal(np.frombuffer(data, "<u4", faces.size, offset).reshape(-1, 3), faces)
+    assert bin_len == gltf["buffers"][0]["byteLength"]
+
+
+@pytest.mark.asyncio
+async def test_viewport_levels_are_cached_per_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(geometry_store, "root", tmp_path / "store")
+    monkeypatch.setattr(static_files, "STATIC_DIR", tmp_path / "static")
+    vertices, faces = torus()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        solid = (await ac.post("/geometry/solid", json={"vertices": vertices.tolist(), "faces": faces.tolist()})).json()["solid_id"]
+        builds = viewport_cache.builds
+        first = (await ac.get("/geometry/viewport/7", params={"geometry_id": solid})).json()
+        budget = (await ac.get("/geometry/viewport/7", params={"triangles": 5000})).json()
+        full = (await ac.get("/geometry/viewport/7", params={"triangles": 10 ** 9})).json()
+        missing = await ac.get("/geometry/viewport/8")
+        unknown = await ac.get("/geometry/viewport/8", params={"geometry_id": "0" * 32})
+
+    assert viewport_cache.builds == builds + 1
+    counts = [lv["triangles"] for lv in first["levels"]]
+    assert counts == sorted(counts) and counts[-1] == len(faces) and len(counts) == 3
+    assert first["triangles"] == counts[0] and first["viewport_url"] == first["levels"][0]["url"]
+    assert budget["triangles"] == max(c for c in counts if c <= 5000)
+    assert full["level"] == 0 and full["geometry_id"] == solid
+    assert (tmp_path / "static" / full["viewport_url"].split("/static/")[1]).exists()
+    assert missing.status_code == 404 and unknown.status_code == 404